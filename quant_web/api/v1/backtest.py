@@ -1,19 +1,45 @@
 from fastapi import APIRouter, BackgroundTasks
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, confloat, conint
 import asyncio
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Union
 
-from quant_web.core.tasks import start_backtest_task
+from quant_web.core.tasks import register_cached_backtest, start_backtest_task, start_sweep_task
 from quant_web.core.task_manager import global_task_manager
+from quant_web.core.result_cache import global_result_cache, make_run_key
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.indicator_store import global_indicator_store
+from quant_web.core.be.profiler import global_profile_stats
+from quant_web.core.be.sweep import check_rank_metric, expand_grid
+from quant_web.core.const import (
+    ROBUSTNESS_MAX_BLOCK_SIZE,
+    ROBUSTNESS_MAX_SIMULATIONS,
+    SWEEP_MAX_COMBINATIONS,
+    SWEEP_RANK_METRIC,
+)
+from quant_web.state import get_task_queue, update_task_activity
 
 router = APIRouter()
 
 
+class RobustnessOptions(BaseModel):
+    """蒙特卡洛稳健性分析选项"""
+    model_config = ConfigDict(extra="forbid")
+    
+    n_simulations: Optional[conint(ge=1, le=ROBUSTNESS_MAX_SIMULATIONS)] = Field(default=None, description="模拟路径数")
+    block_size: Optional[conint(ge=1, le=ROBUSTNESS_MAX_BLOCK_SIZE)] = Field(
+        default=None, description="自助法的块长度（交易日）")
+    confidence: Optional[confloat(gt=0, lt=1)] = Field(default=None, description="置信水平")
+    seed: Optional[int] = Field(default=None, description="随机数种子")
+
+
 class StrategyConfig(BaseModel):
     """策略配置模型"""
     name: str = Field(..., description="策略名称")
     parameters: dict = Field(default_factory=dict, description="策略参数")
+    robustness: Union[bool, RobustnessOptions] = Field(
+        default=False, description="是否附带蒙特卡洛稳健性分析，或分析选项")
+    profile: bool = Field(default=False, description="是否统计回测各阶段耗时")
 
 
 class BacktestRequest(BaseModel):
@@ -25,9 +51,30 @@ class BacktestRequest(BaseModel):
     init_cash: Optional[float] = Field(default=1000000.0, description="初始资金")
 
 
+class SweepRequest(BaseModel):
+    """参数扫描请求模型"""
+    strategy_name: str = Field(..., description="策略名称")
+    param_grid: dict[str, list] = Field(..., description="参数网格，参数名 -> 候选值列表")
+    stock_pool: list[str] = Field(..., description="股票池")
+    start_date: str = Field(..., description="开始日期，格式：YYYY-MM-DD")
+    end_date: str = Field(..., description="结束日期，格式：YYYY-MM-DD")
+    init_cash: Optional[float] = Field(default=1000000.0, description="初始资金")
+    rank_by: Optional[str] = Field(default=SWEEP_RANK_METRIC, description="结果表排序指标")
+    max_workers: Optional[int] = Field(default=None, description="工作进程数")
+
+
 @router.post("/backtest/submit", status_code=202)
 async def submit_backtest(req: BacktestRequest, background_tasks: BackgroundTasks):
-    """提交回测任务"""
+    """提交回测任务
+    
+    由策略、参数、股票池、日期区间、初始资金和数据版本生成运行键，
+    已有相同运行键的结果时直接返回缓存结果，不再重新回测。
+    
+    未命中缓存时返回 {task_id, status: "Pending", cached: false, run_key, message}，
+    结果通过 /ws/{task_id} 推送或由 /backtest/result/{task_id} 获取；
+    命中缓存时返回 {task_id, status: "completed", cached: true, run_key, result}，
+    task_id 登记为已完成的任务，同样可以通过 /backtest/status 和 /backtest/result 查询。
+    """
     # 生成任务ID
     task_id = f"BK_{int(datetime.now().timestamp() * 1000)}"
     
@@ -36,24 +83,57 @@ async def submit_backtest(req: BacktestRequest, background_tasks: BackgroundTask
         start_date = datetime.strptime(req.start_date, "%Y-%m-%d")
         end_date = datetime.strptime(req.end_date, "%Y-%m-%d")
         
-        # 创建消息队列
-        queue = asyncio.Queue()
+        # 加载数据以确定数据版本，加载后的数据馈送交给回测任务复用
+        data_feed = DataFeed(indicator_store=global_indicator_store)
+        loaded = await asyncio.get_running_loop().run_in_executor(
+            None, data_feed.load_historical_data, req.stock_pool, start_date, end_date)
+        if not loaded:
+            raise ValueError("加载历史数据失败")
+        
+        strategy_config = req.strategy_config.model_dump()
+        if isinstance(req.strategy_config.robustness, RobustnessOptions):
+            # 只传递请求中给出的分析选项，其余取分析器的默认值；不带任何选项时等同于 true
+            strategy_config["robustness"] = req.strategy_config.robustness.model_dump(exclude_none=True) or True
+        run_key = make_run_key(req.strategy_config.name, req.strategy_config.parameters, req.stock_pool,
+                               start_date, end_date, req.init_cash, data_feed.data_version,
+                               options={"robustness": strategy_config["robustness"]})
+        # 要求性能统计时需要实际运行一次回测
+        cached = None if req.strategy_config.profile else global_result_cache.get(run_key)
+        if cached is not None:
+            task = register_cached_backtest(task_id, strategy_config, req.stock_pool, start_date, end_date, cached,
+                                            initial_cash=req.init_cash, run_key=run_key)
+            return {
+                "task_id": task_id,
+                "status": "completed",
+                "cached": True,
+                "run_key": run_key,
+                "result": task.result
+            }
+        
+        # 使用与WebSocket端点共享的任务队列
+        queue = get_task_queue(task_id)
+        update_task_activity(task_id)
         
         # 将回测任务添加到后台任务
         background_tasks.add_task(
             start_backtest_task,
             task_id=task_id,
-            strategy_config=req.strategy_config.model_dump(),
+            strategy_config=strategy_config,
             stock_pool=req.stock_pool,
             start_date=start_date,
             end_date=end_date,
-            queue=queue
+            queue=queue,
+            initial_cash=req.init_cash,
+            data_feed=data_feed,
+            run_key=run_key
         )
         
         # 返回任务ID和状态
         return {
             "task_id": task_id,
             "status": "Pending",
+            "cached": False,
+            "run_key": run_key,
             "message": "回测任务已提交，正在处理中"
         }
     except Exception as e:
@@ -64,6 +144,63 @@ async def submit_backtest(req: BacktestRequest, background_tasks: BackgroundTask
         }
 
 
+@router.post("/backtest/sweep", status_code=202)
+async def submit_sweep(req: SweepRequest, background_tasks: BackgroundTasks):
+    """提交参数扫描任务
+    
+    每个参数组合完成后通过 /ws/{task_id} 推送结果行，
+    全部完成后通过 /backtest/result/{task_id} 获取按 rank_by 排序的结果表。
+    """
+    task_id = f"SW_{int(datetime.now().timestamp() * 1000)}"
+    
+    try:
+        start_date = datetime.strptime(req.start_date, "%Y-%m-%d")
+        end_date = datetime.strptime(req.end_date, "%Y-%m-%d")
+        
+        combinations = len(expand_grid(req.param_grid))
+        if combinations > SWEEP_MAX_COMBINATIONS:
+            raise ValueError(f"参数组合数 {combinations} 超过上限 {SWEEP_MAX_COMBINATIONS}")
+        if req.rank_by:
+            check_rank_metric(req.rank_by)
+        
+        # 使用与WebSocket端点共享的任务队列，完成的参数组合可实时推送
+        queue = get_task_queue(task_id)
+        update_task_activity(task_id)
+        
+        background_tasks.add_task(
+            start_sweep_task,
+            task_id=task_id,
+            strategy_name=req.strategy_name,
+            param_grid=req.param_grid,
+            stock_pool=req.stock_pool,
+            start_date=start_date,
+            end_date=end_date,
+            queue=queue,
+            initial_cash=req.init_cash,
+            rank_by=req.rank_by,
+            max_workers=req.max_workers
+        )
+        
+        return {
+            "task_id": task_id,
+            "status": "Pending",
+            "combinations": combinations,
+            "message": "参数扫描任务已提交，正在处理中"
+        }
+    except Exception as e:
+        return {
+            "error": "提交参数扫描任务失败",
+            "message": str(e),
+            "status_code": 400
+        }
+
+
+@router.get("/backtest/profile")
+async def get_backtest_profile():
+    """获取本进程内开启性能统计（strategy_config.profile）的回测按阶段、按策略累计的耗时"""
+    return global_profile_stats.snapshot()
+
+
 @router.get("/backtest/status/{task_id}")
 async def get_backtest_status(task_id: str):
     """获取回测任务状态"""
@@ -104,7 +241,7 @@ async def get_backtest_result(task_id: str):
         "task_id": task.task_id,
         "status": task.status.value,
         "result": task.result,
-        "error": task.error,
+        "error": task.error_message,
         "progress": task.progress,
         "completed_at": task.completed_at.isoformat() if task.completed_at else None
     }
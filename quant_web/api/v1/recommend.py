@@ -1,13 +1,18 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import datetime, timedelta
+import re
 import uuid
 import asyncio
 from loguru import logger
 
+from quant_web.core.be.covariance import CovarianceSnapshot
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.indicator_store import global_indicator_store
 from quant_web.core.re.factor_model import FactorModel
-from quant_web.core.const import FACTOR_WEIGHTS
+from quant_web.core.re.universe_scan import ScanResult, UniverseScan
+from quant_web.core.const import FACTOR_WEIGHTS, SCAN_WARMUP_DAYS
 
 # 模拟推荐任务存储
 tasks: Dict[str, Dict] = {}
@@ -127,6 +132,21 @@ async def get_recommend_results(task_id: str):
     return [RecommendResult(**result) for result in recommendations[task_id]]
 
 
+@router.get("/tasks/{task_id}/risk", response_model=Dict[str, Any])
+async def get_recommend_risk(task_id: str):
+    """获取推荐股票的年化波动率与相关系数矩阵（推荐任务完成时保存在任务上，不重新计算）"""
+    if task_id not in tasks:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    if tasks[task_id]["status"] != "completed":
+        raise HTTPException(status_code=400, detail="任务尚未完成")
+    
+    if "risk" not in tasks[task_id]:
+        raise HTTPException(status_code=404, detail="风险数据不存在")
+    
+    return tasks[task_id]["risk"]
+
+
 @router.get("/factors", response_model=List[FactorConfig])
 async def get_factor_configs():
     """获取当前因子配置"""
@@ -222,20 +242,21 @@ async def run_recommend_algorithm(task_id: str, request: RecommendRequest):
         tasks[task_id]["status"] = "running"
         tasks[task_id]["updated_at"] = datetime.now()
         
-        # 在实际应用中，这里应该从数据库或缓存中获取策略回测结果
-        # 这里使用模拟数据
-        mock_results = generate_mock_results(request.stock_pool)
+        # 逐股运行全部已注册策略，得到因子模型所需的逐股统计（CPU密集，放到线程池避免阻塞事件循环）
+        loop = asyncio.get_running_loop()
+        scan, covariance = await loop.run_in_executor(None, scan_universe, request.stock_pool, request.time_range)
+        results = scan.to_factor_results()
         
         # 更新因子统计信息
         if request.factors:
             # 使用自定义因子权重
             with temp_factor_weights(request.factors):
-                factor_model.update_stats(request.stock_pool, mock_results)
-                scores = calculate_stock_scores(request.stock_pool, mock_results, request.top_n)
+                factor_model.update_stats(request.stock_pool, results)
+                scores = calculate_stock_scores(request.stock_pool, results, request.top_n)
         else:
             # 使用默认因子权重
-            factor_model.update_stats(request.stock_pool, mock_results)
-            scores = calculate_stock_scores(request.stock_pool, mock_results, request.top_n)
+            factor_model.update_stats(request.stock_pool, results)
+            scores = calculate_stock_scores(request.stock_pool, results, request.top_n)
         
         # 构建推荐结果
         recommend_results = []
@@ -252,6 +273,9 @@ async def run_recommend_algorithm(task_id: str, request: RecommendRequest):
         
         # 存储结果
         recommendations[task_id] = recommend_results
+        # 只保存推荐股票的风险摘要，随任务一起保存和清理
+        tasks[task_id]["risk"] = covariance.select(
+            [stock_code for stock_code, _, _ in scores if stock_code in covariance.symbols]).to_dict()
         
         # 更新任务状态为完成
         tasks[task_id]["status"] = "completed"
@@ -266,32 +290,28 @@ async def run_recommend_algorithm(task_id: str, request: RecommendRequest):
         tasks[task_id]["error"] = str(e)
 
 
-def generate_mock_results(stock_pool: List[str]) -> List[Dict]:
-    """生成模拟回测结果"""
-    import random
-    results = []
-    
-    # 模拟几个策略的回测结果
-    for _ in range(3):
-        strategy_result = {"stocks": {}}
-        
-        for stock in stock_pool:
-            # 生成随机的回测数据
-            strategy_result["stocks"][stock] = {
-                "total_return": random.uniform(-0.2, 0.5),
-                "volatility": random.uniform(0.1, 0.5),
-                "sharpe_ratio": random.uniform(-1, 3),
-                "max_drawdown": random.uniform(0.1, 0.4),
-                "win_rate": random.uniform(0.3, 0.7),
-                "close_prices": [random.uniform(10, 100) for _ in range(20)],
-                "volume": [random.uniform(1000, 10000) for _ in range(20)],
-                "daily_returns": [random.uniform(-0.05, 0.05) for _ in range(19)],
-                "price_changes": [random.uniform(-0.05, 0.05) for _ in range(19)]
-            }
-        
-        results.append(strategy_result)
+def parse_time_range(time_range: Optional[str]) -> timedelta:
+    """解析时间范围，如 "10d"、"2w"、"3m"、"1y"，为空时取3个月"""
+    match = re.fullmatch(r"(\d+)([dwmy])", (time_range or "3m").strip().lower())
+    if not match:
+        raise ValueError(f"无效的时间范围: {time_range}")
+    count, unit = int(match.group(1)), match.group(2)
+    return timedelta(days=count * {"d": 1, "w": 7, "m": 30, "y": 365}[unit])
+
+
+def scan_universe(stock_pool: List[str], time_range: Optional[str]) -> Tuple[ScanResult, CovarianceSnapshot]:
+    """在时间范围内对股票池逐股扫描全部策略，评估区间之前额外加载 SCAN_WARMUP_DAYS 天数据用于指标预热
     
-    return results
+    同时返回股票池截至最后一个交易日的收益率协方差快照，由同一份已加载的行情计算。
+    """
+    end_date = datetime.now()
+    start_date = end_date - parse_time_range(time_range)
+    data_feed = DataFeed(indicator_store=global_indicator_store)
+    if not data_feed.load_historical_data(stock_pool, start_date - timedelta(days=SCAN_WARMUP_DAYS), end_date):
+        raise RuntimeError("加载股票池行情数据失败")
+    scan = UniverseScan(stock_pool, start_date, end_date, data_feed=data_feed).run()
+    # 接口展示逐只股票的波动率与相关系数，不向平均方差收缩
+    return scan, data_feed.get_covariance_service(shrinkage=None).snapshot()
 
 
 def calculate_stock_scores(stock_pool: List[str], results: List[Dict], top_n: int) -> List[tuple]:
@@ -5,6 +5,23 @@ from .trading_engine import TradingEngine
 from .portfolio import Portfolio
 from .order import Order, OrderStatus, OrderSide
 from .data_feed import DataFeed
+from .metrics import StreamingMetrics
+from .indicators import IndicatorEngine, IndicatorHandle
+from .indicator_store import IndicatorStore
+from .sweep import ParameterSweep
+from .sharding import ShardedBacktest
+from .checkpoint import EngineSnapshot
+from .scenario import ScenarioFork, Branch
+from .stress import StressTester, ShockScenarios, StressReport
+from .covariance import CovarianceService, CovarianceSnapshot
+from .walk_forward import WalkForwardOptimizer
+from .search import SuccessiveHalvingSearch, StopRule, MaxDrawdownStop, MinSharpeStop
+from .robustness import RobustnessAnalyzer
+from .profiler import PhaseProfiler
+from .cross_section import CrossSection
+from .schedule import (
+    Schedule, EveryDay, EveryNTradingDays, CalendarInterval, MonthEnd, OnFill, IndicatorCross, AnyOf
+)
 
 __all__ = [
     'Strategy',
@@ -15,5 +32,35 @@ __all__ = [
     'Order',
     'OrderStatus',
     'OrderSide',
-    'DataFeed'
+    'DataFeed',
+    'StreamingMetrics',
+    'IndicatorEngine',
+    'IndicatorHandle',
+    'IndicatorStore',
+    'ParameterSweep',
+    'ShardedBacktest',
+    'EngineSnapshot',
+    'ScenarioFork',
+    'Branch',
+    'StressTester',
+    'ShockScenarios',
+    'StressReport',
+    'CovarianceService',
+    'CovarianceSnapshot',
+    'WalkForwardOptimizer',
+    'SuccessiveHalvingSearch',
+    'StopRule',
+    'MaxDrawdownStop',
+    'MinSharpeStop',
+    'RobustnessAnalyzer',
+    'PhaseProfiler',
+    'CrossSection',
+    'Schedule',
+    'EveryDay',
+    'EveryNTradingDays',
+    'CalendarInterval',
+    'MonthEnd',
+    'OnFill',
+    'IndicatorCross',
+    'AnyOf'
 ]
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import io
+import pickle
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+
+class _FeedPickler(pickle.Pickler):
+    """把数据馈送替换为引用，快照中不包含行情数据"""
+    
+    def __init__(self, file, data_feed):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.data_feed = data_feed
+    
+    def persistent_id(self, obj):
+        return 'data_feed' if obj is self.data_feed else None
+
+
+class _FeedUnpickler(pickle.Unpickler):
+    """恢复快照时把数据馈送引用指回当前的数据馈送"""
+    
+    def __init__(self, file, data_feed):
+        super().__init__(file)
+        self.data_feed = data_feed
+    
+    def persistent_load(self, pid):
+        if pid == 'data_feed':
+            return self.data_feed
+        raise pickle.UnpicklingError(f"Unknown persistent id: {pid}")
+
+
+def dumps_state(state: Dict[str, Any], data_feed) -> bytes:
+    """把引擎状态对象图序列化为字节串，数据馈送只保存引用"""
+    buffer = io.BytesIO()
+    _FeedPickler(buffer, data_feed).dump(state)
+    return buffer.getvalue()
+
+
+def loads_state(payload: bytes, data_feed) -> Dict[str, Any]:
+    """反序列化引擎状态对象图，数据馈送引用指回 data_feed"""
+    return _FeedUnpickler(io.BytesIO(payload), data_feed).load()
+
+
+@dataclass
+class EngineSnapshot:
+    """回测在某个交易日收盘后的内存快照，可多次分叉出独立的分支继续回测
+    
+    可变的引擎状态（持仓向量、挂单、指标、绩效累加器、交易日志、策略和调度计划）序列化为一个字节串，
+    每个分支恢复时得到自己的副本，互不影响；数据馈送（价格矩阵、预计算指标）不在快照中，
+    各分支共享同一个只读的数据馈送。已成交的订单和已有的净值点不再变化，分支共享这些对象，
+    只在各自的列表中追加分叉之后的部分。
+    """
+    date: datetime  # 快照时已处理完的最后一个交易日
+    start_date: datetime
+    end_date: datetime
+    vectorized: bool
+    bars: int  # 已处理的交易日数
+    dispatched_days: int
+    data_version: str
+    payload: bytes
+    order_history: List[Any]
+    daily_equity: List[Dict]
+    # 拍摄快照的引擎的构造设置（verbose、journal_sample_every、risk_checker），分支引擎按相同设置构造
+    settings: Dict[str, Any] = field(default_factory=dict)
+    
+    @property
+    def size(self) -> int:
+        """快照中序列化状态的字节数"""
+        return len(self.payload)
+    
+    @property
+    def equity(self) -> float:
+        """快照时的净值"""
+        return self.daily_equity[-1]['equity'] if self.daily_equity else float('nan')
+    
+    def restore(self, data_feed) -> Dict[str, Any]:
+        """恢复一份独立的引擎状态副本"""
+        if data_feed.data_version != self.data_version:
+            raise ValueError(f"Snapshot was taken on data version {self.data_version}, "
+                             f"the data feed is at {data_feed.data_version}")
+        return loads_state(self.payload, data_feed)
+
+
+def checkpoint_key(*parts: Any) -> str:
+    """由回测的输入（区间、资金、策略与参数、数据版本等）生成快照的校验键，输入不同的快照不会被恢复"""
+    payload = json.dumps(parts, separators=(',', ':'), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def save_checkpoint(path: str, state: Dict[str, Any], data_feed) -> int:
+    """保存回测快照（先写临时文件再原子替换），返回写入的字节数
+    
+    快照是引擎状态对象图的一次 pickle：持仓向量、挂单与订单历史、指标引擎、绩效累加器、
+    交易日志和策略对象一起序列化，对象之间的引用（如策略持有的投资组合和指标）在恢复后保持一致；
+    数据馈送只保存引用，恢复时指向当前加载的数据馈送。
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(tmp_path, 'wb') as f:
+        _FeedPickler(f, data_feed).dump(state)
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return size
+
+
+def load_checkpoint(path: str, data_feed) -> Optional[Dict[str, Any]]:
+    """读取回测快照，文件不存在或无法读取时返回None"""
+    try:
+        with open(path, 'rb') as f:
+            return _FeedUnpickler(f, data_feed).load()
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Failed to load checkpoint {path}: {e}")
+        return None
+
+
+def remove_checkpoint(path: str) -> None:
+    """删除回测快照"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
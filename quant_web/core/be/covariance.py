@@ -0,0 +1,253 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from loguru import logger
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.const import (
+    COVARIANCE_HALFLIFE,
+    COVARIANCE_METHOD,
+    COVARIANCE_RESYNC_BARS,
+    COVARIANCE_SHRINKAGE,
+    COVARIANCE_WINDOW,
+    TRADING_DAYS_PER_YEAR,
+)
+
+COVARIANCE_METHODS = ('ewm', 'rolling')
+# 延迟缩放系数低于该值时把缩放并入矩，避免下溢
+_MIN_SCALE = 1e-100
+# 累加二阶矩时每块的行数
+_FOLD_BLOCK = 256
+
+
+def oas_intensity(trace: float, squared_norm: float, n: int, observations: float) -> float:
+    """Oracle Approximating Shrinkage 的最优收缩强度（目标为平均方差 x 单位阵）
+    
+    只依赖协方差矩阵的迹、Frobenius 范数的平方和样本数，不需要逐个样本的四阶矩，
+    增量维护的协方差也可以直接使用。
+    """
+    if n == 0:
+        return 0.0
+    mu = trace / n
+    alpha = squared_norm / n ** 2
+    den = (observations + 1.0) * (alpha - mu ** 2 / n)
+    return 1.0 if den <= 0 else float(min((alpha + mu ** 2) / den, 1.0))
+
+
+@dataclass
+class CovarianceSnapshot:
+    """某一交易日的日收益率协方差估计
+    
+    由 CovarianceService 生成并缓存，数组为只读，可以在多个策略和请求之间直接共享。
+    """
+    date: datetime
+    symbols: List[str]
+    mean: np.ndarray  # 日收益率均值
+    covariance: np.ndarray  # 日收益率协方差（已收缩）
+    observations: float  # 样本数，指数加权时为有效样本量
+    shrinkage: float = 0.0  # 收缩强度
+    _correlation: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+    
+    def __post_init__(self):
+        self.mean.setflags(write=False)
+        self.covariance.setflags(write=False)
+    
+    @property
+    def volatility(self) -> np.ndarray:
+        """日收益率波动率"""
+        return np.sqrt(np.maximum(np.diag(self.covariance), 0.0))
+    
+    @property
+    def correlation(self) -> np.ndarray:
+        """相关系数矩阵，没有波动的股票与其他股票的相关系数为0"""
+        if self._correlation is None:
+            volatility = self.volatility
+            with np.errstate(invalid='ignore', divide='ignore'):
+                correlation = self.covariance / np.outer(volatility, volatility)
+            correlation = np.nan_to_num(correlation, nan=0.0, posinf=0.0, neginf=0.0)
+            np.fill_diagonal(correlation, 1.0)
+            correlation.setflags(write=False)
+            self._correlation = correlation
+        return self._correlation
+    
+    def select(self, symbols: Sequence[str]) -> 'CovarianceSnapshot':
+        """截取部分股票的协方差快照，按 symbols 的顺序排列"""
+        index = {ts_code: j for j, ts_code in enumerate(self.symbols)}
+        missing = [ts_code for ts_code in symbols if ts_code not in index]
+        if missing:
+            raise KeyError(f"Symbols not covered by the covariance snapshot: {missing}")
+        columns = np.array([index[ts_code] for ts_code in symbols], dtype=np.intp)
+        return CovarianceSnapshot(self.date, list(symbols), self.mean[columns],
+                                  self.covariance[np.ix_(columns, columns)], self.observations, self.shrinkage)
+    
+    def portfolio_variance(self, weights: np.ndarray) -> float:
+        """按 symbols 顺序排列的权重向量的组合日收益率方差"""
+        return float(weights @ self.covariance @ weights)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """可序列化的摘要：年化波动率与相关系数矩阵"""
+        return {
+            'date': self.date.isoformat() if self.date is not None else None,
+            'symbols': list(self.symbols),
+            'observations': self.observations,
+            'shrinkage': self.shrinkage,
+            'annual_volatility': (self.volatility * np.sqrt(TRADING_DAYS_PER_YEAR)).tolist(),
+            'correlation': self.correlation.tolist()
+        }
+
+
+class CovarianceService:
+    """由数据馈送的日收益率矩阵增量维护的协方差估计
+    
+    维护加权的样本数、一阶矩向量和二阶矩矩阵（股票数 x 股票数），每个新交易日只做一次秩1更新，
+    成本为 O(股票数²)，不随回看长度增长；一次推进多个交易日时合并为一次矩阵乘法：
+        - ewm：指数加权，每推进一日旧的矩按半衰期衰减；
+        - rolling：最近 window 个交易日等权，加入新的一日同时减去移出窗口的一日，
+          每 resync_every 个交易日按窗口重新计算一次，消除加减累积的舍入误差。
+    协方差快照按交易日缓存，同一日期的多次请求直接返回同一份结果。时间倒退（如从较早的快照分叉回测）时从头重建。
+    收益率取盯市价格的逐日涨跌幅，上市前和停牌日为0。
+    """
+    
+    def __init__(self, data_feed: DataFeed, method: str = COVARIANCE_METHOD, halflife: float = COVARIANCE_HALFLIFE,
+                 window: int = COVARIANCE_WINDOW, shrinkage: Union[None, float, str] = COVARIANCE_SHRINKAGE,
+                 resync_every: int = COVARIANCE_RESYNC_BARS):
+        """
+        Args:
+            data_feed: 提供收益率矩阵的数据馈送
+            method: 'ewm'（指数加权）或 'rolling'（滚动窗口）
+            halflife: 指数加权的半衰期（交易日）
+            window: 滚动窗口长度（交易日）
+            shrinkage: 向 平均方差 x 单位阵 收缩：None 不收缩，0~1 的数为固定收缩强度，'oas' 按样本数自动确定
+            resync_every: 滚动窗口每增量更新多少个交易日重新计算一次
+        """
+        if method not in COVARIANCE_METHODS:
+            raise ValueError(f"Unknown covariance method: {method}")
+        if isinstance(shrinkage, str) and shrinkage != 'oas':
+            raise ValueError(f"Unknown shrinkage estimator: {shrinkage}")
+        self.data_feed = data_feed
+        self.method = method
+        self.halflife = halflife
+        self.window = window
+        self.shrinkage = shrinkage
+        self.resync_every = resync_every
+        self.decay = 0.5 ** (1.0 / halflife) if method == 'ewm' else 1.0
+        self._reset()
+    
+    def _reset(self) -> None:
+        """清空累积的矩，下一次更新从头计算"""
+        self._row = 1  # 已并入的收益率行为 [_start, _row)，第0行没有前一日，不是有效的收益率
+        self._start = 1
+        self._synced = 1  # 滚动窗口上一次整体重新计算时的 _row
+        self._weight = 0.0
+        self._weight_sq = 0.0
+        # 一阶矩与二阶矩按 _scale 延迟缩放：指数衰减只改 _scale，不必每个交易日把整个矩阵乘一遍
+        self._scale = 1.0
+        self._sum: Optional[np.ndarray] = None
+        self._cross: Optional[np.ndarray] = None
+        self._snapshot: Optional[CovarianceSnapshot] = None
+    
+    def _fold(self, rows: np.ndarray, weights: np.ndarray, decay: float = 1.0) -> None:
+        """把一批收益率行按权重并入矩（已有的矩先乘以 decay），权重为负时从矩中减去"""
+        if self._sum is None:
+            n = rows.shape[1]
+            self._sum, self._cross = np.zeros(n), np.zeros((n, n))
+        if decay != 1.0:
+            self._weight *= decay
+            self._weight_sq *= decay ** 2
+            self._scale *= decay
+            if self._scale < _MIN_SCALE:
+                self._sum *= self._scale
+                self._cross *= self._scale
+                self._scale = 1.0
+        self._weight += float(weights.sum())
+        self._weight_sq += float(np.sign(weights) @ (weights ** 2))
+        scaled = weights / self._scale
+        self._sum += scaled @ rows
+        weighted = rows * scaled[:, np.newaxis]
+        # 按行分块累加二阶矩，增量的临时矩阵留在缓存中，不必整块分配 股票数 x 股票数 的内存
+        for i in range(0, len(self._cross), _FOLD_BLOCK):
+            self._cross[i:i + _FOLD_BLOCK] += weighted[:, i:i + _FOLD_BLOCK].T @ rows
+    
+    def _rebuild(self, end: int) -> None:
+        """由收益率矩阵整体计算截至第 end 行（不含）的矩"""
+        returns = self.data_feed.get_return_matrix()
+        self._reset()
+        start = 1 if self.method == 'ewm' else max(1, end - self.window)
+        rows = returns[start:end]
+        if self.method == 'ewm':
+            weights = self.decay ** np.arange(len(rows) - 1, -1, -1, dtype=np.float64)
+        else:
+            weights = np.ones(len(rows))
+        self._fold(rows, weights)
+        self._start, self._row, self._synced = start, max(end, 1), max(end, 1)
+    
+    def update(self, date: Optional[datetime] = None) -> int:
+        """把矩推进到 date（含，默认最后一个交易日），返回并入的交易日数"""
+        returns = self.data_feed.get_return_matrix()
+        end = len(returns)
+        if date is not None:
+            row = self.data_feed.get_date_index(date)
+            if row is None:
+                raise ValueError(f"No market data on {date}")
+            end = row + 1
+        if end == self._row and self._sum is not None:
+            return 0
+        
+        steps = end - self._row
+        if self._sum is None or steps < 0 or (self.method == 'rolling' and (
+                steps >= self.window or end - self._synced >= self.resync_every)):
+            logger.debug(f"Rebuilding {self.method} covariance up to row {end}")
+            self._rebuild(end)
+            return end - self._start
+        
+        rows = returns[self._row:end]
+        if self.method == 'ewm':
+            self._fold(rows, self.decay ** np.arange(steps - 1, -1, -1, dtype=np.float64), self.decay ** steps)
+        else:
+            start = max(1, end - self.window)
+            leaving = returns[self._start:start]
+            self._fold(np.vstack([rows, leaving]), np.concatenate([np.ones(steps), -np.ones(len(leaving))]))
+            self._start = start
+        self._row = end
+        self._snapshot = None
+        return steps
+    
+    def snapshot(self, date: Optional[datetime] = None) -> CovarianceSnapshot:
+        """截至 date（含，默认最后一个交易日）的协方差快照，同一日期重复请求时直接返回缓存的快照"""
+        self.update(date)
+        if self._snapshot is not None:
+            return self._snapshot
+        
+        weight, weight_sq, cross = self._weight, self._weight_sq, self._cross
+        n = len(self._sum)
+        # 协方差 = a x 二阶矩 - u x 均值均值ᵀ，u 为加权样本的无偏修正（等权时即 n / (n - 1)）
+        unbiased = weight ** 2 / (weight ** 2 - weight_sq) if weight ** 2 > weight_sq else 1.0
+        scale = self._scale * unbiased / weight if weight > 0 else 0.0
+        mean = self._sum * (self._scale / weight) if weight > 0 else np.zeros(n)
+        observations = weight ** 2 / weight_sq if weight_sq > 0 else 0.0
+        
+        # 收缩所需的迹和范数直接由矩算出，协方差矩阵只在最后生成一次
+        squared_mean = float(mean @ mean)
+        trace = scale * float(np.trace(cross)) - unbiased * squared_mean
+        intensity = 0.0
+        if self.shrinkage == 'oas':
+            squared_norm = scale ** 2 * float(np.vdot(cross, cross)) - \
+                2.0 * scale * unbiased * float(mean @ cross @ mean) + unbiased ** 2 * squared_mean ** 2
+            intensity = oas_intensity(trace, squared_norm, n, observations)
+        elif self.shrinkage:
+            intensity = float(self.shrinkage)
+        
+        covariance = cross * (scale * (1.0 - intensity))
+        outer = mean * (unbiased * (1.0 - intensity))
+        for i in range(0, n, _FOLD_BLOCK):
+            covariance[i:i + _FOLD_BLOCK] -= np.multiply.outer(outer[i:i + _FOLD_BLOCK], mean)
+        if intensity > 0:
+            covariance[np.diag_indices(n)] += intensity * trace / n
+        
+        dates = self.data_feed.get_dates()
+        self._snapshot = CovarianceSnapshot(dates[self._row - 1] if len(dates) else date,
+                                            list(self.data_feed.get_available_stocks()), mean, covariance,
+                                            observations, intensity)
+        return self._snapshot
@@ -0,0 +1,143 @@
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+# 截面矩阵提供函数中表示“累计有效bar数”的伪字段名
+BAR_COUNTS = 'bar_counts'
+
+
+def rank(values: np.ndarray, mask: Optional[np.ndarray] = None, ascending: bool = True) -> np.ndarray:
+    """截面排名（从1开始），值相同时按股票顺序排名，被掩码排除或为NaN的位置为NaN"""
+    valid = ~np.isnan(values) if mask is None else mask & ~np.isnan(values)
+    ranks = np.full(values.shape, np.nan)
+    candidates = np.flatnonzero(valid)
+    order = np.argsort(values[candidates] if ascending else -values[candidates], kind='stable')
+    ranks[candidates[order]] = np.arange(1, len(candidates) + 1)
+    return ranks
+
+
+def zscore(values: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """截面标准化，被掩码排除或为NaN的位置为NaN，截面标准差为0时全部为0"""
+    valid = ~np.isnan(values) if mask is None else mask & ~np.isnan(values)
+    result = np.full(values.shape, np.nan)
+    if valid.any():
+        selected = values[valid]
+        std = selected.std()
+        result[valid] = (selected - selected.mean()) / std if std > 0 else 0.0
+    return result
+
+
+def top_n(values: np.ndarray, n: int, mask: Optional[np.ndarray] = None, largest: bool = True) -> np.ndarray:
+    """选出截面上最大（或最小）的 n 个位置，按值排序返回列下标
+    
+    用 argpartition 在 O(股票数) 内找到第 n 大的值，只对入选的 n 个位置排序。
+    与稳定排序的结果一致：值相同时股票顺序靠前的优先入选。
+    """
+    valid = ~np.isnan(values) if mask is None else mask & ~np.isnan(values)
+    candidates = np.flatnonzero(valid)
+    scores = values[candidates] if largest else -values[candidates]
+    if n <= 0 or len(candidates) == 0:
+        return np.empty(0, dtype=np.intp)
+    if n < len(candidates):
+        kth = scores[np.argpartition(-scores, n - 1)[n - 1]]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:n - len(above)]
+        selected = np.concatenate([above, ties])
+    else:
+        selected = np.arange(len(candidates))
+    selected = selected[np.lexsort((selected, -scores[selected]))]
+    return candidates[selected]
+
+
+class CrossSection:
+    """某一交易日的截面视图
+    
+    每个字段在当日是一个按股票排列的向量，回看窗口是形状为 (回看期数, 股票数) 的矩阵，
+    二者都是价格矩阵的切片，不复制数据。截面排名、标准化、选前N等计算可以对全部股票一次完成，
+    不必逐只股票处理DataFrame。
+    """
+    
+    def __init__(self, date: datetime, symbols: List[str], row: Optional[int],
+                 matrix: Callable[[str], np.ndarray]):
+        """
+        Args:
+            date: 截面日期
+            symbols: 股票代码，与矩阵列顺序一致
+            row: 截面日期在价格矩阵中的行号，为None时表示当日没有任何行情
+            matrix: 字段名 -> 形状为 (交易日数, 股票数) 的价格矩阵，字段为 BAR_COUNTS 时返回累计有效bar数矩阵
+        """
+        self.date = date
+        self.symbols = list(symbols)
+        self.row = row
+        self._matrix = matrix
+        self._columns: Optional[Dict[str, int]] = None
+    
+    @classmethod
+    def from_frames(cls, date: datetime, data: Dict[str, pd.DataFrame]) -> 'CrossSection':
+        """从 {ts_code: DataFrame} 形式的行情数据构建截面，各股票的日期取并集对齐"""
+        symbols = list(data)
+        dates = pd.DatetimeIndex([])
+        for df in data.values():
+            dates = dates.union(df.index)
+        dates = dates[dates <= pd.Timestamp(date)]
+        cache: Dict[str, np.ndarray] = {}
+        
+        def matrix(field: str) -> np.ndarray:
+            if field not in cache:
+                if field == BAR_COUNTS:
+                    cache[field] = np.cumsum(~np.isnan(matrix('close')), axis=0)
+                else:
+                    cache[field] = np.column_stack([
+                        data[ts_code][field].reindex(dates).to_numpy(dtype=np.float64) for ts_code in symbols
+                    ]) if symbols else np.empty((len(dates), 0))
+            return cache[field]
+        
+        row = len(dates) - 1 if len(dates) and dates[-1] == pd.Timestamp(date) else None
+        return cls(date, symbols, row, matrix)
+    
+    def __len__(self) -> int:
+        return len(self.symbols)
+    
+    def __getitem__(self, field: str) -> np.ndarray:
+        """获取字段在当日的截面向量，无行情的股票为NaN"""
+        if self.row is None:
+            return np.full(len(self.symbols), np.nan)
+        return self._matrix(field)[self.row]
+    
+    @property
+    def close(self) -> np.ndarray:
+        return self['close']
+    
+    @property
+    def valid(self) -> np.ndarray:
+        """当日有行情的掩码"""
+        return ~np.isnan(self.close)
+    
+    @property
+    def bar_counts(self) -> np.ndarray:
+        """截至当日（含）每只股票累计的有效bar数量"""
+        if self.row is None:
+            return np.zeros(len(self.symbols), dtype=np.int64)
+        return self._matrix(BAR_COUNTS)[self.row]
+    
+    def lookback(self, field: str, periods: int) -> np.ndarray:
+        """获取截至当日（含）最近 periods 个交易日的字段矩阵，历史不足的行填充NaN"""
+        if self.row is None:
+            return np.full((periods, len(self.symbols)), np.nan)
+        matrix = self._matrix(field)
+        start = self.row + 1 - periods
+        if start >= 0:
+            return matrix[start:self.row + 1]
+        return np.vstack([np.full((-start, len(self.symbols)), np.nan), matrix[:self.row + 1]])
+    
+    def returns(self, periods: int, field: str = 'close') -> np.ndarray:
+        """当日相对 periods 个交易日之前的收益率，历史不足的股票为NaN"""
+        window = self.lookback(field, periods + 1)
+        return window[-1] / window[0] - 1
+    
+    def index_of(self, ts_code: str) -> Optional[int]:
+        """获取股票在截面中的列号"""
+        if self._columns is None:
+            self._columns = {symbol: j for j, symbol in enumerate(self.symbols)}
+        return self._columns.get(ts_code)
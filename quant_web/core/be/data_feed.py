@@ -1,18 +1,39 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
+import hashlib
+import zlib
 import pandas as pd
 import numpy as np
 from loguru import logger
 
+from quant_web.core.const import DATA_VERSION_FIELDS, DATA_VERSION_LENGTH
+
 
 class DataFeed:
     """数据馈送类，负责提供历史和实时市场数据"""
     
-    def __init__(self):
+    def __init__(self, indicator_store: Optional['IndicatorStore'] = None):
+        """
+        Args:
+            indicator_store: 持久化的指标缓存，为None时指标只缓存在内存中
+        """
         self.stock_data: Dict[str, pd.DataFrame] = {}
         self.stock_codes: List[str] = []
         self.start_date: Optional[datetime] = None
         self.end_date: Optional[datetime] = None
+        # 价格矩阵缓存（交易日 × 股票，列顺序与 stock_codes 一致），数据变化时失效
+        self._matrix_cache: Dict[str, np.ndarray] = {}
+        # 逐bar追加实时数据时价格矩阵的底层缓冲区（预留容量），_matrix_cache 中是它的前缀视图
+        self._matrix_buffers: Dict[str, np.ndarray] = {}
+        self._dates: Optional[pd.DatetimeIndex] = None
+        self._date_index: Dict[pd.Timestamp, int] = {}
+        # 指标矩阵缓存（指标名, 字段, 参数） -> (指标矩阵, 上一值矩阵)，与价格矩阵同时失效
+        self._indicator_cache: Dict[tuple, Tuple[np.ndarray, np.ndarray]] = {}
+        self._data_version: Optional[str] = None
+        self._symbol_versions: Dict[str, str] = {}
+        # 协方差服务缓存（估计方法, 参数） -> CovarianceService，实时bar追加时增量更新，数据整体变化时失效
+        self._covariance_services: Dict[tuple, 'CovarianceService'] = {}
+        self.indicator_store = indicator_store
     
     def load_historical_data(self, ts_codes: List[str], start_date: datetime, end_date: datetime) -> bool:
         """加载历史数据
@@ -33,6 +54,7 @@ class DataFeed:
             # 模拟生成历史数据
             for ts_code in ts_codes:
                 self.stock_data[ts_code] = self._generate_sample_data(ts_code, start_date, end_date)
+            self._invalidate_matrices()
             
             logger.info(f"Loaded historical data for {len(ts_codes)} stocks from {start_date} to {end_date}")
             return True
@@ -48,8 +70,8 @@ class DataFeed:
         # 过滤非交易日（简单模拟，假设只有周一到周五是交易日）
         trading_days = [date for date in date_range if date.weekday() < 5]
         
-        # 随机种子，保证同一只股票生成相同的数据
-        np.random.seed(hash(ts_code) % 1000)
+        # 随机种子，保证同一只股票生成相同的数据（使用稳定哈希，不同进程、多次启动之间保持一致）
+        np.random.seed(zlib.crc32(ts_code.encode()) % 1000)
         
         # 生成价格数据
         n_days = len(trading_days)
@@ -140,6 +162,15 @@ class DataFeed:
         
         return []
     
+    def subset(self, ts_codes: List[str]) -> 'DataFeed':
+        """由部分股票构建新的数据馈送，各股票的DataFrame与原数据馈送共享，不复制数据"""
+        feed = DataFeed(indicator_store=self.indicator_store)
+        feed.stock_codes = [ts_code for ts_code in ts_codes if ts_code in self.stock_data]
+        feed.stock_data = {ts_code: self.stock_data[ts_code] for ts_code in feed.stock_codes}
+        feed.start_date = self.start_date
+        feed.end_date = self.end_date
+        return feed
+    
     def get_available_stocks(self) -> List[str]:
         """获取可用的股票代码列表"""
         return self.stock_codes
@@ -161,29 +192,267 @@ class DataFeed:
             return self.stock_data[ts_code][mask]
         return None
     
-    def update_with_realtime(self, date: datetime, prices: Dict[str, float]) -> None:
+    def update_with_realtime(self, date: datetime, prices: Dict[str, Union[float, Dict[str, float]]]) -> None:
         """更新实时价格数据（用于模拟实时交易）
         
+        日期晚于已有的全部交易日时，新bar追加到已缓存的价格矩阵末尾（均摊 O(股票数)），
+        不再整体重建矩阵；全历史的指标矩阵缓存失效（逐bar推进时由交易引擎增量更新指标）。
+        
         Args:
             date: 当前日期
-            prices: 股票价格字典，格式为 {ts_code: price}
+            prices: 股票价格字典，格式为 {ts_code: price}，或 {ts_code: {open/high/low/close/volume/amount: 值}}
+                （缺少的字段按收盘价和上一收盘价补齐）
         """
+        date = pd.Timestamp(date)
+        rows = {}
         for ts_code, price in prices.items():
             if ts_code in self.stock_data:
                 # 创建新的行数据
                 last_row = self.stock_data[ts_code].iloc[-1]
-                new_row = pd.DataFrame({
-                    'ts_code': [ts_code],
-                    'open': [last_row['close']],  # 以昨天的收盘价作为今天的开盘价
-                    'high': [max(last_row['close'], price)],
-                    'low': [min(last_row['close'], price)],
-                    'close': [price],
-                    'volume': [np.random.randint(1000000, 100000000)],
-                    'amount': [price * np.random.randint(1000000, 100000000)]
-                }, index=[date])
+                bar = dict(price) if isinstance(price, dict) else {'close': price}
+                close = bar['close']
+                rows[ts_code] = {
+                    'ts_code': ts_code,
+                    'open': bar.get('open', last_row['close']),  # 以昨天的收盘价作为今天的开盘价
+                    'high': bar.get('high', max(last_row['close'], close)),
+                    'low': bar.get('low', min(last_row['close'], close)),
+                    'close': close,
+                    'volume': bar.get('volume', np.random.randint(1000000, 100000000)),
+                    'amount': bar.get('amount', close * np.random.randint(1000000, 100000000))
+                }
                 
                 # 添加到现有数据中
+                new_row = pd.DataFrame({key: [value] for key, value in rows[ts_code].items()}, index=[date])
                 self.stock_data[ts_code] = pd.concat([self.stock_data[ts_code], new_row])
+        
+        if self._dates is not None and (len(self._dates) == 0 or date <= self._dates[-1]):
+            # 补录历史日期时无法追加，整体重建
+            self._invalidate_matrices()
+            return
+        self._append_matrix_row(date, rows)
+    
+    def _append_matrix_row(self, date: pd.Timestamp, rows: Dict[str, Dict]) -> None:
+        """把新交易日的bar追加到已缓存的价格矩阵，缓冲区按容量倍增，单次追加均摊 O(股票数)"""
+        self._indicator_cache = {}
+        self._data_version = None
+        for ts_code in rows:
+            self._symbol_versions.pop(ts_code, None)
+        if self._dates is None:
+            return
+        
+        n = len(self._dates)
+        self._dates = self._dates.append(pd.DatetimeIndex([date]))
+        self._date_index[date] = n
+        
+        def field_row(field: str) -> np.ndarray:
+            return np.array([rows[ts_code][field] if ts_code in rows else np.nan for ts_code in self.stock_codes],
+                            dtype=np.float64)
+        
+        close = field_row('close')
+        for key, matrix in list(self._matrix_cache.items()):
+            if key == 'mark':
+                row = np.where(np.isnan(close), matrix[n - 1], close) if n else close
+            elif key == 'returns':
+                previous = self._matrix_cache['mark'][n - 1] if n else np.full(len(close), np.nan)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    row = np.nan_to_num(close / previous - 1.0, nan=0.0, posinf=0.0, neginf=0.0)
+            elif key == 'bar_counts':
+                row = (matrix[n - 1] if n else 0) + ~np.isnan(close)
+            else:
+                row = close if key == 'close' else field_row(key)
+            buffer = self._matrix_buffers.get(key)
+            if buffer is None or len(buffer) <= n:
+                buffer = np.empty((max(2 * n, 16),) + matrix.shape[1:], dtype=matrix.dtype)
+                buffer[:n] = matrix
+                self._matrix_buffers[key] = buffer
+            buffer[n] = row
+            self._matrix_cache[key] = buffer[:n + 1]
+    
+    def _invalidate_matrices(self) -> None:
+        """数据发生变化后清空价格矩阵缓存"""
+        self._matrix_cache = {}
+        self._matrix_buffers = {}
+        self._indicator_cache = {}
+        self._data_version = None
+        self._symbol_versions = {}
+        self._covariance_services = {}
+        self._dates = None
+        self._date_index = {}
+    
+    @property
+    def data_version(self) -> str:
+        """数据集版本号
+        
+        对已加载的全部bar（股票代码、日期与 DATA_VERSION_FIELDS 字段）取摘要，
+        任何一根bar发生变化都会得到不同的版本号，数据不变时版本号稳定，可用作结果缓存的键。
+        """
+        if self._data_version is None:
+            digest = hashlib.sha256()
+            for ts_code in self.stock_codes:
+                digest.update(ts_code.encode())
+                df = self.stock_data.get(ts_code)
+                if df is None or df.empty:
+                    continue
+                digest.update(self.symbol_version(ts_code).encode())
+            self._data_version = digest.hexdigest()[:DATA_VERSION_LENGTH]
+        return self._data_version
+    
+    def symbol_version(self, ts_code: str) -> str:
+        """单只股票的数据版本号（日期与 DATA_VERSION_FIELDS 字段的摘要），用作持久化指标缓存的键"""
+        if ts_code not in self._symbol_versions:
+            digest = hashlib.sha256()
+            df = self.stock_data.get(ts_code)
+            if df is not None and not df.empty:
+                digest.update(pd.DatetimeIndex(df.index).asi8.tobytes())
+                fields = [field for field in DATA_VERSION_FIELDS if field in df.columns]
+                digest.update(np.ascontiguousarray(df[fields].to_numpy(dtype=np.float64)).tobytes())
+            self._symbol_versions[ts_code] = digest.hexdigest()[:DATA_VERSION_LENGTH]
+        return self._symbol_versions[ts_code]
+    
+    def get_dates(self) -> pd.DatetimeIndex:
+        """获取所有股票交易日的并集（价格矩阵的行索引）"""
+        if self._dates is None:
+            dates = pd.DatetimeIndex([])
+            for ts_code in self.stock_codes:
+                if ts_code in self.stock_data:
+                    dates = dates.union(self.stock_data[ts_code].index)
+            self._dates = dates
+            self._date_index = {date: i for i, date in enumerate(dates)}
+        return self._dates
+    
+    def get_date_index(self, date: datetime) -> Optional[int]:
+        """获取日期在价格矩阵中的行号"""
+        self.get_dates()
+        return self._date_index.get(pd.Timestamp(date))
+    
+    def get_field_matrix(self, field: str = 'close') -> np.ndarray:
+        """获取指定字段的价格矩阵
+        
+        Args:
+            field: 字段名，如 open/high/low/close/volume
+        
+        Returns:
+            形状为 (交易日数, 股票数) 的矩阵，列顺序与 get_available_stocks() 一致，缺失数据为NaN
+        """
+        if field not in self._matrix_cache:
+            dates = self.get_dates()
+            matrix = np.full((len(dates), len(self.stock_codes)), np.nan)
+            for j, ts_code in enumerate(self.stock_codes):
+                df = self.stock_data.get(ts_code)
+                if df is not None and not df.empty:
+                    matrix[:, j] = df[field].reindex(dates).to_numpy(dtype=np.float64)
+            self._matrix_cache[field] = matrix
+        return self._matrix_cache[field]
+    
+    def get_mark_matrix(self) -> np.ndarray:
+        """获取用于盯市估值的收盘价矩阵（停牌等缺失数据沿用最近收盘价）"""
+        if 'mark' not in self._matrix_cache:
+            close = pd.DataFrame(self.get_field_matrix('close'))
+            self._matrix_cache['mark'] = close.ffill().to_numpy()
+        return self._matrix_cache['mark']
+    
+    def get_return_matrix(self) -> np.ndarray:
+        """获取日收益率矩阵（盯市价格的逐日涨跌幅，首日、上市前和停牌日为0）"""
+        if 'returns' not in self._matrix_cache:
+            mark = self.get_mark_matrix()
+            returns = np.zeros_like(mark)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                returns[1:] = mark[1:] / mark[:-1] - 1.0
+            self._matrix_cache['returns'] = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+        return self._matrix_cache['returns']
+    
+    def get_bar_count_matrix(self) -> np.ndarray:
+        """获取截至每个交易日（含）每只股票累计的有效bar数量矩阵"""
+        if 'bar_counts' not in self._matrix_cache:
+            self._matrix_cache['bar_counts'] = np.cumsum(~np.isnan(self.get_field_matrix('close')), axis=0)
+        return self._matrix_cache['bar_counts']
+    
+    def get_cross_section(self, date: datetime) -> 'CrossSection':
+        """获取指定日期的截面视图，字段向量和回看窗口都是价格矩阵的切片"""
+        from quant_web.core.be.cross_section import BAR_COUNTS, CrossSection
+        
+        def matrix(field: str) -> np.ndarray:
+            return self.get_bar_count_matrix() if field == BAR_COUNTS else self.get_field_matrix(field)
+        
+        return CrossSection(date, self.stock_codes, self.get_date_index(date), matrix)
+    
+    def get_covariance_service(self, method: Optional[str] = None, **params) -> 'CovarianceService':
+        """获取按参数缓存的协方差服务（参数见 CovarianceService），同一组参数的全部调用方共享增量维护的结果"""
+        from quant_web.core.be.covariance import CovarianceService
+        from quant_web.core.const import COVARIANCE_METHOD
+        
+        method = method or COVARIANCE_METHOD
+        key = (method, tuple(sorted(params.items())))
+        if key not in self._covariance_services:
+            self._covariance_services[key] = CovarianceService(self, method, **params)
+        return self._covariance_services[key]
+    
+    def get_indicator_matrix(self, name: str, field: str = 'close', **params) -> Tuple[np.ndarray, np.ndarray]:
+        """获取在全部历史上计算的指标矩阵
+        
+        技术指标只依赖截至当日的数据，任意截止日期的面板都可以直接截取全历史结果的前缀，
+        因此同一数据馈送上的多次回测（如walk-forward的各个窗口）共享同一份计算结果。
+        
+        Returns:
+            (指标矩阵, 上一值矩阵)，形状与价格矩阵一致
+        """
+        from quant_web.core.be.indicators import IndicatorEngine
+        
+        key = (name, field, tuple(sorted(params.items())))
+        if key not in self._indicator_cache:
+            if self.indicator_store is None:
+                self._indicator_cache[key] = IndicatorEngine.compute(self.get_field_matrix(field), name,
+                                                                     with_previous=True, **params)
+            else:
+                self._indicator_cache[key] = self._load_indicator_matrix(name, field, params)
+        return self._indicator_cache[key]
+    
+    def _load_indicator_matrix(self, name: str, field: str, params: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """从持久化缓存逐只股票载入指标序列，只计算缓存中没有的股票并写回缓存
+        
+        增量指标对每只股票独立更新，某只股票的指标列只取决于它自己的价格序列，
+        因此可以按股票缓存和计算。缓存的序列只包含该股票自身的交易日，在并集交易日上
+        沿用最近一个交易日的值，与在整张价格矩阵上计算的结果一致（缺失数据的交易日指标保持不变）。
+        """
+        from quant_web.core.be.indicators import IndicatorEngine
+        
+        matrix = self.get_field_matrix(field)
+        dates = self.get_dates().asi8
+        values = np.full(matrix.shape, np.nan)
+        previous = np.full(matrix.shape, np.nan)
+        missing = []
+        for j, ts_code in enumerate(self.stock_codes):
+            cached = self.indicator_store.load(ts_code, name, field, params, self.symbol_version(ts_code))
+            if cached is None:
+                missing.append(j)
+                continue
+            own_dates, own_values, own_previous = cached
+            rows = np.searchsorted(own_dates, dates, side='right') - 1
+            present = rows >= 0
+            values[present, j] = own_values[rows[present]]
+            previous[present, j] = own_previous[rows[present]]
+        
+        if missing:
+            computed_values, computed_previous = IndicatorEngine.compute(matrix[:, missing], name,
+                                                                         with_previous=True, **params)
+            values[:, missing] = computed_values
+            previous[:, missing] = computed_previous
+            for k, j in enumerate(missing):
+                ts_code = self.stock_codes[j]
+                own = ~np.isnan(matrix[:, j])
+                self.indicator_store.save(ts_code, name, field, params, self.symbol_version(ts_code),
+                                          dates[own], computed_values[own, k], computed_previous[own, k])
+            self.indicator_store.evict()
+        logger.debug(f"Indicator {name} {params}: {len(self.stock_codes) - len(missing)} series loaded "
+                     f"from cache, {len(missing)} computed")
+        return values, previous
+    
+    def get_close_vector(self, date: datetime) -> np.ndarray:
+        """获取指定日期按股票顺序排列的盯市价格向量"""
+        idx = self.get_date_index(date)
+        if idx is None:
+            return np.full(len(self.stock_codes), np.nan)
+        return self.get_mark_matrix()[idx]
     
     def save_data(self, file_path: str) -> bool:
         """保存数据到文件（可选功能）"""
@@ -215,6 +484,7 @@ class DataFeed:
                     first_stock = next(iter(self.stock_data.values()))
                     self.start_date = first_stock.index.min()
                     self.end_date = first_stock.index.max()
+            self._invalidate_matrices()
             
             logger.info(f"Data loaded from {file_path}, {len(self.stock_codes)} stocks available")
             return True
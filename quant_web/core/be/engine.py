@@ -2,11 +2,13 @@ import time
 import random
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
+import numpy as np
 import pandas as pd
 from loguru import logger
 
-from quant_web.core.be.matcher import SimpleMatcher, Order, Bar
-from quant_web.core.const import MAX_DD_THRESHOLD
+from quant_web.core.be.matcher import SimpleMatcher, Order
+from quant_web.core.be.metrics import StreamingMetrics
+from quant_web.core.const import MAX_DD_THRESHOLD, CALENDAR_DAYS_PER_YEAR
 from quant_web.core.exceptions import BacktestError
 
 
@@ -103,7 +105,11 @@ class BacktestEngine:
         self.matcher = SimpleMatcher()
         self.portfolio = None
         self.price_history = None
+        self.price_matrix = None  # 日期 x 股票 的收盘价矩阵
+        self.symbols: List[str] = []
         self.daily_values = []
+        # 主循环按自然日推进，按自然日年化
+        self.metrics = StreamingMetrics(periods_per_year=CALENDAR_DAYS_PER_YEAR)
     
     def _generate_dummy_prices(self, stock_pool: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
         """生成模拟价格数据"""
@@ -133,56 +139,40 @@ class BacktestEngine:
         
         return prices
     
+    def _build_price_matrix(self, prices: Dict[str, pd.DataFrame], date_range: pd.DatetimeIndex,
+                            field: str = 'close') -> np.ndarray:
+        """将各股票的价格序列对齐为 日期 x 股票 的矩阵，缺失值为NaN"""
+        matrix = np.full((len(date_range), len(prices)), np.nan)
+        for j, price_df in enumerate(prices.values()):
+            matrix[:, j] = price_df[field].reindex(date_range).to_numpy(dtype=np.float64)
+        return matrix
+    
     def _calculate_performance(self) -> Dict[str, float]:
-        """计算绩效指标"""
-        if not self.daily_values:
+        """计算绩效指标（取自在线累加器）"""
+        if not self.metrics.bars:
             return {}
         
-        # 转换为DataFrame便于计算
-        df = pd.DataFrame(self.daily_values)
-        
-        # 计算每日收益率
-        df['daily_return'] = df['total_value'].pct_change()
-        
-        # 计算累计收益率
-        total_return = (df['total_value'].iloc[-1] / df['total_value'].iloc[0]) - 1
-        
-        # 计算年化收益率
-        days = (df['date'].iloc[-1] - df['date'].iloc[0]).days
-        annual_return = ((1 + total_return) ** (365 / days)) - 1 if days > 0 else 0
-        
-        # 计算波动率
-        volatility = df['daily_return'].std() * np.sqrt(252)  # 年化
-        
-        # 计算夏普比率（假设无风险利率为0）
-        sharpe = annual_return / volatility if volatility > 0 else 0
-        
-        # 计算最大回撤
-        df['cum_max'] = df['total_value'].cummax()
-        df['drawdown'] = (df['total_value'] - df['cum_max']) / df['cum_max']
-        max_drawdown = df['drawdown'].min()
-        
-        # 计算胜率
-        win_rate = (df['daily_return'] > 0).mean()
-        
         return {
-            'total_return': total_return,
-            'annual_return': annual_return,
-            'volatility': volatility,
-            'sharpe_ratio': sharpe,
-            'max_drawdown': max_drawdown,
-            'win_rate': win_rate,
+            'total_return': self.metrics.total_return,
+            'annual_return': self.metrics.annual_return,
+            'volatility': self.metrics.annual_volatility,
+            'sharpe_ratio': self.metrics.sharpe_ratio,
+            'sortino_ratio': self.metrics.sortino_ratio,
+            'max_drawdown': self.metrics.max_drawdown,
+            'win_rate': self.metrics.win_rate,
+            'avg_exposure': self.metrics.avg_exposure,
+            'turnover': self.metrics.turnover,
             'total_trades': len(self.portfolio.trades) if self.portfolio else 0
         }
     
-    def _simple_strategy(self, date: datetime, prices: Dict[str, pd.DataFrame], portfolio: Portfolio) -> None:
-        """简单的交易策略示例"""
-        # 获取当前价格
-        current_prices = {}
-        for stock, price_df in prices.items():
-            if date in price_df.index:
-                current_prices[stock] = price_df.loc[date, 'close']
+    def _simple_strategy(self, date: datetime, current_prices: Dict[str, float], portfolio: Portfolio) -> None:
+        """简单的交易策略示例
         
+        Args:
+            date: 当前日期
+            current_prices: 当日有行情的股票收盘价 {ts_code: close}
+            portfolio: 投资组合
+        """
         # 如果持仓为空，随机买入几只股票
         if not portfolio.positions and current_prices:
             stocks_to_buy = random.sample(list(current_prices.keys()), min(3, len(current_prices)))
@@ -218,20 +208,25 @@ class BacktestEngine:
             end = datetime.strptime(end_date, "%Y-%m-%d")
             date_range = pd.date_range(start, end)
             
-            # 回测主循环
+            # 预先构建收盘价矩阵，主循环中按行读取，不再逐股票查询DataFrame索引
+            self.symbols = list(self.price_history.keys())
+            self.price_matrix = self._build_price_matrix(self.price_history, date_range)
+            available = ~np.isnan(self.price_matrix)
+            self.daily_values = []
+            self.metrics.reset()
+            
+            # 回测主循环：每日O(股票数)，绩效指标与回撤增量更新
+            current_prices: Dict[str, float] = {}
             for i, date in enumerate(date_range):
                 # 获取当天的价格
-                current_prices = {}
-                for stock, price_df in self.price_history.items():
-                    if date in price_df.index:
-                        row = price_df.loc[date]
-                        current_prices[stock] = row['close']
-                        
-                        # 创建Bar对象用于订单匹配
-                        bar = Bar(close=row['close'], low=row['low'], high=row['high'])
+                row = self.price_matrix[i].tolist()
+                mask = available[i].tolist()
+                current_prices = {stock: price for stock, price, ok in zip(self.symbols, row, mask) if ok}
                 
                 # 执行策略
-                self._simple_strategy(date, self.price_history, self.portfolio)
+                trade_count = len(self.portfolio.trades)
+                self._simple_strategy(date, current_prices, self.portfolio)
+                traded_value = sum(trade['value'] for trade in self.portfolio.trades[trade_count:])
                 
                 # 记录当日资产价值
                 total_value = self.portfolio.get_total_value(current_prices)
@@ -242,16 +237,13 @@ class BacktestEngine:
                     'positions': len(self.portfolio.positions)
                 })
                 
+                self.metrics.update(total_value, date, total_value - self.portfolio.cash, traded_value)
+                
                 # 检查最大回撤
-                if len(self.daily_values) > 1:
-                    df = pd.DataFrame(self.daily_values)
-                    df['cum_max'] = df['total_value'].cummax()
-                    df['drawdown'] = (df['total_value'] - df['cum_max']) / df['cum_max']
-                    current_dd = df['drawdown'].iloc[-1]
-                    
-                    if current_dd < -MAX_DD_THRESHOLD:
-                        logger.warning(f"Backtest stopped due to maximum drawdown threshold reached: {current_dd:.2%}")
-                        break
+                current_dd = self.metrics.drawdown
+                if current_dd < -MAX_DD_THRESHOLD:
+                    logger.warning(f"Backtest stopped due to maximum drawdown threshold reached: {current_dd:.2%}")
+                    break
                 
                 # 调用进度回调
                 if progress_callback:
@@ -284,7 +276,3 @@ class BacktestEngine:
                 strategy_id=strategy_id,
                 backtest_id=str(time.time())
             ) from e
-
-
-# 导入numpy供内部使用
-import numpy as np
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+from quant_web.core.const import INDICATOR_CACHE_DIR, INDICATOR_CACHE_MAX_BYTES
+
+
+class IndicatorStore:
+    """按股票持久化的指标序列缓存
+    
+    每个条目是一只股票在自身交易日上的一条指标序列，以列式数组（交易日、指标值、上一值）
+    保存为一个 .npz 文件，键为（股票代码, 指标名, 字段, 参数, 该股票的数据版本）。
+    只改变仓位比例等非指标参数后重新回测时，指标直接从磁盘载入而不必重新计算；
+    某只股票的bar发生变化只会使这一只股票的条目失效。
+    
+    文件的修改时间即最近使用时间，读取命中时刷新；磁盘占用超过 max_bytes 时按最近最少使用淘汰。
+    """
+    
+    def __init__(self, cache_dir: str = INDICATOR_CACHE_DIR, max_bytes: int = INDICATOR_CACHE_MAX_BYTES):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存文件总大小上限（字节）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(ts_code: str, name: str, field: str, params: Dict, version: str) -> str:
+        """生成条目的键，参数按键排序后参与摘要"""
+        payload = json.dumps([ts_code, name, field, sorted(params.items()), version],
+                             separators=(',', ':'), default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+    
+    def load(self, ts_code: str, name: str, field: str, params: Dict,
+             version: str) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """读取一只股票的指标序列
+        
+        Returns:
+            (交易日（int64 纳秒时间戳）, 指标值, 上一值)，未命中时返回None
+        """
+        path = self._path(self.make_key(ts_code, name, field, params, version))
+        try:
+            with np.load(path) as entry:
+                result = entry['dates'], entry['values'], entry['previous']
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to load cached indicator {path}: {e}")
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return result
+    
+    def save(self, ts_code: str, name: str, field: str, params: Dict, version: str,
+             dates: np.ndarray, values: np.ndarray, previous: np.ndarray) -> None:
+        """保存一只股票的指标序列（先写临时文件再原子替换）"""
+        path = self._path(self.make_key(ts_code, name, field, params, version))
+        tmp_path = f"{path[:-len('.npz')]}.{os.getpid()}.tmp.npz"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            np.savez(tmp_path, dates=dates, values=values, previous=previous)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to save cached indicator {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def size(self) -> int:
+        """缓存文件总大小（字节）"""
+        return sum(entry.stat().st_size for entry in self._entries())
+    
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [entry for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and entry.name.endswith('.npz') and '.tmp.' not in entry.name]
+    
+    def evict(self) -> int:
+        """按最近最少使用淘汰条目，直到总大小不超过上限，返回淘汰的条目数"""
+        entries = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in self._entries()]
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} cached indicator series, {total} bytes remain")
+        return removed
+    
+    def clear(self) -> None:
+        """删除全部缓存条目"""
+        for entry in self._entries():
+            os.remove(entry.path)
+        self.hits = 0
+        self.misses = 0
+
+
+# 全局指标缓存
+global_indicator_store = IndicatorStore()
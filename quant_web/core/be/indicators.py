@@ -0,0 +1,529 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple, Type, Union
+import numpy as np
+from loguru import logger
+
+
+class Indicator(ABC):
+    """增量技术指标基类
+    
+    指标状态按股票向量化存储（每只股票一列），每来一根新bar调用一次 update，
+    对每只股票是O(1)的更新，与窗口长度无关。values 为最新指标值，未就绪时为NaN；
+    previous 为每只股票上一次更新前的指标值，便于判断交叉。
+    """
+    
+    def __init__(self, n_symbols: int = 0):
+        self.n_symbols = 0
+        self.values = np.zeros(0)
+        self.previous = np.zeros(0)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.params: Dict = {}  # 创建时的参数，用于按名称和参数查找预计算的指标矩阵
+        self.resize(n_symbols)
+    
+    @property
+    @abstractmethod
+    def key(self) -> Tuple:
+        """指标的唯一标识（名称 + 参数）"""
+        pass
+    
+    def resize(self, n_symbols: int) -> None:
+        """扩展股票数量，新增股票的状态为初始状态"""
+        if n_symbols <= self.n_symbols:
+            return
+        extra = n_symbols - self.n_symbols
+        self.values = np.concatenate([self.values, np.full(extra, np.nan)])
+        self.previous = np.concatenate([self.previous, np.full(extra, np.nan)])
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+        self._resize_state(self.n_symbols, n_symbols)
+        self.n_symbols = n_symbols
+    
+    def reset(self) -> None:
+        """清空全部状态"""
+        n = self.n_symbols
+        self.n_symbols = 0
+        self.values = np.zeros(0)
+        self.previous = np.zeros(0)
+        self.count = np.zeros(0, dtype=np.int64)
+        self._reset_state()
+        self.resize(n)
+    
+    def update(self, x: np.ndarray, mask: Optional[np.ndarray] = None) -> None:
+        """用一根新bar更新指标
+        
+        Args:
+            x: 按股票顺序排列的最新值（如收盘价）
+            mask: 当日有数据的股票掩码，为None时以 x 非NaN 为准
+        """
+        if mask is None:
+            mask = ~np.isnan(x)
+        cols = np.flatnonzero(mask)
+        if len(cols) == 0:
+            return
+        self.previous[cols] = self.values[cols]
+        self.count[cols] += 1
+        self.values[cols] = self._update(cols, x[cols])
+    
+    @abstractmethod
+    def _resize_state(self, old_size: int, new_size: int) -> None:
+        pass
+    
+    @abstractmethod
+    def _reset_state(self) -> None:
+        pass
+    
+    @abstractmethod
+    def _update(self, cols: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """更新指定股票的状态，返回这些股票的最新指标值"""
+        pass
+
+
+class _RingBuffer:
+    """按股票存储最近 window 个值的环形缓冲区"""
+    
+    def __init__(self, window: int):
+        self.window = window
+        self.data = np.full((window, 0), np.nan)
+        self.pos = np.zeros(0, dtype=np.int64)
+        self.size = np.zeros(0, dtype=np.int64)
+    
+    def resize(self, old_size: int, new_size: int) -> None:
+        extra = new_size - old_size
+        self.data = np.concatenate([self.data, np.full((self.window, extra), np.nan)], axis=1)
+        self.pos = np.concatenate([self.pos, np.zeros(extra, dtype=np.int64)])
+        self.size = np.concatenate([self.size, np.zeros(extra, dtype=np.int64)])
+    
+    def push(self, cols: np.ndarray, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """写入新值，返回被挤出的旧值及缓冲区是否已满的掩码（写入前）"""
+        pos = self.pos[cols]
+        outgoing = self.data[pos, cols]
+        was_full = self.size[cols] >= self.window
+        self.data[pos, cols] = x
+        self.pos[cols] = (pos + 1) % self.window
+        self.size[cols] = np.minimum(self.size[cols] + 1, self.window)
+        return outgoing, was_full
+
+
+INDICATORS: Dict[str, Type[Indicator]] = {}
+
+
+def register_indicator(name: str):
+    """注册指标类型"""
+    def decorator(indicator_class):
+        INDICATORS[name] = indicator_class
+        indicator_class.name = name
+        return indicator_class
+    return decorator
+
+
+@register_indicator("sma")
+class SMA(Indicator):
+    """简单移动平均，维护窗口内的滚动和"""
+    
+    def __init__(self, window: int, n_symbols: int = 0):
+        self.window = int(window)
+        self._buffer = _RingBuffer(self.window)
+        self._sum = np.zeros(0)
+        super().__init__(n_symbols)
+    
+    @property
+    def key(self) -> Tuple:
+        return ('sma', self.window)
+    
+    def _resize_state(self, old_size: int, new_size: int) -> None:
+        self._buffer.resize(old_size, new_size)
+        self._sum = np.concatenate([self._sum, np.zeros(new_size - old_size)])
+    
+    def _reset_state(self) -> None:
+        self._buffer = _RingBuffer(self.window)
+        self._sum = np.zeros(0)
+    
+    def _update(self, cols: np.ndarray, x: np.ndarray) -> np.ndarray:
+        outgoing, was_full = self._buffer.push(cols, x)
+        self._sum[cols] += x - np.where(was_full, outgoing, 0.0)
+        return np.where(self.count[cols] >= self.window, self._sum[cols] / self.window, np.nan)
+
+
+@register_indicator("ema")
+class EMA(Indicator):
+    """指数移动平均，alpha = 2 / (span + 1)，以第一个值作为初始值"""
+    
+    def __init__(self, span: int, n_symbols: int = 0):
+        self.span = int(span)
+        self.alpha = 2.0 / (self.span + 1)
+        super().__init__(n_symbols)
+    
+    @property
+    def key(self) -> Tuple:
+        return ('ema', self.span)
+    
+    def _resize_state(self, old_size: int, new_size: int) -> None:
+        pass
+    
+    def _reset_state(self) -> None:
+        pass
+    
+    def _update(self, cols: np.ndarray, x: np.ndarray) -> np.ndarray:
+        prev = self.values[cols]
+        return np.where(np.isnan(prev), x, prev + self.alpha * (x - prev))
+
+
+@register_indicator("rsi")
+class RSI(Indicator):
+    """相对强弱指标
+    
+    smoothing='wilder' 时使用Wilder平滑：前 window 个涨跌幅取简单平均作为初值，
+    之后 avg = (avg * (window - 1) + 当日值) / window；
+    smoothing='sma' 时涨跌幅取窗口内简单平均（第一根bar的涨跌幅按0计入）。
+    """
+    
+    def __init__(self, window: int, smoothing: str = 'wilder', n_symbols: int = 0):
+        if smoothing not in ('wilder', 'sma'):
+            raise ValueError(f"Unknown RSI smoothing: {smoothing}")
+        self.window = int(window)
+        self.smoothing = smoothing
+        self._last = np.zeros(0)
+        self._gain = SMA(self.window)
+        self._loss = SMA(self.window)
+        self._avg_gain = np.zeros(0)
+        self._avg_loss = np.zeros(0)
+        super().__init__(n_symbols)
+    
+    @property
+    def key(self) -> Tuple:
+        return ('rsi', self.window, self.smoothing)
+    
+    def _resize_state(self, old_size: int, new_size: int) -> None:
+        extra = new_size - old_size
+        self._last = np.concatenate([self._last, np.full(extra, np.nan)])
+        self._avg_gain = np.concatenate([self._avg_gain, np.full(extra, np.nan)])
+        self._avg_loss = np.concatenate([self._avg_loss, np.full(extra, np.nan)])
+        self._gain.resize(new_size)
+        self._loss.resize(new_size)
+    
+    def _reset_state(self) -> None:
+        self._last = np.zeros(0)
+        self._gain = SMA(self.window)
+        self._loss = SMA(self.window)
+        self._avg_gain = np.zeros(0)
+        self._avg_loss = np.zeros(0)
+    
+    def _update(self, cols: np.ndarray, x: np.ndarray) -> np.ndarray:
+        last = self._last[cols]
+        delta = np.where(np.isnan(last), 0.0, x - last)
+        self._last[cols] = x
+        gain = np.maximum(delta, 0.0)
+        loss = np.maximum(-delta, 0.0)
+        
+        if self.smoothing == 'sma':
+            self._gain.update(self._scatter(cols, gain), self._mask(cols))
+            self._loss.update(self._scatter(cols, loss), self._mask(cols))
+            avg_gain = self._gain.values[cols]
+            avg_loss = self._loss.values[cols]
+        else:
+            # Wilder平滑从第二根bar开始累计涨跌幅
+            count = self.count[cols]
+            has_delta = count > 1
+            self._gain.update(self._scatter(cols, gain), self._mask(cols[has_delta]))
+            self._loss.update(self._scatter(cols, loss), self._mask(cols[has_delta]))
+            seeded = count == self.window + 1
+            smoothed = count > self.window + 1
+            avg_gain = np.where(seeded, self._gain.values[cols],
+                                (self._avg_gain[cols] * (self.window - 1) + gain) / self.window)
+            avg_loss = np.where(seeded, self._loss.values[cols],
+                                (self._avg_loss[cols] * (self.window - 1) + loss) / self.window)
+            avg_gain = np.where(seeded | smoothed, avg_gain, np.nan)
+            avg_loss = np.where(seeded | smoothed, avg_loss, np.nan)
+            self._avg_gain[cols] = avg_gain
+            self._avg_loss[cols] = avg_loss
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = avg_gain / avg_loss
+            return 100 - (100 / (1 + rs))
+    
+    def _scatter(self, cols: np.ndarray, values: np.ndarray) -> np.ndarray:
+        full = np.zeros(len(self._last))
+        full[cols] = values
+        return full
+    
+    def _mask(self, cols: np.ndarray) -> np.ndarray:
+        mask = np.zeros(len(self._last), dtype=bool)
+        mask[cols] = True
+        return mask
+
+
+class _RollingExtreme(Indicator):
+    """滚动最大/最小值：只有被挤出的值恰好是当前极值时才重新扫描窗口，均摊O(1)"""
+    
+    _reduce = None
+    _combine = None
+    
+    def __init__(self, window: int, n_symbols: int = 0):
+        self.window = int(window)
+        self._buffer = _RingBuffer(self.window)
+        self._extreme = np.zeros(0)
+        super().__init__(n_symbols)
+    
+    @property
+    def key(self) -> Tuple:
+        return (self.name, self.window)
+    
+    def _resize_state(self, old_size: int, new_size: int) -> None:
+        self._buffer.resize(old_size, new_size)
+        self._extreme = np.concatenate([self._extreme, np.full(new_size - old_size, np.nan)])
+    
+    def _reset_state(self) -> None:
+        self._buffer = _RingBuffer(self.window)
+        self._extreme = np.zeros(0)
+    
+    def _update(self, cols: np.ndarray, x: np.ndarray) -> np.ndarray:
+        outgoing, was_full = self._buffer.push(cols, x)
+        current = self._extreme[cols]
+        rescan = was_full & (outgoing == current)
+        extreme = type(self)._combine(current, x)
+        if rescan.any():
+            rescan_cols = cols[rescan]
+            extreme[rescan] = type(self)._reduce(self._buffer.data[:, rescan_cols], axis=0)
+        self._extreme[cols] = extreme
+        return np.where(self.count[cols] >= self.window, extreme, np.nan)
+
+
+@register_indicator("max")
+class RollingMax(_RollingExtreme):
+    """滚动最大值"""
+    _reduce = np.nanmax
+    _combine = np.fmax
+
+
+@register_indicator("min")
+class RollingMin(_RollingExtreme):
+    """滚动最小值"""
+    _reduce = np.nanmin
+    _combine = np.fmin
+
+
+@register_indicator("std")
+class RollingStd(Indicator):
+    """滚动样本标准差（ddof=1），使用滑动窗口版Welford算法更新均值和二阶矩"""
+    
+    def __init__(self, window: int, n_symbols: int = 0):
+        if window < 2:
+            raise ValueError("RollingStd window must be at least 2")
+        self.window = int(window)
+        self._buffer = _RingBuffer(self.window)
+        self._mean = np.zeros(0)
+        self._m2 = np.zeros(0)
+        super().__init__(n_symbols)
+    
+    @property
+    def key(self) -> Tuple:
+        return ('std', self.window)
+    
+    def _resize_state(self, old_size: int, new_size: int) -> None:
+        self._buffer.resize(old_size, new_size)
+        self._mean = np.concatenate([self._mean, np.zeros(new_size - old_size)])
+        self._m2 = np.concatenate([self._m2, np.zeros(new_size - old_size)])
+    
+    def _reset_state(self) -> None:
+        self._buffer = _RingBuffer(self.window)
+        self._mean = np.zeros(0)
+        self._m2 = np.zeros(0)
+    
+    def _update(self, cols: np.ndarray, x: np.ndarray) -> np.ndarray:
+        outgoing, was_full = self._buffer.push(cols, x)
+        mean = self._mean[cols]
+        m2 = self._m2[cols]
+        n = np.minimum(self.count[cols], self.window).astype(np.float64)
+        
+        # 窗口未满：普通Welford累加；窗口已满：同时移出旧值、加入新值
+        grow_mean = mean + (x - mean) / n
+        grow_m2 = m2 + (x - mean) * (x - grow_mean)
+        old = np.where(was_full, outgoing, 0.0)
+        slide_mean = mean + (x - old) / self.window
+        slide_m2 = m2 + (x - old) * (x - slide_mean + old - mean)
+        
+        mean = np.where(was_full, slide_mean, grow_mean)
+        m2 = np.maximum(np.where(was_full, slide_m2, grow_m2), 0.0)
+        self._mean[cols] = mean
+        self._m2[cols] = m2
+        return np.where(self.count[cols] >= self.window, np.sqrt(m2 / (self.window - 1)), np.nan)
+
+
+def create_indicator(name: str, n_symbols: int = 0, **params) -> Indicator:
+    """按名称创建指标实例"""
+    if name not in INDICATORS:
+        raise ValueError(f"Indicator {name} not found")
+    indicator = INDICATORS[name](n_symbols=n_symbols, **params)
+    indicator.params = dict(params)
+    return indicator
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class IndicatorHandle:
+    """策略持有的指标句柄，按股票读取指标的最新值和上一值"""
+    
+    def __init__(self, engine: 'IndicatorEngine', indicator: Indicator):
+        self._engine = engine
+        self.indicator = indicator
+    
+    @property
+    def key(self) -> Tuple:
+        return self.indicator.key
+    
+    @property
+    def values(self) -> np.ndarray:
+        """按 engine.symbols 顺序排列的最新指标值（只读视图，同一指标的所有订阅者共享）"""
+        return _read_only(self.indicator.values)
+    
+    @property
+    def previous(self) -> np.ndarray:
+        """每只股票上一次更新前的指标值（只读视图）"""
+        return _read_only(self.indicator.previous)
+    
+    def value(self, ts_code: str) -> float:
+        idx = self._engine.symbol_index.get(ts_code)
+        return np.nan if idx is None else float(self.indicator.values[idx])
+    
+    def previous_value(self, ts_code: str) -> float:
+        idx = self._engine.symbol_index.get(ts_code)
+        return np.nan if idx is None else float(self.indicator.previous[idx])
+    
+    def ready(self, ts_code: str) -> bool:
+        return not np.isnan(self.value(ts_code))
+
+
+class IndicatorEngine:
+    """按股票维护增量指标的引擎
+    
+    策略在初始化时通过 subscribe 订阅指标句柄，交易引擎每个交易日用收盘价向量调用一次 update，
+    所有订阅的指标一起更新，策略每日只读取句柄中的当前值，不再对历史窗口重新计算。
+    
+    订阅按指标的 key（名称 + 参数）去重：多个策略订阅同一指标时共用一个实例，每根bar只计算一次，
+    各策略拿到的句柄读取同一份只读结果。
+    """
+    
+    def __init__(self, symbols: Optional[List[str]] = None):
+        self.symbols: List[str] = []
+        self.symbol_index: Dict[str, int] = {}
+        self.bars = np.zeros(0, dtype=np.int64)  # 每只股票已处理的bar数量
+        self.indicators: List[Indicator] = []  # 去重后的指标，按首次订阅的顺序更新
+        self._by_key: Dict[Tuple, Indicator] = {}
+        self.subscribers: Dict[Tuple, int] = {}  # 指标 key -> 订阅次数
+        if symbols:
+            self.register_symbols(symbols)
+    
+    def register_symbols(self, symbols: List[str]) -> np.ndarray:
+        """注册股票，返回股票在指标向量中的下标"""
+        ids = np.empty(len(symbols), dtype=np.int64)
+        for i, ts_code in enumerate(symbols):
+            idx = self.symbol_index.get(ts_code)
+            if idx is None:
+                idx = len(self.symbols)
+                self.symbols.append(ts_code)
+                self.symbol_index[ts_code] = idx
+            ids[i] = idx
+        n = len(self.symbols)
+        if n > len(self.bars):
+            self.bars = np.concatenate([self.bars, np.zeros(n - len(self.bars), dtype=np.int64)])
+            for indicator in self.indicators:
+                indicator.resize(n)
+        return ids
+    
+    def subscribe(self, name: str, **params) -> IndicatorHandle:
+        """订阅指标，返回句柄
+        
+        Args:
+            name: 指标名称，如 sma/ema/rsi/max/min/std
+            **params: 指标参数，如 window=20
+        """
+        indicator = create_indicator(name, **params)
+        shared = self._by_key.get(indicator.key)
+        if shared is None:
+            indicator.resize(len(self.symbols))
+            self.indicators.append(indicator)
+            self._by_key[indicator.key] = indicator
+            self.subscribers[indicator.key] = 0
+            logger.debug(f"Subscribed indicator {indicator.key}")
+        else:
+            indicator = shared
+            logger.debug(f"Subscribed shared indicator {indicator.key}")
+        self.subscribers[indicator.key] += 1
+        return IndicatorHandle(self, indicator)
+    
+    def unsubscribe(self, key: Union[Tuple, IndicatorHandle]) -> None:
+        """取消一次订阅，最后一个订阅者取消后指标不再更新，已发出的句柄不应再读取
+        
+        Args:
+            key: 指标 key 或 subscribe 返回的句柄
+        """
+        if isinstance(key, IndicatorHandle):
+            key = key.key
+        if key not in self.subscribers:
+            raise KeyError(f"Indicator {key} is not subscribed")
+        self.subscribers[key] -= 1
+        if self.subscribers[key] > 0:
+            return
+        del self.subscribers[key]
+        self.indicators.remove(self._by_key.pop(key))
+        logger.debug(f"Unsubscribed indicator {key}")
+    
+    def requirements(self) -> Dict[Tuple, int]:
+        """全部策略订阅的指标及各自的订阅次数，每个 key 每根bar只计算一次"""
+        return dict(self.subscribers)
+    
+    def update(self, x: np.ndarray, mask: Optional[np.ndarray] = None) -> None:
+        """用一根新bar（按 symbols 顺序排列的值向量）更新全部指标"""
+        if mask is None:
+            mask = ~np.isnan(x)
+        self.bars[mask] += 1
+        for indicator in self.indicators:
+            indicator.update(x, mask)
+    
+    def seek(self, row: int, precomputed: Dict[Tuple, Tuple[np.ndarray, np.ndarray]],
+             bar_counts: np.ndarray) -> None:
+        """把全部指标直接定位到预计算矩阵的第 row 行，代替从上次位置逐行 update
+        
+        结果与逐行增量更新到该行完全一致；定位后指标的内部窗口状态不再更新，
+        之后只能继续 seek，不能再调用 update。
+        
+        Args:
+            row: 价格矩阵中的行号
+            precomputed: 指标 key -> (指标矩阵, 上一值矩阵)，列顺序与 symbols 一致
+            bar_counts: 累计有效bar数量矩阵
+        """
+        self.bars[:] = bar_counts[row]
+        for indicator in self.indicators:
+            values, previous = precomputed[indicator.key]
+            indicator.values[:] = values[row]
+            indicator.previous[:] = previous[row]
+            indicator.count[:] = bar_counts[row]
+    
+    def reset(self) -> None:
+        """清空全部指标状态（保留订阅）"""
+        self.bars[:] = 0
+        for indicator in self.indicators:
+            indicator.reset()
+    
+    @staticmethod
+    def compute(matrix: np.ndarray, name: str, with_previous: bool = False, **params):
+        """在 日期 x 股票 矩阵上逐行运行增量指标，得到完整的指标矩阵
+        
+        与逐日增量更新的结果完全一致，供向量化回测使用。
+        
+        Returns:
+            指标矩阵；with_previous=True 时返回 (指标矩阵, 上一值矩阵)
+        """
+        indicator = create_indicator(name, n_symbols=matrix.shape[1], **params)
+        values = np.full(matrix.shape, np.nan)
+        previous = np.full(matrix.shape, np.nan) if with_previous else None
+        valid = ~np.isnan(matrix)
+        for row in range(len(matrix)):
+            indicator.update(matrix[row], valid[row])
+            values[row] = indicator.values
+            if with_previous:
+                previous[row] = indicator.previous
+        return (values, previous) if with_previous else values
@@ -0,0 +1,229 @@
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from quant_web.core.const import (
+    JOURNAL_DIR,
+    JOURNAL_INITIAL_CAPACITY,
+    JOURNAL_MAX_AGE_DAYS,
+    JOURNAL_MAX_FILES,
+    JOURNAL_SAMPLE_EVERY,
+    JOURNAL_EVENT_ORDER_FILLED,
+    JOURNAL_EVENT_NAMES,
+    ORDER_SIDE_BUY,
+    ORDER_SIDE_SELL,
+)
+
+
+# 每条记录一行的列式结构：日期以天为单位存储，股票与策略存储为字符串表中的下标
+JOURNAL_DTYPE = np.dtype([
+    ('seq', np.int64),  # 事件序号（含被采样丢弃的事件）
+    ('day', np.int32),  # 日期（距1970-01-01的天数）
+    ('event', np.int8),  # 事件类型
+    ('symbol', np.int32),  # 股票代码下标
+    ('strategy', np.int16),  # 策略ID下标
+    ('side', np.int8),  # 1: 买入, -1: 卖出, 0: 无
+    ('quantity', np.int64),  # 数量
+    ('price', np.float64),  # 价格
+    ('cash', np.float64),  # 事件发生后的账户现金
+])
+
+_SIDE_CODES = {ORDER_SIDE_BUY: 1, ORDER_SIDE_SELL: -1}
+_SIDE_NAMES = {1: ORDER_SIDE_BUY, -1: ORDER_SIDE_SELL, 0: ''}
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+class TradeJournal:
+    """低开销的交易与事件日志
+    
+    引擎在回测循环中以一次结构化数组赋值追加一条记录，代替逐笔格式化的日志输出；
+    回测结束后整体写入 .npz 文件，可通过 load / replay 读取和回放。
+    成交事件总是记录，其他事件可按 sample_every 抽样（每 N 条保留 1 条）。
+    """
+    
+    def __init__(self, capacity: int = JOURNAL_INITIAL_CAPACITY, sample_every: int = JOURNAL_SAMPLE_EVERY):
+        self._data = np.zeros(capacity, dtype=JOURNAL_DTYPE)
+        self._size = 0
+        self._seq = 0
+        self.sample_every = max(1, int(sample_every))
+        self.symbols: List[str] = []
+        self._symbol_index: Dict[str, int] = {}
+        self.strategies: List[str] = []
+        self._strategy_index: Dict[str, int] = {}
+        self.meta: Dict = {}
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def records(self) -> np.ndarray:
+        """已记录的事件（结构化数组视图）"""
+        return self._data[:self._size]
+    
+    def _intern(self, value: str, table: List[str], index: Dict[str, int]) -> int:
+        """将字符串映射为表中的下标"""
+        idx = index.get(value)
+        if idx is None:
+            idx = len(table)
+            table.append(value)
+            index[value] = idx
+        return idx
+    
+    def record(self, event: int, date: datetime, ts_code: str = '', strategy_id: str = '', side: str = '',
+               quantity: int = 0, price: Optional[float] = None, cash: float = np.nan) -> None:
+        """追加一条事件记录
+        
+        Args:
+            event: 事件类型，取值见 const 中的 JOURNAL_EVENT_*
+            date: 事件日期
+            ts_code: 股票代码
+            strategy_id: 策略ID
+            side: 交易方向（buy/sell）
+            quantity: 数量
+            price: 价格
+            cash: 事件发生后的账户现金
+        """
+        seq = self._seq
+        self._seq += 1
+        if event != JOURNAL_EVENT_ORDER_FILLED and seq % self.sample_every:
+            return
+        
+        if self._size >= len(self._data):
+            self._data = np.resize(self._data, max(len(self._data) * 2, JOURNAL_INITIAL_CAPACITY))
+        
+        self._data[self._size] = (
+            seq,
+            (np.datetime64(date, 'D') - _EPOCH).astype(np.int32),
+            event,
+            self._intern(ts_code, self.symbols, self._symbol_index),
+            self._intern(strategy_id, self.strategies, self._strategy_index),
+            _SIDE_CODES.get(side, 0),
+            quantity,
+            np.nan if price is None else price,
+            cash
+        )
+        self._size += 1
+    
+    def clear(self) -> None:
+        """清空日志"""
+        self._size = 0
+        self._seq = 0
+    
+    def dump(self, file_path: str) -> str:
+        """将日志写入 .npz 文件
+        
+        Returns:
+            实际写入的文件路径
+        """
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez(
+            file_path,
+            records=self.records,
+            symbols=np.array(self.symbols, dtype=str),
+            strategies=np.array(self.strategies, dtype=str),
+            meta=np.array(json.dumps({**self.meta, 'sample_every': self.sample_every, 'total_events': self._seq}))
+        )
+        path = file_path if file_path.endswith('.npz') else f"{file_path}.npz"
+        logger.info(f"Trade journal saved to {path}: {self._size} records ({self._seq} events)")
+        return path
+    
+    @classmethod
+    def load(cls, file_path: str) -> 'TradeJournal':
+        """从 .npz 文件加载日志"""
+        with np.load(file_path, allow_pickle=False) as archive:
+            records = archive['records']
+            meta = json.loads(str(archive['meta']))
+            journal = cls(capacity=max(len(records), 1), sample_every=meta.get('sample_every', 1))
+            journal._data[:len(records)] = records
+            journal._size = len(records)
+            journal._seq = meta.get('total_events', len(records))
+            for symbol in archive['symbols'].tolist():
+                journal._intern(symbol, journal.symbols, journal._symbol_index)
+            for strategy_id in archive['strategies'].tolist():
+                journal._intern(strategy_id, journal.strategies, journal._strategy_index)
+            journal.meta = meta
+        return journal
+    
+    def replay(self, events: Optional[List[int]] = None) -> Iterator[Dict]:
+        """按记录顺序回放事件
+        
+        Args:
+            events: 只回放指定类型的事件，为None时回放全部
+        
+        Yields:
+            事件字典
+        """
+        records = self.records
+        if events is not None:
+            records = records[np.isin(records['event'], events)]
+        for row in records:
+            yield {
+                'seq': int(row['seq']),
+                'date': pd.Timestamp(_EPOCH + np.timedelta64(int(row['day']), 'D')),
+                'event': JOURNAL_EVENT_NAMES.get(int(row['event']), str(row['event'])),
+                'ts_code': self.symbols[row['symbol']],
+                'strategy_id': self.strategies[row['strategy']],
+                'side': _SIDE_NAMES[int(row['side'])],
+                'quantity': int(row['quantity']),
+                'price': float(row['price']),
+                'cash': float(row['cash'])
+            }
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        """将日志转换为DataFrame，便于分析"""
+        records = self.records
+        return pd.DataFrame({
+            'seq': records['seq'],
+            'date': _EPOCH + records['day'].astype('timedelta64[D]'),
+            'event': [JOURNAL_EVENT_NAMES.get(int(e), str(e)) for e in records['event']],
+            'ts_code': np.array(self.symbols, dtype=object)[records['symbol']] if self.symbols else [],
+            'strategy_id': np.array(self.strategies, dtype=object)[records['strategy']] if self.strategies else [],
+            'side': [_SIDE_NAMES[int(s)] for s in records['side']],
+            'quantity': records['quantity'],
+            'price': records['price'],
+            'cash': records['cash']
+        })
+    
+    def summary(self) -> Dict:
+        """按事件类型统计记录数"""
+        events, counts = np.unique(self.records['event'], return_counts=True)
+        return {
+            'records': self._size,
+            'total_events': self._seq,
+            'sample_every': self.sample_every,
+            'by_event': {JOURNAL_EVENT_NAMES.get(int(e), str(e)): int(c) for e, c in zip(events, counts)}
+        }
+
+
+def prune_journals(directory: str = JOURNAL_DIR, max_files: int = JOURNAL_MAX_FILES,
+                   max_age_days: float = JOURNAL_MAX_AGE_DAYS) -> int:
+    """删除目录中过期的交易日志文件，返回删除的文件数
+    
+    超过 max_age_days 天未修改的文件全部删除；其余文件超过 max_files 个时按修改时间从早到晚删除。
+    """
+    if not os.path.isdir(directory):
+        return 0
+    entries = sorted((entry.stat().st_mtime, entry.path) for entry in os.scandir(directory)
+                     if entry.is_file() and entry.name.endswith('.npz'))
+    cutoff = time.time() - max_age_days * 86400
+    expired = [path for mtime, path in entries if mtime < cutoff]
+    kept = len(entries) - len(expired)
+    if kept > max_files:
+        expired += [path for _, path in entries[len(expired):len(expired) + kept - max_files]]
+    removed = 0
+    for path in expired:
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        removed += 1
+    if removed:
+        logger.info(f"Pruned {removed} trade journals from {directory}, {len(entries) - removed} remain")
+    return removed
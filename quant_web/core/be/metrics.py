@@ -0,0 +1,174 @@
+import math
+from datetime import datetime
+from typing import Dict, Optional
+
+from quant_web.core.const import RISK_FREE_RATE, TRADING_DAYS_PER_YEAR
+
+
+class StreamingMetrics:
+    """在线绩效指标累加器
+    
+    每个bar调用一次 update，以O(1)更新收益率的均值/方差（Welford算法）、运行中的峰值与最大回撤、
+    下行偏差、仓位暴露和换手，回测过程中随时可通过 snapshot 取得当前指标，结束时无需再遍历净值曲线。
+    两个回测引擎共用这一套口径：
+        - 年化收益率 = (1 + 总收益率) ^ (periods_per_year / bar数) - 1
+        - 年化波动率 = 日收益率样本标准差 * sqrt(periods_per_year)
+        - 下行偏差 = sqrt(mean(min(r, 0)^2)) * sqrt(periods_per_year)
+        - 夏普/索提诺比率 = (年化收益率 - 无风险利率) / 年化波动率(下行偏差)
+    """
+    
+    def __init__(self, periods_per_year: int = TRADING_DAYS_PER_YEAR, risk_free_rate: float = RISK_FREE_RATE):
+        """
+        Args:
+            periods_per_year: 每年的bar数量，用于年化
+            risk_free_rate: 年化无风险利率
+        """
+        self.periods_per_year = periods_per_year
+        self.risk_free_rate = risk_free_rate
+        self.reset()
+    
+    def reset(self) -> None:
+        """清空累计状态"""
+        self.bars = 0
+        self.first_equity: Optional[float] = None
+        self.last_equity: Optional[float] = None
+        self.first_date: Optional[datetime] = None
+        self.last_date: Optional[datetime] = None
+        # 日收益率的 Welford 累计量
+        self.return_count = 0
+        self.return_mean = 0.0
+        self._return_m2 = 0.0
+        self._downside_sq_sum = 0.0
+        self.winning_bars = 0
+        # 回撤
+        self.peak_equity: Optional[float] = None
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+        # 仓位暴露与换手
+        self._exposure_sum = 0.0
+        self.max_exposure = 0.0
+        self._equity_sum = 0.0
+        self.traded_value = 0.0
+    
+    def update(self, equity: float, date: Optional[datetime] = None, exposure: float = 0.0,
+               traded_value: float = 0.0) -> None:
+        """累计一个bar
+        
+        Args:
+            equity: 当前总资产
+            date: 当前日期
+            exposure: 当前持仓总市值（多空绝对值之和）
+            traded_value: 本bar成交金额
+        """
+        if self.last_equity is not None and self.last_equity != 0:
+            r = equity / self.last_equity - 1
+            self.return_count += 1
+            delta = r - self.return_mean
+            self.return_mean += delta / self.return_count
+            self._return_m2 += delta * (r - self.return_mean)
+            if r < 0:
+                self._downside_sq_sum += r * r
+            elif r > 0:
+                self.winning_bars += 1
+        
+        if self.first_equity is None:
+            self.first_equity = equity
+            self.first_date = date
+        self.last_equity = equity
+        self.last_date = date
+        self.bars += 1
+        
+        if self.peak_equity is None or equity > self.peak_equity:
+            self.peak_equity = equity
+        self.drawdown = (equity - self.peak_equity) / self.peak_equity if self.peak_equity else 0.0
+        if self.drawdown < self.max_drawdown:
+            self.max_drawdown = self.drawdown
+        
+        exposure_ratio = exposure / equity if equity else 0.0
+        self._exposure_sum += exposure_ratio
+        if exposure_ratio > self.max_exposure:
+            self.max_exposure = exposure_ratio
+        self._equity_sum += equity
+        self.traded_value += traded_value
+    
+    @property
+    def total_return(self) -> float:
+        if not self.first_equity:
+            return 0.0
+        return self.last_equity / self.first_equity - 1
+    
+    @property
+    def annual_return(self) -> float:
+        if self.bars == 0 or self.total_return <= -1:
+            return -1.0 if self.bars else 0.0
+        return (1 + self.total_return) ** (self.periods_per_year / self.bars) - 1
+    
+    @property
+    def volatility(self) -> float:
+        """收益率样本标准差（未年化）"""
+        if self.return_count < 2:
+            return 0.0
+        return math.sqrt(self._return_m2 / (self.return_count - 1))
+    
+    @property
+    def annual_volatility(self) -> float:
+        return self.volatility * math.sqrt(self.periods_per_year)
+    
+    @property
+    def downside_deviation(self) -> float:
+        """年化下行偏差（目标收益为0）"""
+        if self.return_count == 0:
+            return 0.0
+        return math.sqrt(self._downside_sq_sum / self.return_count) * math.sqrt(self.periods_per_year)
+    
+    @property
+    def sharpe_ratio(self) -> float:
+        vol = self.annual_volatility
+        return (self.annual_return - self.risk_free_rate) / vol if vol > 0 else 0.0
+    
+    @property
+    def sortino_ratio(self) -> float:
+        dd = self.downside_deviation
+        return (self.annual_return - self.risk_free_rate) / dd if dd > 0 else 0.0
+    
+    @property
+    def win_rate(self) -> float:
+        """收益为正的bar占比"""
+        return self.winning_bars / self.return_count if self.return_count else 0.0
+    
+    @property
+    def avg_exposure(self) -> float:
+        """平均仓位暴露（持仓市值 / 总资产）"""
+        return self._exposure_sum / self.bars if self.bars else 0.0
+    
+    @property
+    def turnover(self) -> float:
+        """换手率（累计成交金额 / 平均总资产）"""
+        avg_equity = self._equity_sum / self.bars if self.bars else 0.0
+        return self.traded_value / avg_equity if avg_equity else 0.0
+    
+    @property
+    def annual_turnover(self) -> float:
+        return self.turnover * self.periods_per_year / self.bars if self.bars else 0.0
+    
+    def snapshot(self) -> Dict:
+        """当前指标快照，回测中途和结束时均可调用"""
+        return {
+            'bars': self.bars,
+            'date': self.last_date.isoformat() if hasattr(self.last_date, 'isoformat') else self.last_date,
+            'equity': self.last_equity,
+            'total_return': self.total_return,
+            'annual_return': self.annual_return,
+            'annual_volatility': self.annual_volatility,
+            'downside_deviation': self.downside_deviation,
+            'sharpe_ratio': self.sharpe_ratio,
+            'sortino_ratio': self.sortino_ratio,
+            'drawdown': self.drawdown,
+            'max_drawdown': self.max_drawdown,
+            'win_rate': self.win_rate,
+            'avg_exposure': self.avg_exposure,
+            'max_exposure': self.max_exposure,
+            'turnover': self.turnover,
+            'annual_turnover': self.annual_turnover
+        }
+
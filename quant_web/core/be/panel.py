@@ -0,0 +1,95 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.indicators import IndicatorEngine
+
+
+class MarketPanel:
+    """日期 x 股票 的行情面板
+    
+    每个字段是一个形状为 (交易日数, 股票数) 的矩阵，列顺序与 DataFeed.get_available_stocks() 一致，
+    缺失数据为NaN。字段矩阵按需从 DataFeed 的矩阵缓存中读取，同一份数据只构建一次。
+    """
+    
+    def __init__(self, dates: pd.DatetimeIndex, symbols: List[str], fields: Optional[Dict[str, np.ndarray]] = None,
+                 data_feed: Optional[DataFeed] = None, start_row: int = 0):
+        self.dates = dates
+        self.start_row = start_row  # 回测起始日所在行，之前的行只作为指标计算的历史数据
+        self.symbols = list(symbols)
+        self._fields: Dict[str, np.ndarray] = dict(fields or {})
+        self._data_feed = data_feed
+        self._date_index = {date: i for i, date in enumerate(dates)}
+        self._valid: Optional[np.ndarray] = None
+        self._bar_counts: Optional[np.ndarray] = None
+    
+    @classmethod
+    def from_data_feed(cls, data_feed: DataFeed, start_date: Optional[datetime] = None,
+                       end_date: Optional[datetime] = None) -> 'MarketPanel':
+        """基于数据馈送创建面板
+        
+        Args:
+            data_feed: 数据馈送
+            start_date: 回测起始日期，之前的数据保留用于计算指标
+            end_date: 面板的截止日期（含），为None时包含全部数据
+        """
+        dates = data_feed.get_dates()
+        if end_date is not None:
+            dates = dates[dates <= pd.Timestamp(end_date)]
+        start_row = int(dates.searchsorted(pd.Timestamp(start_date))) if start_date is not None else 0
+        return cls(dates, data_feed.get_available_stocks(), data_feed=data_feed, start_row=start_row)
+    
+    def __getitem__(self, field: str) -> np.ndarray:
+        """获取字段矩阵"""
+        if field not in self._fields:
+            if self._data_feed is None:
+                raise KeyError(field)
+            self._fields[field] = self._data_feed.get_field_matrix(field)[:len(self.dates)]
+        return self._fields[field]
+    
+    @property
+    def close(self) -> np.ndarray:
+        return self['close']
+    
+    @property
+    def shape(self):
+        return len(self.dates), len(self.symbols)
+    
+    @property
+    def valid(self) -> np.ndarray:
+        """当日有行情的掩码"""
+        if self._valid is None:
+            self._valid = ~np.isnan(self.close)
+        return self._valid
+    
+    @property
+    def bar_counts(self) -> np.ndarray:
+        """截至每个交易日（含）每只股票累计的有效bar数量"""
+        if self._bar_counts is None:
+            self._bar_counts = np.cumsum(self.valid, axis=0)
+        return self._bar_counts
+    
+    def indicator(self, name: str, field: str = 'close', with_previous: bool = False, **params):
+        """获取字段上的指标矩阵
+        
+        绑定数据馈送时取馈送上全历史指标缓存的前缀，多个面板共享计算结果；否则直接在面板上计算。
+        
+        Returns:
+            指标矩阵；with_previous=True 时返回 (指标矩阵, 上一值矩阵)
+        """
+        if self._data_feed is not None:
+            values, previous = self._data_feed.get_indicator_matrix(name, field, **params)
+            values, previous = values[:len(self.dates)], previous[:len(self.dates)]
+        else:
+            values, previous = IndicatorEngine.compute(self[field], name, with_previous=True, **params)
+        return (values, previous) if with_previous else values
+    
+    def get_date_index(self, date: datetime) -> Optional[int]:
+        """获取日期在面板中的行号"""
+        return self._date_index.get(pd.Timestamp(date))
+    
+    def to_frame(self, field: str = 'close') -> pd.DataFrame:
+        """将字段矩阵转换为以日期为索引、股票代码为列的DataFrame"""
+        return pd.DataFrame(self[field], index=self.dates, columns=self.symbols)
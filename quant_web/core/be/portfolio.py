@@ -1,28 +1,129 @@
-from typing import Dict, Optional
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Union
+import numpy as np
 import pandas as pd
 from loguru import logger
 
+from quant_web.core.const import (
+    DEFAULT_INITIAL_CASH,
+    DEFAULT_COMMISSION_RATE,
+    MIN_COMMISSION,
+    STAMP_TAX_RATE,
+    PORTFOLIO_INITIAL_CAPACITY,
+)
+
+
+class PositionView(Mapping):
+    """持仓向量的只读字典视图
+    
+    兼容策略中 ``ts_code in portfolio.positions``、``portfolio.positions[ts_code]``
+    以及 ``portfolio.positions.keys()`` 等基于字典的访问方式，底层数据仍是
+    按股票ID索引的NumPy向量，仅包含数量不为0的股票。
+    """
+    
+    def __init__(self, portfolio: 'Portfolio', values: str):
+        self._portfolio = portfolio
+        self._values = values
+    
+    def __getitem__(self, ts_code: str):
+        idx = self._portfolio.symbol_index.get(ts_code)
+        if idx is None or self._portfolio._quantities[idx] == 0:
+            raise KeyError(ts_code)
+        return getattr(self._portfolio, self._values)[idx].item()
+    
+    def __iter__(self) -> Iterator[str]:
+        symbols = self._portfolio.symbols
+        for idx in self._portfolio.held_ids():
+            yield symbols[idx]
+    
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._portfolio.quantities))
+    
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
 
 class Portfolio:
-    """投资组合管理类，负责管理现金、持仓和交易执行"""
+    """投资组合管理类，负责管理现金、持仓和交易执行
     
-    def __init__(self, initial_cash: float = 1000000.0):
+    持仓数量与持仓成本以NumPy向量存储，按股票ID（注册顺序）索引，估值、
+    盈亏与敞口计算都是对价格向量的一次点积；``positions`` / ``position_costs``
+    以只读字典视图的形式保留给现有策略使用。
+    """
+    
+    def __init__(self, initial_cash: float = DEFAULT_INITIAL_CASH, symbols: Optional[List[str]] = None,
+                 verbose: bool = False):
         self.initial_cash = initial_cash
         self.cash = initial_cash
-        self.positions: Dict[str, int] = {}  # 持仓 {ts_code: quantity}
-        self.position_costs: Dict[str, float] = {}  # 持仓成本 {ts_code: avg_cost}
+        self.symbols: List[str] = []  # 股票ID -> 股票代码
+        self.symbol_index: Dict[str, int] = {}  # 股票代码 -> 股票ID
+        self._quantities = np.zeros(PORTFOLIO_INITIAL_CAPACITY, dtype=np.int64)  # 持仓数量向量
+        self._costs = np.zeros(PORTFOLIO_INITIAL_CAPACITY, dtype=np.float64)  # 持仓均价向量
         self.total_commission = 0.0  # 总佣金
+        self.verbose = verbose  # 是否逐笔输出成交日志
+        if symbols:
+            self.register_symbols(symbols)
         logger.info(f"Portfolio initialized with cash: {initial_cash}")
     
+    @property
+    def quantities(self) -> np.ndarray:
+        """持仓数量向量（按股票ID索引）"""
+        return self._quantities[:len(self.symbols)]
+    
+    @property
+    def cost_basis(self) -> np.ndarray:
+        """持仓均价向量（按股票ID索引）"""
+        return self._costs[:len(self.symbols)]
+    
+    @property
+    def positions(self) -> PositionView:
+        """持仓 {ts_code: quantity}（只读视图）"""
+        return PositionView(self, '_quantities')
+    
+    @property
+    def position_costs(self) -> PositionView:
+        """持仓成本 {ts_code: avg_cost}（只读视图）"""
+        return PositionView(self, '_costs')
+    
+    def register_symbols(self, symbols: List[str]) -> np.ndarray:
+        """注册股票代码，为其分配向量中的位置
+        
+        Returns:
+            与 symbols 一一对应的股票ID数组
+        """
+        return np.array([self.symbol_id(ts_code) for ts_code in symbols], dtype=np.int64)
+    
+    def symbol_id(self, ts_code: str) -> int:
+        """获取股票ID，不存在时自动注册并按需扩容向量"""
+        idx = self.symbol_index.get(ts_code)
+        if idx is not None:
+            return idx
+        
+        idx = len(self.symbols)
+        if idx >= len(self._quantities):
+            capacity = max(len(self._quantities) * 2, PORTFOLIO_INITIAL_CAPACITY)
+            self._quantities = np.resize(self._quantities, capacity)
+            self._costs = np.resize(self._costs, capacity)
+            self._quantities[idx:] = 0
+            self._costs[idx:] = 0.0
+        
+        self.symbols.append(ts_code)
+        self.symbol_index[ts_code] = idx
+        return idx
+    
+    def held_ids(self) -> np.ndarray:
+        """获取当前持有股票的ID数组"""
+        return np.flatnonzero(self.quantities)
+    
     def reset(self) -> None:
         """重置投资组合"""
         self.cash = self.initial_cash
-        self.positions = {}
-        self.position_costs = {}
+        self._quantities[:] = 0
+        self._costs[:] = 0.0
         self.total_commission = 0.0
         logger.info("Portfolio reset")
     
-    def buy(self, ts_code: str, quantity: int, price: float, commission_rate: float = 0.0003) -> bool:
+    def buy(self, ts_code: str, quantity: int, price: float, commission_rate: float = DEFAULT_COMMISSION_RATE) -> bool:
         """买入股票
         
         Args:
@@ -30,13 +131,13 @@ class Portfolio:
             quantity: 买入数量
             price: 买入价格
             commission_rate: 佣金率
-            
+        
         Returns:
             是否成功买入
         """
         # 计算交易成本
         cost = price * quantity
-        commission = max(cost * commission_rate, 5.0)  # 最低佣金5元
+        commission = max(cost * commission_rate, MIN_COMMISSION)
         total_cost = cost + commission
         
         # 检查资金是否足够
@@ -47,23 +148,19 @@ class Portfolio:
         # 更新现金
         self.cash -= total_cost
         
-        # 更新持仓
-        if ts_code in self.positions:
-            # 已持有该股票，计算平均成本
-            total_shares = self.positions[ts_code] + quantity
-            total_cost_basis = (self.position_costs[ts_code] * self.positions[ts_code]) + cost
-            self.position_costs[ts_code] = total_cost_basis / total_shares
-            self.positions[ts_code] = total_shares
-        else:
-            # 首次买入
-            self.positions[ts_code] = quantity
-            self.position_costs[ts_code] = price
+        # 更新持仓，按加权平均计算持仓成本
+        idx = self.symbol_id(ts_code)
+        held = self._quantities[idx]
+        total_shares = held + quantity
+        self._costs[idx] = (self._costs[idx] * held + cost) / total_shares
+        self._quantities[idx] = total_shares
         
         self.total_commission += commission
-        logger.info(f"Bought {quantity} shares of {ts_code} at {price}, Cash remaining: {self.cash}")
+        if self.verbose:
+            logger.info(f"Bought {quantity} shares of {ts_code} at {price}, Cash remaining: {self.cash}")
         return True
     
-    def sell(self, ts_code: str, quantity: int, price: float, commission_rate: float = 0.0003) -> bool:
+    def sell(self, ts_code: str, quantity: int, price: float, commission_rate: float = DEFAULT_COMMISSION_RATE) -> bool:
         """卖出股票
         
         Args:
@@ -71,108 +168,157 @@ class Portfolio:
             quantity: 卖出数量
             price: 卖出价格
             commission_rate: 佣金率
-            
+        
         Returns:
             是否成功卖出
         """
         # 检查持仓是否足够
-        if ts_code not in self.positions or self.positions[ts_code] < quantity:
-            logger.warning(f"Insufficient shares for sell order: {ts_code} - Requested {quantity}, Available {self.positions.get(ts_code, 0)}")
+        idx = self.symbol_index.get(ts_code)
+        available = int(self._quantities[idx]) if idx is not None else 0
+        if available <= 0 or available < quantity:
+            logger.warning(f"Insufficient shares for sell order: {ts_code} - Requested {quantity}, Available {available}")
             return False
         
         # 计算交易收入和成本
         revenue = price * quantity
-        commission = max(revenue * commission_rate, 5.0)  # 最低佣金5元
-        tax = revenue * 0.001  # 印花税
+        commission = max(revenue * commission_rate, MIN_COMMISSION)
+        tax = revenue * STAMP_TAX_RATE  # 印花税
         net_revenue = revenue - commission - tax
         
         # 更新现金
         self.cash += net_revenue
         
-        # 更新持仓
-        self.positions[ts_code] -= quantity
-        
-        # 如果持仓为0，移除该股票
-        if self.positions[ts_code] == 0:
-            del self.positions[ts_code]
-            del self.position_costs[ts_code]
+        # 更新持仓，清仓后同时清空持仓成本
+        self._quantities[idx] -= quantity
+        if self._quantities[idx] == 0:
+            self._costs[idx] = 0.0
         
         self.total_commission += commission
-        logger.info(f"Sold {quantity} shares of {ts_code} at {price}, Cash remaining: {self.cash}")
+        if self.verbose:
+            logger.info(f"Sold {quantity} shares of {ts_code} at {price}, Cash remaining: {self.cash}")
         return True
     
-    def can_buy(self, ts_code: str, quantity: int, price: float, commission_rate: float = 0.0003) -> bool:
+    def can_buy(self, ts_code: str, quantity: int, price: float, commission_rate: float = DEFAULT_COMMISSION_RATE) -> bool:
         """检查是否可以买入指定数量的股票"""
         cost = price * quantity
-        commission = max(cost * commission_rate, 5.0)
+        commission = max(cost * commission_rate, MIN_COMMISSION)
         total_cost = cost + commission
         return self.cash >= total_cost
     
     def can_sell(self, ts_code: str, quantity: int) -> bool:
         """检查是否可以卖出指定数量的股票"""
-        return ts_code in self.positions and self.positions[ts_code] >= quantity
+        idx = self.symbol_index.get(ts_code)
+        return idx is not None and self._quantities[idx] > 0 and self._quantities[idx] >= quantity
     
     def get_position_value(self, ts_code: str, current_price: float) -> float:
         """获取单个持仓的当前市值"""
-        if ts_code not in self.positions:
+        idx = self.symbol_index.get(ts_code)
+        if idx is None:
             return 0.0
-        return self.positions[ts_code] * current_price
+        return float(self._quantities[idx] * current_price)
+    
+    def _align_prices(self, prices: np.ndarray) -> np.ndarray:
+        """将价格向量对齐到股票ID空间，缺失价格按0处理（与旧版跳过缺失行情一致）"""
+        n = len(self.symbols)
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) < n:
+            prices = np.concatenate([prices, np.zeros(n - len(prices))])
+        elif len(prices) > n:
+            prices = prices[:n]
+        return np.nan_to_num(prices, nan=0.0)
+    
+    def _price_vector(self, market_data: Dict[str, pd.DataFrame]) -> np.ndarray:
+        """从 {ts_code: dataframe} 行情中提取持仓股票的最新价格向量"""
+        prices = np.zeros(len(self.symbols))
+        symbols = self.symbols
+        for idx in self.held_ids():
+            df = market_data.get(symbols[idx])
+            if df is not None and not df.empty:
+                prices[idx] = df['close'].iloc[-1]
+        return prices
+    
+    def market_value(self, prices: np.ndarray) -> float:
+        """持仓市值：数量向量与价格向量的点积"""
+        return float(np.dot(self.quantities, self._align_prices(prices)))
+    
+    def value(self, prices: np.ndarray) -> float:
+        """投资组合总价值（现金 + 持仓市值），prices 为按股票ID对齐的价格向量"""
+        return self.cash + self.market_value(prices)
+    
+    def unrealized_pnl(self, prices: np.ndarray) -> np.ndarray:
+        """各股票浮动盈亏向量：quantity * (price - avg_cost)"""
+        prices = self._align_prices(prices)
+        quantities = self.quantities
+        return np.where(quantities != 0, quantities * (prices - self.cost_basis), 0.0)
+    
+    def exposure(self, prices: np.ndarray) -> Dict[str, float]:
+        """计算持仓敞口
+        
+        Returns:
+            多头/空头/总/净敞口金额，以及净敞口占总资产的比例
+        """
+        position_values = self.quantities * self._align_prices(prices)
+        long_exposure = float(position_values[position_values > 0].sum())
+        short_exposure = float(-position_values[position_values < 0].sum())
+        net_exposure = long_exposure - short_exposure
+        total_value = self.cash + net_exposure
+        return {
+            'long': long_exposure,
+            'short': short_exposure,
+            'gross': long_exposure + short_exposure,
+            'net': net_exposure,
+            'net_ratio': net_exposure / total_value if total_value else 0.0
+        }
     
-    def get_total_value(self, market_data: Dict[str, pd.DataFrame]) -> float:
+    def get_total_value(self, market_data: Union[Dict[str, pd.DataFrame], np.ndarray]) -> float:
         """计算投资组合总价值
         
         Args:
-            market_data: 市场数据，格式为 {ts_code: dataframe}
-            
+            market_data: 按股票ID对齐的价格向量，或兼容旧接口的 {ts_code: dataframe} 行情
+        
         Returns:
             投资组合总价值（现金 + 持仓市值）
         """
-        # 计算持仓市值
-        positions_value = 0.0
-        
-        for ts_code, quantity in self.positions.items():
-            if ts_code in market_data and not market_data[ts_code].empty:
-                current_price = market_data[ts_code]['close'].iloc[-1]
-                positions_value += quantity * current_price
-        
-        # 总价值 = 现金 + 持仓市值
-        total_value = self.cash + positions_value
-        return total_value
+        if isinstance(market_data, dict):
+            market_data = self._price_vector(market_data)
+        return self.value(market_data)
     
     def get_holdings(self) -> Dict[str, Dict]:
         """获取当前持仓详情"""
-        holdings = {}
-        
-        for ts_code, quantity in self.positions.items():
-            holdings[ts_code] = {
-                'quantity': quantity,
-                'avg_cost': self.position_costs.get(ts_code, 0.0)
+        symbols = self.symbols
+        return {
+            symbols[idx]: {
+                'quantity': int(self._quantities[idx]),
+                'avg_cost': float(self._costs[idx])
             }
-        
-        return holdings
+            for idx in self.held_ids()
+        }
     
-    def get_pnl(self, market_data: Dict[str, pd.DataFrame]) -> Dict[str, float]:
+    def get_pnl(self, market_data: Union[Dict[str, pd.DataFrame], np.ndarray]) -> Dict[str, float]:
         """计算盈亏情况
         
         Args:
-            market_data: 市场数据，格式为 {ts_code: dataframe}
-            
+            market_data: 按股票ID对齐的价格向量，或兼容旧接口的 {ts_code: dataframe} 行情
+        
         Returns:
             盈亏信息，包括总体盈亏和各股票盈亏
         """
-        total_pnl = 0.0
-        stock_pnl = {}
+        if isinstance(market_data, dict):
+            # 旧接口只统计有行情的持仓
+            priced = {ts_code for ts_code, df in market_data.items() if df is not None and not df.empty}
+            market_data = self._price_vector(market_data)
+        else:
+            priced = None
         
-        for ts_code, quantity in self.positions.items():
-            if ts_code in market_data and not market_data[ts_code].empty:
-                current_price = market_data[ts_code]['close'].iloc[-1]
-                avg_cost = self.position_costs.get(ts_code, 0.0)
-                pnl = (current_price - avg_cost) * quantity
-                stock_pnl[ts_code] = pnl
-                total_pnl += pnl
+        pnl = self.unrealized_pnl(market_data)
+        stock_pnl = {}
+        for idx in self.held_ids():
+            ts_code = self.symbols[idx]
+            if priced is None or ts_code in priced:
+                stock_pnl[ts_code] = float(pnl[idx])
         
         return {
-            'total_pnl': total_pnl,
+            'total_pnl': float(sum(stock_pnl.values())) if priced is not None else float(pnl.sum()),
             'stock_pnl': stock_pnl
         }
     
@@ -181,8 +327,8 @@ class Portfolio:
         return {
             'initial_cash': self.initial_cash,
             'current_cash': self.cash,
-            'positions': self.positions,
-            'position_costs': self.position_costs,
+            'positions': dict(self.positions),
+            'position_costs': dict(self.position_costs),
             'total_commission': self.total_commission,
             'positions_count': len(self.positions)
         }
@@ -195,10 +341,9 @@ class Portfolio:
         summary += f"Total Commission: {self.total_commission}\n"
         summary += f"Holdings: {len(self.positions)}\n"
         
-        if self.positions:
+        if len(self.positions):
             summary += "Positions:\n"
-            for ts_code, quantity in sorted(self.positions.items()):
-                avg_cost = self.position_costs.get(ts_code, 0.0)
-                summary += f"  {ts_code}: {quantity} shares @ avg cost {avg_cost}\n"
+            for ts_code, holding in sorted(self.get_holdings().items()):
+                summary += f"  {ts_code}: {holding['quantity']} shares @ avg cost {holding['avg_cost']}\n"
         
         return summary
@@ -0,0 +1,207 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterator, Optional, Tuple
+
+# 引擎主循环中的计时阶段
+PHASE_PROCESS_ORDERS = 'process_orders'
+PHASE_MARKET_DATA = 'market_data'
+PHASE_INDICATORS = 'indicators'
+PHASE_STRATEGY = 'strategy'
+PHASE_PROCESS_SIGNALS = 'process_signals'
+PHASE_VALUATION = 'valuation'
+PHASE_METRICS = 'metrics'
+PHASE_SIGNAL_GENERATION = 'signal_generation'
+PHASE_CHECKPOINT = 'checkpoint'
+
+
+class PhaseProfiler:
+    """回测各阶段的耗时统计
+    
+    在引擎主循环中按阶段累计墙钟时间（perf_counter）、CPU时间（当前线程的 thread_time）和调用次数，
+    策略按 strategy_id 分别计时。每次计时只有两次时钟读取和几次字典累加，可在生产环境中常开。
+    
+    用法：
+        started = profiler.start()
+        ...
+        profiler.stop(PHASE_PROCESS_ORDERS, started)
+    块内可能 continue/break 提前退出时用上下文管理器，退出时总会停止计时：
+        with profiler.phase(PHASE_STRATEGY):
+            ...
+    """
+    
+    enabled = True
+    
+    def __init__(self):
+        self.wall: Dict[str, float] = defaultdict(float)
+        self.cpu: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.strategy_wall: Dict[str, float] = defaultdict(float)
+        self.strategy_cpu: Dict[str, float] = defaultdict(float)
+        self.strategy_calls: Dict[str, int] = defaultdict(int)
+        self._started: Optional[Tuple[float, float]] = None
+        self._total: Tuple[float, float] = (0.0, 0.0)
+    
+    @staticmethod
+    def start() -> Tuple[float, float]:
+        """读取当前的墙钟时间和CPU时间"""
+        return time.perf_counter(), time.thread_time()
+    
+    def stop(self, phase: str, started: Tuple[float, float]) -> None:
+        """累计从 started 到现在的耗时到指定阶段"""
+        wall, cpu = time.perf_counter() - started[0], time.thread_time() - started[1]
+        self.wall[phase] += wall
+        self.cpu[phase] += cpu
+        self.calls[phase] += 1
+    
+    @contextmanager
+    def phase(self, phase: str) -> Iterator[None]:
+        """把 with 块的耗时累计到指定阶段，块内提前退出（continue/break/异常）时同样停止计时"""
+        started = self.start()
+        try:
+            yield
+        finally:
+            self.stop(phase, started)
+    
+    def stop_strategy(self, strategy_id: str, started: Tuple[float, float]) -> None:
+        """累计单个策略的耗时，同时计入 strategy 阶段"""
+        wall, cpu = time.perf_counter() - started[0], time.thread_time() - started[1]
+        self.strategy_wall[strategy_id] += wall
+        self.strategy_cpu[strategy_id] += cpu
+        self.strategy_calls[strategy_id] += 1
+        self.wall[PHASE_STRATEGY] += wall
+        self.cpu[PHASE_STRATEGY] += cpu
+        self.calls[PHASE_STRATEGY] += 1
+    
+    def begin(self) -> None:
+        """开始计量整次回测的总耗时"""
+        self._started = self.start()
+    
+    def end(self) -> None:
+        """结束计量整次回测的总耗时"""
+        if self._started is not None:
+            self._total = (time.perf_counter() - self._started[0], time.thread_time() - self._started[1])
+            self._started = None
+    
+    @staticmethod
+    def _rows(wall: Dict[str, float], cpu: Dict[str, float], calls: Dict[str, int],
+              total_wall: float) -> Dict[str, Dict]:
+        rows = {}
+        for name in sorted(wall, key=wall.get, reverse=True):
+            rows[name] = {
+                'calls': calls[name],
+                'wall_time': wall[name],
+                'cpu_time': cpu[name],
+                'wall_share': wall[name] / total_wall if total_wall > 0 else 0.0,
+                'mean_wall_us': wall[name] / calls[name] * 1e6 if calls[name] else 0.0
+            }
+        return rows
+    
+    def report(self) -> Dict:
+        """生成耗时报告，各阶段按墙钟时间降序排列，未计入任何阶段的耗时记为 other"""
+        total_wall, total_cpu = self._total
+        if total_wall <= 0:
+            total_wall, total_cpu = sum(self.wall.values()), sum(self.cpu.values())
+        wall, cpu, calls = dict(self.wall), dict(self.cpu), dict(self.calls)
+        other = total_wall - sum(wall.values())
+        if other > 0:
+            wall['other'] = other
+            cpu['other'] = max(total_cpu - sum(cpu.values()), 0.0)
+            calls['other'] = 0
+        return {
+            'wall_time': total_wall,
+            'cpu_time': total_cpu,
+            'phases': self._rows(wall, cpu, calls, total_wall),
+            'strategies': self._rows(self.strategy_wall, self.strategy_cpu, self.strategy_calls, total_wall)
+        }
+
+
+_NULL_PHASE = nullcontext()
+
+
+class NullProfiler:
+    """不做任何计时的空实现，关闭性能统计时引擎使用它，避免在主循环中判断是否开启"""
+    
+    enabled = False
+    
+    @staticmethod
+    def start() -> None:
+        return None
+    
+    def stop(self, phase: str, started) -> None:
+        pass
+    
+    def phase(self, phase: str) -> ContextManager[None]:
+        return _NULL_PHASE
+    
+    def stop_strategy(self, strategy_id: str, started) -> None:
+        pass
+    
+    def begin(self) -> None:
+        pass
+    
+    def end(self) -> None:
+        pass
+    
+    def report(self) -> Dict:
+        return {}
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class ProfileStats:
+    """进程内所有开启性能统计的回测的累计耗时，用于观察阶段耗时的回归和最耗时的策略"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.runs = 0
+            self.wall_time = 0.0
+            self.cpu_time = 0.0
+            self.phases: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+            self.strategies: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    
+    def record(self, report: Dict, strategy_names: Optional[Dict[str, str]] = None) -> None:
+        """累计一次回测的耗时报告
+        
+        Args:
+            report: PhaseProfiler.report() 的结果
+            strategy_names: strategy_id -> 策略名称，策略耗时按名称聚合；为None时按 strategy_id 聚合
+        """
+        if not report:
+            return
+        with self._lock:
+            self.runs += 1
+            self.wall_time += report['wall_time']
+            self.cpu_time += report['cpu_time']
+            for target, rows, names in ((self.phases, report['phases'], None),
+                                        (self.strategies, report['strategies'], strategy_names)):
+                for name, row in rows.items():
+                    entry = target[names.get(name, name) if names else name]
+                    for field in ('calls', 'wall_time', 'cpu_time'):
+                        entry[field] += row[field]
+    
+    def snapshot(self) -> Dict:
+        """返回累计统计，各阶段附带墙钟时间占比"""
+        with self._lock:
+            def rows(target):
+                return {
+                    name: {**entry, 'wall_share': entry['wall_time'] / self.wall_time if self.wall_time else 0.0}
+                    for name, entry in sorted(target.items(), key=lambda item: item[1]['wall_time'], reverse=True)
+                }
+            return {
+                'runs': self.runs,
+                'wall_time': self.wall_time,
+                'cpu_time': self.cpu_time,
+                'phases': rows(self.phases),
+                'strategies': rows(self.strategies)
+            }
+
+
+# 全局的回测阶段耗时统计
+global_profile_stats = ProfileStats()
@@ -0,0 +1,204 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+from quant_web.core.be.portfolio import Portfolio
+from quant_web.core.const import (
+    MIN_TRADE_QUANTITY,
+    TRADE_QUANTITY_MULTIPLE,
+    MAX_POSITION_SIZE,
+    MAX_CASH_RATIO,
+    DEFAULT_COMMISSION_RATE,
+    MIN_COMMISSION,
+    ORDER_SIDE_BUY,
+    ORDER_SIDE_SELL,
+    RISK_REJECT_INVALID_SIGNAL,
+    RISK_REJECT_BELOW_MIN_QUANTITY,
+    RISK_REJECT_INSUFFICIENT_SHARES,
+    RISK_REJECT_POSITION_LIMIT,
+    RISK_REJECT_INSUFFICIENT_CASH,
+)
+
+
+@dataclass
+class BatchCheckResult:
+    """批量预校验结果，所有数组与输入信号一一对应"""
+    accepted: np.ndarray  # 是否通过校验
+    quantities: np.ndarray  # 通过校验后的数量（可能因仓位/现金比例限制被下调）
+    reasons: List[str]  # 拒绝原因，通过时为空字符串
+    reserved_cash: float = 0.0  # 本批次买入预占用的现金（含佣金）
+    reserved_shares: Dict[str, int] = field(default_factory=dict)  # 本批次卖出预占用的股数
+    
+    @property
+    def rejected(self) -> np.ndarray:
+        """被拒绝的信号掩码"""
+        return ~self.accepted
+    
+    @property
+    def accepted_count(self) -> int:
+        return int(self.accepted.sum())
+
+
+def _grouped_cumsum(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """按组（保持组内原始顺序）计算累计和"""
+    if len(values) == 0:
+        return values.copy()
+    order = np.argsort(groups, kind='stable')
+    sorted_values = values[order]
+    sorted_groups = groups[order]
+    cumsum = np.cumsum(sorted_values)
+    starts = np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]
+    # 每组起点之前的累计和，作为该组的偏移量
+    offsets = (cumsum - sorted_values)[starts][np.cumsum(starts) - 1]
+    result = np.empty_like(cumsum)
+    result[order] = cumsum - offsets
+    return result
+
+
+def _reserve_in_order(amounts: np.ndarray, capacity: np.ndarray, groups: np.ndarray,
+                      candidates: np.ndarray) -> np.ndarray:
+    """按信号顺序累计预留额度
+    
+    每轮用一次向量化累计和找出各组第一笔超出额度的信号并拒绝，
+    被拒绝的信号不再占用额度，直到所有已接受信号的累计占用都不超过额度。
+    
+    Args:
+        amounts: 每个信号需要占用的额度
+        capacity: 每个信号所属组的可用额度
+        groups: 信号所属的组（同组共享额度）
+        candidates: 参与预留的信号掩码
+    
+    Returns:
+        最终被接受的信号掩码
+    """
+    accepted = candidates.copy()
+    while accepted.any():
+        cumulative = _grouped_cumsum(np.where(accepted, amounts, 0.0), groups)
+        overflow = np.flatnonzero(accepted & (cumulative > capacity + 1e-9))
+        if len(overflow) == 0:
+            break
+        # overflow 按位置升序，unique 返回的即各组第一笔超额信号
+        _, first = np.unique(groups[overflow], return_index=True)
+        accepted[overflow[first]] = False
+    return accepted
+
+
+def _round_lot(quantities: np.ndarray) -> np.ndarray:
+    """向下取整到交易单位"""
+    return (quantities // TRADE_QUANTITY_MULTIPLE) * TRADE_QUANTITY_MULTIPLE
+
+
+class BatchRiskChecker:
+    """批量订单预校验器
+    
+    对一个交易日内的全部信号一次性做风控与资金校验：卖出按股票累计预占用持仓，
+    买入先按单股最大仓位（MAX_POSITION_SIZE，占总资产比例）和单笔最大现金使用
+    比例（MAX_CASH_RATIO，占批次开始时可用现金比例）下调数量，再按信号顺序累计
+    预占用现金，避免多笔各自可成交的买单合计透支账户。
+    """
+    
+    def __init__(self, max_position_size: float = MAX_POSITION_SIZE, max_cash_ratio: float = MAX_CASH_RATIO,
+                 commission_rate: float = DEFAULT_COMMISSION_RATE):
+        self.max_position_size = max_position_size
+        self.max_cash_ratio = max_cash_ratio
+        self.commission_rate = commission_rate
+    
+    def _to_arrays(self, portfolio: Portfolio, signals: List[Dict]) -> Tuple[np.ndarray, ...]:
+        """将信号列表转换为列式数组"""
+        n = len(signals)
+        ids = np.empty(n, dtype=np.int64)
+        sides = np.zeros(n, dtype=np.int8)
+        quantities = np.zeros(n, dtype=np.int64)
+        prices = np.full(n, np.nan)
+        for i, signal in enumerate(signals):
+            ids[i] = portfolio.symbol_id(signal['ts_code'])
+            if signal['side'] == ORDER_SIDE_BUY:
+                sides[i] = 1
+            elif signal['side'] == ORDER_SIDE_SELL:
+                sides[i] = -1
+            quantities[i] = signal['quantity']
+            if signal.get('price') is not None:
+                prices[i] = signal['price']
+        return ids, sides, quantities, prices
+    
+    def check(self, portfolio: Portfolio, signals: List[Dict], mark_prices: Optional[np.ndarray] = None,
+              reserved_cash: float = 0.0, reserved_shares: Optional[Dict[str, int]] = None) -> BatchCheckResult:
+        """校验一批交易信号
+        
+        Args:
+            portfolio: 当前投资组合
+            signals: 交易信号列表，格式同 Strategy.on_data 的返回值
+            mark_prices: 按持仓股票ID对齐的盯市价格向量，用于计算总资产；为None时按持仓成本估值
+            reserved_cash: 已被未成交订单占用的现金
+            reserved_shares: 已被未成交卖单占用的股数 {ts_code: quantity}
+        
+        Returns:
+            批量校验结果
+        """
+        n = len(signals)
+        if n == 0:
+            return BatchCheckResult(accepted=np.zeros(0, dtype=bool), quantities=np.zeros(0, dtype=np.int64),
+                                    reasons=[])
+        
+        ids, sides, quantities, prices = self._to_arrays(portfolio, signals)
+        reasons = np.full(n, '', dtype=object)
+        
+        # 基础校验：方向、价格、最小交易数量
+        invalid = (sides == 0) | ~(prices > 0)
+        reasons[invalid] = RISK_REJECT_INVALID_SIGNAL
+        below_min = ~invalid & (quantities < MIN_TRADE_QUANTITY)
+        reasons[below_min] = RISK_REJECT_BELOW_MIN_QUANTITY
+        valid = ~invalid & ~below_min
+        
+        held = portfolio.quantities[ids]
+        if reserved_shares:
+            held = held - np.array([reserved_shares.get(portfolio.symbols[i], 0) for i in ids], dtype=np.int64)
+        
+        # 卖出：同一股票的卖单按顺序累计占用持仓
+        sells = valid & (sides < 0)
+        sell_ok = _reserve_in_order(quantities.astype(np.float64), held.astype(np.float64), ids, sells)
+        reasons[sells & ~sell_ok] = RISK_REJECT_INSUFFICIENT_SHARES
+        
+        # 买入：单股仓位上限 + 单笔现金使用比例上限，超出部分下调到整手
+        buys = valid & (sides > 0)
+        safe_prices = np.where(buys, prices, 1.0)
+        if mark_prices is not None:
+            total_value = portfolio.value(mark_prices)
+        else:
+            total_value = portfolio.cash + float(np.dot(portfolio.quantities, portfolio.cost_basis))
+        available_cash = portfolio.cash - reserved_cash
+        
+        # 先按单笔现金比例截断，再按同股累计买入量截断到仓位上限的剩余额度
+        cash_capped = np.floor(self.max_cash_ratio * max(available_cash, 0.0) / safe_prices)
+        requested = np.where(buys, np.minimum(quantities, cash_capped), 0).astype(np.float64)
+        headroom = np.maximum(np.floor(self.max_position_size * total_value / safe_prices) - held, 0)
+        cumulative = _grouped_cumsum(requested, ids)
+        allowed = (np.minimum(cumulative, headroom) - np.minimum(cumulative - requested, headroom)).astype(np.int64)
+        adjusted = np.where(buys & (allowed < quantities), _round_lot(allowed), quantities)
+        limited = buys & (adjusted < MIN_TRADE_QUANTITY)
+        reasons[limited] = RISK_REJECT_POSITION_LIMIT
+        buys &= ~limited
+        
+        # 买入：按信号顺序累计占用现金（含佣金）
+        costs = adjusted * safe_prices
+        costs = costs + np.maximum(costs * self.commission_rate, MIN_COMMISSION)
+        buy_ok = _reserve_in_order(costs, np.full(n, available_cash), np.zeros(n, dtype=np.int64), buys)
+        reasons[buys & ~buy_ok] = RISK_REJECT_INSUFFICIENT_CASH
+        
+        accepted = sell_ok | buy_ok
+        shares: Dict[str, int] = {}
+        for i in np.flatnonzero(accepted & (sides < 0)):
+            ts_code = portfolio.symbols[ids[i]]
+            shares[ts_code] = shares.get(ts_code, 0) + int(adjusted[i])
+        
+        result = BatchCheckResult(
+            accepted=accepted,
+            quantities=np.where(accepted, adjusted, 0),
+            reasons=reasons.tolist(),
+            reserved_cash=float(costs[buy_ok].sum()),
+            reserved_shares=shares
+        )
+        if result.accepted_count < n:
+            logger.debug(f"Batch risk check rejected {n - result.accepted_count}/{n} signals")
+        return result
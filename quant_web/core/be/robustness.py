@@ -0,0 +1,235 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+from quant_web.core.be.order import Order
+from quant_web.core.const import (
+    ORDER_SIDE_BUY,
+    RISK_FREE_RATE,
+    ROBUSTNESS_BLOCK_SIZE,
+    ROBUSTNESS_CHUNK_SIZE,
+    ROBUSTNESS_CONFIDENCE,
+    ROBUSTNESS_MAX_BLOCK_SIZE,
+    ROBUSTNESS_MAX_SIMULATIONS,
+    ROBUSTNESS_SIMULATIONS,
+    TRADING_DAYS_PER_YEAR,
+)
+
+
+def block_bootstrap_indices(n_obs: int, n_paths: int, block_size: int, rng: np.random.Generator) -> np.ndarray:
+    """生成循环块自助法的抽样下标
+    
+    每条路径由若干长度为 block_size 的连续块拼接而成，块起点均匀随机，越过末尾时循环回到开头，
+    保留了收益率在块内的自相关和波动聚集。
+    
+    Returns:
+        形状为 (n_paths, n_obs) 的下标矩阵
+    """
+    block_size = max(1, min(block_size, n_obs))
+    n_blocks = -(-n_obs // block_size)
+    starts = rng.integers(0, n_obs, size=(n_paths, n_blocks, 1))
+    indices = (starts + np.arange(block_size)) % n_obs
+    return indices.reshape(n_paths, -1)[:, :n_obs]
+
+
+def path_statistics(returns: np.ndarray, initial_value: float = 1.0,
+                    periods_per_year: int = TRADING_DAYS_PER_YEAR,
+                    risk_free_rate: float = RISK_FREE_RATE) -> Dict[str, np.ndarray]:
+    """按行计算一批收益率路径的期末价值、夏普比率与最大回撤
+    
+    口径与 StreamingMetrics 一致：bar数包含起始净值，年化收益率按几何复利，波动率为样本标准差。
+    
+    Args:
+        returns: 形状为 (路径数, 期数) 的收益率矩阵
+        initial_value: 起始净值
+    """
+    equity = initial_value * np.cumprod(1 + returns, axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), initial_value)
+    max_drawdown = np.minimum((equity / peak - 1).min(axis=1), 0.0)
+    
+    final_value = equity[:, -1].copy()  # 复制出来，避免视图让整批净值矩阵无法释放
+    total_return = final_value / initial_value - 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        annual_return = np.where(total_return > -1,
+                                 np.maximum(1 + total_return, 0) ** (periods_per_year / (returns.shape[1] + 1)) - 1,
+                                 -1.0)
+        annual_volatility = returns.std(axis=1, ddof=1) * np.sqrt(periods_per_year) if returns.shape[1] > 1 \
+            else np.zeros(len(returns))
+        sharpe = np.where(annual_volatility > 0, (annual_return - risk_free_rate) / annual_volatility, 0.0)
+    return {
+        'final_value': final_value,
+        'total_return': total_return,
+        'sharpe_ratio': sharpe,
+        'max_drawdown': max_drawdown
+    }
+
+
+def trade_pnls(orders: Iterable[Order]) -> np.ndarray:
+    """按移动平均成本把成交记录配对为逐笔平仓盈亏（扣除佣金），按成交顺序排列"""
+    holdings: Dict[str, List[float]] = {}  # ts_code -> [持仓数量, 持仓成本]
+    pnls = []
+    for order in orders:
+        if order.filled_price is None:
+            continue
+        quantity = order.filled_quantity or order.quantity
+        position = holdings.setdefault(order.ts_code, [0.0, 0.0])
+        if order.side == ORDER_SIDE_BUY:
+            position[0] += quantity
+            position[1] += quantity * order.filled_price + order.commission
+        elif position[0] > 0:
+            closed = min(quantity, position[0])
+            cost = position[1] * closed / position[0]
+            pnls.append(closed * order.filled_price - order.commission - cost)
+            position[0] -= closed
+            position[1] -= cost
+    return np.asarray(pnls, dtype=np.float64)
+
+
+class RobustnessAnalyzer:
+    """回测结果的蒙特卡洛稳健性分析
+    
+    回测只给出一条净值路径。这里对同一结果重采样出大量可能路径，给出指标的置信区间：
+        - 收益率块自助法：对日收益率做循环块抽样，得到期末价值、夏普比率和最大回撤的分布；
+        - 交易顺序重排：随机打乱逐笔平仓盈亏的顺序，期末价值不变，考察回撤对交易顺序的敏感度。
+    路径按 chunk_size 分批在NumPy中整体计算，内存占用约为 chunk_size x 期数 x 8字节的数倍，与模拟次数无关。
+    """
+    
+    def __init__(self, n_simulations: int = ROBUSTNESS_SIMULATIONS, block_size: int = ROBUSTNESS_BLOCK_SIZE,
+                 chunk_size: int = ROBUSTNESS_CHUNK_SIZE, confidence: float = ROBUSTNESS_CONFIDENCE,
+                 periods_per_year: int = TRADING_DAYS_PER_YEAR, risk_free_rate: float = RISK_FREE_RATE,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            n_simulations: 模拟路径数
+            block_size: 自助法的块长度（期数）
+            chunk_size: 每批计算的路径数
+            confidence: 置信水平，如0.95对应2.5%和97.5%分位数
+            periods_per_year: 每年的bar数量，用于年化
+            risk_free_rate: 年化无风险利率
+            seed: 随机数种子
+        """
+        self.n_simulations = n_simulations
+        self.block_size = block_size
+        self.chunk_size = chunk_size
+        self.confidence = confidence
+        self.periods_per_year = periods_per_year
+        self.risk_free_rate = risk_free_rate
+        self.rng = np.random.default_rng(seed)
+    
+    @classmethod
+    def from_options(cls, options: Dict[str, Any]) -> 'RobustnessAnalyzer':
+        """由请求中的分析选项创建分析器，只接受 n_simulations/block_size/confidence/seed 且校验取值范围
+        
+        Raises:
+            ValueError: 选项名未知或取值超出范围
+        """
+        unknown = set(options) - {'n_simulations', 'block_size', 'confidence', 'seed'}
+        if unknown:
+            raise ValueError(f"Unknown robustness options: {sorted(unknown)}")
+        n_simulations = int(options.get('n_simulations', ROBUSTNESS_SIMULATIONS))
+        block_size = int(options.get('block_size', ROBUSTNESS_BLOCK_SIZE))
+        confidence = float(options.get('confidence', ROBUSTNESS_CONFIDENCE))
+        if not 1 <= n_simulations <= ROBUSTNESS_MAX_SIMULATIONS:
+            raise ValueError(f"n_simulations must be between 1 and {ROBUSTNESS_MAX_SIMULATIONS}")
+        if not 1 <= block_size <= ROBUSTNESS_MAX_BLOCK_SIZE:
+            raise ValueError(f"block_size must be between 1 and {ROBUSTNESS_MAX_BLOCK_SIZE}")
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+        return cls(n_simulations=n_simulations, block_size=block_size, confidence=confidence,
+                   seed=options.get('seed'))
+    
+    def _chunks(self):
+        for start in range(0, self.n_simulations, self.chunk_size):
+            yield min(self.chunk_size, self.n_simulations - start)
+    
+    def _summarize(self, samples: Dict[str, List[np.ndarray]], observed: Dict[str, float]) -> Dict[str, Dict]:
+        tail = (1 - self.confidence) / 2 * 100
+        summary = {}
+        for name, chunks in samples.items():
+            values = np.concatenate(chunks)
+            lower, median, upper = np.percentile(values, [tail, 50, 100 - tail])
+            summary[name] = {
+                'observed': observed.get(name),
+                'mean': float(values.mean()),
+                'median': float(median),
+                'ci_lower': float(lower),
+                'ci_upper': float(upper)
+            }
+        return summary
+    
+    def bootstrap(self, equity: Sequence[float]) -> Dict:
+        """对净值曲线的日收益率做块自助法模拟
+        
+        Args:
+            equity: 净值序列
+        
+        Returns:
+            各指标的观测值、均值、中位数与置信区间，以及期末亏损的概率
+        """
+        equity = np.asarray(equity, dtype=np.float64)
+        if len(equity) < 3:
+            raise ValueError("Equity curve is too short for bootstrap analysis")
+        returns = equity[1:] / equity[:-1] - 1
+        initial_value = equity[0]
+        
+        observed = {name: float(value[0]) for name, value in path_statistics(
+            returns[None, :], initial_value, self.periods_per_year, self.risk_free_rate).items()}
+        samples = {name: [] for name in observed}
+        for size in self._chunks():
+            indices = block_bootstrap_indices(len(returns), size, self.block_size, self.rng)
+            stats = path_statistics(returns[indices], initial_value, self.periods_per_year, self.risk_free_rate)
+            for name, values in stats.items():
+                samples[name].append(values)
+        
+        summary = self._summarize(samples, observed)
+        final_values = np.concatenate(samples['final_value'])
+        return {
+            'method': 'block_bootstrap',
+            'simulations': self.n_simulations,
+            'block_size': self.block_size,
+            'confidence': self.confidence,
+            'metrics': summary,
+            'probability_of_loss': float((final_values < initial_value).mean())
+        }
+    
+    def shuffle_trades(self, pnls: Sequence[float], initial_value: float) -> Dict:
+        """随机打乱逐笔盈亏的顺序，模拟按交易序列计的最大回撤分布
+        
+        Args:
+            pnls: 逐笔平仓盈亏
+            initial_value: 初始资金
+        """
+        pnls = np.asarray(pnls, dtype=np.float64)
+        if len(pnls) < 2:
+            raise ValueError("At least two closed trades are required for trade shuffling")
+        
+        def max_drawdown(paths: np.ndarray) -> np.ndarray:
+            equity = initial_value + np.cumsum(paths, axis=-1)
+            peak = np.maximum(np.maximum.accumulate(equity, axis=-1), initial_value)
+            return np.minimum((equity / peak - 1).min(axis=-1), 0.0)
+        
+        samples = {'max_drawdown': []}
+        for size in self._chunks():
+            samples['max_drawdown'].append(max_drawdown(self.rng.permuted(np.tile(pnls, (size, 1)), axis=1)))
+        
+        return {
+            'method': 'trade_shuffle',
+            'simulations': self.n_simulations,
+            'trades': len(pnls),
+            'confidence': self.confidence,
+            'final_value': float(initial_value + pnls.sum()),
+            'metrics': self._summarize(samples, {'max_drawdown': float(max_drawdown(pnls))})
+        }
+    
+    def analyze(self, backtest_result: Dict, initial_value: Optional[float] = None) -> Dict:
+        """对 TradingEngine.execute_backtest 的结果做全部稳健性分析
+        
+        Args:
+            backtest_result: 回测结果，需包含 daily_equity，order_history 可选
+            initial_value: 初始资金，为None时取净值曲线的首个值
+        """
+        equity = [day['equity'] for day in backtest_result['daily_equity']]
+        report = {'bootstrap': self.bootstrap(equity)}
+        pnls = trade_pnls(backtest_result.get('order_history', []))
+        if len(pnls) >= 2:
+            report['trade_shuffle'] = self.shuffle_trades(pnls, initial_value or equity[0])
+        return report
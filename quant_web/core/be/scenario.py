@@ -0,0 +1,123 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+from loguru import logger
+
+from quant_web.core.be.checkpoint import EngineSnapshot
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.sweep import process_pool
+from quant_web.core.const import FORK_MAX_WORKERS, FORK_RESULT_METRICS
+
+# 工作进程内共享的数据馈送和快照，由进程池初始化函数设置
+_WORKER_FORK: Optional[tuple] = None
+
+
+@dataclass
+class Branch:
+    """从快照分叉的一个情景分支
+    
+    在快照日收盘后依次：停止 drop 指定的策略，加入 strategies 中的新策略，按 close 平仓，
+    然后继续回测到快照所在回测的结束日。不做任何修改的分支与不分叉一次跑完的结果相同。
+    """
+    name: str
+    # 分叉后新加入的策略，每项为 {'name': 策略名称, 'parameters': 参数, 'id': 策略ID（可选）}
+    strategies: Optional[List[Dict[str, Any]]] = None
+    # 停止快照中的策略：True 停止全部，或要停止的策略ID列表；停止的策略已有的持仓保留
+    drop: Union[bool, List[str]] = False
+    # 在快照日平仓：True 平掉全部持仓，或要平仓的股票列表
+    close: Union[bool, List[str]] = False
+    
+    def apply(self, engine) -> None:
+        """在恢复了快照的分支引擎上应用本分支的修改"""
+        if self.drop:
+            for strategy_id in list(engine.strategies) if self.drop is True else self.drop:
+                engine.remove_strategy(strategy_id)
+        for spec in self.strategies or []:
+            strategy_id = spec.get('id') or f"{spec['name']}_{self.name}"
+            engine.add_strategy(spec['name'], strategy_id, dict(spec.get('parameters') or {}))
+        if self.close:
+            engine.close_positions(None if self.close is True else list(self.close))
+
+
+def _init_worker(data_feed: DataFeed, snapshot: EngineSnapshot) -> None:
+    """进程池初始化：保存共享的数据馈送和快照"""
+    global _WORKER_FORK
+    _WORKER_FORK = (data_feed, snapshot)
+
+
+def _run_branch(index: int, branch: Branch, data_feed: Optional[DataFeed] = None,
+                snapshot: Optional[EngineSnapshot] = None) -> Dict[str, Any]:
+    """由快照分叉出分支引擎并回测到结束，返回比较表中的一行"""
+    from quant_web.core.be.trading_engine import TradingEngine
+    
+    if data_feed is None:
+        data_feed, snapshot = _WORKER_FORK
+    row = {'index': index, 'branch': branch.name, 'error': None}
+    started = time.perf_counter()
+    try:
+        engine = TradingEngine.from_snapshot(snapshot, data_feed)
+        branch.apply(engine)
+        result = engine.execute_backtest(snapshot.start_date, snapshot.end_date, vectorized=snapshot.vectorized)
+        
+        # 分叉之后的净值（以快照日净值为起点）
+        forked = result['daily_equity'][len(snapshot.daily_equity):]
+        equity = np.array([snapshot.equity] + [day['equity'] for day in forked])
+        row['final_equity'] = float(equity[-1])
+        row['return_since_fork'] = float(equity[-1] / equity[0] - 1.0)
+        row['max_drawdown_since_fork'] = float(np.min(equity / np.maximum.accumulate(equity) - 1.0))
+        row['orders_since_fork'] = len(result['order_history']) - len(snapshot.order_history)
+        for name in FORK_RESULT_METRICS:
+            row[name] = float(result['performance_metrics'].get(name, 0.0))
+    except Exception as e:
+        logger.warning(f"Scenario branch {branch.name} failed: {str(e)}")
+        row['error'] = str(e)
+    row['wall_time'] = time.perf_counter() - started
+    return row
+
+
+class ScenarioFork:
+    """从同一个快照分叉出多个情景分支并行回测，返回分支比较表
+    
+    每个分支恢复快照的一份独立状态副本（只有持仓、挂单、指标、绩效累加器等可变状态，
+    分叉成本与回测已经走过的历史长度基本无关），行情数据和快照之前的订单、净值点由全部分支共享。
+    分支引擎按快照中记录的引擎设置（日志、风控）构造，与拍摄快照的引擎一致。
+    并行时数据馈送和快照在每个工作进程启动时传入一次（序列化一次），之后该进程内的分支共享这一份。
+    """
+    
+    def __init__(self, snapshot: EngineSnapshot, data_feed: DataFeed, max_workers: Optional[int] = None):
+        """
+        Args:
+            snapshot: 由 TradingEngine.snapshot 或 execute_backtest(pause_at=...) 得到的快照
+            data_feed: 拍摄快照时使用的数据馈送
+            max_workers: 工作进程数，为None时取 min(CPU数, FORK_MAX_WORKERS)，为1时在当前进程内顺序执行
+        """
+        self.snapshot = snapshot
+        self.data_feed = data_feed
+        self.max_workers = max_workers or min(os.cpu_count() or 1, FORK_MAX_WORKERS)
+    
+    def run(self, branches: List[Branch]) -> List[Dict[str, Any]]:
+        """回测全部分支
+        
+        Returns:
+            按分支顺序排列的比较表，每行包含分支名称 branch、期末净值 final_equity、
+            分叉后的收益 return_since_fork 与最大回撤 max_drawdown_since_fork、分叉后成交的订单数
+            orders_since_fork、全区间的绩效指标（FORK_RESULT_METRICS）以及 error
+        """
+        names = [branch.name for branch in branches]
+        if len(set(names)) != len(names):
+            raise ValueError("Branch names must be unique")
+        
+        workers = min(self.max_workers, len(branches))
+        logger.info(f"Running {len(branches)} scenario branches from the snapshot of {self.snapshot.date} "
+                    f"with {workers} workers")
+        
+        if workers <= 1:
+            return [_run_branch(index, branch, self.data_feed, self.snapshot)
+                    for index, branch in enumerate(branches)]
+        
+        with process_pool(workers, initializer=_init_worker, initargs=(self.data_feed, self.snapshot)) as executor:
+            futures = [executor.submit(_run_branch, index, branch) for index, branch in enumerate(branches)]
+            return [future.result() for future in futures]
@@ -0,0 +1,155 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+
+
+class Schedule(ABC):
+    """策略的调度计划：决定引擎在哪些交易日调用策略的 on_data
+    
+    引擎在每次回测开始时以回测区间的交易日列表调用 prepare，之后每个交易日调用 is_due，
+    到期且当日确有行情、策略实际执行之后再调用 on_dispatch。有状态的计划在 on_dispatch 中推进状态，
+    到期但因当日没有行情而跳过的交易日不计为一次执行。
+    没有任何策略到期的交易日，引擎不构建当日行情数据、不分发策略，只处理挂单并按价格矩阵盯市。
+    """
+    
+    def prepare(self, data_feed, dates: List[datetime]) -> None:
+        """回测开始前的预计算，重置内部状态"""
+        pass
+    
+    @abstractmethod
+    def is_due(self, index: int, date: datetime, filled: bool = False) -> bool:
+        """
+        Args:
+            index: 当日在回测交易日列表中的下标
+            date: 当日日期
+            filled: 该策略当日是否有订单成交
+        """
+        pass
+    
+    def on_dispatch(self, index: int, date: datetime) -> None:
+        """策略在当日实际执行之后调用"""
+        pass
+
+
+class EveryDay(Schedule):
+    """每个交易日执行（默认）"""
+    
+    def is_due(self, index: int, date: datetime, filled: bool = False) -> bool:
+        return True
+
+
+class EveryNTradingDays(Schedule):
+    """每隔 n 个交易日执行一次，从回测的第 offset 个交易日开始"""
+    
+    def __init__(self, n: int, offset: int = 0):
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        self.n = n
+        self.offset = offset
+    
+    def is_due(self, index: int, date: datetime, filled: bool = False) -> bool:
+        return index >= self.offset and (index - self.offset) % self.n == 0
+
+
+class CalendarInterval(Schedule):
+    """距上次执行满 days 个自然日后的第一个交易日执行，回测首日总会执行"""
+    
+    def __init__(self, days: int):
+        self.days = days
+        self.last_date: Optional[datetime] = None
+    
+    def prepare(self, data_feed, dates: List[datetime]) -> None:
+        self.last_date = None
+    
+    def is_due(self, index: int, date: datetime, filled: bool = False) -> bool:
+        return self.last_date is None or (date - self.last_date).days >= self.days
+    
+    def on_dispatch(self, index: int, date: datetime) -> None:
+        self.last_date = date
+
+
+class MonthEnd(Schedule):
+    """每月最后一个交易日执行"""
+    
+    def __init__(self):
+        self._due: List[bool] = []
+    
+    def prepare(self, data_feed, dates: List[datetime]) -> None:
+        # 回测最后一天之后没有交易日，按下一个工作日是否跨月判断
+        following = [dates[i + 1] for i in range(len(dates) - 1)]
+        if dates:
+            following.append(dates[-1] + timedelta(days=3 if dates[-1].weekday() == 4 else 1))
+        self._due = [(nxt.year, nxt.month) != (date.year, date.month) for date, nxt in zip(dates, following)]
+    
+    def is_due(self, index: int, date: datetime, filled: bool = False) -> bool:
+        return self._due[index]
+
+
+class OnFill(Schedule):
+    """策略有订单成交的交易日执行"""
+    
+    def is_due(self, index: int, date: datetime, filled: bool = False) -> bool:
+        return filled
+
+
+class IndicatorCross(Schedule):
+    """任一股票的指标线穿越参照线的交易日执行
+    
+    参照线依次取：固定水平 level；另一指标 reference（参数 reference_params）；字段价格本身。
+    穿越按价格矩阵逐行判断（指标与参照线之差的符号改变），在回测开始前对全部交易日一次性计算。
+    """
+    
+    def __init__(self, name: str, params: Optional[Dict] = None, level: Optional[float] = None,
+                 reference: Optional[str] = None, reference_params: Optional[Dict] = None,
+                 field: str = 'close'):
+        self.name = name
+        self.params = params or {}
+        self.level = level
+        self.reference = reference
+        self.reference_params = reference_params or {}
+        self.field = field
+        self._due: List[bool] = []
+    
+    def prepare(self, data_feed, dates: List[datetime]) -> None:
+        line, _ = data_feed.get_indicator_matrix(self.name, self.field, **self.params)
+        if self.level is not None:
+            reference = self.level
+        elif self.reference is not None:
+            reference, _ = data_feed.get_indicator_matrix(self.reference, self.field, **self.reference_params)
+        else:
+            reference = data_feed.get_field_matrix(self.field)
+        
+        sign = np.sign(line - reference)
+        previous = np.full(sign.shape, np.nan)
+        previous[1:] = sign[:-1]
+        with np.errstate(invalid='ignore'):
+            crossed = ((sign != previous) & (sign != 0) & ~np.isnan(sign) & ~np.isnan(previous)).any(axis=1)
+        
+        rows = [data_feed.get_date_index(date) for date in dates]
+        self._due = [row is not None and bool(crossed[row]) for row in rows]
+    
+    def is_due(self, index: int, date: datetime, filled: bool = False) -> bool:
+        return self._due[index]
+
+
+class AnyOf(Schedule):
+    """任一子计划到期时执行"""
+    
+    def __init__(self, *schedules: Schedule):
+        self.schedules = schedules
+        self._due: List[Schedule] = []  # 当日到期的子计划
+    
+    def prepare(self, data_feed, dates: List[datetime]) -> None:
+        self._due = []
+        for schedule in self.schedules:
+            schedule.prepare(data_feed, dates)
+    
+    def is_due(self, index: int, date: datetime, filled: bool = False) -> bool:
+        self._due = [schedule for schedule in self.schedules if schedule.is_due(index, date, filled)]
+        return bool(self._due)
+    
+    def on_dispatch(self, index: int, date: datetime) -> None:
+        # 只有当日到期的子计划记为执行，有状态的子计划（如 CalendarInterval）按自身节奏推进
+        for schedule in self._due:
+            schedule.on_dispatch(index, date)
@@ -0,0 +1,204 @@
+import math
+from abc import ABC, abstractmethod
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+from loguru import logger
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.metrics import StreamingMetrics
+from quant_web.core.be.sweep import (
+    PoolRunner,
+    _init_worker,
+    _run_combination,
+    check_rank_metric,
+    expand_grid,
+    process_pool,
+    rank_results,
+)
+from quant_web.core.const import (
+    DEFAULT_INITIAL_CASH,
+    MAX_DD_THRESHOLD,
+    SEARCH_ETA,
+    SEARCH_MAX_RUNGS,
+    SEARCH_STOP_MIN_BARS,
+    SWEEP_MAX_COMBINATIONS,
+    SWEEP_MAX_WORKERS,
+    SWEEP_RANK_METRIC,
+)
+
+
+class StopRule(ABC):
+    """提前终止规则
+    
+    回测中每个交易日以实时绩效指标调用，返回终止原因（字符串）时停止该次回测，返回None继续。
+    规则对象会被发送到工作进程，自定义规则需可被pickle（模块级的类或函数）。
+    """
+    
+    def __init__(self, min_bars: int = SEARCH_STOP_MIN_BARS):
+        self.min_bars = min_bars  # 预热期，不足该bar数时不做判断
+    
+    def __call__(self, metrics: StreamingMetrics) -> Optional[str]:
+        if metrics.bars < self.min_bars:
+            return None
+        return self.check(metrics)
+    
+    @abstractmethod
+    def check(self, metrics: StreamingMetrics) -> Optional[str]:
+        """预热期之后的判断，返回终止原因或None"""
+        pass
+
+
+class MaxDrawdownStop(StopRule):
+    """回撤超过阈值时终止"""
+    
+    def __init__(self, threshold: float = MAX_DD_THRESHOLD, min_bars: int = 1):
+        super().__init__(min_bars)
+        self.threshold = threshold
+    
+    def check(self, metrics: StreamingMetrics) -> Optional[str]:
+        if metrics.max_drawdown < -self.threshold:
+            return f"max_drawdown {metrics.max_drawdown:.2%} beyond {self.threshold:.2%}"
+        return None
+
+
+class MinSharpeStop(StopRule):
+    """夏普比率低于下限时终止"""
+    
+    def __init__(self, min_sharpe: float = 0.0, min_bars: int = SEARCH_STOP_MIN_BARS):
+        super().__init__(min_bars)
+        self.min_sharpe = min_sharpe
+    
+    def check(self, metrics: StreamingMetrics) -> Optional[str]:
+        sharpe = metrics.sharpe_ratio
+        if sharpe < self.min_sharpe:
+            return f"sharpe_ratio {sharpe:.2f} below {self.min_sharpe:.2f}"
+        return None
+
+
+class SuccessiveHalvingSearch(PoolRunner):
+    """逐轮减半的参数搜索
+    
+    第一轮用全部参数组合回测最短的历史前缀，每轮按排序指标保留前 1/eta 的组合，
+    并把回测区间扩大 eta 倍，最后一轮在完整历史上回测幸存组合。
+    回测过程中按实时绩效指标执行提前终止规则，触发规则的组合直接淘汰，不再占用后续算力。
+    
+    n 个组合、eta=3 时总计算量约为 log3(n)+1 次完整回测，而穷举网格需要 n 次。
+    """
+    
+    task_name = 'parameter search'
+    prebuild_matrices = True
+    
+    def __init__(self, strategy_name: str, param_grid: Dict[str, List[Any]], stock_pool: List[str],
+                 start_date: datetime, end_date: datetime, eta: int = SEARCH_ETA,
+                 max_rungs: int = SEARCH_MAX_RUNGS, stop_rules: Optional[List[Callable]] = None,
+                 rank_by: str = SWEEP_RANK_METRIC, ascending: bool = False,
+                 initial_cash: float = DEFAULT_INITIAL_CASH, max_workers: Optional[int] = None,
+                 vectorized: bool = True, data_feed: Optional[DataFeed] = None):
+        """
+        Args:
+            strategy_name: 策略名称
+            param_grid: 参数网格，参数名 -> 候选值列表
+            end_date: 回测结束日期（最后一轮的回测区间）
+            eta: 每轮保留 1/eta 的组合，回测区间扩大 eta 倍
+            max_rungs: 最多轮数
+            stop_rules: 提前终止规则，为None时使用 MaxDrawdownStop(MAX_DD_THRESHOLD)
+            rank_by: 每轮排序所用的绩效指标（SWEEP_RESULT_METRICS 之一）
+            ascending: 是否按指标升序排列
+            initial_cash: 初始资金
+            vectorized: 策略支持时使用向量化回测模式
+            其余参数见 PoolRunner，工作进程数上限为 SWEEP_MAX_WORKERS
+        """
+        if eta < 2:
+            raise ValueError("eta must be at least 2")
+        super().__init__(stock_pool, start_date, end_date, max_workers, SWEEP_MAX_WORKERS, data_feed)
+        self.strategy_name = strategy_name
+        self.param_grid = param_grid
+        self.eta = eta
+        self.max_rungs = max_rungs
+        self.stop_rules = [MaxDrawdownStop()] if stop_rules is None else list(stop_rules)
+        self.rank_by = check_rank_metric(rank_by)
+        self.ascending = ascending
+        self.initial_cash = initial_cash
+        self.vectorized = vectorized
+    
+    def rung_budgets(self, n_configurations: int, n_bars: int) -> List[int]:
+        """每一轮回测的交易日数，最后一轮为完整区间"""
+        rungs = min(self.max_rungs, int(math.log(max(n_configurations, 1), self.eta) + 1e-9) + 1)
+        return [max(SEARCH_STOP_MIN_BARS, math.ceil(n_bars / self.eta ** (rungs - 1 - k))) if k < rungs - 1
+                else n_bars for k in range(rungs)]
+    
+    def run(self) -> Dict[str, Any]:
+        """执行搜索
+        
+        Returns:
+            results: 最后一轮的排序结果表
+            eliminated: 被淘汰的组合（附淘汰轮次 rung）
+            rungs: 每轮的回测区间与组合数
+            bars_simulated / exhaustive_bars: 实际模拟的bar数与穷举网格所需的bar数
+        """
+        combinations = expand_grid(self.param_grid)
+        if len(combinations) > SWEEP_MAX_COMBINATIONS:
+            raise ValueError(f"Parameter grid has {len(combinations)} combinations, "
+                             f"exceeding the limit of {SWEEP_MAX_COMBINATIONS}")
+        
+        data_feed = self.load_data()
+        dates = data_feed.get_dates()
+        dates = dates[(dates >= pd.Timestamp(self.start_date)) & (dates <= pd.Timestamp(self.end_date))]
+        if len(dates) == 0:
+            raise ValueError("No trading dates in the search period")
+        budgets = self.rung_budgets(len(combinations), len(dates))
+        
+        run = partial(_run_combination, strategy_name=self.strategy_name, start_date=self.start_date,
+                      initial_cash=self.initial_cash, vectorized=self.vectorized, stop_rules=self.stop_rules)
+        workers = min(self.max_workers, len(combinations))
+        executor = process_pool(workers, _init_worker, (data_feed,)) if workers > 1 else None
+        
+        alive = list(enumerate(combinations))
+        rungs, eliminated, ranked = [], [], []
+        bars_simulated = 0
+        try:
+            for rung, bars in enumerate(budgets):
+                end_date = dates[bars - 1].to_pydatetime()
+                jobs = [partial(run, index, parameters=parameters, end_date=end_date) for index, parameters in alive]
+                if executor is None:
+                    rows = [job(data_feed=data_feed) for job in jobs]
+                else:
+                    rows = list(executor.map(_call, jobs))
+                bars_simulated += sum(row.get('bars', 0) for row in rows)
+                
+                stopped = [row for row in rows if row['error'] or row['stopped_reason']]
+                finished = [row for row in rows if not (row['error'] or row['stopped_reason'])]
+                ranked = rank_results(finished, self.rank_by, self.ascending)
+                last_rung = rung == len(budgets) - 1
+                keep = len(ranked) if last_rung else max(1, math.ceil(len(alive) / self.eta))
+                for row in stopped + ranked[keep:]:
+                    row['rung'] = rung
+                    eliminated.append(row)
+                ranked = ranked[:keep]
+                
+                rungs.append({'rung': rung, 'end_date': end_date, 'bars': bars, 'configurations': len(rows),
+                              'stopped': len(stopped), 'survivors': len(ranked)})
+                logger.info(f"Search rung {rung}: {len(rows)} configurations on {bars} bars, "
+                            f"{len(stopped)} stopped, {len(ranked)} survive")
+                alive = [(row['index'], row['params']) for row in ranked]
+                if not alive:
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        return {
+            'results': ranked,
+            'eliminated': eliminated,
+            'rungs': rungs,
+            'bars_simulated': bars_simulated,
+            'exhaustive_bars': len(combinations) * len(dates)
+        }
+
+
+def _call(job: Callable) -> Dict[str, Any]:
+    """在工作进程中执行预先绑定参数的回测任务"""
+    return job()
@@ -0,0 +1,177 @@
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.metrics import StreamingMetrics
+from quant_web.core.be.strategy import StrategyFactory
+from quant_web.core.be.sweep import PoolRunner, process_pool
+from quant_web.core.const import DEFAULT_INITIAL_CASH, SHARD_DEFAULT_COUNT, SHARD_MAX_WORKERS
+
+
+class _RecordingMetrics(StreamingMetrics):
+    """额外记录每日仓位暴露与成交金额的绩效累加器，合并分片时用于重算组合层面的指标"""
+    
+    def reset(self) -> None:
+        super().reset()
+        self.exposures: List[float] = []
+        self.traded_values: List[float] = []
+    
+    def update(self, equity: float, date: Optional[datetime] = None, exposure: float = 0.0,
+               traded_value: float = 0.0) -> None:
+        self.exposures.append(exposure)
+        self.traded_values.append(traded_value)
+        super().update(equity, date, exposure, traded_value)
+
+
+def partition(symbols: List[str], n_shards: int) -> List[List[str]]:
+    """把股票池按原顺序切分为至多 n_shards 个分片，各分片的股票数相差不超过1"""
+    n_shards = max(1, min(n_shards, len(symbols)))
+    size, extra = divmod(len(symbols), n_shards)
+    shards, start = [], 0
+    for i in range(n_shards):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(symbols[start:end])
+        start = end
+    return shards
+
+
+def _run_shard(index: int, data_feed: DataFeed, strategy_name: str, parameters: Dict[str, Any],
+               start_date: datetime, end_date: datetime, capital: float, vectorized: bool) -> Dict[str, Any]:
+    """在一个分片的资金账户上回测分片内的全部股票，返回逐日的净值、仓位暴露、成交金额和订单"""
+    from quant_web.core.be.trading_engine import TradingEngine
+    
+    started = time.perf_counter()
+    engine = TradingEngine()
+    engine.initialize(capital)
+    engine.metrics = _RecordingMetrics()
+    engine.load_data_feed(data_feed)
+    # 策略ID带分片序号，各分片生成的订单ID互不重复
+    engine.add_strategy(strategy_name, f"{strategy_name}_shard_{index}", dict(parameters))
+    result = engine.execute_backtest(start_date, end_date, vectorized=vectorized)
+    return {
+        'index': index,
+        'symbols': list(data_feed.get_available_stocks()),
+        'capital': capital,
+        'dates': [day['date'] for day in result['daily_equity']],
+        'equity': np.array([day['equity'] for day in result['daily_equity']], dtype=np.float64),
+        'exposure': np.array(engine.metrics.exposures, dtype=np.float64),
+        'traded_value': np.array(engine.metrics.traded_values, dtype=np.float64),
+        'orders': result['order_history'],
+        'wall_time': time.perf_counter() - started
+    }
+
+
+class ShardedBacktest(PoolRunner):
+    """按股票分片的并行回测
+    
+    适用于逐只股票独立决策的策略（Strategy.per_symbol 为True，如均线和RSI策略）。
+    初始资金按股票等额分配，股票池按顺序切分为若干分片，每个分片以其股票分得的资金之和
+    作为独立账户，由一个交易引擎回测；各分片互不影响，在进程池中并行执行，
+    每个工作进程只接收本分片股票的行情数据。
+    
+    同一分片内的股票共用该分片的资金，因此结果取决于分片数 n_shards，与工作进程数无关；
+    n_shards 等于股票数时每只股票都是完全独立的账户。
+    
+    全部分片完成后，各分片的净值、仓位暴露和成交金额按交易日相加（无行情的交易日沿用最近值），
+    订单按创建时间合并，绩效指标在合并后的组合净值上重新计算。
+    """
+    
+    task_name = 'sharded backtest'
+    
+    def __init__(self, strategy_name: str, stock_pool: List[str], start_date: datetime, end_date: datetime,
+                 parameters: Optional[Dict[str, Any]] = None, initial_cash: float = DEFAULT_INITIAL_CASH,
+                 max_workers: Optional[int] = None, n_shards: int = SHARD_DEFAULT_COUNT, vectorized: bool = False,
+                 data_feed: Optional[DataFeed] = None):
+        """
+        Args:
+            strategy_name: 策略名称，策略须逐只股票独立决策
+            parameters: 策略参数
+            initial_cash: 初始资金，按股票等额分配
+            n_shards: 分片数（不超过股票数），决定资金账户的划分
+            vectorized: 策略支持时使用向量化回测模式
+            其余参数见 PoolRunner，工作进程数上限为 SHARD_MAX_WORKERS
+        """
+        super().__init__(stock_pool, start_date, end_date, max_workers, SHARD_MAX_WORKERS, data_feed)
+        self.strategy_name = strategy_name
+        self.parameters = dict(parameters or {})
+        self.initial_cash = initial_cash
+        self.n_shards = n_shards
+        self.vectorized = vectorized
+    
+    def run(self) -> Dict[str, Any]:
+        """执行分片回测
+        
+        Returns:
+            与 TradingEngine.execute_backtest 相同结构的 daily_equity、performance_metrics、
+            order_history，以及各分片的股票与耗时 shards
+        """
+        strategy = StrategyFactory.create(self.strategy_name, f"{self.strategy_name}_shard")
+        if not strategy.per_symbol:
+            raise ValueError(f"Strategy {self.strategy_name} does not make independent per-symbol decisions "
+                             f"and cannot be sharded")
+        
+        data_feed = self.load_data()
+        symbols = data_feed.get_available_stocks()
+        if not symbols:
+            raise RuntimeError("No symbols to backtest")
+        per_symbol = self.initial_cash / len(symbols)
+        shards = partition(symbols, self.n_shards)
+        workers = min(self.max_workers, len(shards))
+        logger.info(f"Sharded backtest of {self.strategy_name}: {len(symbols)} symbols in {len(shards)} shards "
+                    f"with {workers} workers, {per_symbol:.2f} capital per symbol")
+        
+        def args(shard):
+            return (data_feed.subset(shard), self.strategy_name, self.parameters, self.start_date, self.end_date,
+                    per_symbol * len(shard), self.vectorized)
+        
+        if workers <= 1:
+            shard_results = [_run_shard(index, *args(shard)) for index, shard in enumerate(shards)]
+        else:
+            with process_pool(workers) as executor:
+                futures = [executor.submit(_run_shard, index, *args(shard)) for index, shard in enumerate(shards)]
+                shard_results = [future.result() for future in futures]
+        
+        result = self._merge(data_feed, shard_results)
+        result['shards'] = [{key: shard[key] for key in ('index', 'symbols', 'capital', 'wall_time')}
+                            for shard in shard_results]
+        return result
+    
+    def _merge(self, data_feed: DataFeed, shards: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """按交易日汇总各分片账户，重算组合层面的绩效指标"""
+        from quant_web.core.be.trading_engine import TradingEngine
+        
+        calendar = data_feed.get_trading_dates(self.start_date, self.end_date)
+        index = pd.DatetimeIndex(calendar)
+        equity = np.zeros(len(index))
+        exposure = np.zeros(len(index))
+        traded_value = np.zeros(len(index))
+        orders = []
+        for shard in shards:
+            own = pd.DatetimeIndex(shard['dates'])
+            # 分片无行情的交易日沿用最近的净值和持仓市值，首个交易日之前为未动用的资金
+            equity += pd.Series(shard['equity'], index=own).reindex(index, method='ffill') \
+                .fillna(shard['capital']).to_numpy()
+            exposure += pd.Series(shard['exposure'], index=own).reindex(index, method='ffill').fillna(0.0).to_numpy()
+            traded_value += pd.Series(shard['traded_value'], index=own).reindex(index, fill_value=0.0).to_numpy()
+            orders.extend(shard['orders'])
+        orders.sort(key=lambda order: order.created_at)
+        
+        # 绩效指标沿用交易引擎的口径，在合并后的净值和订单上重新计算
+        merged = TradingEngine()
+        merged.metrics = StreamingMetrics()
+        for date, value, gross, traded in zip(calendar, equity, exposure, traded_value):
+            merged.metrics.update(float(value), date, float(gross), float(traded))
+        merged.order_history = orders
+        merged._calculate_performance_metrics()
+        
+        return {
+            'daily_equity': [{'date': date, 'equity': float(value)} for date, value in zip(calendar, equity)],
+            'performance_metrics': merged.performance_metrics,
+            'order_history': orders,
+            'stopped_reason': None
+        }
@@ -3,14 +3,37 @@ import pandas as pd
 from datetime import datetime
 from typing import Dict, List, Optional
 
-from quant_web.core.be.strategy import Strategy, StrategyFactory
-from quant_web.core.const import MIN_TRADE_QUANTITY
+from quant_web.core.be.strategy import Strategy, StrategyFactory, StrategyContext
+from quant_web.core.be.cross_section import top_n
+from quant_web.core.be.schedule import CalendarInterval, Schedule
+from quant_web.core.be.panel import MarketPanel
+from quant_web.core.be.indicators import IndicatorEngine
+from quant_web.core.be.vectorized import SignalMatrix
+from quant_web.core.const import (
+    MIN_TRADE_QUANTITY,
+    SIGNAL_TYPE_GOLDEN_CROSS,
+    SIGNAL_TYPE_DEATH_CROSS,
+    SIGNAL_TYPE_OVERSOLD,
+    SIGNAL_TYPE_OVERBOUGHT,
+    SIGNAL_TYPE_ENTER,
+    SIGNAL_TYPE_EXIT,
+)
+
+
+def _shift_rows(matrix: np.ndarray, periods: int) -> np.ndarray:
+    """将矩阵按行向下平移，空出的行填充NaN"""
+    shifted = np.full(matrix.shape, np.nan)
+    if periods < len(matrix):
+        shifted[periods:] = matrix[:len(matrix) - periods]
+    return shifted
 
 
 @StrategyFactory.register("moving_average")
 class MovingAverageStrategy(Strategy):
     """移动平均线策略"""
     
+    per_symbol = True
+    
     def __init__(self, strategy_id: str):
         super().__init__(strategy_id)
         self.description = "基于短期和长期移动平均线交叉的交易策略"
@@ -26,25 +49,43 @@ class MovingAverageStrategy(Strategy):
         # 从上下文获取必要信息
         self.portfolio = context.get('portfolio')
         self.initial_cash = context.get('initial_cash', 1000000)
+        
+        # 订阅增量均线指标，由交易引擎每日更新
+        self.indicators = context.get('indicators')
+        self.short_ma = self.long_ma = None
+        if self.indicators is not None:
+            self.short_ma = self.indicators.subscribe('sma', window=self.parameters['short_window'])
+            self.long_ma = self.indicators.subscribe('sma', window=self.parameters['long_window'])
+    
+    def _moving_averages(self, ts_code: str, df: pd.DataFrame) -> Optional[tuple]:
+        """获取 (前一日短均线, 前一日长均线, 短均线, 长均线)，数据不足时返回None"""
+        long_window = self.parameters['long_window']
+        if self.short_ma is not None:
+            idx = self.indicators.symbol_index.get(ts_code)
+            if idx is None or self.indicators.bars[idx] < long_window + 1:
+                return None
+            return (self.short_ma.previous[idx], self.long_ma.previous[idx],
+                    self.short_ma.values[idx], self.long_ma.values[idx])
+        
+        # 未接入指标引擎时按数据窗口计算
+        if len(df) < long_window + 1:
+            return None
+        close = df['close'].to_numpy()[:, None]
+        short_ma = IndicatorEngine.compute(close, 'sma', window=self.parameters['short_window'])[-2:, 0]
+        long_ma = IndicatorEngine.compute(close, 'sma', window=long_window)[-2:, 0]
+        return short_ma[0], long_ma[0], short_ma[1], long_ma[1]
     
     def on_data(self, date: datetime, data: Dict[str, pd.DataFrame]) -> List[Dict]:
         """生成交易信号"""
         signals = []
         
         for ts_code, df in data.items():
-            # 确保有足够的数据计算移动平均线
-            if len(df) < self.parameters['long_window']:
-                continue
-            
-            # 计算移动平均线
-            df['short_ma'] = df['close'].rolling(window=self.parameters['short_window']).mean()
-            df['long_ma'] = df['close'].rolling(window=self.parameters['long_window']).mean()
-            
-            # 检查是否有足够的历史数据来判断交叉
-            if len(df) >= self.parameters['long_window'] + 1:
+            # 确保有足够的历史数据来判断交叉
+            averages = self._moving_averages(ts_code, df)
+            if averages is not None:
+                prev_short, prev_long, short_ma, long_ma = averages
                 # 金叉信号（短期均线上穿长期均线）
-                if (df['short_ma'].iloc[-2] < df['long_ma'].iloc[-2] and 
-                    df['short_ma'].iloc[-1] > df['long_ma'].iloc[-1]):
+                if prev_short < prev_long and short_ma > long_ma:
                     
                     # 计算买入数量
                     available_cash = self.portfolio.cash if self.portfolio else self.initial_cash
@@ -61,8 +102,7 @@ class MovingAverageStrategy(Strategy):
                     })
                 
                 # 死叉信号（短期均线下穿长期均线）
-                elif (df['short_ma'].iloc[-2] > df['long_ma'].iloc[-2] and 
-                      df['short_ma'].iloc[-1] < df['long_ma'].iloc[-1]):
+                elif prev_short > prev_long and short_ma < long_ma:
                     
                     # 如果持有该股票，则卖出全部
                     if self.portfolio and ts_code in self.portfolio.positions:
@@ -76,12 +116,31 @@ class MovingAverageStrategy(Strategy):
                         })
         
         return signals
+    
+    def generate_signals(self, panel: MarketPanel) -> SignalMatrix:
+        """向量化生成均线交叉信号"""
+        short_ma, prev_short = panel.indicator('sma', with_previous=True, window=self.parameters['short_window'])
+        long_ma, prev_long = panel.indicator('sma', with_previous=True, window=self.parameters['long_window'])
+        
+        enough = panel.valid & (panel.bar_counts >= self.parameters['long_window'] + 1)
+        golden = enough & (prev_short < prev_long) & (short_ma > long_ma)
+        death = enough & ~golden & (prev_short > prev_long) & (short_ma < long_ma)
+        
+        return SignalMatrix(
+            buy=golden,
+            sell=death,
+            position_ratio=self.parameters['position_ratio'],
+            buy_signal_type=SIGNAL_TYPE_GOLDEN_CROSS,
+            sell_signal_type=SIGNAL_TYPE_DEATH_CROSS
+        )
 
 
 @StrategyFactory.register("rsi_strategy")
 class RSIStrategy(Strategy):
     """RSI策略"""
     
+    per_symbol = True
+    
     def __init__(self, strategy_id: str):
         super().__init__(strategy_id)
         self.description = "基于相对强弱指标(RSI)的超买超卖策略"
@@ -90,36 +149,47 @@ class RSIStrategy(Strategy):
             'rsi_window': 14,
             'oversold_threshold': 30,
             'overbought_threshold': 70,
-            'position_ratio': 0.1
+            'position_ratio': 0.1,
+            'rsi_smoothing': 'sma'  # 涨跌幅平滑方式：sma（窗口简单平均）或 wilder
         })
     
     def initialize(self, context: Dict) -> None:
         """初始化策略"""
         self.portfolio = context.get('portfolio')
         self.initial_cash = context.get('initial_cash', 1000000)
+        
+        # 订阅增量RSI指标，由交易引擎每日更新
+        self.indicators = context.get('indicators')
+        self.rsi = None
+        if self.indicators is not None:
+            self.rsi = self.indicators.subscribe('rsi', window=self.parameters['rsi_window'],
+                                                 smoothing=self.parameters['rsi_smoothing'])
     
-    def _calculate_rsi(self, data: pd.Series, window: int) -> pd.Series:
-        """计算RSI指标"""
-        delta = data.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
+    def _current_rsi(self, ts_code: str, df: pd.DataFrame) -> float:
+        """获取最新的RSI值，数据不足时返回NaN"""
+        window = self.parameters['rsi_window']
+        if self.rsi is not None:
+            idx = self.indicators.symbol_index.get(ts_code)
+            if idx is None or self.indicators.bars[idx] < window:
+                return np.nan
+            return self.rsi.values[idx]
+        
+        # 未接入指标引擎时按数据窗口计算
+        if len(df) < window:
+            return np.nan
+        rsi = IndicatorEngine.compute(df['close'].to_numpy()[:, None], 'rsi', window=window,
+                                      smoothing=self.parameters['rsi_smoothing'])
+        return rsi[-1, 0]
     
     def on_data(self, date: datetime, data: Dict[str, pd.DataFrame]) -> List[Dict]:
         """生成交易信号"""
         signals = []
         
         for ts_code, df in data.items():
-            # 确保有足够的数据
-            if len(df) < self.parameters['rsi_window']:
-                continue
-            
-            # 计算RSI
-            df['rsi'] = self._calculate_rsi(df['close'], self.parameters['rsi_window'])
-            
             # 获取最新的RSI值
-            current_rsi = df['rsi'].iloc[-1]
+            current_rsi = self._current_rsi(ts_code, df)
+            if np.isnan(current_rsi):
+                continue
             price = df['close'].iloc[-1]
             
             # 超卖信号（RSI低于阈值）
@@ -149,6 +219,23 @@ class RSIStrategy(Strategy):
                     })
         
         return signals
+    
+    def generate_signals(self, panel: MarketPanel) -> SignalMatrix:
+        """向量化生成RSI超买超卖信号"""
+        window = self.parameters['rsi_window']
+        rsi = panel.indicator('rsi', window=window, smoothing=self.parameters['rsi_smoothing'])
+        
+        enough = panel.valid & (panel.bar_counts >= window)
+        oversold = enough & (rsi < self.parameters['oversold_threshold'])
+        overbought = enough & ~oversold & (rsi > self.parameters['overbought_threshold'])
+        
+        return SignalMatrix(
+            buy=oversold,
+            sell=overbought,
+            position_ratio=self.parameters['position_ratio'],
+            buy_signal_type=SIGNAL_TYPE_OVERSOLD,
+            sell_signal_type=SIGNAL_TYPE_OVERBOUGHT
+        )
 
 
 @StrategyFactory.register("momentum")
@@ -166,71 +253,111 @@ class MomentumStrategy(Strategy):
         })
         self.last_rebalance_date = None
     
-    def initialize(self, context: Dict) -> None:
+    def initialize(self, context: StrategyContext) -> None:
         """初始化策略"""
+        self.context = context
         self.portfolio = context.get('portfolio')
         self.initial_cash = context.get('initial_cash', 1000000)
     
+    def get_schedule(self) -> Schedule:
+        """只在调仓日执行，其余交易日引擎不分发策略"""
+        return CalendarInterval(self.parameters['rebalance_days'])
+    
     def on_data(self, date: datetime, data: Dict[str, pd.DataFrame]) -> List[Dict]:
-        """生成交易信号"""
+        """生成交易信号
+        
+        在当日截面上一次性计算全部股票的动量，用 top_n 选出目标股票，与 generate_signals 的口径一致。
+        """
         # 检查是否需要调仓
         if self.last_rebalance_date is None or \
            (date - self.last_rebalance_date).days >= self.parameters['rebalance_days']:
             
             self.last_rebalance_date = date
             signals = []
-            momentum_scores = {}
-            
-            # 计算每只股票的动量
-            for ts_code, df in data.items():
-                if len(df) >= self.parameters['lookback_period']:
-                    # 计算收益率作为动量指标
-                    start_price = df['close'].iloc[-self.parameters['lookback_period']]
-                    end_price = df['close'].iloc[-1]
-                    momentum = (end_price / start_price) - 1
-                    momentum_scores[ts_code] = momentum
+            lookback = self.parameters['lookback_period']
             
-            # 选择动量最强的股票
-            sorted_stocks = sorted(momentum_scores.items(), key=lambda x: x[1], reverse=True)
-            top_stocks = [ts_code for ts_code, _ in sorted_stocks[:self.parameters['top_n']]]
+            # 计算全部股票的动量，选择动量最强的股票
+            section = self.context.cross_section(date, data)
+            momentum = section.returns(lookback - 1)
+            eligible = section.valid & (section.bar_counts >= lookback)
+            top_stocks = [section.symbols[j] for j in top_n(momentum, self.parameters['top_n'], eligible)]
+            close = section.close
             
             # 获取当前持仓
-            current_positions = set(self.portfolio.positions.keys()) if self.portfolio else set()
-            target_stocks = set(top_stocks)
+            positions = self.portfolio.positions if self.portfolio else {}
             
             # 卖出不在目标列表中的股票
-            for ts_code in current_positions - target_stocks:
-                if self.portfolio and ts_code in self.portfolio.positions:
-                    quantity = self.portfolio.positions[ts_code]
-                    price = data[ts_code]['close'].iloc[-1]
-                    signals.append({
-                        'ts_code': ts_code,
-                        'side': 'sell',
-                        'quantity': quantity,
-                        'price': price,
-                        'signal_type': 'exit'
-                    })
+            for ts_code, quantity in list(positions.items()):
+                column = section.index_of(ts_code)
+                if ts_code in top_stocks or column is None or np.isnan(close[column]):
+                    continue
+                signals.append({
+                    'ts_code': ts_code,
+                    'side': 'sell',
+                    'quantity': quantity,
+                    'price': close[column],
+                    'signal_type': 'exit'
+                })
             
             # 计算可用资金
             total_value = self.portfolio.get_total_value({}) if self.portfolio else self.initial_cash
-            available_cash = self.portfolio.cash if self.portfolio else self.initial_cash
             
-            # 买入目标股票
-            for ts_code in target_stocks - current_positions:
-                if ts_code in data:
-                    # 平均分配资金
-                    allocation = total_value / self.parameters['top_n']
-                    price = data[ts_code]['close'].iloc[-1]
-                    quantity = max(int(allocation / price), MIN_TRADE_QUANTITY)
-                    
-                    signals.append({
-                        'ts_code': ts_code,
-                        'side': 'buy',
-                        'quantity': quantity,
-                        'price': price,
-                        'signal_type': 'enter'
-                    })
+            # 买入目标股票，平均分配资金
+            allocation = total_value / self.parameters['top_n']
+            for ts_code in top_stocks:
+                if ts_code in positions:
+                    continue
+                price = close[section.index_of(ts_code)]
+                quantity = max(int(allocation / price), MIN_TRADE_QUANTITY)
+                signals.append({
+                    'ts_code': ts_code,
+                    'side': 'buy',
+                    'quantity': quantity,
+                    'price': price,
+                    'signal_type': 'enter'
+                })
             
             return signals
         
         return []
+    
+    def generate_signals(self, panel: MarketPanel) -> SignalMatrix:
+        """向量化生成动量轮动信号
+        
+        调仓日按自然日间隔从回测起始日开始推算，每个调仓日选出动量最强的 top_n 只股票，
+        卖出不在目标中的持仓，买入尚未持有的目标股票。
+        """
+        lookback = self.parameters['lookback_period']
+        n_targets = self.parameters['top_n']
+        close = panel.close
+        momentum = close / _shift_rows(close, lookback - 1) - 1
+        eligible = panel.valid & (panel.bar_counts >= lookback) & ~np.isnan(momentum)
+        
+        buy = np.zeros(panel.shape, dtype=bool)
+        sell = np.zeros(panel.shape, dtype=bool)
+        has_data = panel.valid.any(axis=1)
+        last_rebalance = None
+        for row in range(panel.start_row, len(panel.dates)):
+            date = panel.dates[row]
+            if not has_data[row]:
+                continue
+            if last_rebalance is not None and (date - last_rebalance).days < self.parameters['rebalance_days']:
+                continue
+            last_rebalance = date
+            
+            # 动量相同时股票顺序靠前的优先入选
+            targets = top_n(momentum[row], n_targets, eligible[row])
+            buy[row, targets] = True
+            sell[row] = True
+            sell[row, targets] = False
+        self.last_rebalance_date = last_rebalance
+        
+        return SignalMatrix(
+            buy=buy,
+            sell=sell,
+            position_ratio=1.0 / n_targets,
+            buy_signal_type=SIGNAL_TYPE_ENTER,
+            sell_signal_type=SIGNAL_TYPE_EXIT,
+            buy_only_if_flat=True,
+            sells_first=True
+        )
@@ -4,16 +4,23 @@ from datetime import datetime
 import pandas as pd
 from loguru import logger
 
+from quant_web.core.be.schedule import EveryDay, Schedule
+from quant_web.core.be.vectorized import SignalMatrix
+
 
 class Strategy(ABC):
     """策略抽象基类"""
     
+    # 策略是否逐只股票独立决策（不依赖截面比较），为True时可以按股票分片并行回测
+    per_symbol = False
+    
     def __init__(self, strategy_id: str):
         self.strategy_id = strategy_id
         self.name = self.__class__.__name__
         self.description = ""
         self.parameters = {}
         self.signals = []
+        self.verbose = False  # 是否输出逐笔成交/撤单日志，由引擎按运行设置
         logger.info(f"Initialized strategy: {self.name} (ID: {self.strategy_id})")
     
     @abstractmethod
@@ -41,6 +48,26 @@ class Strategy(ABC):
         """
         pass
     
+    def get_schedule(self) -> Schedule:
+        """策略的调度计划，引擎只在计划到期的交易日调用 on_data，默认每个交易日执行"""
+        return EveryDay()
+    
+    def generate_signals(self, panel) -> SignalMatrix:
+        """向量化模式：基于完整历史一次性生成信号矩阵（可选实现）
+        
+        Args:
+            panel: MarketPanel 行情面板，日期 x 股票
+            
+        Returns:
+            SignalMatrix 信号矩阵，第t行只能使用第t行及之前的数据
+        """
+        raise NotImplementedError(f"{self.name} does not support vectorized backtest")
+    
+    @property
+    def supports_vectorized(self) -> bool:
+        """策略是否实现了向量化信号生成"""
+        return type(self).generate_signals is not Strategy.generate_signals
+    
     def set_parameters(self, parameters: Dict) -> None:
         """设置策略参数"""
         self.parameters.update(parameters)
@@ -52,11 +79,13 @@ class Strategy(ABC):
     
     def on_order_filled(self, order: Dict) -> None:
         """订单成交回调"""
-        logger.info(f"Order filled: {order}")
+        if self.verbose:
+            logger.info(f"Order filled: {order}")
     
     def on_order_cancelled(self, order: Dict) -> None:
         """订单取消回调"""
-        logger.info(f"Order cancelled: {order}")
+        if self.verbose:
+            logger.info(f"Order cancelled: {order}")
     
     def record(self, key: str, value: float) -> None:
         """记录指标"""
@@ -122,3 +151,29 @@ class StrategyContext:
         if hasattr(self, key):
             return getattr(self, key)
         return default
+    
+    def cross_section(self, date: datetime, data: Optional[Dict[str, pd.DataFrame]] = None):
+        """获取指定日期全部股票的截面视图
+        
+        有数据馈送时直接切片馈送上的价格矩阵；否则由当日传入策略的 {ts_code: DataFrame} 数据构建。
+        """
+        from quant_web.core.be.cross_section import CrossSection
+        
+        if self.data_feed is not None:
+            return self.data_feed.get_cross_section(date)
+        return CrossSection.from_frames(date, data or {})
+    
+    def covariance(self, date: datetime, symbols: Optional[List[str]] = None, **params):
+        """获取截至指定日期（含）的日收益率协方差快照
+        
+        由数据馈送上的协方差服务逐日增量维护，同一日期的多次调用不重新计算。
+        
+        Args:
+            date: 截止日期
+            symbols: 只保留这些股票（按给定顺序），为None时为数据馈送的全部股票
+            params: 协方差服务的参数，如 method/halflife/window/shrinkage
+        """
+        if self.data_feed is None:
+            raise ValueError("Covariance snapshots require a data feed")
+        snapshot = self.data_feed.get_covariance_service(**params).snapshot(date)
+        return snapshot.select(symbols) if symbols is not None else snapshot
@@ -0,0 +1,245 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.portfolio import Portfolio
+from quant_web.core.const import (
+    STRESS_CONFIDENCE,
+    STRESS_FACTORS,
+    STRESS_FACTOR_SCENARIOS,
+    STRESS_LOOKBACK_DAYS,
+    STRESS_SECTOR_SHOCK,
+    STRESS_WORST_N,
+)
+
+
+@dataclass
+class ShockScenarios:
+    """一批冲击情景：情景 x 股票 的收益率冲击矩阵，列顺序与 symbols 一致"""
+    names: List[str]
+    symbols: List[str]
+    shocks: np.ndarray
+    
+    def __post_init__(self):
+        if self.shocks.shape != (len(self.names), len(self.symbols)):
+            raise ValueError(f"Shock matrix of shape {self.shocks.shape} does not match "
+                             f"{len(self.names)} scenarios x {len(self.symbols)} symbols")
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    @classmethod
+    def concat(cls, parts: Sequence['ShockScenarios']) -> 'ShockScenarios':
+        """合并股票列相同的多批情景"""
+        symbols = parts[0].symbols
+        if any(part.symbols != symbols for part in parts):
+            raise ValueError("Scenario sets cover different symbols")
+        return cls([name for part in parts for name in part.names], list(symbols),
+                   np.vstack([part.shocks for part in parts]))
+
+
+@dataclass
+class StressReport:
+    """组合在一批冲击情景下的盈亏分布"""
+    names: List[str]
+    pnl: np.ndarray  # 每个情景的组合盈亏（金额）
+    portfolio_value: float  # 组合净值（现金 + 持仓市值）
+    exposure: float  # 持仓市值
+    date: Optional[datetime] = None
+    # 最差情景的下标 -> 贡献损失最大的 (股票, 盈亏)
+    top_losses: Dict[int, List[Tuple[str, float]]] = field(default_factory=dict)
+    
+    @property
+    def returns(self) -> np.ndarray:
+        """每个情景的组合收益率（盈亏 / 组合净值）"""
+        return self.pnl / self.portfolio_value if self.portfolio_value else np.zeros(len(self.pnl))
+    
+    def value_at_risk(self, confidence: float = STRESS_CONFIDENCE) -> float:
+        """情景盈亏分布的风险价值（以正数表示的损失金额）"""
+        return float(max(-np.quantile(self.pnl, 1 - confidence), 0.0)) if len(self.pnl) else 0.0
+    
+    def expected_shortfall(self, confidence: float = STRESS_CONFIDENCE) -> float:
+        """超过风险价值的情景的平均损失（以正数表示）"""
+        if not len(self.pnl):
+            return 0.0
+        tail = self.pnl[self.pnl <= np.quantile(self.pnl, 1 - confidence)]
+        return float(max(-tail.mean(), 0.0))
+    
+    def worst(self, n: int = STRESS_WORST_N) -> List[Dict]:
+        """损失最大的 n 个情景，附带贡献损失最大的股票"""
+        order = np.argsort(self.pnl, kind='stable')[:n]
+        return [{
+            'scenario': self.names[i],
+            'pnl': float(self.pnl[i]),
+            'return': float(self.returns[i]),
+            'top_losses': self.top_losses.get(int(i), [])
+        } for i in order]
+    
+    def summary(self, confidence: float = STRESS_CONFIDENCE, n: int = STRESS_WORST_N) -> Dict:
+        """可序列化的压力测试摘要"""
+        return {
+            'date': self.date.isoformat() if self.date is not None else None,
+            'scenarios': len(self.pnl),
+            'portfolio_value': self.portfolio_value,
+            'exposure': self.exposure,
+            'confidence': confidence,
+            'value_at_risk': self.value_at_risk(confidence),
+            'expected_shortfall': self.expected_shortfall(confidence),
+            'mean_pnl': float(self.pnl.mean()) if len(self.pnl) else 0.0,
+            'worst': self.worst(n)
+        }
+
+
+class StressTester:
+    """组合压力测试
+    
+    冲击情景统一表示为 情景 x 股票 的收益率矩阵，组合在全部情景下的盈亏是冲击矩阵与持仓市值向量的
+    一次矩阵乘法，数千个情景一次算完。情景由数据馈送上已缓存的日收益率矩阵构建，不重新读取bar：
+        - historical：历史上每个交易日的实际涨跌幅（最差的历史交易日）；
+        - sector_shocks：每个行业一个情景，行业内股票同时下跌；
+        - factor_moves：回看窗口收益率的主成分（统计因子）按各自波动率随机联动，生成相关的冲击；
+        - factor_shock：沿某个因子方向移动若干倍标准差的确定性情景（第一个因子近似市场整体）。
+    因子分解按收益率矩阵缓存，数据不变时重复的压力测试只做矩阵乘法。
+    """
+    
+    def __init__(self, data_feed: DataFeed, lookback: int = STRESS_LOOKBACK_DAYS, n_factors: int = STRESS_FACTORS,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            data_feed: 提供收益率矩阵的数据馈送
+            lookback: 历史情景和因子估计使用的最近交易日数
+            n_factors: 统计因子个数
+            seed: 随机情景的随机数种子
+        """
+        self.data_feed = data_feed
+        self.lookback = lookback
+        self.n_factors = n_factors
+        self.rng = np.random.default_rng(seed)
+        self._factor_key = None
+        self._factors: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._factor_returns: Optional[np.ndarray] = None  # 持有因子所基于的收益率矩阵，保证缓存键中的 id 不被复用
+    
+    @property
+    def symbols(self) -> List[str]:
+        return list(self.data_feed.get_available_stocks())
+    
+    def _window(self, date: Optional[datetime] = None) -> Tuple[int, int]:
+        """截至 date（含，默认最后一个交易日）的回看窗口在收益率矩阵中的行范围 [start, end)"""
+        end = len(self.data_feed.get_return_matrix())
+        if date is not None:
+            row = self.data_feed.get_date_index(date)
+            if row is None:
+                raise ValueError(f"No market data on {date}")
+            end = row + 1
+        # 第一行没有前一日，不是有效的收益率
+        return max(1, end - self.lookback), end
+    
+    def factors(self, date: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """回看窗口收益率的统计因子
+        
+        Returns:
+            (因子载荷矩阵 (因子数, 股票数), 因子日波动率向量)，因子按方差从大到小排列
+        """
+        start, end = self._window(date)
+        returns = self.data_feed.get_return_matrix()
+        key = (id(returns), start, end, self.n_factors)
+        if self._factor_key != key:
+            window = returns[start:end]
+            centered = window - window.mean(axis=0)
+            # 窗口行数远小于股票数时，薄SVD比分解 股票数 x 股票数 的协方差矩阵便宜得多
+            _, singular, loadings = np.linalg.svd(centered, full_matrices=False)
+            k = min(self.n_factors, len(singular))
+            self._factors = (loadings[:k], singular[:k] / np.sqrt(max(len(window) - 1, 1)))
+            self._factor_key = key
+            self._factor_returns = returns
+        return self._factors
+    
+    def historical(self, date: Optional[datetime] = None) -> ShockScenarios:
+        """回看窗口内每个交易日的实际涨跌幅作为一个情景"""
+        start, end = self._window(date)
+        dates = self.data_feed.get_dates()[start:end]
+        return ShockScenarios([f"historical {day.date()}" for day in dates], self.symbols,
+                              self.data_feed.get_return_matrix()[start:end])
+    
+    def sector_shocks(self, sectors: Dict[str, str], shock: float = STRESS_SECTOR_SHOCK) -> ShockScenarios:
+        """每个行业一个情景：行业内的股票同时按 shock 变动
+        
+        Args:
+            sectors: 股票代码 -> 行业，未列出的股票不受冲击
+            shock: 行业内股票的收益率冲击
+        """
+        symbols = self.symbols
+        names = sorted(set(sectors[ts_code] for ts_code in symbols if ts_code in sectors))
+        members = np.array([[sectors.get(ts_code) == name for ts_code in symbols] for name in names], dtype=bool)
+        shocks = np.where(members, shock, 0.0) if names else np.zeros((0, len(symbols)))
+        return ShockScenarios([f"sector {name} {shock:+.0%}" for name in names], symbols, shocks)
+    
+    def factor_moves(self, n: int = STRESS_FACTOR_SCENARIOS, horizon: int = 1, scale: float = 1.0,
+                     date: Optional[datetime] = None) -> ShockScenarios:
+        """统计因子按各自波动率随机联动的情景，股票之间的相关性由因子载荷决定
+        
+        Args:
+            n: 情景数
+            horizon: 冲击的持有期（交易日），波动率按平方根放大
+            scale: 波动率的放大倍数，用于模拟高波动环境
+        """
+        loadings, volatility = self.factors(date)
+        moves = self.rng.standard_normal((n, len(volatility))) * (volatility * scale * np.sqrt(horizon))
+        return ShockScenarios([f"factor draw {i}" for i in range(n)], self.symbols, moves @ loadings)
+    
+    def factor_shock(self, factor: int = 0, sigmas: float = -3.0, date: Optional[datetime] = None) -> ShockScenarios:
+        """沿第 factor 个统计因子移动 sigmas 倍标准差的确定性情景
+        
+        因子方向的正负号不确定，第一个因子统一定向为多数股票同涨，sigmas 为负即市场整体下跌。
+        """
+        loadings, volatility = self.factors(date)
+        direction = loadings[factor] * (1.0 if loadings[factor].sum() >= 0 else -1.0)
+        shocks = (sigmas * volatility[factor] * direction)[np.newaxis, :]
+        return ShockScenarios([f"factor {factor + 1} {sigmas:+g} sigma"], self.symbols, shocks)
+    
+    def exposures(self, portfolio: Portfolio, date: Optional[datetime] = None) -> np.ndarray:
+        """按数据馈送股票顺序排列的持仓市值向量（date 的盯市价格，默认最后一个交易日）"""
+        prices = self.data_feed.get_mark_matrix()[-1] if date is None else self.data_feed.get_close_vector(date)
+        quantities = np.zeros(len(prices))
+        for j, ts_code in enumerate(self.symbols):
+            idx = portfolio.symbol_index.get(ts_code)
+            if idx is not None:
+                quantities[j] = portfolio.quantities[idx]
+        return np.nan_to_num(quantities * prices)
+    
+    def run(self, portfolio: Portfolio, scenarios: ShockScenarios, date: Optional[datetime] = None,
+            top_symbols: int = 3) -> StressReport:
+        """计算组合在全部情景下的盈亏
+        
+        Args:
+            portfolio: 投资组合，持仓按 date 的盯市价格估值
+            scenarios: 冲击情景，股票列须与数据馈送一致
+            date: 估值日期，为None时取最后一个交易日
+            top_symbols: 最差的情景中列出的贡献损失最大的股票数
+        """
+        if scenarios.symbols != self.symbols:
+            raise ValueError("Scenarios were built for a different symbol universe")
+        exposure = self.exposures(portfolio, date)
+        pnl = scenarios.shocks @ exposure
+        
+        # 只为最差的情景拆分个股贡献，避免生成 情景数 x 股票数 的贡献矩阵
+        top_losses = {}
+        symbols = self.symbols
+        held = np.flatnonzero(exposure)
+        for i in np.argsort(pnl, kind='stable')[:STRESS_WORST_N]:
+            contributions = scenarios.shocks[i, held] * exposure[held]
+            top_losses[int(i)] = [(symbols[held[j]], float(contributions[j]))
+                                  for j in np.argsort(contributions, kind='stable')[:top_symbols]]
+        
+        market_value = float(exposure.sum())
+        return StressReport(
+            names=list(scenarios.names),
+            pnl=pnl,
+            portfolio_value=float(portfolio.cash) + market_value,
+            exposure=market_value,
+            date=date if date is not None else self.data_feed.get_dates()[-1],
+            top_losses=top_losses
+        )
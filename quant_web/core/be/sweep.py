@@ -0,0 +1,225 @@
+import itertools
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.const import (
+    DEFAULT_INITIAL_CASH,
+    POOL_START_METHOD,
+    SWEEP_MAX_COMBINATIONS,
+    SWEEP_MAX_WORKERS,
+    SWEEP_RANK_METRIC,
+    SWEEP_RESULT_METRICS,
+)
+
+# 工作进程内共享的数据馈送，由进程池初始化函数设置，每个进程只接收一次
+_WORKER_FEED: Optional[DataFeed] = None
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """将参数网格展开为全部参数组合（笛卡尔积）
+    
+    Args:
+        grid: 参数名 -> 候选值列表，单个值会被视为只有一个候选
+    
+    Returns:
+        参数组合列表，按参数名在网格中的顺序展开
+    """
+    if not grid:
+        return [{}]
+    names = list(grid.keys())
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in grid.values()]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def process_pool(max_workers: int, initializer: Optional[Callable] = None, initargs: tuple = ()) -> ProcessPoolExecutor:
+    """创建工作进程池
+    
+    回测在多线程的服务进程（事件循环、线程池、日志处理线程）中发起，直接 fork 会把其他线程持有的锁
+    原样复制进子进程而可能死锁，因此按 POOL_START_METHOD（forkserver，不可用时 spawn）启动工作进程；
+    任务所需的数据都经由初始化参数或任务参数传入，不依赖 fork 继承父进程的内存。
+    """
+    method = POOL_START_METHOD if POOL_START_METHOD in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method),
+                               initializer=initializer, initargs=initargs)
+
+
+def _init_worker(data_feed: DataFeed) -> None:
+    """进程池初始化：保存共享的数据馈送"""
+    global _WORKER_FEED
+    _WORKER_FEED = data_feed
+
+
+def _run_combination(index: int, strategy_name: str, parameters: Dict[str, Any], start_date: datetime,
+                     end_date: datetime, initial_cash: float, vectorized: bool,
+                     data_feed: Optional[DataFeed] = None, keep_equity: bool = False,
+                     stop_rules: Optional[List[Callable]] = None) -> Dict[str, Any]:
+    """执行单个参数组合的回测，返回结果表中的一行，keep_equity=True 时附带 (日期, 净值) 序列"""
+    from quant_web.core.be.trading_engine import TradingEngine
+    
+    row = {'index': index, 'params': parameters, 'error': None}
+    try:
+        engine = TradingEngine()
+        engine.initialize(initial_cash)
+        engine.load_data_feed(data_feed if data_feed is not None else _WORKER_FEED)
+        engine.add_strategy(strategy_name, f"{strategy_name}_sweep_{index}", dict(parameters))
+        result = engine.execute_backtest(start_date, end_date, vectorized=vectorized, stop_rules=stop_rules)
+        
+        metrics = result['performance_metrics']
+        for name in SWEEP_RESULT_METRICS:
+            row[name] = float(metrics.get(name, 0.0))
+        daily_equity = result['daily_equity']
+        row['final_equity'] = float(daily_equity[-1]['equity']) if daily_equity else float(initial_cash)
+        row['bars'] = len(daily_equity)
+        row['stopped_reason'] = result['stopped_reason']
+        if keep_equity:
+            row['equity_curve'] = [(day['date'], float(day['equity'])) for day in daily_equity]
+    except Exception as e:
+        logger.warning(f"Sweep combination {index} {parameters} failed: {str(e)}")
+        row['error'] = str(e)
+    return row
+
+
+def rank_results(rows: List[Dict[str, Any]], rank_by: str = SWEEP_RANK_METRIC,
+                 ascending: bool = False) -> List[Dict[str, Any]]:
+    """按指定指标对结果表排序并写入名次，失败或指标为NaN的组合排在最后"""
+    def sort_key(row):
+        value = row.get(rank_by)
+        if row.get('error') or value is None or math.isnan(value):
+            return (1, 0.0, row['index'])
+        return (0, value if ascending else -value, row['index'])
+    
+    ranked = sorted(rows, key=sort_key)
+    for rank, row in enumerate(ranked, start=1):
+        row['rank'] = rank
+    return ranked
+
+
+def check_rank_metric(rank_by: str) -> str:
+    """校验排序指标：只能是结果表中保留的绩效指标（SWEEP_RESULT_METRICS）"""
+    if rank_by not in SWEEP_RESULT_METRICS:
+        raise ValueError(f"Unknown rank metric {rank_by}, expected one of {', '.join(SWEEP_RESULT_METRICS)}")
+    return rank_by
+
+
+class PoolRunner:
+    """在进程池中并行回测的运行器的公共部分：股票池与区间、工作进程数和行情数据的加载
+    
+    ParameterSweep、SuccessiveHalvingSearch、WalkForwardOptimizer、ShardedBacktest 和 UniverseScan 由此派生。
+    """
+    
+    # 加载失败时错误信息中的任务名称
+    task_name = 'backtest'
+    # 加载后是否预先构建价格矩阵：全部任务共享同一份数据馈送时在分发前构建一次，避免每个工作进程重复构建
+    prebuild_matrices = False
+    
+    def __init__(self, stock_pool: List[str], start_date: datetime, end_date: datetime, max_workers: Optional[int],
+                 worker_limit: int, data_feed: Optional[DataFeed] = None):
+        """
+        Args:
+            stock_pool: 股票池
+            start_date: 回测开始日期
+            end_date: 回测结束日期
+            max_workers: 工作进程数，为None时取 min(CPU数, worker_limit)，为1时在当前进程内顺序执行
+            worker_limit: 默认工作进程数的上限
+            data_feed: 已加载的数据馈送，为None时在首次运行时按股票池加载
+        """
+        self.stock_pool = list(stock_pool)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.max_workers = max_workers or min(os.cpu_count() or 1, worker_limit)
+        self.data_feed = data_feed
+    
+    def load_data(self) -> DataFeed:
+        """加载行情数据（prebuild_matrices 为True时同时构建价格矩阵）"""
+        if self.data_feed is None:
+            data_feed = DataFeed()
+            if not data_feed.load_historical_data(self.stock_pool, self.start_date, self.end_date):
+                raise RuntimeError(f"Failed to load historical data for {self.task_name}")
+            self.data_feed = data_feed
+        if self.prebuild_matrices:
+            self.data_feed.get_field_matrix('close')
+            self.data_feed.get_mark_matrix()
+        return self.data_feed
+
+
+class ParameterSweep(PoolRunner):
+    """参数扫描
+    
+    对同一策略的参数网格批量回测：行情数据只加载一次（价格矩阵也只构建一次），
+    随后随进程池初始化分发给每个工作进程，各参数组合在进程池中并行执行。
+    每个组合完成时通过回调推送结果行，全部完成后返回按指标排序的结果表。
+    """
+    
+    task_name = 'parameter sweep'
+    prebuild_matrices = True
+    
+    def __init__(self, strategy_name: str, stock_pool: List[str], start_date: datetime, end_date: datetime,
+                 initial_cash: float = DEFAULT_INITIAL_CASH, max_workers: Optional[int] = None,
+                 rank_by: str = SWEEP_RANK_METRIC, ascending: bool = False, vectorized: bool = True,
+                 data_feed: Optional[DataFeed] = None):
+        """
+        Args:
+            strategy_name: 策略名称
+            initial_cash: 初始资金
+            rank_by: 排序所用的绩效指标（SWEEP_RESULT_METRICS 之一）
+            ascending: 是否按指标升序排列（如按波动率排序）
+            vectorized: 策略支持时使用向量化回测模式
+            其余参数见 PoolRunner，工作进程数上限为 SWEEP_MAX_WORKERS
+        """
+        super().__init__(stock_pool, start_date, end_date, max_workers, SWEEP_MAX_WORKERS, data_feed)
+        self.strategy_name = strategy_name
+        self.initial_cash = initial_cash
+        self.rank_by = check_rank_metric(rank_by)
+        self.ascending = ascending
+        self.vectorized = vectorized
+    
+    def run(self, grid: Dict[str, List[Any]],
+            on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """执行参数扫描
+        
+        Args:
+            grid: 参数网格，参数名 -> 候选值列表
+            on_result: 每个组合完成时的回调，参数为该组合的结果行（完成顺序，尚未排名）
+        
+        Returns:
+            按 rank_by 排序的结果表，每行包含 rank、params、各项绩效指标及 error
+        """
+        combinations = expand_grid(grid)
+        if len(combinations) > SWEEP_MAX_COMBINATIONS:
+            raise ValueError(f"Parameter grid has {len(combinations)} combinations, "
+                             f"exceeding the limit of {SWEEP_MAX_COMBINATIONS}")
+        
+        data_feed = self.load_data()
+        workers = min(self.max_workers, len(combinations))
+        logger.info(f"Sweeping {len(combinations)} parameter combinations of {self.strategy_name} "
+                    f"with {workers} workers")
+        
+        rows = []
+        if workers <= 1:
+            for index, parameters in enumerate(combinations):
+                row = _run_combination(index, self.strategy_name, parameters, self.start_date, self.end_date,
+                                       self.initial_cash, self.vectorized, data_feed)
+                rows.append(row)
+                if on_result:
+                    on_result(row)
+        else:
+            with process_pool(workers, _init_worker, (data_feed,)) as executor:
+                futures = [
+                    executor.submit(_run_combination, index, self.strategy_name, parameters, self.start_date,
+                                    self.end_date, self.initial_cash, self.vectorized)
+                    for index, parameters in enumerate(combinations)
+                ]
+                for future in as_completed(futures):
+                    row = future.result()
+                    rows.append(row)
+                    if on_result:
+                        on_result(row)
+        
+        return rank_results(rows, self.rank_by, self.ascending)
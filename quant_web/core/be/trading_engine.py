@@ -1,5 +1,7 @@
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from datetime import datetime
+import pickle
+import time
 import pandas as pd
 import numpy as np
 from loguru import logger
@@ -8,7 +10,46 @@ from quant_web.core.be.strategy import Strategy, StrategyFactory, StrategyContex
 from quant_web.core.be.portfolio import Portfolio
 from quant_web.core.be.order import Order, OrderStatus
 from quant_web.core.be.data_feed import DataFeed
-from quant_web.core.const import MIN_TRADE_QUANTITY
+from quant_web.core.be.risk import BatchRiskChecker
+from quant_web.core.be.journal import TradeJournal
+from quant_web.core.be.metrics import StreamingMetrics
+from quant_web.core.be.checkpoint import (
+    EngineSnapshot,
+    checkpoint_key,
+    dumps_state,
+    load_checkpoint,
+    remove_checkpoint,
+    save_checkpoint,
+)
+from quant_web.core.be.panel import MarketPanel
+from quant_web.core.be.profiler import (
+    NULL_PROFILER,
+    PHASE_CHECKPOINT,
+    PHASE_INDICATORS,
+    PHASE_MARKET_DATA,
+    PHASE_METRICS,
+    PHASE_PROCESS_ORDERS,
+    PHASE_PROCESS_SIGNALS,
+    PHASE_SIGNAL_GENERATION,
+    PHASE_STRATEGY,
+    PHASE_VALUATION,
+    PhaseProfiler,
+    global_profile_stats,
+)
+from quant_web.core.be.indicators import IndicatorEngine
+from quant_web.core.be.vectorized import SignalMatrix, signals_for_row
+from quant_web.core.const import (
+    CHECKPOINT_EVERY,
+    FORK_EXIT_STRATEGY_ID,
+    MIN_COMMISSION,
+    METRICS_STREAM_INTERVAL,
+    PROGRESS_STREAM_INTERVAL,
+    JOURNAL_SAMPLE_EVERY,
+    JOURNAL_EVENT_ORDER_CREATED,
+    JOURNAL_EVENT_ORDER_FILLED,
+    JOURNAL_EVENT_ORDER_REJECTED,
+    JOURNAL_EVENT_SIGNAL_REJECTED,
+)
 
 # 导入策略模块，确保策略被注册
 from quant_web.core.be.strategies import *
@@ -17,7 +58,17 @@ from quant_web.core.be.strategies import *
 class TradingEngine:
     """交易引擎，负责执行策略、处理订单和管理投资组合"""
     
-    def __init__(self):
+    def __init__(self, verbose: bool = False, journal_sample_every: int = JOURNAL_SAMPLE_EVERY):
+        """
+        Args:
+            verbose: 是否逐笔输出可读的订单/成交日志（默认只写入交易日志 journal）
+            journal_sample_every: 交易日志中非成交事件的抽样间隔
+        """
+        self.verbose = verbose
+        self.journal = TradeJournal(sample_every=journal_sample_every)
+        self.metrics = StreamingMetrics()
+        self._day_traded_value = 0.0
+        self._filled_strategies: set = set()  # 当日有订单成交的策略，供 OnFill 调度计划使用
         self.strategies: Dict[str, Strategy] = {}
         self.portfolio: Optional[Portfolio] = None
         self.data_feed: Optional[DataFeed] = None
@@ -25,17 +76,64 @@ class TradingEngine:
         self.order_history: List[Order] = []
         self.performance_metrics: Dict = {}
         self.current_date: Optional[datetime] = None
+        self.risk_checker = BatchRiskChecker()
+        # 策略订阅的增量指标，股票顺序与数据馈送一致
+        self.indicators = IndicatorEngine()
+        self._indicator_row = -1
+        # 策略ID -> 策略初始化时订阅的指标 key，移除策略时取消这些订阅
+        self._strategy_indicators: Dict[str, List[Tuple]] = {}
+        # 指标 key -> 数据馈送上预计算的 (指标矩阵, 上一值矩阵)，为None时逐行增量更新
+        self._precomputed_indicators: Optional[Dict] = None
+        # 数据馈送股票顺序 -> 持仓向量股票ID 的映射，顺序一致时为None
+        self._feed_symbol_ids: Optional[np.ndarray] = None
+        # 逐bar推进（start_live/step）以来的每日净值
+        self.live_equity: List[Dict] = []
+        # 断点快照中已序列化的订单历史分块及其覆盖的订单数
+        self._order_chunks: List[bytes] = []
+        self._order_chunk_count = 0
+        # restore_snapshot 恢复的快照（及其调度计划和指标），下一次 execute_backtest 从快照处继续
+        self._resume: Optional[Dict] = None
     
     def initialize(self, initial_cash: float = 1000000.0) -> None:
         """初始化交易引擎"""
         self.portfolio = Portfolio(initial_cash)
+        if self.data_feed:
+            self._register_feed_symbols()
         logger.info(f"Trading engine initialized with cash: {initial_cash}")
     
     def load_data_feed(self, data_feed: DataFeed) -> None:
         """加载数据馈送"""
         self.data_feed = data_feed
+        # 持仓向量与价格矩阵使用相同的股票顺序，估值时可直接做点积
+        if self.portfolio:
+            self._register_feed_symbols()
         logger.info(f"Data feed loaded with {len(data_feed.get_available_stocks())} stocks")
     
+    def _register_feed_symbols(self) -> None:
+        """将数据馈送的股票注册到持仓向量中"""
+        ids = self.portfolio.register_symbols(self.data_feed.get_available_stocks())
+        self.indicators.register_symbols(self.data_feed.get_available_stocks())
+        self._feed_symbol_ids = None if np.array_equal(ids, np.arange(len(ids))) else ids
+    
+    def _feed_quantities(self) -> np.ndarray:
+        """获取按数据馈送股票顺序排列的持仓数量向量"""
+        if self._feed_symbol_ids is None:
+            n = len(self.data_feed.get_available_stocks())
+            quantities = self.portfolio.quantities[:n]
+            if len(quantities) < n:
+                quantities = np.pad(quantities, (0, n - len(quantities)))
+            return quantities
+        return self.portfolio.quantities[self._feed_symbol_ids]
+    
+    def _mark_prices(self, date: datetime) -> np.ndarray:
+        """获取按持仓股票ID对齐的当日盯市价格向量"""
+        prices = self.data_feed.get_close_vector(date)
+        if self._feed_symbol_ids is None:
+            return prices
+        aligned = np.zeros(len(self.portfolio.symbols))
+        aligned[self._feed_symbol_ids] = prices
+        return aligned
+    
     def add_strategy(self, strategy_name: str, strategy_id: str, parameters: Optional[Dict] = None) -> Strategy:
         """添加策略"""
         try:
@@ -55,94 +153,690 @@ class TradingEngine:
             context.initial_cash = self.portfolio.initial_cash
             context.stock_pool = self.data_feed.get_available_stocks() if self.data_feed else []
             context.data_feed = self.data_feed
+            context.indicators = self.indicators
             
+            subscribed = self.indicators.requirements()
             strategy.initialize(context)
+            self._strategy_indicators[strategy_id] = [
+                key for key, count in self.indicators.requirements().items()
+                for _ in range(count - subscribed.get(key, 0))
+            ]
             return strategy
         except Exception as e:
             logger.error(f"Failed to add strategy {strategy_name}: {str(e)}")
             raise
     
     def remove_strategy(self, strategy_id: str) -> None:
-        """移除策略"""
+        """移除策略，并取消它订阅的指标"""
         if strategy_id in self.strategies:
             del self.strategies[strategy_id]
+            for key in self._strategy_indicators.pop(strategy_id, []):
+                self.indicators.unsubscribe(key)
             logger.info(f"Removed strategy: {strategy_id}")
         else:
             logger.warning(f"Strategy {strategy_id} not found")
     
-    def execute_backtest(self, start_date: datetime, end_date: datetime) -> Dict:
-        """执行回测"""
+    def execute_backtest(self, start_date: datetime, end_date: datetime, journal_path: Optional[str] = None,
+                         metrics_callback: Optional[Callable[[Dict], None]] = None,
+                         metrics_every: int = METRICS_STREAM_INTERVAL, vectorized: bool = False,
+                         stop_rules: Optional[List[Callable[[StreamingMetrics], Optional[str]]]] = None,
+                         progress_callback: Optional[Callable[[Dict], None]] = None,
+                         progress_interval: float = PROGRESS_STREAM_INTERVAL, profile: bool = False,
+                         checkpoint_path: Optional[str] = None, checkpoint_every: int = CHECKPOINT_EVERY,
+                         pause_at: Optional[datetime] = None) -> Dict:
+        """执行回测
+        
+        引擎由 restore_snapshot（或 fork）恢复快照后，本次回测从快照的下一个交易日继续，不重置状态，
+        回测区间须与拍摄快照的回测相同；此时不读取断点快照。
+        
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            journal_path: 回测结束后交易日志的保存路径，为None时只保留在内存中
+            metrics_callback: 回测过程中接收实时绩效指标快照的回调
+            metrics_every: 每隔多少个交易日推送一次指标快照
+            vectorized: 向量化模式，策略通过 generate_signals 一次性生成全部信号，
+                引擎只在模拟循环中逐日取出信号撮合；有策略不支持时回退到逐日 on_data 模式
+            stop_rules: 提前终止规则，每个交易日以实时绩效指标调用，返回非空原因时停止回测，
+                原因记录在结果的 stopped_reason 中
+            progress_callback: 回测过程中接收逐日进度的回调，参数包含已处理/总交易日数 bars/total、
+                进度 progress、当前日期 date、当前净值 equity，以及自上次回调以来新增的净值点 equity_points
+            progress_interval: 两次进度回调的最小间隔（秒），最后一个交易日总会回调
+            profile: 按阶段和策略统计主循环的墙钟/CPU耗时，报告记录在结果的 profile 中，
+                并累计到 global_profile_stats
+            checkpoint_path: 断点快照文件路径，每 checkpoint_every 个交易日保存一次引擎状态；
+                文件已存在且回测输入（区间、资金、策略参数、数据版本）相同时从快照处继续，
+                恢复后引擎的投资组合、策略、指标等为快照中的对象；回测完成后删除快照
+            checkpoint_every: 保存快照的交易日间隔
+            pause_at: 处理完该日（含）及之前的交易日后暂停，结果的 snapshot 中返回此时的引擎快照
+                EngineSnapshot，可由 fork 分叉出多个分支各自继续；早于第一个交易日时抛出 ValueError
+        """
         if not self.data_feed:
             raise ValueError("Data feed not loaded")
         
-        if not self.strategies:
+        resume, self._resume = self._resume, None
+        if not self.strategies and resume is None:
             raise ValueError("No strategies added")
         
         logger.info(f"Starting backtest from {start_date} to {end_date}")
+        profiler = PhaseProfiler() if profile else NULL_PROFILER
+        profiler.begin()
         
-        # 重置状态
-        self.portfolio.reset()
-        self.open_orders = []
-        self.order_history = []
+        if resume is None:
+            # 重置状态
+            self.portfolio.reset()
+            self.open_orders = []
+            self.order_history = []
+            self._order_chunks, self._order_chunk_count = [], 0
+            self.journal.clear()
+            self.metrics.reset()
+            self.indicators.reset()
+            self._indicator_row = -1
+        else:
+            snapshot = resume['snapshot']
+            if (pd.Timestamp(start_date), pd.Timestamp(end_date)) != \
+                    (pd.Timestamp(snapshot.start_date), pd.Timestamp(snapshot.end_date)):
+                raise ValueError(f"Snapshot was taken on a backtest from {snapshot.start_date} to "
+                                 f"{snapshot.end_date}, cannot resume it from {start_date} to {end_date}")
+            checkpoint_path = None
+        self._precomputed_indicators = self._load_precomputed_indicators() if not vectorized else None
+        if resume is not None:
+            self._warm_up_indicators(resume['indicator_keys'])
+        subscriptions = sum(self.indicators.requirements().values())
+        if subscriptions > len(self.indicators.indicators):
+            logger.info(f"{subscriptions} indicator subscriptions share "
+                        f"{len(self.indicators.indicators)} computations")
+        self.journal.meta = {'start_date': str(start_date), 'end_date': str(end_date),
+                             'initial_cash': self.portfolio.initial_cash}
+        
+        # 可读日志按本次运行的 verbose 设置开启
+        self.portfolio.verbose = self.verbose
+        for strategy in self.strategies.values():
+            strategy.verbose = self.verbose
         
         # 获取回测期间的所有日期
         trading_dates = self.data_feed.get_trading_dates(start_date, end_date)
+        if pause_at is not None and (not len(trading_dates) or pause_at < trading_dates[0]):
+            raise ValueError(f"Pause date {pause_at} is before the first trading day of the backtest")
+        
+        # 向量化模式下预先生成全部策略的信号矩阵
+        panel, signal_matrices = None, None
+        if vectorized:
+            unsupported = [sid for sid, strategy in self.strategies.items() if not strategy.supports_vectorized]
+            if unsupported:
+                logger.warning(f"Strategies {unsupported} do not support vectorized mode, using event loop")
+            else:
+                started = profiler.start()
+                panel = MarketPanel.from_data_feed(self.data_feed, start_date, end_date)
+                signal_matrices = self._generate_signal_matrices(panel)
+                profiler.stop(PHASE_SIGNAL_GENERATION, started)
+        
+        # 逐日模式下按各策略的调度计划分发，没有策略到期的交易日只处理挂单和盯市
+        # 从快照继续时沿用快照中策略的调度计划，分叉后新增的策略从头准备
+        schedules = {}
+        if signal_matrices is None:
+            for strategy_id, strategy in self.strategies.items():
+                if resume is not None and strategy_id in resume['schedules']:
+                    schedules[strategy_id] = resume['schedules'][strategy_id]
+                    continue
+                schedules[strategy_id] = strategy.get_schedule()
+                schedules[strategy_id].prepare(self.data_feed, trading_dates)
+        dispatched_days = 0
         
         # 用于记录每日净值
         daily_equity = []
+        stopped_reason = None
+        reported, last_report = 0, time.monotonic()
+        
+        # 从内存快照或断点快照恢复已完成的交易日
+        resumed_bars = 0
+        if resume is not None:
+            resumed_bars, dispatched_days = snapshot.bars, snapshot.dispatched_days
+            if resumed_bars and trading_dates[resumed_bars - 1] != snapshot.date:
+                raise ValueError(f"Trading calendar differs from the snapshot taken on {snapshot.date}")
+            daily_equity = list(snapshot.daily_equity)
+            reported = len(daily_equity)
+            logger.info(f"Resumed backtest from snapshot of {snapshot.date} after {resumed_bars} trading days")
+        elif checkpoint_path:
+            key = checkpoint_key(str(start_date), str(end_date), vectorized, signal_matrices is not None,
+                                 self.portfolio.initial_cash, self.data_feed.data_version,
+                                 [(sid, strategy.name, strategy.get_parameters())
+                                  for sid, strategy in self.strategies.items()])
+            state = load_checkpoint(checkpoint_path, self.data_feed)
+            if state is not None and state['key'] == key:
+                resumed_bars, dispatched_days, schedules = state['bars'], state['dispatched_days'], state['schedules']
+                self._restore_checkpoint(state)
+                daily_equity = [{'date': date, 'equity': equity}
+                                for date, equity in zip(pd.to_datetime(state['equity_dates']), state['equity'])]
+                logger.info(f"Resumed backtest from checkpoint {checkpoint_path} after {resumed_bars} trading days")
+            elif state is not None:
+                logger.warning(f"Checkpoint {checkpoint_path} was written for different inputs, starting over")
         
-        for date in trading_dates:
+        bars_done = resumed_bars
+        for bar, date in enumerate(trading_dates[resumed_bars:], start=resumed_bars + 1):
+            if pause_at is not None and date > pause_at:
+                break
+            bars_done = bar
+            # 在交易日开始前保存快照，此时前 bar - 1 个交易日已全部处理完
+            if checkpoint_path and bar > resumed_bars + 1 and (bar - 1) % checkpoint_every == 0:
+                started = profiler.start()
+                self._save_checkpoint(checkpoint_path, key, bar - 1, dispatched_days, schedules, daily_equity)
+                profiler.stop(PHASE_CHECKPOINT, started)
             self.current_date = date
+            self._day_traded_value = 0.0
+            self._filled_strategies = set()
             
             # 处理未完成订单
+            started = profiler.start()
             self._process_orders(date)
+            profiler.stop(PHASE_PROCESS_ORDERS, started)
             
-            # 获取当日数据
-            market_data = self.data_feed.get_data_for_date(date)
-            
-            if not market_data:
-                continue
-            
-            # 执行所有策略
-            for strategy_id, strategy in self.strategies.items():
-                try:
-                    signals = strategy.on_data(date, market_data)
-                    self._process_signals(signals, date, strategy_id)
-                except Exception as e:
-                    logger.error(f"Error executing strategy {strategy_id}: {str(e)}")
+            if signal_matrices is not None:
+                # 向量化模式：从信号矩阵中取出当日信号
+                with profiler.phase(PHASE_STRATEGY):
+                    row = panel.get_date_index(date)
+                    if row is None or not panel.valid[row].any():
+                        continue
+                    day_signals = self._signals_from_matrices(panel, signal_matrices, row)
+            else:
+                with profiler.phase(PHASE_MARKET_DATA):
+                    due = [strategy_id for strategy_id, schedule in schedules.items()
+                           if schedule.is_due(bar - 1, date, strategy_id in self._filled_strategies)]
+                    if due:
+                        # 获取当日数据
+                        market_data = self.data_feed.get_data_for_date(date)
+                        if not market_data:
+                            continue
+                    elif self.data_feed.get_date_index(date) is None:
+                        continue
+                if due:
+                    dispatched_days += 1
+                    # 更新策略订阅的增量指标（跳过的交易日在此一并补齐）
+                    with profiler.phase(PHASE_INDICATORS):
+                        self._advance_indicators(date)
+                
+                # 执行当日到期的策略，汇总全部信号后统一做批量预校验
+                day_signals = []
+                for strategy_id in due:
+                    strategy = self.strategies[strategy_id]
+                    schedules[strategy_id].on_dispatch(bar - 1, date)
+                    started = profiler.start()
+                    try:
+                        signals = strategy.on_data(date, market_data)
+                        day_signals.extend((strategy_id, signal) for signal in signals)
+                    except Exception as e:
+                        logger.error(f"Error executing strategy {strategy_id}: {str(e)}")
+                    profiler.stop_strategy(strategy_id, started)
+            started = profiler.start()
+            self._process_signal_batch(day_signals, date)
+            profiler.stop(PHASE_PROCESS_SIGNALS, started)
             
-            # 计算当日净值
-            current_equity = self.portfolio.get_total_value(market_data)
+            # 计算当日净值（持仓向量与当日价格向量的点积），并增量更新绩效指标
+            started = profiler.start()
+            prices = self._mark_prices(date)
+            current_equity = self.portfolio.value(prices)
+            gross_exposure = self.portfolio.exposure(prices)['gross']
+            profiler.stop(PHASE_VALUATION, started)
             daily_equity.append({
                 'date': date,
                 'equity': current_equity
             })
+            started = profiler.start()
+            self.metrics.update(current_equity, date, gross_exposure, self._day_traded_value)
+            profiler.stop(PHASE_METRICS, started)
+            if metrics_callback and self.metrics.bars % metrics_every == 0:
+                metrics_callback(self.metrics.snapshot())
+            if stop_rules:
+                stopped_reason = next(filter(None, (rule(self.metrics) for rule in stop_rules)), None)
+                if stopped_reason:
+                    logger.info(f"Backtest stopped early on {date}: {stopped_reason}")
+                    break
+            if progress_callback and time.monotonic() - last_report >= progress_interval:
+                reported = self._report_progress(progress_callback, daily_equity, reported, bar, len(trading_dates))
+                last_report = time.monotonic()
+        
+        if progress_callback and reported < len(daily_equity):
+            # 提前停止或暂停时按实际处理的交易日数报告，不报告100%
+            self._report_progress(progress_callback, daily_equity, reported, bars_done, len(trading_dates))
+        
+        if checkpoint_path:
+            remove_checkpoint(checkpoint_path)
+        
+        if schedules and dispatched_days < len(trading_dates):
+            logger.info(f"Strategies dispatched on {dispatched_days} of {len(trading_dates)} trading days")
         
         # 计算绩效指标
-        self._calculate_performance_metrics(daily_equity)
+        started = profiler.start()
+        self._calculate_performance_metrics()
+        profiler.stop(PHASE_METRICS, started)
+        profiler.end()
         
         logger.info(f"Backtest completed. Final equity: {daily_equity[-1]['equity']}")
         
-        return {
+        result = {
             'daily_equity': daily_equity,
             'performance_metrics': self.performance_metrics,
-            'order_history': self.order_history
+            'order_history': self.order_history,
+            'journal': self.journal.summary(),
+            'stopped_reason': stopped_reason
+        }
+        if pause_at is not None:
+            result['snapshot'] = self._take_snapshot(start_date, end_date, signal_matrices is not None, bars_done,
+                                                     dispatched_days, schedules, daily_equity)
+        if profiler.enabled:
+            result['profile'] = profiler.report()
+            global_profile_stats.record(result['profile'],
+                                        {sid: strategy.name for sid, strategy in self.strategies.items()})
+        if journal_path:
+            result['journal']['path'] = self.journal.dump(journal_path)
+        return result
+    
+    def start_live(self) -> None:
+        """开始逐bar推进（模拟盘/实盘）
+        
+        与 execute_backtest 一样重置投资组合、订单、交易日志、绩效指标和指标引擎，
+        并用数据馈送中已有的全部历史bar预热订阅的指标；之后每到一根新bar调用一次 step，
+        全部状态在两次调用之间保持，无需从头重放。
+        """
+        if not self.data_feed:
+            raise ValueError("Data feed not loaded")
+        
+        if not self.strategies:
+            raise ValueError("No strategies added")
+        
+        self.portfolio.reset()
+        self.open_orders = []
+        self.order_history = []
+        self.journal.clear()
+        self.metrics.reset()
+        self.indicators.reset()
+        self._indicator_row = -1
+        # 全历史的预计算指标矩阵不随新bar延伸，逐bar推进时增量更新
+        self._precomputed_indicators = None
+        self.live_equity = []
+        self.portfolio.verbose = self.verbose
+        for strategy in self.strategies.values():
+            strategy.verbose = self.verbose
+        
+        dates = self.data_feed.get_dates()
+        if len(dates):
+            self._advance_indicators(dates[-1])
+        self.journal.meta = {'start_date': None, 'end_date': None, 'initial_cash': self.portfolio.initial_cash,
+                             'live': True}
+        logger.info(f"Live trading started after {len(dates)} warm-up bars")
+    
+    def step(self, bar_batch: Dict[str, Union[float, Dict[str, float]]], date: datetime) -> Dict:
+        """推进一根bar：追加行情、撮合挂单、执行策略、生成订单并更新净值和绩效指标
+        
+        新bar通过 DataFeed.update_with_realtime 追加到价格矩阵末尾，指标只更新新的一行，不重放历史；
+        逐股票的行情 DataFrame 仍以 pd.concat 追加，这一部分的耗时随历史长度增长。每根bar都分发全部策略
+        （不使用调度计划，调度计划只是跳过空闲交易日的优化，逐日分发结果相同）。
+        
+        Args:
+            bar_batch: 新bar，格式同 DataFeed.update_with_realtime 的 prices
+            date: bar的日期，须晚于数据馈送中已有的全部交易日
+        
+        Returns:
+            当日日期 date、净值 equity、当日成交的订单 filled 和实时绩效指标快照 metrics
+        """
+        dates = self.data_feed.get_dates()
+        if len(dates) and pd.Timestamp(date) <= dates[-1]:
+            raise ValueError(f"Bar date {date} is not after the last trading day {dates[-1]} of the data feed")
+        
+        self.data_feed.update_with_realtime(date, bar_batch)
+        date = pd.Timestamp(date)
+        self.current_date = date
+        self._day_traded_value = 0.0
+        self._filled_strategies = set()
+        
+        filled_before = len(self.order_history)
+        self._process_orders(date)
+        
+        day_signals = []
+        market_data = self.data_feed.get_data_for_date(date)
+        if market_data:
+            self._advance_indicators(date)
+            for strategy_id, strategy in self.strategies.items():
+                try:
+                    signals = strategy.on_data(date, market_data)
+                    day_signals.extend((strategy_id, signal) for signal in signals)
+                except Exception as e:
+                    logger.error(f"Error executing strategy {strategy_id}: {str(e)}")
+        self._process_signal_batch(day_signals, date)
+        
+        prices = self._mark_prices(date)
+        current_equity = self.portfolio.value(prices)
+        self.metrics.update(current_equity, date, self.portfolio.exposure(prices)['gross'], self._day_traded_value)
+        self.live_equity.append({'date': date, 'equity': current_equity})
+        
+        return {
+            'date': date,
+            'equity': current_equity,
+            'filled': [order.to_dict() for order in self.order_history[filled_before:]],
+            'metrics': self.metrics.snapshot()
+        }
+    
+    def _save_checkpoint(self, path: str, key: str, bars: int, dispatched_days: int, schedules: Dict,
+                         daily_equity: List[Dict]) -> None:
+        """保存已完成 bars 个交易日时的引擎状态快照"""
+        state = {
+            'key': key,
+            'bars': bars,
+            'dispatched_days': dispatched_days,
+            'order_chunks': self._checkpoint_order_chunks(),
+            **self._state_objects(schedules),
+            'equity_dates': np.fromiter((day['date'].value for day in daily_equity), dtype=np.int64,
+                                        count=len(daily_equity)),
+            'equity': np.fromiter((day['equity'] for day in daily_equity), dtype=np.float64, count=len(daily_equity))
+        }
+        try:
+            size = save_checkpoint(path, state, self.data_feed)
+            logger.debug(f"Saved checkpoint after {bars} trading days ({size} bytes)")
+        except Exception as e:
+            logger.warning(f"Failed to save checkpoint {path}: {e}")
+    
+    def _checkpoint_order_chunks(self) -> List[bytes]:
+        """按快照分块序列化的订单历史
+        
+        已成交的订单不再变化，每次快照只序列化上次快照之后新增的订单，
+        之前的分块以字节串原样写入，快照耗时不随订单历史的增长而增加。
+        """
+        if self._order_chunk_count > len(self.order_history):
+            self._order_chunks, self._order_chunk_count = [], 0
+        if self._order_chunk_count < len(self.order_history):
+            self._order_chunks.append(pickle.dumps(self.order_history[self._order_chunk_count:],
+                                                   protocol=pickle.HIGHEST_PROTOCOL))
+            self._order_chunk_count = len(self.order_history)
+        return self._order_chunks
+    
+    def _restore_checkpoint(self, state: Dict) -> None:
+        """用快照中的对象替换引擎状态"""
+        self._order_chunks = state['order_chunks']
+        self.order_history = [order for chunk in self._order_chunks for order in pickle.loads(chunk)]
+        self._order_chunk_count = len(self.order_history)
+        self._restore_state(state)
+    
+    def _state_objects(self, schedules: Dict) -> Dict:
+        """快照中的引擎状态对象，作为一个对象图序列化，对象之间的引用在恢复后保持一致"""
+        return {
+            'portfolio': self.portfolio,
+            'open_orders': self.open_orders,
+            'indicators': self.indicators,
+            'indicator_row': self._indicator_row,
+            'metrics': self.metrics,
+            'journal': self.journal,
+            'strategies': self.strategies,
+            'strategy_indicators': self._strategy_indicators,
+            'schedules': schedules
+        }
+    
+    def _restore_state(self, state: Dict) -> None:
+        """用恢复出的状态对象替换引擎状态"""
+        self.portfolio = state['portfolio']
+        self.open_orders = state['open_orders']
+        self.indicators = state['indicators']
+        self._indicator_row = state['indicator_row']
+        self.metrics = state['metrics']
+        self.journal = state['journal']
+        self.strategies = state['strategies']
+        self._strategy_indicators = state.get('strategy_indicators', {})
+    
+    def _take_snapshot(self, start_date: datetime, end_date: datetime, vectorized: bool, bars: int,
+                       dispatched_days: int, schedules: Dict, daily_equity: List[Dict]) -> EngineSnapshot:
+        """回测暂停时的内存快照"""
+        snapshot = EngineSnapshot(
+            date=self.current_date,
+            start_date=start_date,
+            end_date=end_date,
+            vectorized=vectorized,
+            bars=bars,
+            dispatched_days=dispatched_days,
+            data_version=self.data_feed.data_version,
+            payload=dumps_state(self._state_objects(schedules), self.data_feed),
+            order_history=list(self.order_history),
+            daily_equity=list(daily_equity),
+            settings=self._engine_settings()
+        )
+        logger.info(f"Took engine snapshot on {snapshot.date} after {bars} trading days ({snapshot.size} bytes)")
+        return snapshot
+    
+    def snapshot(self, start_date: datetime, end_date: datetime, date: datetime,
+                 vectorized: bool = False) -> EngineSnapshot:
+        """回测到 date（含）收盘后拍摄快照
+        
+        回测按完整区间 [start_date, end_date] 准备（交易日历、调度计划、信号矩阵），在 date 之后暂停，
+        分叉出的分支继续回测同一区间的剩余交易日。
+        """
+        return self.execute_backtest(start_date, end_date, vectorized=vectorized, pause_at=date)['snapshot']
+    
+    def restore_snapshot(self, snapshot: EngineSnapshot) -> None:
+        """把引擎恢复为快照的一份独立副本，下一次 execute_backtest 从快照处继续
+        
+        恢复后可以在继续之前修改分支：remove_strategy / add_strategy 替换策略（新策略绑定恢复后的
+        投资组合和指标，新订阅的指标在继续时预热到快照日），close_positions 在快照日平仓。
+        """
+        state = snapshot.restore(self.data_feed)
+        self._restore_state(state)
+        self._register_feed_symbols()
+        # 快照之前成交的订单不再变化，分支共享这些订单对象
+        self.order_history = list(snapshot.order_history)
+        self._order_chunks, self._order_chunk_count = [], 0
+        self.current_date = snapshot.date
+        self._resume = {
+            'snapshot': snapshot,
+            'schedules': state['schedules'],
+            'indicator_keys': {indicator.key for indicator in self.indicators.indicators}
+        }
+    
+    def _engine_settings(self) -> Dict[str, Any]:
+        """引擎的构造设置，由快照带给分支引擎"""
+        return {
+            'verbose': self.verbose,
+            'journal_sample_every': self.journal.sample_every,
+            'risk_checker': self.risk_checker
         }
     
+    @classmethod
+    def from_snapshot(cls, snapshot: EngineSnapshot, data_feed: DataFeed,
+                      settings: Optional[Dict[str, Any]] = None) -> 'TradingEngine':
+        """由快照和数据馈送构造分支引擎
+        
+        Args:
+            snapshot: 要恢复的快照
+            data_feed: 拍摄快照时使用的数据馈送
+            settings: 引擎的构造设置，为None时沿用拍摄快照的引擎的设置（snapshot.settings）
+        """
+        settings = snapshot.settings if settings is None else settings
+        engine = cls(verbose=settings.get('verbose', False),
+                     journal_sample_every=settings.get('journal_sample_every', JOURNAL_SAMPLE_EVERY))
+        if settings.get('risk_checker') is not None:
+            engine.risk_checker = settings['risk_checker']
+        engine.initialize()
+        engine.load_data_feed(data_feed)
+        engine.restore_snapshot(snapshot)
+        return engine
+    
+    def fork(self, snapshot: EngineSnapshot) -> 'TradingEngine':
+        """由快照分叉出一个新的分支引擎
+        
+        分支与当前引擎共享只读的数据馈送和风控设置，状态为快照的独立副本，
+        调用分支的 execute_backtest（区间与快照相同）从快照日之后继续。
+        """
+        return TradingEngine.from_snapshot(snapshot, self.data_feed, self._engine_settings())
+    
+    def close_positions(self, symbols: Optional[List[str]] = None) -> int:
+        """在当前交易日（恢复快照后为快照日）平仓
+        
+        撤销这些股票的挂单，并以当日收盘价为全部持仓生成卖出订单，订单与策略的订单一样在下一交易日成交。
+        
+        Args:
+            symbols: 要平仓的股票，为None时平掉全部持仓
+        
+        Returns:
+            生成的卖出订单数
+        """
+        if self.current_date is None:
+            raise ValueError("No trading day to close positions on")
+        targets = None if symbols is None else set(symbols)
+        for order in [order for order in self.open_orders if targets is None or order.ts_code in targets]:
+            order.cancel(self.current_date, "Position closed")
+            self.open_orders.remove(order)
+        
+        prices = self._mark_prices(self.current_date)
+        batch = []
+        for idx in self.portfolio.held_ids():
+            ts_code = self.portfolio.symbols[idx]
+            if targets is not None and ts_code not in targets:
+                continue
+            batch.append((FORK_EXIT_STRATEGY_ID, {
+                'ts_code': ts_code,
+                'side': 'sell',
+                'quantity': int(self.portfolio.quantities[idx]),
+                'price': float(prices[idx]),
+                'signal_type': 'close_position'
+            }))
+        orders_before = len(self.open_orders)
+        self._process_signal_batch(batch, self.current_date)
+        return len(self.open_orders) - orders_before
+    
+    def _warm_up_indicators(self, known_keys: set) -> None:
+        """把恢复快照后新订阅的指标补齐到快照时已处理的行
+        
+        使用预计算指标时直接定位到当前行；逐行增量更新时只把新指标在历史收盘价上重放一遍，
+        已有指标的状态不变。
+        """
+        if self._indicator_row < 0:
+            return
+        if self._precomputed_indicators is not None:
+            self.indicators.seek(self._indicator_row, self._precomputed_indicators,
+                                 self.data_feed.get_bar_count_matrix())
+            return
+        new = [indicator for indicator in self.indicators.indicators if indicator.key not in known_keys]
+        if not new:
+            return
+        close = self.data_feed.get_field_matrix('close')
+        for row in range(self._indicator_row + 1):
+            mask = ~np.isnan(close[row])
+            for indicator in new:
+                indicator.update(close[row], mask)
+    
+    @staticmethod
+    def _report_progress(callback: Callable[[Dict], None], daily_equity: List[Dict], reported: int,
+                         bar: int, total: int) -> int:
+        """回调当前进度与新增的净值点，返回已推送的净值点数"""
+        callback({
+            'bars': bar,
+            'total': total,
+            'progress': bar / total if total else 1.0,
+            'date': daily_equity[-1]['date'],
+            'equity': daily_equity[-1]['equity'],
+            'equity_points': daily_equity[reported:]
+        })
+        return len(daily_equity)
+    
+    def _advance_indicators(self, date: datetime) -> None:
+        """用截至当日（含）尚未处理的收盘价更新全部订阅的指标，回测起始日之前的数据用于预热"""
+        if not self.indicators.indicators:
+            return
+        row = self.data_feed.get_date_index(date)
+        if row is None:
+            return
+        if self._precomputed_indicators is not None:
+            if row > self._indicator_row:
+                self.indicators.seek(row, self._precomputed_indicators, self.data_feed.get_bar_count_matrix())
+                self._indicator_row = row
+            return
+        close = self.data_feed.get_field_matrix('close')
+        for r in range(self._indicator_row + 1, row + 1):
+            self.indicators.update(close[r])
+        self._indicator_row = max(self._indicator_row, row)
+    
+    def _load_precomputed_indicators(self) -> Optional[Dict]:
+        """数据馈送带有持久化指标缓存时，载入全部订阅指标在全历史上的结果
+        
+        命中缓存的股票直接读取磁盘上的序列，逐日只需按行定位，不再逐行重新计算。
+        策略额外注册了数据馈送之外的股票时，列无法对齐，仍逐行增量更新。
+        """
+        if (self.data_feed.indicator_store is None or not self.indicators.indicators
+                or self.indicators.symbols != self.data_feed.get_available_stocks()):
+            return None
+        return {indicator.key: self.data_feed.get_indicator_matrix(indicator.name, 'close', **indicator.params)
+                for indicator in self.indicators.indicators}
+    
+    def _generate_signal_matrices(self, panel: MarketPanel) -> Dict[str, SignalMatrix]:
+        """调用各策略的 generate_signals 生成信号矩阵"""
+        matrices = {}
+        for strategy_id, strategy in self.strategies.items():
+            matrix = strategy.generate_signals(panel)
+            if matrix.buy.shape != panel.shape:
+                raise ValueError(f"Strategy {strategy_id} returned signal matrix of shape {matrix.buy.shape}, "
+                                 f"expected {panel.shape}")
+            matrices[strategy_id] = matrix
+            logger.info(f"Generated {matrix.signal_count} vectorized signals for strategy {strategy_id}")
+        return matrices
+    
+    def _signals_from_matrices(self, panel: MarketPanel, matrices: Dict[str, SignalMatrix],
+                               row: int) -> List[Tuple[str, Dict]]:
+        """取出信号矩阵中当日的信号，按当前持仓和现金确定下单数量"""
+        day_signals = []
+        prices = panel.close[row]
+        for strategy_id, matrix in matrices.items():
+            signals = signals_for_row(matrix, row, panel.symbols, prices, self._feed_quantities(),
+                                      self.portfolio.cash)
+            day_signals.extend((strategy_id, signal) for signal in signals)
+        return day_signals
+    
     def _process_signals(self, signals: List[Dict], date: datetime, strategy_id: str) -> None:
-        """处理交易信号，生成订单"""
-        for signal in signals:
+        """处理单个策略的交易信号，生成订单"""
+        self._process_signal_batch([(strategy_id, signal) for signal in signals], date)
+    
+    def _open_order_reservations(self) -> Tuple[float, Dict[str, int]]:
+        """计算未成交订单已占用的现金和持仓"""
+        reserved_cash = 0.0
+        reserved_shares: Dict[str, int] = {}
+        for order in self.open_orders:
+            if order.side == 'buy' and order.price is not None:
+                cost = order.price * order.quantity
+                reserved_cash += cost + max(cost * self.risk_checker.commission_rate, MIN_COMMISSION)
+            elif order.side == 'sell':
+                reserved_shares[order.ts_code] = reserved_shares.get(order.ts_code, 0) + order.quantity
+        return reserved_cash, reserved_shares
+    
+    def _process_signal_batch(self, batch: List[Tuple[str, Dict]], date: datetime) -> None:
+        """批量处理当日交易信号，生成订单
+        
+        Args:
+            batch: [(strategy_id, signal)] 列表，按策略执行顺序排列
+            date: 当前日期
+        """
+        if not batch:
+            return
+        
+        # 在整个批次上累计预占用现金和持仓，并执行仓位/现金比例限制
+        reserved_cash, reserved_shares = self._open_order_reservations()
+        check = self.risk_checker.check(
+            self.portfolio,
+            [signal for _, signal in batch],
+            mark_prices=self._mark_prices(date),
+            reserved_cash=reserved_cash,
+            reserved_shares=reserved_shares
+        )
+        
+        for i, (strategy_id, signal) in enumerate(batch):
             ts_code = signal['ts_code']
             side = signal['side']
-            quantity = signal['quantity']
-            price = signal.get('price')
-            signal_type = signal.get('signal_type', 'unknown')
             
-            # 验证交易数量
-            if quantity < MIN_TRADE_QUANTITY:
-                logger.warning(f"Order quantity below minimum: {quantity}")
+            if not check.accepted[i]:
+                self.journal.record(JOURNAL_EVENT_SIGNAL_REJECTED, date, ts_code, strategy_id, side,
+                                    signal['quantity'], signal.get('price'), self.portfolio.cash)
+                if self.verbose:
+                    logger.warning(f"Signal rejected ({check.reasons[i]}): {side} {ts_code} - "
+                                   f"{signal['quantity']} shares")
                 continue
             
+            quantity = int(check.quantities[i])
+            price = signal.get('price')
+            
             # 创建订单
             order = Order(
                 order_id=f"{date.strftime('%Y%m%d')}_{strategy_id}_{len(self.open_orders) + 1}",
@@ -151,23 +845,16 @@ class TradingEngine:
                 side=side,
                 quantity=quantity,
                 price=price,
-                signal_type=signal_type,
+                signal_type=signal.get('signal_type', 'unknown'),
                 created_at=date
             )
             
-            # 检查是否可以执行订单
-            if side == 'buy':
-                if not self.portfolio.can_buy(ts_code, quantity, price):
-                    logger.warning(f"Insufficient cash for buy order: {ts_code} - {quantity} shares")
-                    continue
-            elif side == 'sell':
-                if not self.portfolio.can_sell(ts_code, quantity):
-                    logger.warning(f"Insufficient shares for sell order: {ts_code} - {quantity} shares")
-                    continue
-            
             # 添加到订单列表
             self.open_orders.append(order)
-            logger.info(f"Created {side} order: {ts_code} - {quantity} shares at {price}")
+            self.journal.record(JOURNAL_EVENT_ORDER_CREATED, date, ts_code, strategy_id, side,
+                                quantity, price, self.portfolio.cash)
+            if self.verbose:
+                logger.info(f"Created {side} order: {ts_code} - {quantity} shares at {price}")
     
     def _process_orders(self, date: datetime) -> None:
         """处理订单（模拟订单成交）"""
@@ -175,16 +862,27 @@ class TradingEngine:
         
         for order in self.open_orders:
             try:
+                # 更新投资组合，成交失败的订单直接拒绝
+                if order.side == 'buy':
+                    executed = self.portfolio.buy(order.ts_code, order.quantity, order.price)
+                else:
+                    executed = self.portfolio.sell(order.ts_code, order.quantity, order.price)
+                
+                if not executed:
+                    order.reject("Portfolio rejected the trade")
+                    orders_to_remove.append(order)
+                    self.journal.record(JOURNAL_EVENT_ORDER_REJECTED, date, order.ts_code, order.strategy_id,
+                                        order.side, order.quantity, order.price, self.portfolio.cash)
+                    continue
+                
                 # 模拟订单成交
                 order.fill(date, order.price)
-                
-                # 更新投资组合
-                if order.side == 'buy':
-                    self.portfolio.buy(order.ts_code, order.quantity, order.price)
-                elif order.side == 'sell':
-                    self.portfolio.sell(order.ts_code, order.quantity, order.price)
+                self._day_traded_value += order.quantity * order.filled_price
+                self.journal.record(JOURNAL_EVENT_ORDER_FILLED, date, order.ts_code, order.strategy_id,
+                                    order.side, order.quantity, order.filled_price, self.portfolio.cash)
                 
                 # 通知策略订单成交
+                self._filled_strategies.add(order.strategy_id)
                 if order.strategy_id in self.strategies:
                     self.strategies[order.strategy_id].on_order_filled(order.to_dict())
                 
@@ -198,47 +896,20 @@ class TradingEngine:
         for order in orders_to_remove:
             self.open_orders.remove(order)
     
-    def _calculate_performance_metrics(self, daily_equity: List[Dict]) -> None:
-        """计算绩效指标"""
-        df = pd.DataFrame(daily_equity)
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-        
-        # 计算收益率
-        df['returns'] = df['equity'].pct_change()
-        
-        # 累计收益
-        df['cumulative_returns'] = (1 + df['returns']).cumprod()
-        
-        # 计算基本指标
-        total_return = (df['equity'].iloc[-1] / df['equity'].iloc[0]) - 1
-        annual_return = ((1 + total_return) ** (252 / len(df))) - 1
-        
-        # 计算风险指标
-        daily_volatility = df['returns'].std()
-        annual_volatility = daily_volatility * np.sqrt(252)
-        
-        # 计算最大回撤
-        df['cumulative_max'] = df['equity'].cummax()
-        df['drawdown'] = (df['equity'] - df['cumulative_max']) / df['cumulative_max']
-        max_drawdown = df['drawdown'].min()
-        
-        # 计算夏普比率（假设无风险利率为3%）
-        risk_free_rate = 0.03
-        sharpe_ratio = (annual_return - risk_free_rate) / annual_volatility if annual_volatility != 0 else 0
-        
-        # 计算索提诺比率
-        downside_returns = df['returns'][df['returns'] < 0]
-        downside_deviation = downside_returns.std() * np.sqrt(252)
-        sortino_ratio = (annual_return - risk_free_rate) / downside_deviation if downside_deviation != 0 else 0
-        
+    def _calculate_performance_metrics(self) -> None:
+        """汇总绩效指标（收益/风险指标取自在线累加器，无需再遍历净值曲线）"""
+        snapshot = self.metrics.snapshot()
         self.performance_metrics = {
-            'total_return': total_return,
-            'annual_return': annual_return,
-            'annual_volatility': annual_volatility,
-            'max_drawdown': max_drawdown,
-            'sharpe_ratio': sharpe_ratio,
-            'sortino_ratio': sortino_ratio,
+            'total_return': snapshot['total_return'],
+            'annual_return': snapshot['annual_return'],
+            'annual_volatility': snapshot['annual_volatility'],
+            'max_drawdown': snapshot['max_drawdown'],
+            'sharpe_ratio': snapshot['sharpe_ratio'],
+            'sortino_ratio': snapshot['sortino_ratio'],
+            'downside_deviation': snapshot['downside_deviation'],
+            'avg_exposure': snapshot['avg_exposure'],
+            'max_exposure': snapshot['max_exposure'],
+            'turnover': snapshot['turnover'],
             'trades_count': len(self.order_history),
             'win_rate': self._calculate_win_rate(),
             'profit_factor': self._calculate_profit_factor()
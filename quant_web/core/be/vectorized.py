@@ -0,0 +1,185 @@
+from dataclasses import dataclass
+from typing import Dict, List
+import numpy as np
+
+from quant_web.core.const import (
+    DEFAULT_COMMISSION_RATE,
+    MAX_CASH_RATIO,
+    MAX_POSITION_SIZE,
+    MIN_COMMISSION,
+    MIN_TRADE_QUANTITY,
+    ORDER_SIDE_BUY,
+    ORDER_SIDE_SELL,
+    SIGNAL_TYPE_ENTER,
+    SIGNAL_TYPE_EXIT,
+    STAMP_TAX_RATE,
+    TRADE_QUANTITY_MULTIPLE,
+)
+
+
+@dataclass
+class SignalMatrix:
+    """向量化模式下策略一次性生成的信号矩阵
+    
+    buy/sell 为形状 (交易日数, 股票数) 的布尔矩阵，与 MarketPanel 对齐。
+    引擎在模拟循环中按日取出一行，结合当日持仓和现金生成订单：
+        - 买入数量 = max(int(现金 * position_ratio / 收盘价), MIN_TRADE_QUANTITY)
+        - 卖出数量 = 当前全部持仓，未持仓的卖出信号忽略
+    """
+    buy: np.ndarray
+    sell: np.ndarray
+    position_ratio: float = 0.1  # 每笔买入使用当前现金的比例
+    buy_signal_type: str = SIGNAL_TYPE_ENTER
+    sell_signal_type: str = SIGNAL_TYPE_EXIT
+    buy_only_if_flat: bool = False  # 只在未持仓时买入
+    sells_first: bool = False  # 同一交易日先输出全部卖出信号再输出买入信号，否则按股票顺序交错
+    
+    def __post_init__(self):
+        if self.buy.shape != self.sell.shape:
+            raise ValueError(f"Signal matrix shape mismatch: buy {self.buy.shape}, sell {self.sell.shape}")
+    
+    @property
+    def signal_count(self) -> int:
+        return int(self.buy.sum() + self.sell.sum())
+
+
+def signals_for_row(matrix: SignalMatrix, row: int, symbols: List[str], prices: np.ndarray,
+                    held: np.ndarray, cash: float) -> List[Dict]:
+    """取出信号矩阵的一行，生成与 Strategy.on_data 格式一致的交易信号
+    
+    Args:
+        matrix: 信号矩阵
+        row: 交易日所在行
+        symbols: 股票代码列表（列顺序）
+        prices: 当日收盘价向量
+        held: 当前持仓数量向量（与列顺序对齐）
+        cash: 当前可用现金
+    
+    Returns:
+        交易信号列表
+    """
+    buy_ids = np.flatnonzero(matrix.buy[row])
+    sell_ids = np.flatnonzero(matrix.sell[row])
+    if len(buy_ids) == 0 and len(sell_ids) == 0:
+        return []
+    
+    sell_ids = sell_ids[held[sell_ids] > 0]
+    if matrix.buy_only_if_flat:
+        buy_ids = buy_ids[held[buy_ids] <= 0]
+    buy_quantities = np.maximum((cash * matrix.position_ratio / prices[buy_ids]).astype(np.int64),
+                                MIN_TRADE_QUANTITY)
+    
+    sells = [{
+        'ts_code': symbols[j],
+        'side': ORDER_SIDE_SELL,
+        'quantity': int(held[j]),
+        'price': prices[j],
+        'signal_type': matrix.sell_signal_type
+    } for j in sell_ids]
+    buys = [{
+        'ts_code': symbols[j],
+        'side': ORDER_SIDE_BUY,
+        'quantity': int(quantity),
+        'price': prices[j],
+        'signal_type': matrix.buy_signal_type
+    } for j, quantity in zip(buy_ids, buy_quantities)]
+    
+    if matrix.sells_first:
+        return sells + buys
+    # 同一股票同一天只会有一个方向的信号，按股票顺序合并
+    columns = np.concatenate([sell_ids, buy_ids])
+    merged = sells + buys
+    return [merged[k] for k in np.argsort(columns, kind='stable')]
+
+
+@dataclass
+class ColumnSimulation:
+    """逐列独立账户的模拟结果，数组的列与面板的股票一一对应"""
+    equity: np.ndarray  # 形状 (回测交易日数, 股票数) 的每日净值，该股票当日无行情时为NaN
+    trades: np.ndarray  # 成交订单数
+    win_rate: np.ndarray  # 与交易引擎口径一致的按相邻买卖订单配对的胜率
+
+
+def simulate_columns(panel, matrix: SignalMatrix, capital: float,
+                     commission_rate: float = DEFAULT_COMMISSION_RATE,
+                     max_position_size: float = MAX_POSITION_SIZE,
+                     max_cash_ratio: float = MAX_CASH_RATIO) -> ColumnSimulation:
+    """把面板的每一列（每只股票）当作一个独立账户，同时模拟全部股票
+    
+    每只股票有自己的初始资金 capital，结果与只含这一只股票、初始资金为 capital 的交易引擎
+    向量化回测一致：当日先按上一交易日的挂单价格成交（资金或持仓不足时拒绝），
+    再取出当日信号，按 BatchRiskChecker 的单股仓位和单笔现金比例上限确定买入数量，
+    挂单次日成交；净值按当日收盘价盯市。只在股票有行情的交易日推进该股票的状态。
+    
+    逐日循环只有交易日一层，每一步都是对全部股票的向量运算，与股票数量基本无关。
+    
+    Args:
+        panel: 行情面板，回测从 panel.start_row 开始
+        matrix: 策略生成的信号矩阵
+        capital: 每只股票的初始资金
+    """
+    close = panel.close
+    valid = panel.valid
+    n_rows, n = panel.shape
+    cash = np.full(n, float(capital))
+    held = np.zeros(n, dtype=np.int64)
+    pending_side = np.zeros(n, dtype=np.int8)
+    pending_quantity = np.zeros(n, dtype=np.int64)
+    pending_price = np.zeros(n)
+    trades = np.zeros(n, dtype=np.int64)
+    wins = np.zeros(n, dtype=np.int64)
+    pair_side = np.zeros(n, dtype=np.int8)
+    pair_price = np.zeros(n)
+    equity = np.full((n_rows - panel.start_row, n), np.nan)
+    
+    for row in range(panel.start_row, n_rows):
+        active = valid[row]
+        
+        # 上一交易日的挂单按挂单价格成交
+        value = pending_quantity * pending_price
+        commission = np.maximum(value * commission_rate, MIN_COMMISSION)
+        bought = active & (pending_side > 0) & (cash >= value + commission)
+        sold = active & (pending_side < 0) & (held > 0) & (held >= pending_quantity)
+        cash[bought] -= (value + commission)[bought]
+        held[bought] += pending_quantity[bought]
+        cash[sold] += (value - commission - value * STAMP_TAX_RATE)[sold]
+        held[sold] -= pending_quantity[sold]
+        
+        # 胜率按成交顺序两两配对（买入在前、卖出在后且卖价更高计为盈利）
+        filled = bought | sold
+        side = np.where(bought, 1, -1).astype(np.int8)
+        opening = filled & (trades % 2 == 0)
+        closing = filled & (trades % 2 == 1)
+        wins[closing & (pair_side > 0) & (side < 0) & (pending_price > pair_price)] += 1
+        pair_side[opening] = side[opening]
+        pair_price[opening] = pending_price[opening]
+        trades[filled] += 1
+        pending_side[active] = 0
+        
+        # 当日信号
+        prices = close[row]
+        safe_prices = np.where(active & (prices > 0), prices, 1.0)
+        sell = matrix.sell[row] & active & (held >= MIN_TRADE_QUANTITY) & (prices > 0)
+        buy = matrix.buy[row] & active & (prices > 0)
+        if matrix.buy_only_if_flat:
+            buy &= held <= 0
+        requested = np.maximum((cash * matrix.position_ratio / safe_prices).astype(np.int64), MIN_TRADE_QUANTITY)
+        cash_capped = np.floor(max_cash_ratio * np.maximum(cash, 0.0) / safe_prices)
+        headroom = np.maximum(np.floor(max_position_size * (cash + held * safe_prices) / safe_prices) - held, 0)
+        allowed = np.minimum(np.minimum(requested, cash_capped), headroom).astype(np.int64)
+        quantity = np.where(allowed < requested,
+                            (allowed // TRADE_QUANTITY_MULTIPLE) * TRADE_QUANTITY_MULTIPLE, requested)
+        cost = quantity * safe_prices
+        cost = cost + np.maximum(cost * commission_rate, MIN_COMMISSION)
+        buy &= (quantity >= MIN_TRADE_QUANTITY) & (cost <= cash + 1e-9)
+        
+        pending_side[buy] = 1
+        pending_side[sell] = -1
+        pending_quantity[buy] = quantity[buy]
+        pending_quantity[sell] = held[sell]
+        pending_price[buy | sell] = prices[buy | sell]
+        
+        equity[row - panel.start_row, active] = (cash + held * safe_prices)[active]
+    
+    win_rate = np.where(trades >= 2, wins / np.maximum(trades // 2, 1), 0.0)
+    return ColumnSimulation(equity=equity, trades=trades, win_rate=win_rate)
@@ -0,0 +1,222 @@
+from dataclasses import dataclass
+from functools import partial
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from loguru import logger
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.metrics import StreamingMetrics
+from quant_web.core.be.panel import MarketPanel
+from quant_web.core.be.strategy import StrategyFactory
+from quant_web.core.be.sweep import (
+    PoolRunner,
+    _init_worker,
+    _run_combination,
+    check_rank_metric,
+    expand_grid,
+    process_pool,
+    rank_results,
+)
+from quant_web.core.const import (
+    DEFAULT_INITIAL_CASH,
+    SWEEP_MAX_COMBINATIONS,
+    SWEEP_MAX_WORKERS,
+    SWEEP_RANK_METRIC,
+    WALK_FORWARD_IN_SAMPLE_BARS,
+    WALK_FORWARD_OUT_SAMPLE_BARS,
+)
+
+
+@dataclass
+class WalkForwardFold:
+    """walk-forward 的一个窗口：在样本内优化参数，在紧随其后的样本外区间检验"""
+    index: int
+    in_sample_start: datetime
+    in_sample_end: datetime
+    out_sample_start: datetime
+    out_sample_end: datetime
+
+
+def split_windows(dates: pd.DatetimeIndex, in_sample_bars: int, out_sample_bars: int,
+                  anchored: bool = False) -> List[WalkForwardFold]:
+    """按交易日切分滚动的样本内/样本外窗口
+    
+    每个窗口向后滚动 out_sample_bars 个交易日，样本外区间首尾相接、互不重叠，
+    最后一个样本外区间不足 out_sample_bars 时截断到数据末尾。
+    
+    Args:
+        dates: 交易日序列
+        in_sample_bars: 样本内交易日数
+        out_sample_bars: 样本外交易日数
+        anchored: 为True时样本内区间始终从第一个交易日开始（扩展窗口）
+    """
+    if in_sample_bars <= 0 or out_sample_bars <= 0:
+        raise ValueError("in_sample_bars and out_sample_bars must be positive")
+    
+    folds = []
+    offset = 0
+    while offset + in_sample_bars < len(dates):
+        in_start = 0 if anchored else offset
+        out_start = offset + in_sample_bars
+        out_end = min(out_start + out_sample_bars, len(dates)) - 1
+        folds.append(WalkForwardFold(
+            index=len(folds),
+            in_sample_start=dates[in_start].to_pydatetime(),
+            in_sample_end=dates[out_start - 1].to_pydatetime(),
+            out_sample_start=dates[out_start].to_pydatetime(),
+            out_sample_end=dates[out_end].to_pydatetime()
+        ))
+        offset += out_sample_bars
+    return folds
+
+
+def _run_fold(fold: WalkForwardFold, strategy_name: str, combinations: List[Dict[str, Any]],
+              initial_cash: float, vectorized: bool, rank_by: str, ascending: bool,
+              data_feed: Optional[DataFeed] = None) -> Dict[str, Any]:
+    """在样本内回测全部参数组合选出最优参数，再用最优参数回测样本外区间"""
+    in_sample = [
+        _run_combination(index, strategy_name, parameters, fold.in_sample_start, fold.in_sample_end,
+                         initial_cash, vectorized, data_feed)
+        for index, parameters in enumerate(combinations)
+    ]
+    best = rank_results(in_sample, rank_by, ascending)[0]
+    if best['error']:
+        raise RuntimeError(f"All parameter combinations failed in fold {fold.index}: {best['error']}")
+    
+    out_sample = _run_combination(best['index'], strategy_name, best['params'], fold.out_sample_start,
+                                  fold.out_sample_end, initial_cash, vectorized, data_feed, keep_equity=True)
+    if out_sample['error']:
+        raise RuntimeError(f"Out-of-sample run failed in fold {fold.index}: {out_sample['error']}")
+    
+    return {
+        'fold': fold.index,
+        'in_sample_start': fold.in_sample_start,
+        'in_sample_end': fold.in_sample_end,
+        'out_sample_start': fold.out_sample_start,
+        'out_sample_end': fold.out_sample_end,
+        'best_params': best['params'],
+        'in_sample_metric': best[rank_by],
+        'out_sample_metrics': {k: v for k, v in out_sample.items()
+                               if k not in ('index', 'params', 'error', 'equity_curve')},
+        'equity_curve': out_sample['equity_curve']
+    }
+
+
+class WalkForwardOptimizer(PoolRunner):
+    """walk-forward 优化
+    
+    将历史切分为滚动的样本内/样本外窗口，每个窗口在样本内对参数网格寻优，
+    以最优参数在样本外回测，最后把各窗口的样本外净值曲线按收益率首尾拼接。
+    
+    相邻窗口的样本内区间大量重叠，为避免逐窗口重复计算：
+        - 行情数据与价格矩阵只加载构建一次，各窗口回测都是同一份矩阵上的切片；
+        - 指标只依赖截至当日的数据，每个参数组合的指标在全历史上计算一次并缓存在数据馈送上，
+          各窗口直接截取前缀（见 DataFeed.get_indicator_matrix）；
+        - 预计算完成后数据馈送随进程池初始化分发给工作进程，各窗口在多核上并行执行。
+    """
+    
+    task_name = 'walk-forward optimization'
+    prebuild_matrices = True
+    
+    def __init__(self, strategy_name: str, param_grid: Dict[str, List[Any]], stock_pool: List[str],
+                 start_date: datetime, end_date: datetime,
+                 in_sample_bars: int = WALK_FORWARD_IN_SAMPLE_BARS,
+                 out_sample_bars: int = WALK_FORWARD_OUT_SAMPLE_BARS, anchored: bool = False,
+                 rank_by: str = SWEEP_RANK_METRIC, ascending: bool = False,
+                 initial_cash: float = DEFAULT_INITIAL_CASH, max_workers: Optional[int] = None,
+                 vectorized: bool = True, data_feed: Optional[DataFeed] = None):
+        """
+        Args:
+            strategy_name: 策略名称
+            param_grid: 参数网格，参数名 -> 候选值列表
+            start_date: 历史数据开始日期
+            end_date: 历史数据结束日期
+            in_sample_bars: 样本内交易日数
+            out_sample_bars: 样本外交易日数，也是窗口滚动的步长
+            anchored: 样本内区间是否固定从第一个交易日开始
+            rank_by: 样本内选择参数所用的绩效指标（SWEEP_RESULT_METRICS 之一）
+            ascending: 是否按指标升序选择
+            initial_cash: 每个区间回测的初始资金
+            vectorized: 策略支持时使用向量化回测模式
+            其余参数见 PoolRunner，工作进程数上限为 SWEEP_MAX_WORKERS
+        """
+        super().__init__(stock_pool, start_date, end_date, max_workers, SWEEP_MAX_WORKERS, data_feed)
+        self.strategy_name = strategy_name
+        self.param_grid = param_grid
+        self.in_sample_bars = in_sample_bars
+        self.out_sample_bars = out_sample_bars
+        self.anchored = anchored
+        self.rank_by = check_rank_metric(rank_by)
+        self.ascending = ascending
+        self.initial_cash = initial_cash
+        self.vectorized = vectorized
+    
+    def _precompute_indicators(self, data_feed: DataFeed, combinations: List[Dict[str, Any]]) -> None:
+        """在全历史面板上为每个参数组合生成一次信号，把所需指标写入数据馈送的缓存"""
+        if not self.vectorized:
+            return
+        panel = MarketPanel.from_data_feed(data_feed, end_date=self.end_date)
+        for parameters in combinations:
+            strategy = StrategyFactory.create(self.strategy_name, f"{self.strategy_name}_warmup")
+            strategy.set_parameters(parameters)
+            if not strategy.supports_vectorized:
+                return
+            strategy.generate_signals(panel)
+    
+    def run(self) -> Dict[str, Any]:
+        """执行 walk-forward 优化
+        
+        Returns:
+            包含各窗口结果 folds、拼接后的样本外净值曲线 equity_curve 及其绩效指标 performance_metrics
+        """
+        combinations = expand_grid(self.param_grid)
+        if len(combinations) > SWEEP_MAX_COMBINATIONS:
+            raise ValueError(f"Parameter grid has {len(combinations)} combinations, "
+                             f"exceeding the limit of {SWEEP_MAX_COMBINATIONS}")
+        
+        data_feed = self.load_data()
+        dates = data_feed.get_dates()
+        dates = dates[(dates >= pd.Timestamp(self.start_date)) & (dates <= pd.Timestamp(self.end_date))]
+        folds = split_windows(dates, self.in_sample_bars, self.out_sample_bars, self.anchored)
+        if not folds:
+            raise ValueError(f"Not enough data for walk-forward: {len(dates)} bars, "
+                             f"in-sample window needs more than {self.in_sample_bars}")
+        
+        self._precompute_indicators(data_feed, combinations)
+        workers = min(self.max_workers, len(folds))
+        logger.info(f"Walk-forward {self.strategy_name}: {len(folds)} folds x {len(combinations)} combinations "
+                    f"with {workers} workers")
+        
+        run_fold = partial(_run_fold, strategy_name=self.strategy_name, combinations=combinations,
+                           initial_cash=self.initial_cash, vectorized=self.vectorized,
+                           rank_by=self.rank_by, ascending=self.ascending)
+        if workers <= 1:
+            results = [run_fold(fold, data_feed=data_feed) for fold in folds]
+        else:
+            # 工作进程从初始化时收到的数据馈送（含预计算的指标缓存）上运行各窗口
+            with process_pool(workers, _init_worker, (data_feed,)) as executor:
+                results = list(executor.map(run_fold, folds))
+        
+        equity_curve, metrics = self._stitch(results)
+        return {
+            'folds': [{k: v for k, v in result.items() if k != 'equity_curve'} for result in results],
+            'equity_curve': equity_curve,
+            'performance_metrics': metrics
+        }
+    
+    def _stitch(self, results: List[Dict[str, Any]]):
+        """按收益率首尾拼接各窗口的样本外净值：每个窗口从上一窗口的期末净值开始复利"""
+        metrics = StreamingMetrics()
+        equity_curve = []
+        scale = 1.0
+        for result in results:
+            curve = result['equity_curve']
+            for date, equity in curve:
+                value = equity * scale
+                equity_curve.append({'date': date, 'equity': value})
+                metrics.update(value, date)
+            if curve:
+                scale *= curve[-1][1] / self.initial_cash
+        return equity_curve, metrics.snapshot()
@@ -21,6 +21,68 @@ MAX_POSITION_SIZE = 0.3  # 单个股票最大仓位比例
 MAX_CASH_RATIO = 0.2  # 最大现金比例
 SLIPPAGE_RATE = 0.001  # 滑点率（0.1%）
 COMMISSION_RATE = 0.0002  # 佣金率（0.02%）
+PORTFOLIO_INITIAL_CAPACITY = 64  # 持仓向量初始容量（股票数）
+
+# 参数扫描相关
+SWEEP_MAX_WORKERS = 8  # 参数扫描默认最大工作进程数
+POOL_START_METHOD = 'forkserver'  # 工作进程的启动方式，不可用时改用 spawn；服务进程有多个线程，不能直接 fork
+SWEEP_MAX_COMBINATIONS = 1000  # 单次参数扫描允许的最大参数组合数
+SWEEP_RANK_METRIC = 'sharpe_ratio'  # 参数扫描结果表默认排序指标
+SWEEP_RESULT_METRICS = (  # 参数扫描结果表中保留的绩效指标
+    'total_return', 'annual_return', 'annual_volatility', 'max_drawdown',
+    'sharpe_ratio', 'sortino_ratio', 'win_rate', 'turnover', 'trades_count'
+)
+SWEEP_STREAM_TOP_N = 10  # 扫描完成消息中附带的排名靠前的组合数
+SHARD_MAX_WORKERS = 8  # 按股票分片回测默认最大工作进程数
+SHARD_DEFAULT_COUNT = 8  # 按股票分片回测默认分片数（资金账户数），固定取值使结果不随机器核数变化
+SCAN_MAX_WORKERS = 8  # 全市场逐股扫描默认最大工作进程数
+SCAN_STATS = ('total_return', 'volatility', 'sharpe_ratio', 'max_drawdown', 'win_rate')  # 逐股扫描输出的统计量（FactorModel 的输入）
+SCAN_ACTIVITY_BARS = 20  # 逐股扫描保留的最近成交量/收盘价bar数，供活跃因子使用
+SCAN_WARMUP_DAYS = 120  # 推荐任务扫描时在评估区间前额外加载的自然日数，用于指标预热
+FORK_MAX_WORKERS = 8  # 快照分叉的分支回测默认最大工作进程数
+FORK_EXIT_STRATEGY_ID = 'fork_exit'  # 分叉后平仓生成的订单所属的策略ID
+FORK_RESULT_METRICS = ('total_return', 'annual_return', 'sharpe_ratio', 'max_drawdown', 'win_rate')  # 分支比较表中保留的全区间绩效指标
+STRESS_LOOKBACK_DAYS = 250  # 压力测试历史情景与统计因子的回看交易日数
+STRESS_FACTORS = 10  # 压力测试统计因子（收益率主成分）个数
+STRESS_FACTOR_SCENARIOS = 5000  # 因子联动随机情景的默认数量
+STRESS_SECTOR_SHOCK = -0.10  # 行业冲击情景的默认收益率冲击
+STRESS_CONFIDENCE = 0.99  # 压力测试风险价值/预期损失的置信水平
+STRESS_WORST_N = 10  # 压力测试报告中列出的最差情景数
+COVARIANCE_METHOD = 'ewm'  # 协方差服务的默认估计方法：ewm（指数加权）或 rolling（滚动窗口）
+COVARIANCE_HALFLIFE = 60  # 指数加权协方差的半衰期（交易日）
+COVARIANCE_WINDOW = 250  # 滚动窗口协方差的窗口长度（交易日）
+COVARIANCE_SHRINKAGE = 'oas'  # 协方差的默认收缩估计：None、固定收缩强度或 'oas'
+COVARIANCE_RESYNC_BARS = 250  # 滚动窗口协方差增量更新多少个交易日后整体重新计算一次
+WALK_FORWARD_IN_SAMPLE_BARS = 252  # walk-forward 默认样本内窗口（交易日）
+WALK_FORWARD_OUT_SAMPLE_BARS = 63  # walk-forward 默认样本外窗口及滚动步长（交易日）
+SEARCH_ETA = 3  # 逐轮减半搜索每轮保留 1/eta 的组合，回测区间扩大 eta 倍
+SEARCH_MAX_RUNGS = 5  # 逐轮减半搜索的最多轮数
+SEARCH_STOP_MIN_BARS = 20  # 提前终止规则的预热期，也是最短的回测前缀（交易日）
+
+# 稳健性分析相关
+ROBUSTNESS_SIMULATIONS = 10000  # 蒙特卡洛模拟路径数
+ROBUSTNESS_BLOCK_SIZE = 20  # 收益率块自助法的块长度（交易日）
+ROBUSTNESS_CHUNK_SIZE = 500  # 每批计算的路径数，限制内存占用
+ROBUSTNESS_CONFIDENCE = 0.95  # 置信区间的置信水平
+ROBUSTNESS_MAX_SIMULATIONS = 100000  # 请求可指定的模拟路径数上限
+ROBUSTNESS_MAX_BLOCK_SIZE = 250  # 请求可指定的自助法块长度上限（交易日）
+
+# 交易日志相关
+JOURNAL_DIR = "data/journals"  # 交易日志默认存储目录
+JOURNAL_MAX_FILES = 500  # 交易日志目录最多保留的文件数，超出后删除最早写入的
+JOURNAL_MAX_AGE_DAYS = 30  # 交易日志文件的最长保留天数
+JOURNAL_INITIAL_CAPACITY = 4096  # 交易日志初始容量（条）
+JOURNAL_SAMPLE_EVERY = 1  # 非成交事件的抽样间隔（每N条保留1条）
+JOURNAL_EVENT_ORDER_CREATED = 1  # 订单创建
+JOURNAL_EVENT_ORDER_FILLED = 2  # 订单成交
+JOURNAL_EVENT_ORDER_REJECTED = 3  # 订单成交时被拒绝
+JOURNAL_EVENT_SIGNAL_REJECTED = 4  # 信号未通过预校验
+JOURNAL_EVENT_NAMES = {
+    JOURNAL_EVENT_ORDER_CREATED: "order_created",
+    JOURNAL_EVENT_ORDER_FILLED: "order_filled",
+    JOURNAL_EVENT_ORDER_REJECTED: "order_rejected",
+    JOURNAL_EVENT_SIGNAL_REJECTED: "signal_rejected"
+}
 
 # 策略相关常量
 STRATEGY_TIMEOUT = 60 * 60  # 策略执行超时时间（秒）
@@ -32,6 +94,17 @@ DEFAULT_END_DATE = "2023-12-31"
 MAX_BATCH_SIZE = 100  # 批量数据加载的最大数量
 CACHE_EXPIRY = 3600  # 缓存过期时间（秒）
 
+# 数据集版本与回测结果缓存
+DATA_VERSION_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'amount')  # 参与数据集版本摘要的字段
+DATA_VERSION_LENGTH = 16  # 数据集版本号长度（十六进制字符）
+RESULT_CACHE_DIR = "data/results"  # 回测结果缓存目录
+RESULT_CACHE_MAX_ENTRIES = 256  # 结果缓存最多保留的条目数（按最近使用淘汰）
+RESULT_CACHE_VERSION = 1  # 结果缓存格式/引擎口径版本，回测语义变化时递增使旧缓存全部失效
+INDICATOR_CACHE_DIR = "data/indicators"  # 按股票持久化的指标序列缓存目录
+INDICATOR_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 指标缓存的磁盘占用上限（字节），超出后按最近使用淘汰
+CHECKPOINT_DIR = "data/checkpoints"  # 长时间回测的断点快照目录
+CHECKPOINT_EVERY = 250  # 每隔多少个交易日保存一次回测快照
+
 # 订单相关常量
 ORDER_TYPES = ['market', 'limit', 'stop', 'stop_limit']
 ORDER_SIDES = ['buy', 'sell']
@@ -41,6 +114,13 @@ ORDER_STATUS_FILLED = "filled"
 ORDER_STATUS_CANCELLED = "cancelled"
 ORDER_STATUS_REJECTED = "rejected"
 
+# 批量风控预校验的拒绝原因
+RISK_REJECT_INVALID_SIGNAL = "invalid_signal"  # 方向或价格无效
+RISK_REJECT_BELOW_MIN_QUANTITY = "below_min_quantity"  # 低于最小交易数量
+RISK_REJECT_INSUFFICIENT_SHARES = "insufficient_shares"  # 可卖持仓不足
+RISK_REJECT_POSITION_LIMIT = "position_limit"  # 超出仓位或现金使用比例上限
+RISK_REJECT_INSUFFICIENT_CASH = "insufficient_cash"  # 可用现金不足
+
 # 交易方向常量
 ORDER_SIDE_BUY = "buy"
 ORDER_SIDE_SELL = "sell"
@@ -48,6 +128,9 @@ ORDER_SIDE_SELL = "sell"
 # 性能指标相关常量
 RISK_FREE_RATE = 0.03  # 无风险利率
 TRADING_DAYS_PER_YEAR = 252  # 每年交易日数量
+CALENDAR_DAYS_PER_YEAR = 365  # 每年自然日数量（按自然日推进的回测用于年化）
+METRICS_STREAM_INTERVAL = 20  # 回测中推送实时绩效指标的间隔（bar数）
+PROGRESS_STREAM_INTERVAL = 0.2  # 回测中推送逐日进度的最小间隔（秒）
 
 # 滑点范围配置
 SLIP_RANGE = [-0.0005, 0.0005]  # 滑点范围（-0.05% 到 0.05%）
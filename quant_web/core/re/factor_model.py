@@ -129,13 +129,13 @@ class FactorModel:
     
     def _calc(self, factor_name: str, stock: str, results: List[Dict]) -> float:
         """计算特定因子的值"""
-        if factor_name == '收益因子':
+        if factor_name in ('收益因子', 'return'):
             return self._calc_returns_factor(stock, results)
-        elif factor_name == '稳定因子':
+        elif factor_name in ('稳定因子', 'stability'):
             return self._calc_stability_factor(stock, results)
-        elif factor_name == '活跃因子':
+        elif factor_name in ('活跃因子', 'active'):
             return self._calc_activity_factor(stock, results)
-        elif factor_name == '质量因子':
+        elif factor_name in ('质量因子', 'quality'):
             return self._calc_quality_factor(stock, results)
         else:
             logger.error(f"未知因子: {factor_name}")
@@ -0,0 +1,203 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.panel import MarketPanel
+from quant_web.core.be.sharding import partition
+from quant_web.core.be.strategy import StrategyFactory
+from quant_web.core.be.sweep import PoolRunner, process_pool
+from quant_web.core.be.vectorized import simulate_columns
+from quant_web.core.const import (
+    DEFAULT_INITIAL_CASH,
+    RISK_FREE_RATE,
+    SCAN_ACTIVITY_BARS,
+    SCAN_MAX_WORKERS,
+    SCAN_STATS,
+    TRADING_DAYS_PER_YEAR,
+)
+
+
+def _compact(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """把每列的有效值（非NaN）保持原顺序移到列首，NaN 移到列尾，返回 (移动后的矩阵, 每列的有效值个数)"""
+    missing = np.isnan(matrix)
+    order = np.argsort(missing, axis=0, kind='stable')
+    return np.take_along_axis(matrix, order, axis=0), (~missing).sum(axis=0)
+
+
+def column_stats(equity: np.ndarray) -> Dict[str, np.ndarray]:
+    """按列计算净值矩阵的绩效统计，NaN（该股票无行情的交易日）不参与计算
+    
+    所有统计量都在整个矩阵上沿 axis=0 计算，不逐列循环。
+    收益率、波动率（年化）、夏普比率的口径与 StreamingMetrics 一致；
+    最大回撤取正值（回撤幅度），与 FactorModel 的质量因子约定一致。
+    """
+    n = equity.shape[1]
+    if len(equity) == 0:
+        return {name: np.zeros(n) for name in ('total_return', 'volatility', 'sharpe_ratio', 'max_drawdown')}
+    values, counts = _compact(equity)
+    first = values[0]
+    last = np.take_along_axis(values, np.maximum(counts - 1, 0)[np.newaxis, :], axis=0)[0]
+    valid = (counts > 0) & (first != 0)
+    
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        total_return = np.where(valid, last / first - 1, 0.0)
+        annual_return = np.where(total_return <= -1, -1.0,
+                                 (1 + total_return) ** (TRADING_DAYS_PER_YEAR / np.maximum(counts, 1)) - 1)
+        # 相邻两个有效值之间的收益率，前一日净值为0的不计入
+        previous, current = values[:-1], values[1:]
+        used = ~np.isnan(current) & (previous != 0)
+        returns = np.where(used, current / previous - 1, 0.0)
+        used_count = used.sum(axis=0)
+        mean = returns.sum(axis=0) / np.maximum(used_count, 1)
+        variance = np.where(used, returns - mean, 0.0)
+        variance = (variance * variance).sum(axis=0) / np.maximum(used_count - 1, 1)
+        volatility = np.where(valid & (used_count >= 2), np.sqrt(variance) * np.sqrt(TRADING_DAYS_PER_YEAR), 0.0)
+        sharpe_ratio = np.where(volatility > 0, (annual_return - RISK_FREE_RATE) / volatility, 0.0)
+        peaks = np.fmax.accumulate(values, axis=0)
+        drawdowns = np.where(np.isnan(values), 0.0, (values - peaks) / peaks)
+        max_drawdown = np.where(valid, -drawdowns.min(axis=0), 0.0)
+    return {
+        'total_return': total_return,
+        'volatility': volatility,
+        'sharpe_ratio': sharpe_ratio,
+        'max_drawdown': max_drawdown
+    }
+
+
+def _recent(matrix: np.ndarray, bars: int) -> np.ndarray:
+    """每只股票最近 bars 个有效值，形状 (股票数, bars)，不足的部分在前面补NaN"""
+    if len(matrix) == 0:
+        return np.full((matrix.shape[1], bars), np.nan)
+    values, counts = _compact(matrix)
+    rows = counts[:, np.newaxis] - bars + np.arange(bars)
+    recent = values[np.clip(rows, 0, len(values) - 1), np.arange(matrix.shape[1])[:, np.newaxis]]
+    return np.where(rows >= 0, recent, np.nan)
+
+
+@dataclass
+class ScanResult:
+    """全市场逐股扫描结果（列式存储）
+    
+    stats[策略名][统计量] 是按 symbols 顺序排列的数组；volume 和 close 是每只股票
+    最近 SCAN_ACTIVITY_BARS 个交易日的成交量和收盘价，供活跃因子使用。
+    """
+    symbols: List[str]
+    stats: Dict[str, Dict[str, np.ndarray]]
+    volume: np.ndarray
+    close: np.ndarray
+    
+    @classmethod
+    def concat(cls, parts: List['ScanResult']) -> 'ScanResult':
+        """按顺序拼接各分片的扫描结果"""
+        strategies = list(parts[0].stats) if parts else []
+        return cls(
+            symbols=[symbol for part in parts for symbol in part.symbols],
+            stats={name: {stat: np.concatenate([part.stats[name][stat] for part in parts]) for stat in SCAN_STATS}
+                   for name in strategies},
+            volume=np.vstack([part.volume for part in parts]) if parts else np.empty((0, SCAN_ACTIVITY_BARS)),
+            close=np.vstack([part.close for part in parts]) if parts else np.empty((0, SCAN_ACTIVITY_BARS))
+        )
+    
+    def to_frame(self, strategy: str) -> pd.DataFrame:
+        """单个策略的统计表，以股票代码为索引"""
+        return pd.DataFrame(self.stats[strategy], index=self.symbols, columns=list(SCAN_STATS))
+    
+    def to_factor_results(self) -> List[Dict[str, Any]]:
+        """转换为 FactorModel 使用的结果列表：每个策略一项 {'stocks': {股票代码: 统计量}}"""
+        results = []
+        for name, stats in self.stats.items():
+            stocks = {}
+            for j, symbol in enumerate(self.symbols):
+                entry = {stat: float(stats[stat][j]) for stat in SCAN_STATS}
+                volume = self.volume[j][~np.isnan(self.volume[j])]
+                close = self.close[j][~np.isnan(self.close[j])]
+                entry['volume'] = volume.tolist()
+                entry['price_changes'] = (np.diff(close) / close[:-1]).tolist()
+                stocks[symbol] = entry
+            results.append({'strategy': name, 'stocks': stocks})
+        return results
+
+
+def _scan_shard(data_feed: DataFeed, strategies: Dict[str, Dict[str, Any]], start_date: datetime,
+                end_date: datetime, capital: float) -> ScanResult:
+    """在一个分片的全部股票上运行每个策略"""
+    panel = MarketPanel.from_data_feed(data_feed, start_date, end_date)
+    stats = {}
+    for name, parameters in strategies.items():
+        strategy = StrategyFactory.create(name, f"{name}_scan")
+        strategy.set_parameters(parameters)
+        simulation = simulate_columns(panel, strategy.generate_signals(panel), capital)
+        stats[name] = column_stats(simulation.equity)
+        stats[name]['win_rate'] = simulation.win_rate
+    return ScanResult(
+        symbols=list(panel.symbols),
+        stats=stats,
+        volume=_recent(panel['volume'], SCAN_ACTIVITY_BARS),
+        close=_recent(panel.close, SCAN_ACTIVITY_BARS)
+    )
+
+
+class UniverseScan(PoolRunner):
+    """全市场逐股策略扫描
+    
+    把每个已注册的逐股独立策略（Strategy.per_symbol 为True且支持向量化）分别在股票池的每只股票上回测，
+    每只股票是初始资金为 capital 的独立账户，结果与单独回测这只股票一致。
+    每个策略在面板上一次性生成全部股票的信号矩阵，再由 simulate_columns 同时模拟全部账户；
+    股票池按分片分发到进程池并行，各股票互不影响，结果与分片方式无关。
+    """
+    
+    task_name = 'universe scan'
+    
+    def __init__(self, stock_pool: List[str], start_date: datetime, end_date: datetime,
+                 strategies: Optional[Dict[str, Dict[str, Any]]] = None, capital: float = DEFAULT_INITIAL_CASH,
+                 max_workers: Optional[int] = None, data_feed: Optional[DataFeed] = None):
+        """
+        Args:
+            start_date: 回测开始日期，之前已加载的数据用于计算指标
+            strategies: 策略名 -> 参数，为None时扫描全部逐股独立且支持向量化的已注册策略（默认参数）
+            capital: 每只股票的初始资金
+            其余参数见 PoolRunner，工作进程数上限为 SCAN_MAX_WORKERS
+        """
+        super().__init__(stock_pool, start_date, end_date, max_workers, SCAN_MAX_WORKERS, data_feed)
+        self.strategies = strategies if strategies is not None else self.default_strategies()
+        self.capital = capital
+    
+    @staticmethod
+    def default_strategies() -> Dict[str, Dict[str, Any]]:
+        """全部逐股独立且支持向量化的已注册策略"""
+        strategies = {}
+        for name in StrategyFactory.get_available_strategies():
+            strategy = StrategyFactory.create(name, f"{name}_scan")
+            if strategy.per_symbol and strategy.supports_vectorized:
+                strategies[name] = {}
+        return strategies
+    
+    def run(self) -> ScanResult:
+        """执行扫描"""
+        for name in self.strategies:
+            strategy = StrategyFactory.create(name, f"{name}_scan")
+            if not (strategy.per_symbol and strategy.supports_vectorized):
+                raise ValueError(f"Strategy {name} cannot be scanned per symbol")
+        
+        started = time.perf_counter()
+        data_feed = self.load_data()
+        shards = partition(data_feed.get_available_stocks(), self.max_workers)
+        workers = min(self.max_workers, len(shards))
+        args = (self.strategies, self.start_date, self.end_date, self.capital)
+        if workers <= 1:
+            parts = [_scan_shard(data_feed.subset(shard), *args) for shard in shards]
+        else:
+            with process_pool(workers) as executor:
+                futures = [executor.submit(_scan_shard, data_feed.subset(shard), *args) for shard in shards]
+                parts = [future.result() for future in futures]
+        
+        result = ScanResult.concat(parts)
+        logger.info(f"Scanned {len(self.strategies)} strategies on {len(result.symbols)} stocks "
+                    f"with {workers} workers in {time.perf_counter() - started:.2f}s")
+        return result
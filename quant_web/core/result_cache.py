@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from quant_web.core.const import RESULT_CACHE_DIR, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_VERSION
+
+
+def _canonical(value: Any) -> Any:
+    """将回测输入转换为可稳定序列化的形式"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        # 1000000 与 1000000.0 视为同一输入
+        return int(value)
+    return value
+
+
+def make_run_key(strategy_name: str, parameters: Optional[Dict], stock_pool: List[str], start_date: datetime,
+                 end_date: datetime, initial_cash: float, data_version: str,
+                 options: Optional[Dict] = None) -> str:
+    """根据回测的全部输入和数据集版本生成确定性的运行键
+    
+    参数字典按键排序后序列化，股票池保持原顺序（列顺序会影响同日信号的撮合顺序）。
+    options 为影响结果内容的附加选项（如是否附带稳健性分析），值为假的选项不参与计算。
+    """
+    payload = {
+        'cache_version': RESULT_CACHE_VERSION,
+        'strategy_name': strategy_name,
+        'parameters': _canonical(parameters or {}),
+        'stock_pool': list(stock_pool),
+        'start_date': _canonical(start_date),
+        'end_date': _canonical(end_date),
+        'initial_cash': _canonical(float(initial_cash)),
+        'data_version': data_version
+    }
+    options = {k: v for k, v in (options or {}).items() if v}
+    if options:
+        payload['options'] = _canonical(options)
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """以运行键寻址的回测结果缓存
+    
+    运行键包含数据集版本，底层bar一旦变化，同样的提交会得到新的键而不会命中旧结果；
+    旧版本的结果不再被访问，按最近最少使用淘汰。结果同时保存在内存和磁盘上，服务重启后仍可命中；
+    磁盘上的条目以文件修改时间记录最近使用时间，此前进程写入的文件同样计入容量上限。
+    """
+    
+    def __init__(self, cache_dir: Optional[str] = RESULT_CACHE_DIR, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        """
+        Args:
+            cache_dir: 磁盘缓存目录，为None时只缓存在内存中
+            max_entries: 最多保留的条目数
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evict()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+    
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存结果，未命中时返回None"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._touch(key)
+                self.hits += 1
+                return self._entries[key]
+            
+            if self.cache_dir and os.path.exists(self._path(key)):
+                try:
+                    with open(self._path(key), 'rb') as f:
+                        result = pickle.load(f)
+                    self._remember(key, result)
+                    self._touch(key)
+                    self.hits += 1
+                    return result
+                except Exception as e:
+                    logger.warning(f"Failed to read cached result {key}: {str(e)}")
+            
+            self.misses += 1
+            return None
+    
+    def put(self, key: str, result: Any) -> None:
+        """写入结果"""
+        with self._lock:
+            self._remember(key, result)
+            if not self.cache_dir:
+                return
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # 先写临时文件再原子替换，避免并发读到半个文件
+                tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self._path(key))
+            except Exception as e:
+                logger.warning(f"Failed to persist cached result {key}: {str(e)}")
+            self.evict()
+    
+    def _remember(self, key: str, result: Any) -> None:
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._remove_file(evicted)
+    
+    def _touch(self, key: str) -> None:
+        """把磁盘条目的修改时间更新为当前时间，作为最近使用时间"""
+        if self.cache_dir:
+            try:
+                os.utime(self._path(key))
+            except OSError:
+                pass
+    
+    def evict(self) -> int:
+        """按文件修改时间淘汰磁盘上最近最少使用的条目，直到条目数不超过上限，返回淘汰的条目数
+        
+        按目录列表计数，包括此前进程写入而本进程从未读取的文件（如旧数据版本的结果）。
+        """
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return 0
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith('.pkl'):
+                    try:
+                        entries.append((entry.stat().st_mtime_ns, entry.name[:-4]))
+                    except OSError:
+                        continue
+            stale = sorted(entries)[:max(len(entries) - self.max_entries, 0)]
+            for _, key in stale:
+                self._entries.pop(key, None)
+                self._remove_file(key)
+            if stale:
+                logger.info(f"Evicted {len(stale)} cached results, {len(entries) - len(stale)} remain")
+            return len(stale)
+    
+    def _remove_file(self, key: str) -> None:
+        if self.cache_dir and os.path.exists(self._path(key)):
+            try:
+                os.remove(self._path(key))
+            except OSError as e:
+                logger.warning(f"Failed to remove cached result {key}: {str(e)}")
+    
+    def invalidate(self, key: str) -> bool:
+        """删除指定的缓存结果"""
+        with self._lock:
+            found = self._entries.pop(key, None) is not None
+            if self.cache_dir and os.path.exists(self._path(key)):
+                self._remove_file(key)
+                found = True
+            return found
+    
+    def clear(self) -> None:
+        """清空全部缓存"""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove_file(key)
+            self._entries.clear()
+            if self.cache_dir and os.path.isdir(self.cache_dir):
+                for name in os.listdir(self.cache_dir):
+                    if name.endswith('.pkl'):
+                        self._remove_file(name[:-4])
+    
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries or bool(self.cache_dir and os.path.exists(self._path(key)))
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 全局回测结果缓存实例
+global_result_cache = ResultCache()
@@ -126,6 +126,10 @@ class BaseTask(ABC):
         """执行任务的抽象方法"""
         pass
     
+    def load_parameters(self, parameters: Dict[str, Any]) -> None:
+        """从持久化的任务参数恢复任务，子类覆盖以还原各自的输入"""
+        self.parameters = parameters or {}
+    
     def update_progress(self, progress: float) -> None:
         """更新任务进度"""
         self.progress = min(max(0.0, progress), 1.0)
@@ -193,7 +197,7 @@ class BaseTask(ABC):
             
         task.error_message = data.get('error_message')
         task.result = json.loads(data.get('result')) if data.get('result') else None
-        task.parameters = json.loads(data.get('parameters')) if data.get('parameters') else {}
+        task.load_parameters(json.loads(data.get('parameters')) if data.get('parameters') else {})
         return task
 
 
@@ -499,8 +503,7 @@ class TaskManager:
                     completed_at=task.completed_at,
                     result=json.dumps(task.result) if task.result is not None else None,
                     error_message=task.error_message,
-                    parameters=json.dumps(task.parameters) if task.parameters else None,
-                    fail_count=getattr(task, 'fail_count', 0)
+                    parameters=json.dumps(task.parameters) if task.parameters else None
                 )
                 self.db_session.add(db_task)
             
@@ -567,9 +570,9 @@ class TaskManager:
                 
                 if db_task.parameters:
                     try:
-                        task.parameters = json.loads(db_task.parameters)
+                        task.load_parameters(json.loads(db_task.parameters))
                     except (json.JSONDecodeError, TypeError):
-                        task.parameters = {}
+                        task.load_parameters({})
                 
                 self.tasks[task_id] = task
                 return task
@@ -596,7 +599,9 @@ class TaskManager:
                     task.started_at = db_task.started_at
                     task.completed_at = db_task.completed_at
                     task.result = db_task.result
-                    task.error = db_task.error
+                    task.error_message = db_task.error_message
+                    task.load_parameters(json.loads(db_task.parameters) if db_task.parameters else {})
+                    self.tasks[task.task_id] = task
                     tasks.append(task)
             return tasks
         except Exception as e:
@@ -624,7 +629,9 @@ class TaskManager:
                     task.started_at = db_task.started_at
                     task.completed_at = db_task.completed_at
                     task.result = db_task.result
-                    task.error = db_task.error
+                    task.error_message = db_task.error_message
+                    task.load_parameters(json.loads(db_task.parameters) if db_task.parameters else {})
+                    self.tasks[task.task_id] = task
                     tasks.append(task)
             return tasks
         except Exception as e:
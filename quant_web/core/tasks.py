@@ -1,3 +1,4 @@
+import os
 import uuid
 import asyncio
 import time
@@ -5,6 +6,7 @@ import enum
 import traceback
 import random
 from datetime import datetime, timedelta
+from functools import partial
 from typing import Dict, Any, Optional, List, Callable, TypeVar, Generic
 from abc import ABC, abstractmethod
 import logging
@@ -13,6 +15,7 @@ from quant_web.core.task_manager import (
     BaseTask, TaskResult, register_task, TaskPriority,
     global_task_manager
 )
+from quant_web.core.const import CHECKPOINT_DIR, DEFAULT_INITIAL_CASH, JOURNAL_DIR, SWEEP_STREAM_TOP_N
 
 
 @register_task("simulated_download")
@@ -91,13 +94,82 @@ class BacktestTask(BaseTask):
     
     def __init__(self, task_id: str = None, strategy_config: dict = None, 
                  stock_pool: list = None, start_date: datetime = None, 
-                 end_date: datetime = None):
-        super().__init__(task_id=task_id, priority=TaskPriority.HIGH)
+                 end_date: datetime = None, initial_cash: float = DEFAULT_INITIAL_CASH,
+                 data_feed=None, run_key: str = None, priority: TaskPriority = TaskPriority.HIGH):
+        super().__init__(task_id=task_id, priority=priority)
         self.strategy_config = strategy_config or {}
         self.stock_pool = stock_pool or []
         self.start_date = start_date or (datetime.now() - timedelta(days=365))
         self.end_date = end_date or datetime.now()
+        self.initial_cash = initial_cash
+        self.data_feed = data_feed  # 提交时已加载的数据馈送，为None时在任务中加载
+        self.run_key = run_key  # 结果缓存的运行键，任务成功后以此键缓存结果
         self.queue = None
+        self.parameters = {
+            "strategy_config": self.strategy_config,
+            "stock_pool": self.stock_pool,
+            "start_date": self.start_date.isoformat(),
+            "end_date": self.end_date.isoformat(),
+            "initial_cash": self.initial_cash,
+            "run_key": self.run_key
+        }
+    
+    def load_parameters(self, parameters: dict) -> None:
+        """从持久化的参数恢复回测输入，重启后重新入队的任务据此从快照续跑"""
+        super().load_parameters(parameters)
+        self.strategy_config = parameters.get("strategy_config", self.strategy_config)
+        self.stock_pool = parameters.get("stock_pool", self.stock_pool)
+        if parameters.get("start_date"):
+            self.start_date = datetime.fromisoformat(parameters["start_date"])
+        if parameters.get("end_date"):
+            self.end_date = datetime.fromisoformat(parameters["end_date"])
+        self.initial_cash = parameters.get("initial_cash", self.initial_cash)
+        self.run_key = parameters.get("run_key", self.run_key)
+    
+    @property
+    def checkpoint_path(self) -> str:
+        """回测快照文件路径，任务中断后按任务ID找回快照"""
+        return os.path.join(CHECKPOINT_DIR, f"{self.task_id}.ckpt")
+    
+    def _progress_message(self, update: dict) -> dict:
+        """把引擎的逐日进度映射到任务进度的回测阶段（60%~90%），并生成可序列化的进度消息"""
+        progress = 0.6 + 0.3 * update["progress"]
+        self.update_progress(progress)
+        return {
+            "type": "progress",
+            "task_id": self.task_id,
+            "percent": round(progress * 100),
+            "message": f"回测计算中，已完成 {update['bars']}/{update['total']} 个交易日",
+            "progress": progress,
+            "bars": update["bars"],
+            "total": update["total"],
+            "date": update["date"].isoformat(),
+            "equity": float(update["equity"]),
+            "equity_points": [{"date": point["date"].isoformat(), "equity": float(point["equity"])}
+                              for point in update["equity_points"]],
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    def _cache_result(self, result_data: dict) -> None:
+        """按运行键缓存成功的回测结果，相同输入和数据版本的再次提交直接返回
+        
+        开启性能统计（profile）的回测提交时不查缓存，结果带有本次的耗时报告，也不写入缓存，
+        否则相同运行键下未开启性能统计的提交会命中这份结果。
+        """
+        if not self.run_key or self.strategy_config.get("profile"):
+            return
+        from quant_web.core.result_cache import global_result_cache
+        
+        result_data["run_key"] = self.run_key
+        global_result_cache.put(self.run_key, result_data)
+    
+    def _analyze_robustness(self, backtest_result: dict) -> dict:
+        """按策略配置中的 robustness 选项对回测结果做蒙特卡洛稳健性分析"""
+        from quant_web.core.be.robustness import RobustnessAnalyzer
+        
+        options = self.strategy_config.get("robustness")
+        analyzer = RobustnessAnalyzer.from_options(options) if isinstance(options, dict) else RobustnessAnalyzer()
+        return analyzer.analyze(backtest_result)
     
     def execute(self) -> TaskResult:
         """实现BaseTask的抽象方法execute
@@ -110,20 +182,20 @@ class BacktestTask(BaseTask):
             # 导入需要的模块
             from quant_web.core.be.trading_engine import TradingEngine
             from quant_web.core.be.data_feed import DataFeed
+            from quant_web.core.be.indicator_store import global_indicator_store
+            from quant_web.core.be.journal import prune_journals
             
             # 创建交易引擎
-            engine = TradingEngine()
-            engine.initialize()
-            
-            # 创建数据馈送
-            data_feed = DataFeed()
+            engine = TradingEngine(verbose=self.strategy_config.get("verbose_logging", False))
+            engine.initialize(self.initial_cash)
             
-            # 加载历史数据
+            # 加载历史数据（提交时已加载的数据直接复用）
             self.update_progress(0.2)
-            success = data_feed.load_historical_data(self.stock_pool, self.start_date, self.end_date)
-            
-            if not success:
-                raise Exception("加载历史数据失败")
+            data_feed = self.data_feed
+            if data_feed is None:
+                data_feed = DataFeed(indicator_store=global_indicator_store)
+                if not data_feed.load_historical_data(self.stock_pool, self.start_date, self.end_date):
+                    raise Exception("加载历史数据失败")
             
             # 加载数据到交易引擎
             engine.load_data_feed(data_feed)
@@ -143,7 +215,14 @@ class BacktestTask(BaseTask):
             
             # 执行回测
             self.update_progress(0.6)
-            backtest_result = engine.execute_backtest(self.start_date, self.end_date)
+            backtest_result = engine.execute_backtest(
+                self.start_date, self.end_date,
+                journal_path=os.path.join(JOURNAL_DIR, f"{self.task_id}.npz"),
+                checkpoint_path=self.checkpoint_path,
+                progress_callback=self._progress_message,
+                profile=self.strategy_config.get("profile", False)
+            )
+            prune_journals()
             
             # 准备结果
             self.update_progress(0.9)
@@ -158,6 +237,9 @@ class BacktestTask(BaseTask):
                 },
                 "stock_count": len(self.stock_pool)
             }
+            if self.strategy_config.get("robustness"):
+                result_data["robustness"] = self._analyze_robustness(backtest_result)
+            self._cache_result(result_data)
             
             result = TaskResult(success=True, data=result_data)
             self.complete(result)
@@ -185,7 +267,10 @@ class BacktestTask(BaseTask):
             # 导入需要的模块
             from quant_web.core.be.trading_engine import TradingEngine
             from quant_web.core.be.data_feed import DataFeed
+            from quant_web.core.be.indicator_store import global_indicator_store
+            from quant_web.core.be.journal import prune_journals
             from quant_web.core.exceptions import DataError, StrategyError, BacktestError
+            from quant_web.state import put_task_message
             
             # 发送结构化的开始消息
             await queue.put({
@@ -199,8 +284,8 @@ class BacktestTask(BaseTask):
             self.update_progress(0.05)
             
             # 创建交易引擎
-            engine = TradingEngine()
-            engine.initialize()
+            engine = TradingEngine(verbose=self.strategy_config.get("verbose_logging", False))
+            engine.initialize(self.initial_cash)
             logger.debug(f"Trading engine initialized for task {self.task_id}")
             
             # 发送进度消息
@@ -214,9 +299,6 @@ class BacktestTask(BaseTask):
             })
             self.update_progress(0.1)
             
-            # 创建数据馈送
-            data_feed = DataFeed()
-            
             # 加载历史数据
             await queue.put({
                 "type": "progress", 
@@ -228,14 +310,16 @@ class BacktestTask(BaseTask):
             })
             self.update_progress(0.2)
             
-            # 加载数据（这里使用同步调用但在异步环境中）
-            # 实际实现中可能需要使用asyncio.to_thread来避免阻塞
-            await asyncio.sleep(0.5)  # 短暂暂停以避免阻塞
-            
+            # 数据加载和回测计算都在线程池中执行，避免阻塞事件循环上的HTTP和WebSocket请求
+            loop = asyncio.get_running_loop()
             try:
-                success = data_feed.load_historical_data(self.stock_pool, self.start_date, self.end_date)
-                if not success:
-                    raise DataError("加载历史数据失败", details={"stock_count": len(self.stock_pool)})
+                data_feed = self.data_feed
+                if data_feed is None:
+                    data_feed = DataFeed(indicator_store=global_indicator_store)
+                    loaded = await loop.run_in_executor(
+                        None, data_feed.load_historical_data, self.stock_pool, self.start_date, self.end_date)
+                    if not loaded:
+                        raise DataError("加载历史数据失败", details={"stock_count": len(self.stock_pool)})
             except DataError:
                 raise
             except Exception as e:
@@ -294,13 +378,22 @@ class BacktestTask(BaseTask):
             })
             self.update_progress(0.6)
             
-            # 执行回测（同样，在实际实现中可能需要使用asyncio.to_thread）
+            def on_progress(update):
+                # 在回测线程中回调，转发到事件循环线程写入队列
+                loop.call_soon_threadsafe(put_task_message, queue, self._progress_message(update))
+            
             try:
-                await asyncio.sleep(0.5)
-                backtest_result = engine.execute_backtest(self.start_date, self.end_date)
+                backtest_result = await loop.run_in_executor(None, partial(
+                    engine.execute_backtest, self.start_date, self.end_date,
+                    journal_path=os.path.join(JOURNAL_DIR, f"{self.task_id}.npz"),
+                    checkpoint_path=self.checkpoint_path,
+                    progress_callback=on_progress,
+                    profile=self.strategy_config.get("profile", False)
+                ))
                 logger.debug(f"Backtest execution completed for task {self.task_id}")
             except Exception as e:
                 raise BacktestError(f"回测执行失败: {str(e)}")
+            prune_journals()
             
             # 更新进度
             await queue.put({
@@ -325,9 +418,12 @@ class BacktestTask(BaseTask):
                 },
                 "stock_count": len(self.stock_pool)
             }
+            if self.strategy_config.get("robustness"):
+                result_data["robustness"] = await loop.run_in_executor(
+                    None, self._analyze_robustness, backtest_result)
+            self._cache_result(result_data)
             
             # 完成任务
-            await asyncio.sleep(0.2)
             await queue.put({
                 "type": "done", 
                 "task_id": self.task_id, 
@@ -413,6 +509,173 @@ class BacktestTask(BaseTask):
             return error_result
 
 
+@register_task("parameter_sweep")
+class ParameterSweepTask(BaseTask):
+    """参数扫描任务类"""
+    
+    def __init__(self, task_id: str = None, strategy_name: str = "moving_average", param_grid: dict = None,
+                 stock_pool: list = None, start_date: datetime = None, end_date: datetime = None,
+                 initial_cash: float = DEFAULT_INITIAL_CASH, rank_by: str = None, max_workers: int = None,
+                 priority: TaskPriority = TaskPriority.HIGH):
+        super().__init__(task_id=task_id, priority=priority)
+        self.strategy_name = strategy_name
+        self.param_grid = param_grid or {}
+        self.stock_pool = stock_pool or []
+        self.start_date = start_date or (datetime.now() - timedelta(days=365))
+        self.end_date = end_date or datetime.now()
+        self.initial_cash = initial_cash
+        self.rank_by = rank_by
+        self.max_workers = max_workers
+        self.queue = None
+        self.parameters = {
+            "strategy_name": self.strategy_name,
+            "param_grid": self.param_grid,
+            "stock_pool": self.stock_pool,
+            "start_date": self.start_date.isoformat(),
+            "end_date": self.end_date.isoformat(),
+            "initial_cash": self.initial_cash,
+            "rank_by": self.rank_by,
+            "max_workers": self.max_workers
+        }
+    
+    def load_parameters(self, parameters: dict) -> None:
+        """从持久化的参数恢复扫描输入，重启后重新入队的任务据此重新运行"""
+        super().load_parameters(parameters)
+        self.strategy_name = parameters.get("strategy_name", self.strategy_name)
+        self.param_grid = parameters.get("param_grid", self.param_grid)
+        self.stock_pool = parameters.get("stock_pool", self.stock_pool)
+        if parameters.get("start_date"):
+            self.start_date = datetime.fromisoformat(parameters["start_date"])
+        if parameters.get("end_date"):
+            self.end_date = datetime.fromisoformat(parameters["end_date"])
+        self.initial_cash = parameters.get("initial_cash", self.initial_cash)
+        self.rank_by = parameters.get("rank_by", self.rank_by)
+        self.max_workers = parameters.get("max_workers", self.max_workers)
+    
+    def _create_sweep(self):
+        from quant_web.core.be.sweep import ParameterSweep
+        
+        kwargs = {"rank_by": self.rank_by} if self.rank_by else {}
+        return ParameterSweep(
+            strategy_name=self.strategy_name,
+            stock_pool=self.stock_pool,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            initial_cash=self.initial_cash,
+            max_workers=self.max_workers,
+            **kwargs
+        )
+    
+    def _result_data(self, sweep, table: list) -> dict:
+        return {
+            "status": "done",
+            "task_id": self.task_id,
+            "strategy_name": self.strategy_name,
+            "rank_by": sweep.rank_by,
+            "combinations": len(table),
+            "results": table,
+            "time_range": {
+                "start_date": self.start_date.isoformat(),
+                "end_date": self.end_date.isoformat()
+            },
+            "stock_count": len(self.stock_pool)
+        }
+    
+    def execute(self) -> TaskResult:
+        """在同步环境中执行参数扫描"""
+        self.start()
+        
+        try:
+            sweep = self._create_sweep()
+            table = sweep.run(self.param_grid)
+            result = TaskResult(success=True, data=self._result_data(sweep, table))
+            self.complete(result)
+            logger.info(f"Parameter sweep task {self.task_id} done, {len(table)} combinations")
+            return result
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"Error in parameter sweep task {self.task_id}: {error_msg}\n{traceback.format_exc()}")
+            error_result = TaskResult(success=False, error_message=error_msg)
+            self.complete(error_result)
+            return error_result
+    
+    async def execute_async(self, queue: asyncio.Queue) -> TaskResult:
+        """异步执行参数扫描
+        
+        扫描在线程池中运行，避免阻塞事件循环；每个参数组合完成后立即通过队列推送其结果行。
+        """
+        from quant_web.core.be.sweep import expand_grid
+        from quant_web.state import put_task_message
+        
+        self.queue = queue
+        self.start()
+        loop = asyncio.get_running_loop()
+        
+        try:
+            sweep = self._create_sweep()
+            total = len(expand_grid(self.param_grid))
+            completed = 0
+            logger.info(f"Starting parameter sweep task {self.task_id}: {self.strategy_name}, {total} combinations")
+            
+            await queue.put({
+                "type": "progress",
+                "task_id": self.task_id,
+                "percent": 0,
+                "message": f"加载行情数据，共 {total} 个参数组合...",
+                "progress": 0.0,
+                "timestamp": datetime.utcnow().isoformat()
+            })
+            
+            def on_result(row):
+                # 在扫描线程中回调，转发到事件循环线程写入队列
+                nonlocal completed
+                completed += 1
+                self.update_progress(completed / total)
+                loop.call_soon_threadsafe(put_task_message, queue, {
+                    "type": "sweep_result",
+                    "task_id": self.task_id,
+                    "completed": completed,
+                    "total": total,
+                    "percent": int(completed / total * 100),
+                    "progress": self.progress,
+                    "row": row,
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+            
+            table = await loop.run_in_executor(None, sweep.run, self.param_grid, on_result)
+            result_data = self._result_data(sweep, table)
+            
+            await queue.put({
+                "type": "done",
+                "task_id": self.task_id,
+                "message": "参数扫描完成",
+                "data": {"sweep_id": self.task_id, "rank_by": sweep.rank_by,
+                         "top": table[:SWEEP_STREAM_TOP_N]},
+                "timestamp": datetime.utcnow().isoformat()
+            })
+            
+            result = TaskResult(success=True, data=result_data)
+            self.complete(result)
+            logger.info(f"Parameter sweep task {self.task_id} completed successfully")
+            return result
+        
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"Error in parameter sweep task {self.task_id}: {error_msg}\n{traceback.format_exc()}")
+            
+            await queue.put({
+                "type": "error",
+                "task_id": self.task_id,
+                "error_code": "SWEEP_ERROR",
+                "message": f"参数扫描失败: {error_msg}",
+                "timestamp": datetime.utcnow().isoformat()
+            })
+            
+            error_result = TaskResult(success=False, error_message=error_msg)
+            self.complete(error_result)
+            return error_result
+
+
 async def start_download_simulation(task_id: str, stock_list: list[str], queue: asyncio.Queue):
     """模拟下载任务入口，使用SimulatedDownloadTask类
 
@@ -431,7 +694,8 @@ async def start_download_simulation(task_id: str, stock_list: list[str], queue:
 
 async def start_backtest_task(task_id: str, strategy_config: dict, stock_pool: list, 
                              start_date: datetime, end_date: datetime, 
-                             queue: asyncio.Queue):
+                             queue: asyncio.Queue, initial_cash: float = DEFAULT_INITIAL_CASH,
+                             data_feed=None, run_key: str = None):
     """回测任务入口，使用BacktestTask类
     
     Args:
@@ -441,6 +705,9 @@ async def start_backtest_task(task_id: str, strategy_config: dict, stock_pool: l
         start_date: 回测开始日期
         end_date: 回测结束日期
         queue: 消息队列，用于发送进度和结果
+        initial_cash: 初始资金
+        data_feed: 已加载的数据馈送
+        run_key: 结果缓存的运行键
     """
     # 创建任务实例
     task = BacktestTask(
@@ -448,11 +715,88 @@ async def start_backtest_task(task_id: str, strategy_config: dict, stock_pool: l
         strategy_config=strategy_config,
         stock_pool=stock_pool,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        initial_cash=initial_cash,
+        data_feed=data_feed,
+        run_key=run_key
     )
     
-    # 添加到全局任务管理器
+    # 先标记为运行中再加入任务管理器，避免工作线程把待执行的任务再执行一遍
+    task.start()
     global_task_manager.add_task(task)
     
     # 执行异步任务
     await task.execute_async(queue)
+
+
+def register_cached_backtest(task_id: str, strategy_config: dict, stock_pool: list, start_date: datetime,
+                             end_date: datetime, cached_result: dict, initial_cash: float = DEFAULT_INITIAL_CASH,
+                             run_key: str = None) -> BacktestTask:
+    """把命中结果缓存的回测提交登记为已完成的任务
+    
+    客户端照常用返回的 task_id 查询 /backtest/status 和 /backtest/result；
+    结果为缓存结果的副本，其中的 task_id 改为本次提交的任务ID。
+    
+    Args:
+        task_id: 任务ID
+        strategy_config: 策略配置，包含name和parameters
+        stock_pool: 股票池列表
+        start_date: 回测开始日期
+        end_date: 回测结束日期
+        cached_result: 缓存的回测结果
+        initial_cash: 初始资金
+        run_key: 结果缓存的运行键
+    """
+    task = BacktestTask(
+        task_id=task_id,
+        strategy_config=strategy_config,
+        stock_pool=stock_pool,
+        start_date=start_date,
+        end_date=end_date,
+        initial_cash=initial_cash,
+        run_key=run_key
+    )
+    
+    # 先标记为已完成再加入任务管理器，工作线程会跳过已完成的任务
+    task.start()
+    task.update_progress(1.0)
+    task.complete(TaskResult(success=True, data={**cached_result, "task_id": task_id}))
+    global_task_manager.add_task(task)
+    return task
+
+
+async def start_sweep_task(task_id: str, strategy_name: str, param_grid: dict, stock_pool: list,
+                           start_date: datetime, end_date: datetime, queue: asyncio.Queue,
+                           initial_cash: float = DEFAULT_INITIAL_CASH, rank_by: str = None,
+                           max_workers: int = None):
+    """参数扫描任务入口，使用ParameterSweepTask类
+    
+    Args:
+        task_id: 任务ID
+        strategy_name: 策略名称
+        param_grid: 参数网格，参数名 -> 候选值列表
+        stock_pool: 股票池列表
+        start_date: 回测开始日期
+        end_date: 回测结束日期
+        queue: 消息队列，用于推送每个参数组合的结果
+        initial_cash: 初始资金
+        rank_by: 结果表排序指标
+        max_workers: 工作进程数
+    """
+    task = ParameterSweepTask(
+        task_id=task_id,
+        strategy_name=strategy_name,
+        param_grid=param_grid,
+        stock_pool=stock_pool,
+        start_date=start_date,
+        end_date=end_date,
+        initial_cash=initial_cash,
+        rank_by=rank_by,
+        max_workers=max_workers
+    )
+    
+    # 先标记为运行中再加入任务管理器，避免工作线程再同步执行一遍扫描
+    task.start()
+    global_task_manager.add_task(task)
+    
+    await task.execute_async(queue)
@@ -344,26 +344,26 @@ async def websocket_tasks_endpoint(websocket: WebSocket):
         logger.info(f"WebSocket tasks connection {connection_id} closed")
 
 
-    @app.websocket("/ws/{task_id}")
-    async def websocket_endpoint(websocket: WebSocket, task_id: str):
-        """单任务WebSocket端点 - 性能优化版"""
-        await websocket.accept()
-        
-        # 使用线程安全的函数获取队列
-        q = get_task_queue(task_id)
-        
-        # 检查任务是否存在（通过检查队列中是否有数据）
-        if q.empty() and task_id not in task_last_activity:
-            # 如果没有活动记录且队列为空，认为任务不存在
-            error_response = {
-                "type": "error", 
-                "error_code": "TASK_NOT_FOUND",
-                "message": "Task not found", 
-                "task_id": task_id,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            await websocket.send_json(error_response)
-            await websocket.close(code=1008)
+@app.websocket("/ws/{task_id}")
+async def websocket_endpoint(websocket: WebSocket, task_id: str):
+    """单任务WebSocket端点 - 性能优化版"""
+    await websocket.accept()
+    
+    # 使用线程安全的函数获取队列
+    q = get_task_queue(task_id)
+    
+    # 检查任务是否存在（通过检查队列中是否有数据）
+    if q.empty() and task_id not in task_last_activity:
+        # 如果没有活动记录且队列为空，认为任务不存在
+        error_response = {
+            "type": "error", 
+            "error_code": "TASK_NOT_FOUND",
+            "message": "Task not found", 
+            "task_id": task_id,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        await websocket.send_json(error_response)
+        await websocket.close(code=1008)
         return
     
     # 创建连接ID用于日志
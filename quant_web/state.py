@@ -35,6 +35,22 @@ def get_task_queue(task_id: str) -> asyncio.Queue:
         return TASK_QUEUES[task_id]
 
 
+def put_task_message(queue: asyncio.Queue, message: dict) -> None:
+    """非阻塞地向任务队列写入消息，队列已满时丢弃最旧的消息
+
+    必须在事件循环线程中调用，工作线程应通过 loop.call_soon_threadsafe 转发。
+    """
+    while True:
+        try:
+            queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+
+
 def remove_task_queue(task_id: str) -> bool:
     """线程安全地移除任务队列"""
     with _QUEUE_LOCK:
@@ -0,0 +1,69 @@
+"""交易日志读取与回放脚本
+
+用法:
+    python scripts/journal_replay.py data/journals/<task_id>.npz [--events order_filled] [--limit 50] [--rebuild]
+"""
+
+import argparse
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from quant_web.core.be.journal import TradeJournal
+from quant_web.core.be.portfolio import Portfolio
+from quant_web.core.const import (
+    DEFAULT_INITIAL_CASH,
+    JOURNAL_EVENT_NAMES,
+    JOURNAL_EVENT_ORDER_FILLED,
+    ORDER_SIDE_BUY,
+)
+
+
+def rebuild_portfolio(journal: TradeJournal) -> Portfolio:
+    """按成交事件重放，重建回测结束时的现金与持仓"""
+    portfolio = Portfolio(initial_cash=journal.meta.get('initial_cash', DEFAULT_INITIAL_CASH))
+    for event in journal.replay([JOURNAL_EVENT_ORDER_FILLED]):
+        if event['side'] == ORDER_SIDE_BUY:
+            portfolio.buy(event['ts_code'], event['quantity'], event['price'])
+        else:
+            portfolio.sell(event['ts_code'], event['quantity'], event['price'])
+    return portfolio
+
+
+def main():
+    """读取交易日志并输出事件"""
+    parser = argparse.ArgumentParser(description="读取并回放回测交易日志")
+    parser.add_argument("path", help="交易日志文件路径(.npz)")
+    parser.add_argument("--events", nargs="*", choices=list(JOURNAL_EVENT_NAMES.values()),
+                        help="只输出指定类型的事件")
+    parser.add_argument("--limit", type=int, default=50, help="最多输出的事件条数，0表示全部")
+    parser.add_argument("--rebuild", action="store_true", help="按成交事件重建投资组合")
+    args = parser.parse_args()
+
+    journal = TradeJournal.load(args.path)
+    print(f"日志信息: {journal.meta}")
+    print(f"事件统计: {journal.summary()}")
+
+    events = None
+    if args.events:
+        codes = {name: code for code, name in JOURNAL_EVENT_NAMES.items()}
+        events = [codes[name] for name in args.events]
+
+    for i, event in enumerate(journal.replay(events)):
+        if args.limit and i >= args.limit:
+            print("...")
+            break
+        print(f"{event['seq']:>8} {event['date'].date()} {event['event']:<16} {event['strategy_id']:<24} "
+              f"{event['side']:<4} {event['ts_code']:<10} {event['quantity']:>8} @ {event['price']:.2f} "
+              f"cash={event['cash']:.2f}")
+
+    if args.rebuild:
+        portfolio = rebuild_portfolio(journal)
+        print(f"重建后现金: {portfolio.cash:.2f}")
+        print(f"重建后持仓: {dict(portfolio.positions)}")
+
+
+if __name__ == "__main__":
+    main()
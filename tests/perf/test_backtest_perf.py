@@ -0,0 +1,57 @@
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from quant_web.core.be.engine import BacktestEngine
+from quant_web.core.const import MAX_DD_THRESHOLD
+
+
+STOCK_POOL = [f"{i:06d}.SZ" for i in range(100)]
+
+
+def _run_years(years):
+    """回测 years 年，返回 (交易日数, 耗时)"""
+    random.seed(42)
+    np.random.seed(42)
+    engine = BacktestEngine()
+
+    start_time = time.perf_counter()
+    result = engine.run("perf", STOCK_POOL, "2010-01-01", f"{2009 + years}-12-31", 1000000.0)
+    total_time = time.perf_counter() - start_time
+
+    assert result['status'] == 'success'
+    days = len(engine.daily_values)
+    print(f"{years}-year backtest on {len(STOCK_POOL)} stocks: {days} days in {total_time:.2f}s "
+          f"({total_time / days * 1e3:.3f} ms/day)")
+    return days, total_time
+
+
+def test_legacy_engine_run_scales_linearly():
+    """测试旧版回测引擎的耗时随回测长度线性增长（每日O(股票数)，与已走过的历史长度无关）
+
+    比较10年与1年回测的每日耗时，不依赖机器快慢的绝对耗时。
+    """
+    _run_years(1)  # 预热
+    short_days, short_time = _run_years(1)
+    long_days, long_time = _run_years(10)
+    assert long_days > 5 * short_days
+    # 每日耗时不随历史长度增长；留出计时抖动的余量
+    assert long_time / long_days < 3.0 * short_time / short_days, \
+        f"Per-day cost grew from {short_time / short_days * 1e3:.3f} to {long_time / long_days * 1e3:.3f} ms"
+
+
+def test_incremental_drawdown_matches_dataframe_reference():
+    """测试增量回撤与按DataFrame累计最大值计算的结果一致"""
+    random.seed(7)
+    np.random.seed(7)
+    engine = BacktestEngine()
+    engine.run("perf", STOCK_POOL[:20], "2010-01-01", "2019-12-31", 1000000.0)
+
+    df = pd.DataFrame(engine.daily_values)
+    drawdown = (df['total_value'] - df['total_value'].cummax()) / df['total_value'].cummax()
+    # 回测只在最后一天可能触发回撤停止，之前的每一天都未超过阈值
+    assert (drawdown.iloc[:-1] >= -MAX_DD_THRESHOLD).all()
+    if len(df) < len(pd.date_range("2010-01-01", "2019-12-31")):
+        assert drawdown.iloc[-1] < -MAX_DD_THRESHOLD
@@ -0,0 +1,39 @@
+import time
+import tracemalloc
+
+import numpy as np
+
+from quant_web.core.be.robustness import RobustnessAnalyzer
+
+
+def _bootstrap(equity, n_simulations):
+    """返回 (报告, 耗时, 峰值内存)"""
+    analyzer = RobustnessAnalyzer(n_simulations=n_simulations, chunk_size=500, seed=0)
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    report = analyzer.bootstrap(equity)
+    total_time = time.perf_counter() - start_time
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{n_simulations} bootstrap paths x {len(equity)} bars in {total_time:.2f}s, "
+          f"peak memory {peak / 1e6:.1f} MB")
+    return report, total_time, peak
+
+
+def test_bootstrap_10k_paths_over_10_years():
+    """测试1万条10年期自助法路径的耗时与路径数成正比，且内存按批次有界
+
+    以1千条路径的耗时为基准比较，不依赖机器快慢的绝对耗时。
+    """
+    rng = np.random.default_rng(42)
+    equity = 1e6 * np.cumprod(1 + rng.normal(0.0004, 0.01, 2520))
+
+    _bootstrap(equity, 1000)  # 预热
+    _, base_time, base_peak = _bootstrap(equity, 1000)
+    report, total_time, peak = _bootstrap(equity, 10000)
+    assert report["simulations"] == 10000
+    # 路径数增加10倍，耗时增长不超过约10倍（留出计时抖动的余量）
+    assert total_time < 15.0 * base_time, f"Too slow: {total_time:.2f}s vs {base_time:.2f}s for 1k paths"
+    # 峰值内存只与批大小有关，不随路径数增长：500条路径 x 2520期，约十余个同尺寸矩阵
+    assert peak < 500 * 2520 * 8 * 16
+    assert peak < 2 * base_peak
@@ -0,0 +1,48 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from typing import Any, Dict, Optional, Tuple
+
+import pytest
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.trading_engine import TradingEngine
+from quant_web.core.const import DEFAULT_STOCK_POOL
+
+# 测试模块未定义 FEED_SYMBOLS 时加载的示例股票
+DEFAULT_FEED_SYMBOLS = DEFAULT_STOCK_POOL[:6]
+
+
+@pytest.fixture(scope="module")
+def data_feed(request) -> DataFeed:
+    """加载示例行情数据，每个测试模块加载一次
+    
+    股票与区间取测试模块中的 FEED_SYMBOLS（默认前6只示例股票）、START_DATE 和 END_DATE；
+    模块定义了 FEED_START_DATE 时从该日期开始加载，回测开始前的数据用于指标预热。
+    """
+    module = request.module
+    feed = DataFeed()
+    feed.load_historical_data(getattr(module, "FEED_SYMBOLS", DEFAULT_FEED_SYMBOLS),
+                              getattr(module, "FEED_START_DATE", module.START_DATE), module.END_DATE)
+    return feed
+
+
+@pytest.fixture(scope="module")
+def make_engine(data_feed):
+    """构造交易引擎的工厂
+    
+    make_engine((策略名称, 策略ID, 参数), ..., initial_cash=初始资金, feed=数据馈送, **TradingEngine的参数)，
+    feed 默认为模块的 data_feed。
+    """
+    def make(*strategies: Tuple[str, str, Dict[str, Any]], initial_cash: float = 1000000.0,
+             feed: Optional[DataFeed] = None, **kwargs) -> TradingEngine:
+        engine = TradingEngine(**kwargs)
+        engine.initialize(initial_cash)
+        engine.load_data_feed(data_feed if feed is None else feed)
+        for name, strategy_id, parameters in strategies:
+            engine.add_strategy(name, strategy_id, dict(parameters))
+        return engine
+    return make
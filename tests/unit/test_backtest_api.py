@@ -0,0 +1,112 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+import quant_web.api.v1.backtest as backtest_module
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.profiler import ProfileStats
+from quant_web.core.const import DEFAULT_STOCK_POOL
+from quant_web.core.result_cache import ResultCache, make_run_key
+from quant_web.main import app
+
+
+client = TestClient(app)
+POOL = DEFAULT_STOCK_POOL[:3]
+BACKTEST_REQUEST = {
+    "strategy_config": {"name": "moving_average", "parameters": {"short_window": 5, "long_window": 20}},
+    "stock_pool": POOL,
+    "start_date": "2023-01-01",
+    "end_date": "2023-06-30",
+    "init_cash": 1000000.0
+}
+SWEEP_REQUEST = {
+    "strategy_name": "moving_average",
+    "param_grid": {"short_window": [5, 10], "long_window": [30]},
+    "stock_pool": POOL,
+    "start_date": "2023-01-01",
+    "end_date": "2023-06-30",
+    "rank_by": "total_return",
+    "max_workers": 1
+}
+
+
+def test_cache_hit_registers_completed_task(monkeypatch):
+    """测试命中结果缓存的提交登记为已完成的任务，可按返回的 task_id 查询状态和结果"""
+    feed = DataFeed()
+    feed.load_historical_data(POOL, datetime(2023, 1, 1), datetime(2023, 6, 30))
+    run_key = make_run_key("moving_average", {"short_window": 5, "long_window": 20}, POOL, datetime(2023, 1, 1),
+                           datetime(2023, 6, 30), 1000000.0, feed.data_version, options={"robustness": False})
+    cache = ResultCache(cache_dir=None)
+    cache.put(run_key, {"status": "done", "task_id": "BK_original", "backtest_result": {"daily_equity": []}})
+    monkeypatch.setattr(backtest_module, "global_result_cache", cache)
+
+    body = client.post("/api/v1/backtest/submit", json=BACKTEST_REQUEST).json()
+    assert (body["status"], body["cached"], body["run_key"]) == ("completed", True, run_key)
+    assert body["result"]["task_id"] == body["task_id"]
+
+    status = client.get(f"/api/v1/backtest/status/{body['task_id']}").json()
+    assert status["status"] == "completed"
+    result = client.get(f"/api/v1/backtest/result/{body['task_id']}").json()
+    assert result["status"] == "completed"
+    assert result["result"]["backtest_result"] == {"daily_equity": []}
+
+
+def test_unknown_backtest_task_is_not_found():
+    """测试查询不存在的任务时返回404"""
+    assert client.get("/api/v1/backtest/status/BK_missing").json()["status_code"] == 404
+    assert client.get("/api/v1/backtest/result/BK_missing").json()["status_code"] == 404
+
+
+def test_robustness_options_reject_unknown_fields():
+    """测试稳健性分析选项中的未知字段返回422"""
+    request = {**BACKTEST_REQUEST, "strategy_config": {"name": "moving_average",
+                                                       "robustness": {"n_simulations": 100, "paths": 5}}}
+    assert client.post("/api/v1/backtest/submit", json=request).status_code == 422
+    request["strategy_config"]["robustness"] = {"n_simulations": 0}
+    assert client.post("/api/v1/backtest/submit", json=request).status_code == 422
+
+
+def test_sweep_runs_and_ranks_results():
+    """测试参数扫描任务提交后完成，结果表按 rank_by 排序"""
+    body = client.post("/api/v1/backtest/sweep", json=SWEEP_REQUEST).json()
+    assert (body["status"], body["combinations"]) == ("Pending", 2)
+
+    result = client.get(f"/api/v1/backtest/result/{body['task_id']}").json()
+    assert result["status"] == "completed"
+    table = result["result"]["results"]
+    assert result["result"]["rank_by"] == "total_return"
+    assert len(table) == 2
+    assert table[0]["total_return"] >= table[1]["total_return"]
+    assert client.get("/api/v1/backtest/result/SW_missing").json()["status_code"] == 404
+
+
+def test_sweep_request_is_validated(monkeypatch):
+    """测试参数扫描请求缺少字段时返回422，参数组合超限、排序指标未知或日期格式错误时返回400"""
+    assert client.post("/api/v1/backtest/sweep", json={"strategy_name": "moving_average"}).status_code == 422
+
+    monkeypatch.setattr(backtest_module, "SWEEP_MAX_COMBINATIONS", 1)
+    assert client.post("/api/v1/backtest/sweep", json=SWEEP_REQUEST).json()["status_code"] == 400
+    monkeypatch.undo()
+    for invalid in ({"rank_by": "sharpe"}, {"end_date": "2023/06/30"}):
+        assert client.post("/api/v1/backtest/sweep", json={**SWEEP_REQUEST, **invalid}).json()["status_code"] == 400
+
+
+def test_profile_returns_accumulated_phase_times(monkeypatch):
+    """测试性能统计端点返回本进程累计的各阶段耗时"""
+    stats = ProfileStats()
+    monkeypatch.setattr(backtest_module, "global_profile_stats", stats)
+    assert client.get("/api/v1/backtest/profile").json()["runs"] == 0
+
+    row = {"calls": 1, "wall_time": 1.0, "cpu_time": 1.0}
+    stats.record({"wall_time": 2.0, "cpu_time": 2.0, "phases": {"strategy": row}, "strategies": {"ma": row}},
+                 {"ma": "moving_average"})
+    profile = client.get("/api/v1/backtest/profile").json()
+    assert (profile["runs"], profile["wall_time"]) == (1, 2.0)
+    assert profile["phases"]["strategy"]["wall_share"] == 0.5
+    assert profile["strategies"]["moving_average"]["calls"] == 1
@@ -0,0 +1,75 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import asyncio
+from datetime import datetime
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.trading_engine import TradingEngine
+from quant_web.core.const import DEFAULT_STOCK_POOL
+from quant_web.core.tasks import BacktestTask
+
+
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+
+
+def test_progress_callback_streams_every_equity_point():
+    """测试逐日进度回调按顺序覆盖全部净值点，最后一次回调为100%"""
+    data_feed = DataFeed()
+    data_feed.load_historical_data(DEFAULT_STOCK_POOL[:4], START_DATE, END_DATE)
+    engine = TradingEngine()
+    engine.initialize()
+    engine.load_data_feed(data_feed)
+    engine.add_strategy("moving_average", "progress", {})
+    
+    updates = []
+    result = engine.execute_backtest(START_DATE, END_DATE, progress_callback=updates.append, progress_interval=0)
+    
+    points = [point for update in updates for point in update['equity_points']]
+    assert points == result['daily_equity']
+    assert [u['bars'] for u in updates] == sorted(u['bars'] for u in updates)
+    assert updates[-1]['progress'] == 1.0
+    assert updates[-1]['equity'] == result['daily_equity'][-1]['equity']
+    
+    # 暂停时最后一次回调报告实际处理的交易日数
+    updates = []
+    paused = engine.execute_backtest(START_DATE, END_DATE, progress_callback=updates.append,
+                                     progress_interval=3600, pause_at=datetime(2022, 12, 30))
+    assert updates[-1]['bars'] == len(paused['snapshot'].daily_equity) < updates[-1]['total']
+    assert updates[-1]['progress'] < 1.0
+
+
+def test_async_backtest_keeps_event_loop_responsive():
+    """测试异步回测在线程池中运行，期间事件循环仍能调度其他协程，进度消息可JSON序列化"""
+    async def run():
+        queue = asyncio.Queue()
+        task = BacktestTask(task_id="BK_progress", strategy_config={"name": "moving_average"},
+                            stock_pool=DEFAULT_STOCK_POOL[:4], start_date=START_DATE, end_date=END_DATE)
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+        
+        ticking = asyncio.create_task(ticker())
+        result = await task.execute_async(queue)
+        ticking.cancel()
+        messages = []
+        while not queue.empty():
+            messages.append(queue.get_nowait())
+        return result, messages, ticks
+    
+    result, messages, ticks = asyncio.run(run())
+    assert result.success
+    assert ticks > 1
+    
+    daily = [m for m in messages if m["type"] == "progress" and "bars" in m]
+    assert daily and daily[-1]["bars"] == daily[-1]["total"]
+    assert isinstance(daily[-1]["equity_points"][0]["date"], str)
+    assert messages[-1]["type"] == "done"
@@ -0,0 +1,105 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import json
+from datetime import datetime
+
+import pytest
+
+import quant_web.core.tasks as tasks_module
+from quant_web.core.be.checkpoint import load_checkpoint
+from quant_web.core.be.trading_engine import TradingEngine
+from quant_web.core.const import DEFAULT_STOCK_POOL
+from quant_web.core.task_manager import TaskFactory, TaskPriority
+from quant_web.core.tasks import BacktestTask
+
+
+START_DATE = datetime(2021, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+CRASH_BAR = 250
+RESUME_BAR = 200  # 中断前最后一次保存快照时已完成的交易日数
+
+
+class Crash(Exception):
+    pass
+
+
+def _engine(make_engine, short_window: int = 5) -> TradingEngine:
+    return make_engine(("moving_average", "ma", {"short_window": short_window, "long_window": 20}),
+                       ("momentum", "momentum", {"rebalance_days": 10}))
+
+
+def _crash(snapshot):
+    if snapshot["bars"] >= CRASH_BAR:
+        raise Crash()
+
+
+def _run_until_crash(data_feed, make_engine, path: str) -> None:
+    with pytest.raises(Crash):
+        _engine(make_engine).execute_backtest(START_DATE, END_DATE, checkpoint_path=path, checkpoint_every=100,
+                                              metrics_callback=_crash, metrics_every=1)
+    assert load_checkpoint(path, data_feed)["bars"] == RESUME_BAR
+
+
+def test_resume_matches_uninterrupted_run(data_feed, make_engine, tmp_path):
+    """测试中断后从快照续跑的回测与一次跑完的结果完全相同，完成后删除快照"""
+    path = str(tmp_path / "run.ckpt")
+    _run_until_crash(data_feed, make_engine, path)
+    
+    resumed = _engine(make_engine).execute_backtest(START_DATE, END_DATE, checkpoint_path=path, checkpoint_every=100)
+    baseline = _engine(make_engine).execute_backtest(START_DATE, END_DATE)
+    
+    assert len(baseline["order_history"]) > 0
+    assert resumed["daily_equity"] == baseline["daily_equity"]
+    assert [order.order_id for order in resumed["order_history"]] == \
+        [order.order_id for order in baseline["order_history"]]
+    assert resumed["performance_metrics"] == baseline["performance_metrics"]
+    assert resumed["journal"] == baseline["journal"]
+    assert not os.path.exists(path)
+
+
+def test_checkpoint_of_different_inputs_is_ignored(data_feed, make_engine, tmp_path):
+    """测试策略参数不同时不恢复快照，回测从头开始"""
+    path = str(tmp_path / "run.ckpt")
+    _run_until_crash(data_feed, make_engine, path)
+    
+    result = _engine(make_engine, short_window=10).execute_backtest(START_DATE, END_DATE, checkpoint_path=path)
+    baseline = _engine(make_engine, short_window=10).execute_backtest(START_DATE, END_DATE)
+    
+    assert result["daily_equity"] == baseline["daily_equity"]
+
+
+def test_reloaded_backtest_task_resumes_from_checkpoint(data_feed, make_engine, tmp_path, monkeypatch):
+    """测试从持久化参数重建的回测任务找到原任务的快照并续跑"""
+    monkeypatch.setattr(tasks_module, "CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setattr(tasks_module, "JOURNAL_DIR", str(tmp_path))
+    task = BacktestTask(task_id="BK_checkpoint", strategy_config={"name": "moving_average"},
+                        stock_pool=DEFAULT_STOCK_POOL[:6], start_date=START_DATE, end_date=END_DATE)
+    
+    reloaded = TaskFactory.create_task("BacktestTask", task_id=task.task_id, priority=TaskPriority.HIGH)
+    reloaded.load_parameters(json.loads(json.dumps(task.parameters)))
+    assert (reloaded.strategy_config, reloaded.stock_pool) == (task.strategy_config, task.stock_pool)
+    assert (reloaded.start_date, reloaded.end_date) == (START_DATE, END_DATE)
+    assert reloaded.checkpoint_path == task.checkpoint_path
+    
+    # 与任务相同配置的引擎在中途中断，留下任务的快照
+    def task_engine():
+        return make_engine(("moving_average", f"moving_average_{task.task_id[:8]}", {}), initial_cash=task.initial_cash)
+    
+    with pytest.raises(Crash):
+        task_engine().execute_backtest(START_DATE, END_DATE, checkpoint_path=task.checkpoint_path,
+                                       checkpoint_every=100, metrics_callback=_crash, metrics_every=1)
+    restored = []
+    restore = TradingEngine._restore_checkpoint
+    monkeypatch.setattr(TradingEngine, "_restore_checkpoint",
+                        lambda engine, state: restored.append(state["bars"]) or restore(engine, state))
+    
+    reloaded.data_feed = data_feed
+    result = reloaded.execute()
+    assert result.success and restored == [RESUME_BAR]
+    assert result.data["backtest_result"]["daily_equity"] == \
+        task_engine().execute_backtest(START_DATE, END_DATE)["daily_equity"]
+    assert not os.path.exists(task.checkpoint_path)
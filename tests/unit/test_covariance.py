@@ -0,0 +1,93 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_web.core.be.covariance import CovarianceService
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.strategy import StrategyContext
+from quant_web.core.const import DEFAULT_STOCK_POOL
+
+
+FEED_SYMBOLS = DEFAULT_STOCK_POOL[:8]
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+
+
+def test_incremental_estimates_match_full_recomputation(data_feed):
+    """测试逐日增量更新的指数加权/滚动窗口协方差与整体重新计算的结果一致，时间倒退时从头重建"""
+    returns = data_feed.get_return_matrix()
+    dates = data_feed.get_dates()
+    ewm = CovarianceService(data_feed, "ewm", halflife=30, shrinkage=None)
+    rolling = CovarianceService(data_feed, "rolling", window=60, shrinkage=None, resync_every=100)
+    for row in range(1, len(dates)):
+        assert ewm.update(dates[row]) == 1
+        rolling.update(dates[row])
+    
+    expected = pd.DataFrame(returns[1:]).ewm(halflife=30).cov().iloc[-len(FEED_SYMBOLS):].to_numpy()
+    np.testing.assert_allclose(ewm.snapshot().covariance, expected, rtol=1e-9, atol=1e-15)
+    np.testing.assert_allclose(rolling.snapshot().covariance, np.cov(returns[-60:], rowvar=False),
+                               rtol=1e-9, atol=1e-15)
+    assert rolling.snapshot().observations == pytest.approx(60)
+    
+    earlier = ewm.snapshot(dates[150])
+    np.testing.assert_allclose(earlier.covariance,
+                               CovarianceService(data_feed, "ewm", halflife=30, shrinkage=None)
+                               .snapshot(dates[150]).covariance, rtol=1e-12)
+
+
+def test_shrinkage_and_snapshot_cache(data_feed):
+    """测试 OAS 与固定强度的收缩结果，同一日期的快照只计算一次且不可修改"""
+    returns = data_feed.get_return_matrix()[-60:]
+    sample = np.cov(returns, rowvar=False)
+    n = len(FEED_SYMBOLS)
+    mu = np.trace(sample) / n
+    alpha = np.mean(sample ** 2)
+    intensity = min((alpha + mu ** 2) / (61 * (alpha - mu ** 2 / n)), 1.0)
+    
+    service = CovarianceService(data_feed, "rolling", window=60, shrinkage="oas")
+    snapshot = service.snapshot()
+    assert snapshot.shrinkage == pytest.approx(intensity)
+    np.testing.assert_allclose(snapshot.covariance, (1 - intensity) * sample + intensity * mu * np.eye(n),
+                               rtol=1e-9, atol=1e-15)
+    fixed = CovarianceService(data_feed, "rolling", window=60, shrinkage=0.3).snapshot()
+    np.testing.assert_allclose(fixed.covariance, 0.7 * sample + 0.3 * mu * np.eye(n), rtol=1e-9, atol=1e-15)
+    
+    assert service.snapshot() is snapshot
+    with pytest.raises(ValueError):
+        snapshot.covariance[0, 0] = 1.0
+    selected = snapshot.select([FEED_SYMBOLS[3], FEED_SYMBOLS[1]])
+    np.testing.assert_array_equal(selected.covariance, snapshot.covariance[np.ix_([3, 1], [3, 1])])
+    np.testing.assert_allclose(np.diag(selected.correlation), 1.0)
+    with pytest.raises(ValueError):
+        CovarianceService(data_feed, "median")
+
+
+def test_service_follows_realtime_bars():
+    """测试实时bar追加后数据馈送上共享的协方差服务只并入新的一日，策略上下文取到同一份快照"""
+    feed = DataFeed()
+    feed.load_historical_data(FEED_SYMBOLS[:4], START_DATE, END_DATE)
+    service = feed.get_covariance_service("ewm", halflife=20)
+    context = StrategyContext()
+    context.update(data_feed=feed)
+    before = context.covariance(END_DATE, halflife=20, method="ewm")
+    assert before is service.snapshot()
+    
+    last = feed.get_mark_matrix()[-1]
+    feed.update_with_realtime(datetime(2023, 7, 3), {ts_code: float(last[j]) * 1.02
+                                                     for j, ts_code in enumerate(FEED_SYMBOLS[:4])})
+    assert feed.get_covariance_service("ewm", halflife=20) is service
+    assert service.update() == 1
+    after = context.covariance(datetime(2023, 7, 3), symbols=FEED_SYMBOLS[:2], method="ewm", halflife=20)
+    expected = CovarianceService(feed, "ewm", halflife=20).snapshot().select(FEED_SYMBOLS[:2])
+    np.testing.assert_allclose(after.covariance, expected.covariance, rtol=1e-12)
+    
+    feed.load_historical_data(FEED_SYMBOLS[:4], START_DATE, END_DATE)
+    assert feed.get_covariance_service("ewm", halflife=20) is not service
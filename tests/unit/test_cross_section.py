@@ -0,0 +1,63 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import numpy as np
+
+from quant_web.core.be.cross_section import CrossSection, rank, top_n, zscore
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.const import DEFAULT_STOCK_POOL
+
+
+START_DATE = datetime(2023, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+
+
+def test_top_n_matches_stable_sort():
+    """测试 argpartition 选前N与稳定排序的结果一致，包括值相同和被掩码排除的股票"""
+    rng = np.random.default_rng(3)
+    for _ in range(50):
+        values = rng.integers(0, 20, size=200).astype(float)
+        values[rng.random(200) < 0.1] = np.nan
+        mask = rng.random(200) < 0.9
+        n = int(rng.integers(1, 30))
+        
+        candidates = np.flatnonzero(mask & ~np.isnan(values))
+        expected = candidates[np.argsort(-values[candidates], kind='stable')[:n]]
+        np.testing.assert_array_equal(top_n(values, n, mask), expected)
+        expected_low = candidates[np.argsort(values[candidates], kind='stable')[:n]]
+        np.testing.assert_array_equal(top_n(values, n, mask, largest=False), expected_low)
+
+
+def test_rank_and_zscore_skip_masked_values():
+    """测试截面排名和标准化只在有效股票上计算"""
+    values = np.array([3.0, np.nan, 1.0, 2.0, 5.0])
+    mask = np.array([True, True, True, True, False])
+    np.testing.assert_array_equal(rank(values, mask), [3.0, np.nan, 1.0, 2.0, np.nan])
+    np.testing.assert_array_equal(rank(values, mask, ascending=False), [1.0, np.nan, 3.0, 2.0, np.nan])
+    np.testing.assert_allclose(zscore(values, mask), [np.sqrt(1.5), np.nan, -np.sqrt(1.5), 0.0, np.nan])
+
+
+def test_feed_cross_section_matches_frames():
+    """测试数据馈送上的截面与由逐只股票DataFrame构建的截面一致"""
+    feed = DataFeed()
+    feed.load_historical_data(DEFAULT_STOCK_POOL[:5], START_DATE, END_DATE)
+    date = feed.get_dates()[30].to_pydatetime()
+    
+    section = feed.get_cross_section(date)
+    reference = CrossSection.from_frames(date, feed.get_data_for_date(date))
+    assert section.symbols == reference.symbols
+    np.testing.assert_array_equal(section.close, reference.close)
+    np.testing.assert_array_equal(section.lookback('volume', 10), reference.lookback('volume', 10))
+    np.testing.assert_array_equal(section.bar_counts, np.full(5, 31))
+    
+    momentum = section.returns(20)
+    expected = [feed.stock_data[code]['close'].iloc[30] / feed.stock_data[code]['close'].iloc[10] - 1
+                for code in section.symbols]
+    np.testing.assert_allclose(momentum, expected)
+    assert np.isnan(section.returns(40)).all()
+    assert section.lookback('close', 40).shape == (40, 5)
@@ -0,0 +1,97 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import numpy as np
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.indicator_store import IndicatorStore
+from quant_web.core.be.indicators import IndicatorEngine
+from quant_web.core.be.trading_engine import TradingEngine
+from quant_web.core.const import DEFAULT_STOCK_POOL
+
+
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+
+
+def _feed(store=None):
+    feed = DataFeed(indicator_store=store)
+    feed.load_historical_data(DEFAULT_STOCK_POOL[:4], START_DATE, END_DATE)
+    # 制造一段停牌，使各股票的交易日不一致
+    code = feed.get_available_stocks()[1]
+    feed.stock_data[code] = feed.stock_data[code].drop(feed.stock_data[code].index[40:55])
+    feed._invalidate_matrices()
+    return feed
+
+
+def _run(feed, position_ratio):
+    engine = TradingEngine()
+    engine.initialize()
+    engine.load_data_feed(feed)
+    engine.add_strategy("moving_average", "ma", {"position_ratio": position_ratio})
+    engine.add_strategy("rsi_strategy", "rsi", {})
+    return engine.execute_backtest(START_DATE, END_DATE)
+
+
+def test_cached_series_match_full_computation(tmp_path, monkeypatch):
+    """测试从磁盘载入的指标矩阵与整张矩阵计算的结果一致，重新加载数据后不再计算"""
+    expected = _feed().get_indicator_matrix("rsi", window=14)
+    store = IndicatorStore(str(tmp_path))
+    first = _feed(store).get_indicator_matrix("rsi", window=14)
+    
+    calls = []
+    compute = IndicatorEngine.compute
+    monkeypatch.setattr(IndicatorEngine, "compute",
+                        staticmethod(lambda matrix, *args, **kwargs: calls.append(matrix.shape[1])
+                                     or compute(matrix, *args, **kwargs)))
+    second = _feed(store).get_indicator_matrix("rsi", window=14)
+    assert calls == []
+    assert store.hits == 4
+    for result in (first, second):
+        np.testing.assert_array_equal(result[0], expected[0])
+        np.testing.assert_array_equal(result[1], expected[1])
+    
+    # 只有数据变化的股票重新计算
+    feed = _feed(store)
+    code = feed.get_available_stocks()[2]
+    feed.stock_data[code].iloc[-1, feed.stock_data[code].columns.get_loc('close')] *= 1.01
+    feed._invalidate_matrices()
+    feed.get_indicator_matrix("rsi", window=14)
+    assert calls == [1]
+
+
+def test_engine_uses_precomputed_indicators(tmp_path):
+    """测试逐日回测改用预计算指标后结果不变，调整仓位比例重新回测时指标全部命中缓存"""
+    plain = _run(_feed(), 0.5)
+    store = IndicatorStore(str(tmp_path))
+    cached = _run(_feed(store), 0.5)
+    assert len(plain['order_history']) > 0
+    assert [d['equity'] for d in cached['daily_equity']] == [d['equity'] for d in plain['daily_equity']]
+    
+    misses = store.misses
+    _run(_feed(store), 0.3)
+    assert store.misses == misses
+    assert store.hits > 0
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    """测试磁盘占用超过上限时按最近使用时间淘汰"""
+    store = IndicatorStore(str(tmp_path), max_bytes=10 ** 9)
+    dates = np.arange(100, dtype=np.int64)
+    for i, code in enumerate(['A', 'B', 'C']):
+        store.save(code, 'sma', 'close', {'window': 5}, 'v1', dates, np.random.rand(100), np.random.rand(100))
+        path = store._path(store.make_key(code, 'sma', 'close', {'window': 5}, 'v1'))
+        os.utime(path, (1000 + i, 1000 + i))
+    assert store.load('A', 'sma', 'close', {'window': 5}, 'v1') is not None
+    assert store.load('A', 'sma', 'close', {'window': 5}, 'v2') is None
+    
+    store.max_bytes = store.size() * 2 // 3
+    assert store.evict() == 1
+    assert store.load('B', 'sma', 'close', {'window': 5}, 'v1') is None
+    assert store.load('A', 'sma', 'close', {'window': 5}, 'v1') is not None
+    assert store.load('C', 'sma', 'close', {'window': 5}, 'v1') is not None
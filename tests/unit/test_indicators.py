@@ -0,0 +1,133 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_web.core.be.indicators import IndicatorEngine
+
+
+@pytest.fixture
+def prices():
+    """生成带停牌缺失值的价格矩阵"""
+    rng = np.random.default_rng(1)
+    matrix = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (300, 4)), axis=0))
+    matrix[:30, 2] = np.nan  # 晚上市
+    matrix[100:110, 3] = np.nan  # 停牌
+    return matrix
+
+
+def _pandas_rsi(series, window):
+    delta = series.diff()
+    gain = delta.where(delta > 0, 0).rolling(window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window).mean()
+    return 100 - 100 / (1 + gain / loss)
+
+
+@pytest.mark.parametrize("name,params,reference", [
+    ("sma", {"window": 20}, lambda s: s.rolling(20).mean()),
+    ("ema", {"span": 10}, lambda s: s.ewm(span=10, adjust=False).mean()),
+    ("max", {"window": 15}, lambda s: s.rolling(15).max()),
+    ("min", {"window": 15}, lambda s: s.rolling(15).min()),
+    ("std", {"window": 15}, lambda s: s.rolling(15).std()),
+    ("rsi", {"window": 14, "smoothing": "sma"}, lambda s: _pandas_rsi(s, 14)),
+])
+def test_incremental_indicators_match_pandas(prices, name, params, reference):
+    """测试增量指标与pandas在每只股票有效数据上的滚动计算一致"""
+    values = IndicatorEngine.compute(prices, name, **params)
+    for j in range(prices.shape[1]):
+        valid = ~np.isnan(prices[:, j])
+        expected = reference(pd.Series(prices[valid, j])).to_numpy()
+        np.testing.assert_allclose(values[valid, j], expected, rtol=1e-9, atol=1e-9)
+
+
+def test_wilder_rsi_seeds_with_simple_average(prices):
+    """测试Wilder RSI以前window个涨跌幅的均值为初值，之后递推平滑"""
+    window = 14
+    series = prices[:, 0]
+    delta = np.diff(series)
+    gain, loss = np.maximum(delta, 0), np.maximum(-delta, 0)
+    avg_gain, avg_loss = gain[:window].mean(), loss[:window].mean()
+    expected = [100 - 100 / (1 + avg_gain / avg_loss)]
+    for g, l in zip(gain[window:], loss[window:]):
+        avg_gain = (avg_gain * (window - 1) + g) / window
+        avg_loss = (avg_loss * (window - 1) + l) / window
+        expected.append(100 - 100 / (1 + avg_gain / avg_loss))
+
+    values = IndicatorEngine.compute(series[:, None], "rsi", window=window)[:, 0]
+    assert np.isnan(values[:window]).all()
+    np.testing.assert_allclose(values[window:], expected, rtol=1e-9)
+
+
+def test_engine_handles_track_previous_values_per_symbol():
+    """测试指标句柄按股票读取最新值和上一值，无数据的股票不更新"""
+    engine = IndicatorEngine(["000001.SZ", "600519.SH"])
+    sma = engine.subscribe("sma", window=2)
+    engine.update(np.array([10.0, 100.0]))
+    engine.update(np.array([12.0, np.nan]))
+    engine.update(np.array([14.0, 110.0]))
+
+    assert engine.bars.tolist() == [3, 2]
+    assert sma.value("000001.SZ") == pytest.approx(13.0)
+    assert sma.previous_value("000001.SZ") == pytest.approx(11.0)
+    assert sma.value("600519.SH") == pytest.approx(105.0)
+    assert not sma.ready("000002.SZ")
+
+    engine.reset()
+    assert not sma.ready("000001.SZ")
+    assert engine.bars.tolist() == [0, 0]
+
+
+def test_engine_deduplicates_shared_subscriptions():
+    """测试多个策略订阅同一指标时只计算一次，且句柄读取的是共享的只读结果"""
+    from datetime import datetime
+    from quant_web.core.be.data_feed import DataFeed
+    from quant_web.core.be.trading_engine import TradingEngine
+    from quant_web.core.const import DEFAULT_STOCK_POOL
+
+    feed = DataFeed()
+    feed.load_historical_data(DEFAULT_STOCK_POOL[:4], datetime(2022, 1, 1), datetime(2023, 6, 30))
+    engine = TradingEngine()
+    engine.initialize()
+    engine.load_data_feed(feed)
+    first = engine.add_strategy("moving_average", "ma_fast", {"short_window": 5, "long_window": 20})
+    second = engine.add_strategy("moving_average", "ma_slow", {"short_window": 20, "long_window": 60})
+
+    assert engine.indicators.requirements() == {("sma", 5): 1, ("sma", 20): 2, ("sma", 60): 1}
+    assert len(engine.indicators.indicators) == 3
+    assert first.long_ma.indicator is second.short_ma.indicator
+
+    engine.execute_backtest(datetime(2022, 1, 1), datetime(2023, 6, 30))
+    np.testing.assert_array_equal(first.long_ma.values, second.short_ma.values)
+    with pytest.raises(ValueError):
+        first.long_ma.values[0] = 0.0
+
+
+def test_unsubscribe_releases_indicator_after_last_subscriber():
+    """测试取消订阅按订阅次数计数，移除策略时取消它订阅的指标，不再计算的指标从引擎中移除"""
+    from datetime import datetime
+    from quant_web.core.be.data_feed import DataFeed
+    from quant_web.core.be.trading_engine import TradingEngine
+    from quant_web.core.const import DEFAULT_STOCK_POOL
+
+    feed = DataFeed()
+    feed.load_historical_data(DEFAULT_STOCK_POOL[:4], datetime(2022, 1, 1), datetime(2022, 6, 30))
+    engine = TradingEngine()
+    engine.initialize()
+    engine.load_data_feed(feed)
+    engine.add_strategy("moving_average", "ma_fast", {"short_window": 5, "long_window": 20})
+    engine.add_strategy("moving_average", "ma_slow", {"short_window": 20, "long_window": 60})
+
+    engine.remove_strategy("ma_slow")
+    assert engine.indicators.requirements() == {("sma", 5): 1, ("sma", 20): 1}
+    assert [indicator.key for indicator in engine.indicators.indicators] == [("sma", 5), ("sma", 20)]
+
+    engine.remove_strategy("ma_fast")
+    assert engine.indicators.requirements() == {}
+    assert engine.indicators.indicators == []
+    with pytest.raises(KeyError):
+        engine.indicators.unsubscribe(("sma", 5))
@@ -0,0 +1,67 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from quant_web.core.be.journal import TradeJournal, prune_journals
+from quant_web.core.const import (
+    JOURNAL_EVENT_ORDER_CREATED,
+    JOURNAL_EVENT_ORDER_FILLED,
+    JOURNAL_EVENT_SIGNAL_REJECTED,
+)
+
+
+def test_dump_load_replay_roundtrip(tmp_path):
+    """测试日志写入文件后可以完整读取并回放"""
+    journal = TradeJournal(capacity=2)
+    journal.meta = {'initial_cash': 1000000.0}
+    journal.record(JOURNAL_EVENT_ORDER_CREATED, datetime(2023, 1, 3), "000001.SZ", "ma_1", "buy", 100, 10.0, 1e6)
+    journal.record(JOURNAL_EVENT_ORDER_FILLED, datetime(2023, 1, 3), "000001.SZ", "ma_1", "buy", 100, 10.0, 998995.0)
+    journal.record(JOURNAL_EVENT_ORDER_FILLED, datetime(2023, 1, 4), "600519.SH", "ma_1", "sell", 200, 20.5, 1e6)
+
+    path = journal.dump(str(tmp_path / "journal"))
+    loaded = TradeJournal.load(path)
+
+    assert len(loaded) == 3
+    assert loaded.meta['initial_cash'] == 1000000.0
+    fills = list(loaded.replay([JOURNAL_EVENT_ORDER_FILLED]))
+    assert [f['ts_code'] for f in fills] == ["000001.SZ", "600519.SH"]
+    assert fills[1]['side'] == "sell"
+    assert fills[1]['date'] == datetime(2023, 1, 4)
+    assert fills[1]['price'] == pytest.approx(20.5)
+    assert loaded.summary()['by_event'] == {'order_created': 1, 'order_filled': 2}
+
+
+def test_sampling_always_keeps_fills():
+    """测试抽样只作用于非成交事件"""
+    journal = TradeJournal(sample_every=10)
+    for i in range(100):
+        journal.record(JOURNAL_EVENT_SIGNAL_REJECTED, datetime(2023, 1, 3), "000001.SZ", "ma_1", "buy", 100, 10.0)
+    for i in range(5):
+        journal.record(JOURNAL_EVENT_ORDER_FILLED, datetime(2023, 1, 3), "000001.SZ", "ma_1", "buy", 100, 10.0)
+
+    counts = journal.summary()['by_event']
+    assert counts['signal_rejected'] == 10
+    assert counts['order_filled'] == 5
+    assert journal.summary()['total_events'] == 105
+    assert np.all(np.diff(journal.records['seq']) > 0)
+
+
+def test_prune_journals_removes_expired_and_oldest_files(tmp_path):
+    """测试清理过期的日志文件，剩余文件超过上限时删除最早写入的"""
+    now = time.time()
+    for i in range(5):
+        path = TradeJournal().dump(str(tmp_path / f"task_{i}"))
+        os.utime(path, (now - i * 86400, now - i * 86400))
+    (tmp_path / "notes.txt").write_text("kept")
+
+    assert prune_journals(str(tmp_path), max_files=2, max_age_days=3.5) == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["notes.txt", "task_0.npz", "task_1.npz"]
+    assert prune_journals(str(tmp_path / "missing")) == 0
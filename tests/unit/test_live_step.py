@@ -0,0 +1,93 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.trading_engine import TradingEngine
+from quant_web.core.const import DEFAULT_STOCK_POOL
+
+
+POOL = DEFAULT_STOCK_POOL[:6]
+START_DATE = datetime(2022, 1, 1)
+SPLIT_DATE = datetime(2023, 1, 2)
+END_DATE = datetime(2023, 6, 30)
+FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+
+def _history_feed(end: datetime) -> DataFeed:
+    """只包含 end 之前的bar的数据馈送"""
+    feed = DataFeed()
+    feed.load_historical_data(POOL, START_DATE, END_DATE)
+    feed.stock_data = {code: df[df.index < end] for code, df in feed.stock_data.items()}
+    feed._invalidate_matrices()
+    return feed
+
+
+def _engine(feed: DataFeed) -> TradingEngine:
+    engine = TradingEngine()
+    engine.initialize()
+    engine.load_data_feed(feed)
+    engine.add_strategy("moving_average", "ma", {"short_window": 5, "long_window": 20})
+    engine.add_strategy("momentum", "momentum", {"rebalance_days": 10})
+    return engine
+
+
+@pytest.fixture(scope="module")
+def full_feed():
+    feed = DataFeed()
+    feed.load_historical_data(POOL, START_DATE, END_DATE)
+    return feed
+
+
+def test_step_matches_backtest(full_feed):
+    """测试逐bar推进与在完整数据上回测同一区间的净值和订单一致"""
+    backtest = _engine(full_feed).execute_backtest(SPLIT_DATE, END_DATE)
+    
+    engine = _engine(_history_feed(SPLIT_DATE))
+    engine.start_live()
+    # 第一根bar也不能与预热历史中的交易日重复
+    with pytest.raises(ValueError):
+        engine.step({POOL[0]: 10.0}, engine.data_feed.get_dates()[-1])
+    for date in full_feed.get_trading_dates(SPLIT_DATE, END_DATE):
+        result = engine.step({code: full_feed.stock_data[code].loc[date, FIELDS].to_dict() for code in POOL}, date)
+    
+    assert len(backtest['order_history']) > 0
+    assert [day['equity'] for day in engine.live_equity] == [day['equity'] for day in backtest['daily_equity']]
+    assert [order.order_id for order in engine.order_history] == \
+        [order.order_id for order in backtest['order_history']]
+    assert result['metrics']['total_return'] == backtest['performance_metrics']['total_return']
+    
+    with pytest.raises(ValueError):
+        engine.step({POOL[0]: 10.0}, date)
+
+
+def test_realtime_bars_extend_cached_matrices():
+    """测试实时bar追加到已缓存的价格矩阵后，与重新构建的矩阵相同（包括缺失bar的股票）"""
+    feed = _history_feed(SPLIT_DATE)
+    feed.get_field_matrix('volume')
+    feed.get_mark_matrix()
+    feed.get_bar_count_matrix()
+    
+    dates = pd.bdate_range(SPLIT_DATE, periods=40)
+    for i, date in enumerate(dates):
+        bars = {code: 10.0 + i for code in POOL[:4]}
+        bars[POOL[4]] = {'close': 20.0 + i, 'volume': 1000.0}
+        if i % 3:
+            bars[POOL[5]] = 30.0
+        feed.update_with_realtime(date, bars)
+    
+    cached = {key: matrix.copy() for key, matrix in feed._matrix_cache.items()}
+    assert len(cached['close']) == feed.get_date_index(dates[-1]) + 1
+    feed._invalidate_matrices()
+    np.testing.assert_array_equal(cached['close'], feed.get_field_matrix('close'))
+    np.testing.assert_array_equal(cached['volume'], feed.get_field_matrix('volume'))
+    np.testing.assert_array_equal(cached['mark'], feed.get_mark_matrix())
+    np.testing.assert_array_equal(cached['bar_counts'], feed.get_bar_count_matrix())
@@ -0,0 +1,52 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_web.core.be.metrics import StreamingMetrics
+
+
+def test_streaming_metrics_match_pandas_reference():
+    """测试在线累计的指标与按完整净值曲线计算的结果一致"""
+    rng = np.random.default_rng(0)
+    equity = 1e6 * np.cumprod(1 + rng.normal(0.0005, 0.01, 500))
+    metrics = StreamingMetrics(periods_per_year=252, risk_free_rate=0.03)
+    for i, value in enumerate(equity):
+        metrics.update(value, exposure=0.5 * value, traded_value=1000.0 if i % 10 == 0 else 0.0)
+
+    series = pd.Series(equity)
+    returns = series.pct_change().dropna()
+    drawdown = (series - series.cummax()) / series.cummax()
+    total_return = equity[-1] / equity[0] - 1
+    annual_return = (1 + total_return) ** (252 / len(equity)) - 1
+    downside = np.sqrt((np.minimum(returns, 0) ** 2).mean()) * np.sqrt(252)
+
+    assert metrics.total_return == pytest.approx(total_return)
+    assert metrics.annual_volatility == pytest.approx(returns.std() * np.sqrt(252))
+    assert metrics.max_drawdown == pytest.approx(drawdown.min())
+    assert metrics.drawdown == pytest.approx(drawdown.iloc[-1])
+    assert metrics.downside_deviation == pytest.approx(downside)
+    assert metrics.sortino_ratio == pytest.approx((annual_return - 0.03) / downside)
+    assert metrics.win_rate == pytest.approx((returns > 0).mean())
+    assert metrics.avg_exposure == pytest.approx(0.5)
+    assert metrics.turnover == pytest.approx(50 * 1000.0 / equity.mean())
+
+
+def test_snapshot_is_available_mid_run():
+    """测试回测过程中随时可以取得指标快照"""
+    metrics = StreamingMetrics()
+    assert metrics.snapshot()['total_return'] == 0.0
+    metrics.update(100.0)
+    metrics.update(120.0)
+    metrics.update(90.0)
+
+    snapshot = metrics.snapshot()
+    assert snapshot['bars'] == 3
+    assert snapshot['drawdown'] == pytest.approx(-0.25)
+    assert snapshot['max_drawdown'] == pytest.approx(-0.25)
+    assert snapshot['total_return'] == pytest.approx(-0.1)
@@ -0,0 +1,77 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_web.core.be.portfolio import Portfolio
+from quant_web.core.const import MIN_COMMISSION, STAMP_TAX_RATE
+
+
+@pytest.fixture
+def portfolio():
+    """创建注册了三只股票的投资组合"""
+    return Portfolio(initial_cash=1000000.0, symbols=["000001.SZ", "600519.SH", "601318.SH"])
+
+
+def test_buy_updates_vectors_and_dict_view(portfolio):
+    """测试买入后持仓向量与字典视图保持一致"""
+    assert portfolio.buy("600519.SH", 100, 10.0)
+    assert portfolio.buy("600519.SH", 100, 20.0)
+    
+    assert portfolio.quantities.tolist() == [0, 200, 0]
+    assert portfolio.cost_basis[1] == pytest.approx(15.0)
+    assert "600519.SH" in portfolio.positions
+    assert "000001.SZ" not in portfolio.positions
+    assert portfolio.positions["600519.SH"] == 200
+    assert portfolio.position_costs["600519.SH"] == pytest.approx(15.0)
+    assert list(portfolio.positions.keys()) == ["600519.SH"]
+    assert portfolio.cash == pytest.approx(1000000.0 - 3000.0 - 2 * MIN_COMMISSION)
+
+
+def test_sell_all_removes_position(portfolio):
+    """测试清仓后股票从持仓视图中移除"""
+    portfolio.buy("000001.SZ", 1000, 10.0)
+    assert not portfolio.can_sell("000001.SZ", 2000)
+    assert portfolio.sell("000001.SZ", 1000, 12.0)
+    
+    assert "000001.SZ" not in portfolio.positions
+    assert len(portfolio.positions) == 0
+    assert not portfolio.sell("000001.SZ", 100, 12.0)
+    assert portfolio.cash == pytest.approx(1000000.0 - 10000.0 - MIN_COMMISSION
+                                           + 12000.0 - MIN_COMMISSION - 12000.0 * STAMP_TAX_RATE)
+
+
+def test_vectorized_valuation_matches_dict_valuation(portfolio):
+    """测试价格向量估值与旧的DataFrame估值一致"""
+    portfolio.buy("000001.SZ", 1000, 10.0)
+    portfolio.buy("601318.SH", 500, 40.0)
+    prices = np.array([11.0, 1800.0, 38.0])
+    market_data = {
+        ts_code: pd.DataFrame({'close': [price]})
+        for ts_code, price in zip(portfolio.symbols, prices)
+    }
+    
+    assert portfolio.value(prices) == pytest.approx(portfolio.get_total_value(market_data))
+    assert portfolio.get_pnl(prices)['total_pnl'] == pytest.approx(1000 * 1.0 + 500 * -2.0)
+    assert portfolio.get_pnl(market_data)['stock_pnl'] == pytest.approx({"000001.SZ": 1000.0, "601318.SH": -1000.0})
+    exposure = portfolio.exposure(prices)
+    assert exposure['gross'] == pytest.approx(11000.0 + 19000.0)
+    assert exposure['net'] == pytest.approx(30000.0)
+
+
+def test_unregistered_symbol_grows_vectors():
+    """测试买入未注册的股票时自动扩容"""
+    portfolio = Portfolio(initial_cash=1e9)
+    for i in range(100):
+        portfolio.buy(f"{i:06d}.SZ", 100, 10.0)
+    
+    assert len(portfolio.symbols) == 100
+    assert len(portfolio.positions) == 100
+    assert portfolio.value(np.full(100, 10.0)) == pytest.approx(portfolio.cash + 100 * 100 * 10.0)
+    # 价格向量比股票数短时，缺失部分按0估值
+    assert portfolio.value(np.full(10, 10.0)) == pytest.approx(portfolio.cash + 10 * 100 * 10.0)
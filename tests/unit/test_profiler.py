@@ -0,0 +1,69 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import pytest
+
+from quant_web.core.be.profiler import PhaseProfiler, ProfileStats
+from quant_web.core.const import DEFAULT_STOCK_POOL
+
+
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+FEED_SYMBOLS = DEFAULT_STOCK_POOL[:4]
+STRATEGIES = (("moving_average", "ma", {}), ("rsi_strategy", "rsi", {}))
+
+
+def test_profile_reports_phases_and_strategies(make_engine):
+    """测试开启性能统计后结果附带按阶段、按策略的耗时，且不改变回测结果"""
+    plain = make_engine(*STRATEGIES).execute_backtest(START_DATE, END_DATE)
+    profiled = make_engine(*STRATEGIES).execute_backtest(START_DATE, END_DATE, profile=True)
+    assert 'profile' not in plain
+    assert [d['equity'] for d in profiled['daily_equity']] == [d['equity'] for d in plain['daily_equity']]
+    
+    report = profiled['profile']
+    bars = len(profiled['daily_equity'])
+    for phase in ('process_orders', 'market_data', 'indicators', 'strategy', 'process_signals', 'valuation'):
+        assert report['phases'][phase]['calls'] >= bars
+    assert set(report['strategies']) == {'ma', 'rsi'}
+    assert report['phases']['strategy']['wall_time'] == pytest.approx(
+        sum(row['wall_time'] for row in report['strategies'].values()))
+    assert sum(row['wall_time'] for row in report['phases'].values()) == pytest.approx(report['wall_time'])
+
+
+def test_profile_stats_aggregate_by_strategy_name():
+    """测试累计统计按策略名称聚合多次回测"""
+    profiler = PhaseProfiler()
+    started = profiler.start()
+    profiler.stop('process_orders', started)
+    profiler.stop_strategy('ma_1', profiler.start())
+    profiler.stop_strategy('ma_2', profiler.start())
+    
+    stats = ProfileStats()
+    stats.record(profiler.report(), {'ma_1': 'MovingAverageStrategy', 'ma_2': 'MovingAverageStrategy'})
+    stats.record(profiler.report(), {'ma_1': 'MovingAverageStrategy', 'ma_2': 'MovingAverageStrategy'})
+    snapshot = stats.snapshot()
+    assert snapshot['runs'] == 2
+    assert snapshot['strategies']['MovingAverageStrategy']['calls'] == 4
+    assert snapshot['phases']['process_orders']['calls'] == 2
+
+
+def test_phase_stops_timer_on_early_exit(data_feed, make_engine):
+    """测试计时块内 continue 或异常提前退出时也停止计时，跳过的交易日同样计入阶段的调用次数"""
+    profiler = PhaseProfiler()
+    for day in range(3):
+        with profiler.phase('market_data'):
+            if day:
+                continue
+    with pytest.raises(RuntimeError):
+        with profiler.phase('strategy'):
+            raise RuntimeError("strategy failed")
+    assert profiler.calls == {'market_data': 3, 'strategy': 1}
+    
+    result = make_engine(*STRATEGIES).execute_backtest(START_DATE, END_DATE, vectorized=True, profile=True)
+    trading_days = len(data_feed.get_trading_dates(START_DATE, END_DATE))
+    assert result['profile']['phases']['strategy']['calls'] == trading_days
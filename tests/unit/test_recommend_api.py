@@ -0,0 +1,43 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+import quant_web.api.v1.recommend as recommend_module
+from quant_web.core.const import DEFAULT_STOCK_POOL
+from quant_web.main import app
+
+
+client = TestClient(app)
+PREFIX = "/api/v1/api/v1/recommend"
+POOL = DEFAULT_STOCK_POOL[:6]
+
+
+def test_recommend_risk_is_saved_on_the_task():
+    """测试推荐任务完成后风险摘要保存在任务上，查询时直接返回"""
+    task = client.post(f"{PREFIX}/tasks", json={"stock_pool": POOL, "top_n": 3}).json()
+    assert client.get(f"{PREFIX}/tasks/{task['task_id']}").json()["status"] == "completed"
+
+    risk = client.get(f"{PREFIX}/tasks/{task['task_id']}/risk").json()
+    assert risk == recommend_module.tasks[task["task_id"]]["risk"]
+    assert 0 < len(risk["symbols"]) <= 3
+    assert len(risk["correlation"]) == len(risk["annual_volatility"]) == len(risk["symbols"])
+
+
+def test_recommend_risk_of_unfinished_or_unknown_task(monkeypatch):
+    """测试任务不存在时返回404，任务未完成时返回400"""
+    assert client.get(f"{PREFIX}/tasks/missing/risk").status_code == 404
+
+    monkeypatch.setitem(recommend_module.tasks, "pending", {"task_id": "pending", "status": "pending",
+                                                            "created_at": datetime.now()})
+    assert client.get(f"{PREFIX}/tasks/pending/risk").status_code == 400
+
+
+def test_recommend_request_is_validated():
+    """测试推荐数量超出范围时返回422"""
+    assert client.post(f"{PREFIX}/tasks", json={"stock_pool": POOL, "top_n": 0}).status_code == 422
@@ -0,0 +1,80 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.const import DEFAULT_STOCK_POOL
+from quant_web.core.result_cache import ResultCache, make_run_key
+
+
+START_DATE = datetime(2023, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+POOL = DEFAULT_STOCK_POOL[:3]
+
+
+def _load():
+    feed = DataFeed()
+    feed.load_historical_data(POOL, START_DATE, END_DATE)
+    return feed
+
+
+def test_run_key_is_deterministic_and_input_sensitive():
+    """测试运行键对相同输入稳定，任一输入变化都会改变"""
+    base = dict(strategy_name="ma_cross", parameters={"short_window": 5, "long_window": 20},
+                stock_pool=POOL, start_date=START_DATE, end_date=END_DATE, initial_cash=1e6, data_version="abc")
+    key = make_run_key(**base)
+    
+    # 参数顺序和整数/浮点写法不影响运行键
+    reordered = dict(base, parameters={"long_window": 20, "short_window": 5}, initial_cash=1000000)
+    assert make_run_key(**reordered) == key
+    
+    for name, value in [("strategy_name", "rsi"), ("parameters", {"short_window": 10, "long_window": 20}),
+                        ("stock_pool", POOL[:2]), ("end_date", datetime(2023, 5, 31)),
+                        ("initial_cash", 5e5), ("data_version", "abd")]:
+        assert make_run_key(**dict(base, **{name: value})) != key
+
+
+def test_data_version_changes_only_with_bars():
+    """测试数据版本在重复加载间保持稳定，bar变化后改变"""
+    feed = _load()
+    version = feed.data_version
+    assert _load().data_version == version
+    
+    feed.update_with_realtime(datetime(2023, 7, 3), {POOL[0]: 12.34})
+    assert feed.data_version != version
+
+
+def test_result_cache_persists_and_evicts(tmp_path):
+    """测试结果写入磁盘后可被新实例读取，超出容量时按最近最少使用淘汰"""
+    cache = ResultCache(cache_dir=str(tmp_path), max_entries=2)
+    cache.put("a", {"total_return": 0.1})
+    cache.put("b", {"total_return": 0.2})
+    
+    reopened = ResultCache(cache_dir=str(tmp_path), max_entries=2)
+    assert reopened.get("a") == {"total_return": 0.1}
+    
+    cache.get("a")
+    cache.put("c", {"total_return": 0.3})
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.get("missing") is None
+    assert cache.misses == 1
+
+
+def test_result_cache_counts_files_from_earlier_processes(tmp_path):
+    """测试此前进程写入、从未再读取的结果文件也计入容量上限，按最近使用时间淘汰"""
+    old = ResultCache(cache_dir=str(tmp_path), max_entries=10)
+    for i in range(4):
+        old.put(f"old_{i}", {"total_return": i})
+        os.utime(tmp_path / f"old_{i}.pkl", ns=(i * 10 ** 9, i * 10 ** 9))
+    
+    cache = ResultCache(cache_dir=str(tmp_path), max_entries=3)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["old_1.pkl", "old_2.pkl", "old_3.pkl"]
+    
+    cache.put("new", {"total_return": 0.5})
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["new.pkl", "old_2.pkl", "old_3.pkl"]
+    assert cache.get("new") == {"total_return": 0.5}
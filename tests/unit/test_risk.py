@@ -0,0 +1,68 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+
+from quant_web.core.be.portfolio import Portfolio
+from quant_web.core.be.risk import BatchRiskChecker
+from quant_web.core.const import (
+    RISK_REJECT_INSUFFICIENT_CASH,
+    RISK_REJECT_INSUFFICIENT_SHARES,
+    RISK_REJECT_POSITION_LIMIT,
+    RISK_REJECT_BELOW_MIN_QUANTITY,
+)
+
+
+def _buy(ts_code, quantity, price):
+    return {'ts_code': ts_code, 'side': 'buy', 'quantity': quantity, 'price': price}
+
+
+def _sell(ts_code, quantity, price):
+    return {'ts_code': ts_code, 'side': 'sell', 'quantity': quantity, 'price': price}
+
+
+def test_cumulative_cash_reservation():
+    """测试多笔各自可成交的买单不会合计透支现金"""
+    portfolio = Portfolio(initial_cash=100000.0)
+    checker = BatchRiskChecker(max_position_size=1.0, max_cash_ratio=1.0)
+    # 每笔约 40000 元，单独都能成交，合计只能成交两笔；最后一笔小单仍可用剩余现金
+    signals = [_buy(f"00000{i}.SZ", 4000, 10.0) for i in range(3)] + [_buy("000009.SZ", 1000, 10.0)]
+    
+    result = checker.check(portfolio, signals)
+    
+    assert result.accepted.tolist() == [True, True, False, True]
+    assert result.reasons[2] == RISK_REJECT_INSUFFICIENT_CASH
+    assert result.reserved_cash <= portfolio.cash
+
+
+def test_cumulative_share_reservation():
+    """测试同一股票的多笔卖单累计占用持仓"""
+    portfolio = Portfolio(initial_cash=100000.0)
+    portfolio.buy("000001.SZ", 1000, 10.0)
+    checker = BatchRiskChecker()
+    signals = [_sell("000001.SZ", 600, 10.0), _sell("000001.SZ", 600, 10.0), _sell("000001.SZ", 400, 10.0)]
+    
+    result = checker.check(portfolio, signals)
+    
+    assert result.accepted.tolist() == [True, False, True]
+    assert result.reasons[1] == RISK_REJECT_INSUFFICIENT_SHARES
+    assert result.reserved_shares == {"000001.SZ": 1000}
+
+
+def test_position_and_cash_ratio_limits():
+    """测试单股仓位上限与单笔现金使用比例上限"""
+    portfolio = Portfolio(initial_cash=1000000.0)
+    checker = BatchRiskChecker(max_position_size=0.3, max_cash_ratio=0.2)
+    signals = [_buy("000001.SZ", 50000, 10.0), _buy("000001.SZ", 20000, 10.0), _buy("000002.SZ", 50, 10.0)]
+    
+    result = checker.check(portfolio, signals, mark_prices=np.zeros(2))
+    
+    # 单笔现金上限 20 万元 -> 20000 股；同股累计仓位上限 30 万元 -> 第二笔只剩 10000 股
+    assert result.quantities.tolist() == [20000, 10000, 0]
+    assert result.reasons[2] == RISK_REJECT_BELOW_MIN_QUANTITY
+    
+    result = checker.check(portfolio, [_buy("000001.SZ", 100, 10.0)], reserved_cash=portfolio.cash)
+    assert result.reasons[0] == RISK_REJECT_POSITION_LIMIT
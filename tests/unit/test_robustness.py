@@ -0,0 +1,76 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from quant_web.core.be.metrics import StreamingMetrics
+from quant_web.core.be.order import Order
+from quant_web.core.be.robustness import RobustnessAnalyzer, block_bootstrap_indices, trade_pnls
+from quant_web.core.const import ROBUSTNESS_MAX_SIMULATIONS
+
+
+@pytest.fixture
+def equity():
+    """生成10年的模拟净值曲线"""
+    rng = np.random.default_rng(3)
+    return 1e6 * np.cumprod(1 + rng.normal(0.0005, 0.012, 2520))
+
+
+def test_block_bootstrap_indices_are_contiguous_circular_blocks():
+    """测试自助法下标由首尾循环的连续块组成"""
+    indices = block_bootstrap_indices(50, 8, 10, np.random.default_rng(0))
+    assert indices.shape == (8, 50)
+    blocks = indices.reshape(8, 5, 10)
+    np.testing.assert_array_equal(np.diff(blocks, axis=2) % 50, 1)
+
+
+def test_bootstrap_observed_metrics_match_streaming_metrics(equity):
+    """测试观测值口径与 StreamingMetrics 一致，置信区间包含中位数"""
+    metrics = StreamingMetrics()
+    for value in equity:
+        metrics.update(value)
+
+    report = RobustnessAnalyzer(n_simulations=2000, chunk_size=300, seed=1).bootstrap(equity)
+    observed = report["metrics"]
+    assert observed["sharpe_ratio"]["observed"] == pytest.approx(metrics.sharpe_ratio)
+    assert observed["max_drawdown"]["observed"] == pytest.approx(metrics.max_drawdown)
+    assert observed["final_value"]["observed"] == pytest.approx(equity[-1])
+    for summary in observed.values():
+        assert summary["ci_lower"] <= summary["median"] <= summary["ci_upper"]
+    assert 0.0 <= report["probability_of_loss"] <= 1.0
+
+
+def test_trade_shuffle_keeps_final_value():
+    """测试逐笔盈亏按平均成本配对，交易顺序重排不改变期末价值"""
+    day = datetime(2023, 1, 3)
+    orders = []
+    for side, quantity, price in [("buy", 100, 10.0), ("buy", 100, 12.0), ("sell", 200, 13.0),
+                                  ("buy", 100, 20.0), ("sell", 100, 18.0)]:
+        order = Order(order_id=str(len(orders)), strategy_id="s", ts_code="000001.SZ", side=side,
+                      quantity=quantity, price=price)
+        order.fill(day, price)
+        order.commission = 5.0
+        orders.append(order)
+    # 买入成本含佣金：(1000 + 1200 + 10) 配对卖出 2600 - 5，(2000 + 5) 配对卖出 1800 - 5
+    pnls = trade_pnls(orders)
+    np.testing.assert_allclose(pnls, [385.0, -210.0])
+
+    report = RobustnessAnalyzer(n_simulations=500, seed=2).shuffle_trades(pnls, 10000.0)
+    assert report["final_value"] == pytest.approx(10000.0 + pnls.sum())
+    assert report["metrics"]["max_drawdown"]["ci_lower"] <= report["metrics"]["max_drawdown"]["observed"]
+
+
+def test_options_are_whitelisted_and_bounded():
+    """测试请求中的分析选项只接受已知字段，模拟路径数和块长度有上限"""
+    analyzer = RobustnessAnalyzer.from_options({"n_simulations": 200, "block_size": 5, "seed": 1})
+    assert (analyzer.n_simulations, analyzer.block_size) == (200, 5)
+    for options in ({"chunk_size": 1}, {"n_simulations": ROBUSTNESS_MAX_SIMULATIONS + 1},
+                    {"block_size": 0}, {"confidence": 1.5}):
+        with pytest.raises(ValueError):
+            RobustnessAnalyzer.from_options(options)
@@ -0,0 +1,118 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from quant_web.core.be.indicators import IndicatorEngine
+from quant_web.core.be.risk import BatchRiskChecker
+from quant_web.core.be.scenario import Branch, ScenarioFork
+from quant_web.core.be.trading_engine import TradingEngine
+from quant_web.core.const import FORK_EXIT_STRATEGY_ID
+
+
+START_DATE = datetime(2021, 1, 1)
+FORK_DATE = datetime(2022, 6, 30)
+END_DATE = datetime(2023, 6, 30)
+STRATEGIES = (("moving_average", "ma", {"short_window": 5, "long_window": 20}),
+              ("momentum", "momentum", {"rebalance_days": 10}))
+
+
+@pytest.fixture(scope="module")
+def snapshot(make_engine):
+    return make_engine(*STRATEGIES).snapshot(START_DATE, END_DATE, FORK_DATE)
+
+
+def test_fork_continues_like_uninterrupted_run(make_engine, snapshot):
+    """测试分叉后不做修改继续回测与一次跑完的结果完全相同，修改过的分支不影响其他分支"""
+    baseline = make_engine(*STRATEGIES).execute_backtest(START_DATE, END_DATE)
+    
+    engine = make_engine(*STRATEGIES)
+    flat = engine.fork(snapshot)
+    assert flat.close_positions() > 0
+    flat.execute_backtest(START_DATE, END_DATE)
+    
+    resumed = engine.fork(snapshot).execute_backtest(START_DATE, END_DATE)
+    assert len(snapshot.daily_equity) < len(baseline["daily_equity"])
+    assert resumed["daily_equity"] == baseline["daily_equity"]
+    assert [order.order_id for order in resumed["order_history"]] == \
+        [order.order_id for order in baseline["order_history"]]
+    assert resumed["performance_metrics"] == baseline["performance_metrics"]
+    assert resumed["journal"] == baseline["journal"]
+    
+    with pytest.raises(ValueError):
+        engine.fork(snapshot).execute_backtest(START_DATE, datetime(2023, 3, 31))
+
+
+def test_branch_strategy_indicators_are_warmed_up(data_feed, make_engine, snapshot):
+    """测试分叉后新加入的策略订阅的指标补齐了快照之前的全部历史"""
+    engine = make_engine(*STRATEGIES).fork(snapshot)
+    rsi = {"name": "rsi_strategy", "parameters": {"rsi_smoothing": "wilder"}}
+    Branch("rsi", drop=True, strategies=[rsi]).apply(engine)
+    assert list(engine.strategies) == ["rsi_strategy_rsi"]
+    engine.execute_backtest(START_DATE, END_DATE)
+    
+    close = data_feed.get_field_matrix("close")
+    last_row = data_feed.get_date_index(engine.current_date)
+    for indicator in engine.indicators.indicators:
+        np.testing.assert_array_equal(indicator.count, data_feed.get_bar_count_matrix()[last_row])
+        expected = IndicatorEngine.compute(close[:last_row + 1], indicator.name, **indicator.params)
+        np.testing.assert_allclose(indicator.values, expected[last_row], rtol=1e-12, equal_nan=True)
+
+
+def test_scenario_fork_comparison_table(data_feed, make_engine, snapshot):
+    """测试分支比较表：继续分支与完整回测一致，平仓分支分叉后只有平仓订单且净值不再变化，多进程结果相同"""
+    branches = [
+        Branch("continue"),
+        Branch("flat", drop=True, close=True),
+        Branch("slow_ma", drop=["ma"], strategies=[{"name": "moving_average",
+                                                    "parameters": {"short_window": 10, "long_window": 60}}])
+    ]
+    rows = ScenarioFork(snapshot, data_feed, max_workers=1).run(branches)
+    assert [row["branch"] for row in rows] == ["continue", "flat", "slow_ma"]
+    assert all(row["error"] is None for row in rows)
+    
+    baseline = make_engine(*STRATEGIES).execute_backtest(START_DATE, END_DATE)
+    assert rows[0]["final_equity"] == baseline["daily_equity"][-1]["equity"]
+    assert rows[0]["total_return"] == baseline["performance_metrics"]["total_return"]
+    
+    held = len(make_engine(*STRATEGIES).fork(snapshot).portfolio.positions)
+    assert held > 0 and rows[1]["orders_since_fork"] == held
+    engine = make_engine(*STRATEGIES).fork(snapshot)
+    Branch("flat", drop=True, close=True).apply(engine)
+    result = engine.execute_backtest(START_DATE, END_DATE)
+    assert {order.strategy_id for order in result["order_history"][len(snapshot.order_history):]} == \
+        {FORK_EXIT_STRATEGY_ID}
+    assert len({day["equity"] for day in result["daily_equity"][len(snapshot.daily_equity) + 1:]}) == 1
+    
+    parallel = ScenarioFork(snapshot, data_feed, max_workers=2).run(branches)
+    for row, other in zip(rows, parallel):
+        assert {k: v for k, v in row.items() if k != "wall_time"} == \
+            {k: v for k, v in other.items() if k != "wall_time"}
+
+
+def test_scenario_branches_keep_engine_settings(data_feed, make_engine):
+    """测试分支引擎沿用拍摄快照的引擎的风控和日志设置"""
+    engine = make_engine(*STRATEGIES, journal_sample_every=3)
+    engine.risk_checker = BatchRiskChecker(max_position_size=0.02)
+    snapshot = engine.snapshot(START_DATE, END_DATE, FORK_DATE)
+    baseline = engine.fork(snapshot).execute_backtest(START_DATE, END_DATE)
+    
+    branch = TradingEngine.from_snapshot(snapshot, data_feed)
+    assert branch.risk_checker.max_position_size == 0.02
+    assert branch.journal.sample_every == 3
+    row = ScenarioFork(snapshot, data_feed, max_workers=1).run([Branch("continue")])[0]
+    assert row["final_equity"] == baseline["daily_equity"][-1]["equity"]
+    default = make_engine(*STRATEGIES).execute_backtest(START_DATE, END_DATE)
+    assert row["final_equity"] != default["daily_equity"][-1]["equity"]
+
+
+def test_snapshot_before_first_trading_day_is_rejected(make_engine):
+    """测试暂停日期早于回测的第一个交易日时明确报错，而不是在没有净值时失败"""
+    with pytest.raises(ValueError, match="before the first trading day"):
+        make_engine(*STRATEGIES).snapshot(START_DATE, END_DATE, datetime(2020, 12, 1))
@@ -0,0 +1,101 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import numpy as np
+
+from quant_web.core.be.schedule import (
+    AnyOf,
+    CalendarInterval,
+    EveryDay,
+    EveryNTradingDays,
+    IndicatorCross,
+    MonthEnd,
+    OnFill,
+)
+from quant_web.core.be.strategies import MomentumStrategy
+
+
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+
+
+def _run_momentum(make_engine):
+    engine = make_engine(("momentum", "momentum", {"rebalance_days": 10}))
+    strategy = engine.strategies["momentum"]
+    calls = []
+    on_data = strategy.on_data
+    strategy.on_data = lambda date, data: calls.append(date) or on_data(date, data)
+    return engine.execute_backtest(START_DATE, END_DATE), calls
+
+
+def test_scheduled_strategy_matches_daily_dispatch(make_engine, monkeypatch):
+    """测试按调仓计划跳过的交易日不改变回测结果，且只在调仓日调用 on_data"""
+    scheduled, scheduled_calls = _run_momentum(make_engine)
+    monkeypatch.setattr(MomentumStrategy, "get_schedule", lambda self: EveryDay())
+    daily, daily_calls = _run_momentum(make_engine)
+    
+    assert len(scheduled['order_history']) > 0
+    assert [d['equity'] for d in scheduled['daily_equity']] == [d['equity'] for d in daily['daily_equity']]
+    assert len(daily_calls) == len(daily['daily_equity'])
+    assert len(scheduled_calls) < len(daily_calls) / 5
+    assert all((b - a).days >= 10 for a, b in zip(scheduled_calls, scheduled_calls[1:]))
+
+
+def test_calendar_schedules(data_feed):
+    """测试按交易日间隔和月末的调度计划"""
+    dates = data_feed.get_trading_dates(START_DATE, END_DATE)
+    
+    month_end = MonthEnd()
+    month_end.prepare(data_feed, dates)
+    due = [date for i, date in enumerate(dates) if month_end.is_due(i, date)]
+    assert len(due) == 18
+    assert all(dates[dates.index(date) + 1].month != date.month for date in due[:-1])
+    
+    every = EveryNTradingDays(5, offset=2)
+    assert [i for i, date in enumerate(dates[:15]) if every.is_due(i, date)] == [2, 7, 12]
+    
+    on_fill = AnyOf(OnFill(), EveryNTradingDays(100))
+    on_fill.prepare(data_feed, dates)
+    assert on_fill.is_due(3, dates[3], filled=True) and not on_fill.is_due(3, dates[3])
+
+
+def test_calendar_interval_advances_only_when_dispatched(data_feed):
+    """测试按自然日间隔的计划只在策略实际执行后重新计时，到期但被跳过的交易日之后仍然到期"""
+    dates = data_feed.get_trading_dates(START_DATE, END_DATE)
+    interval = CalendarInterval(10)
+    interval.prepare(data_feed, dates)
+    assert interval.is_due(0, dates[0]) and interval.is_due(1, dates[1])
+    interval.on_dispatch(1, dates[1])
+    assert not interval.is_due(2, dates[2])
+    
+    combined = AnyOf(OnFill(), CalendarInterval(10))
+    combined.prepare(data_feed, dates)
+    assert combined.is_due(0, dates[0])
+    combined.on_dispatch(0, dates[0])
+    # 只因成交而执行的交易日不重置自然日间隔
+    assert combined.is_due(1, dates[1], filled=True)
+    combined.on_dispatch(1, dates[1])
+    assert combined.schedules[1].last_date == dates[0]
+
+
+def test_indicator_cross_schedule(data_feed):
+    """测试指标穿越的调度计划与逐日比较短长均线的结果一致"""
+    dates = data_feed.get_trading_dates(START_DATE, END_DATE)
+    schedule = IndicatorCross("sma", {"window": 5}, reference="sma", reference_params={"window": 20})
+    schedule.prepare(data_feed, dates)
+    
+    short = data_feed.get_indicator_matrix("sma", window=5)[0]
+    long = data_feed.get_indicator_matrix("sma", window=20)[0]
+    above = short > long
+    expected = []
+    for i, date in enumerate(dates):
+        row = data_feed.get_date_index(date)
+        valid = ~np.isnan(short[row]) & ~np.isnan(long[row]) & ~np.isnan(short[row - 1]) & ~np.isnan(long[row - 1])
+        expected.append(bool((valid & (above[row] != above[row - 1])).any()))
+    assert [schedule.is_due(i, date) for i, date in enumerate(dates)] == expected
+    assert 0 < sum(expected) < len(dates)
@@ -0,0 +1,61 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import pytest
+
+from quant_web.core.be.metrics import StreamingMetrics
+from quant_web.core.be.search import MaxDrawdownStop, MinSharpeStop, SuccessiveHalvingSearch
+from quant_web.core.be.sweep import ParameterSweep
+from quant_web.core.const import DEFAULT_STOCK_POOL
+
+
+START_DATE = datetime(2020, 1, 1)
+END_DATE = datetime(2022, 12, 31)
+FEED_SYMBOLS = DEFAULT_STOCK_POOL[:4]
+GRID = {"short_window": [5, 10, 20], "long_window": [30, 60, 90]}
+
+
+def test_stop_rule_ends_backtest_early(make_engine):
+    """测试提前终止规则触发后回测立即停止并记录原因"""
+    engine = make_engine(("moving_average", "stop", {"short_window": 5, "long_window": 30}))
+    full = engine.execute_backtest(START_DATE, END_DATE, vectorized=True)
+    assert full["stopped_reason"] is None
+
+    stopped = engine.execute_backtest(START_DATE, END_DATE, vectorized=True,
+                                      stop_rules=[MinSharpeStop(min_sharpe=100.0, min_bars=30)])
+    assert "sharpe_ratio" in stopped["stopped_reason"]
+    assert len(stopped["daily_equity"]) == 30
+
+
+def test_max_drawdown_stop_uses_streaming_drawdown():
+    """测试回撤终止规则基于实时最大回撤判断"""
+    metrics = StreamingMetrics()
+    rule = MaxDrawdownStop(threshold=0.05)
+    for equity in (100.0, 110.0, 106.0):
+        metrics.update(equity)
+    assert rule(metrics) is None
+    metrics.update(99.0)
+    assert "max_drawdown" in rule(metrics)
+
+
+def test_successive_halving_keeps_top_fraction_per_rung(data_feed):
+    """测试逐轮减半：每轮保留 1/eta，区间逐轮扩大，最终轮在完整区间上与单独回测一致"""
+    search = SuccessiveHalvingSearch("moving_average", GRID, FEED_SYMBOLS, START_DATE, END_DATE,
+                                     eta=3, stop_rules=[], max_workers=1, data_feed=data_feed)
+    result = search.run()
+
+    rungs = result["rungs"]
+    assert [r["configurations"] for r in rungs] == [9, 3, 1]
+    assert rungs[0]["bars"] < rungs[1]["bars"] < rungs[2]["bars"]
+    assert len(result["eliminated"]) == 8
+    assert result["bars_simulated"] < result["exhaustive_bars"] / 2
+
+    best = result["results"][0]
+    reference = ParameterSweep("moving_average", FEED_SYMBOLS, START_DATE, END_DATE, max_workers=1,
+                               data_feed=data_feed).run({k: [v] for k, v in best["params"].items()})[0]
+    assert best["final_equity"] == pytest.approx(reference["final_equity"])
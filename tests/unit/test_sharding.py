@@ -0,0 +1,69 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import pytest
+
+from quant_web.core.be.sharding import ShardedBacktest, partition
+from quant_web.core.const import DEFAULT_STOCK_POOL
+
+
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+FEED_SYMBOLS = DEFAULT_STOCK_POOL[:5]
+PARAMETERS = {"short_window": 5, "long_window": 20, "position_ratio": 0.5}
+
+
+def test_partition_keeps_order_and_balances_sizes():
+    """测试分片保持股票顺序，各分片大小相差不超过1"""
+    symbols = [f"{i:06d}.SZ" for i in range(11)]
+    shards = partition(symbols, 4)
+    assert [len(shard) for shard in shards] == [3, 3, 3, 2]
+    assert [s for shard in shards for s in shard] == symbols
+    assert partition(symbols[:2], 8) == [[symbols[0]], [symbols[1]]]
+
+
+def _standalone(make_engine, data_feed, symbols, capital):
+    engine = make_engine(("moving_average", "ma", PARAMETERS), initial_cash=capital, feed=data_feed.subset(symbols))
+    return engine.execute_backtest(START_DATE, END_DATE)
+
+
+def test_sharded_result_is_independent_of_worker_count(data_feed, make_engine):
+    """测试分片回测等于各分片独立账户之和，且与工作进程数无关"""
+    symbols = data_feed.get_available_stocks()
+    serial = ShardedBacktest("moving_average", symbols, START_DATE, END_DATE, parameters=PARAMETERS,
+                             max_workers=1, n_shards=3, data_feed=data_feed).run()
+    parallel = ShardedBacktest("moving_average", symbols, START_DATE, END_DATE, parameters=PARAMETERS,
+                               max_workers=2, n_shards=3, data_feed=data_feed).run()
+    assert [d['equity'] for d in parallel['daily_equity']] == [d['equity'] for d in serial['daily_equity']]
+    assert parallel['performance_metrics'] == serial['performance_metrics']
+    assert [shard['symbols'] for shard in serial['shards']] == [symbols[:2], symbols[2:4], symbols[4:]]
+    assert [shard['capital'] for shard in serial['shards']] == [400000.0, 400000.0, 200000.0]
+    
+    final = sum(_standalone(make_engine, data_feed, shard['symbols'], shard['capital'])['daily_equity'][-1]['equity']
+                for shard in serial['shards'])
+    assert serial['daily_equity'][-1]['equity'] == pytest.approx(final)
+    assert serial['daily_equity'][0]['equity'] == pytest.approx(1000000.0)
+
+
+def test_one_shard_per_symbol_gives_independent_accounts(data_feed, make_engine):
+    """测试分片数等于股票数时，每只股票是独立账户，订单ID在合并后保持唯一"""
+    symbols = data_feed.get_available_stocks()
+    result = ShardedBacktest("moving_average", symbols, START_DATE, END_DATE, parameters=PARAMETERS,
+                             max_workers=1, n_shards=len(symbols), data_feed=data_feed).run()
+    runs = [_standalone(make_engine, data_feed, [ts_code], 200000.0) for ts_code in symbols]
+    trades = sum(len(run['order_history']) for run in runs)
+    assert result['daily_equity'][-1]['equity'] == pytest.approx(sum(run['daily_equity'][-1]['equity'] for run in runs))
+    assert result['performance_metrics']['trades_count'] == trades > 0
+    assert len({order.order_id for order in result['order_history']}) == trades
+
+
+def test_cross_sectional_strategy_cannot_be_sharded(data_feed):
+    """测试依赖截面比较的策略不能分片回测"""
+    with pytest.raises(ValueError):
+        ShardedBacktest("momentum", data_feed.get_available_stocks(), START_DATE, END_DATE,
+                        max_workers=1, data_feed=data_feed).run()
@@ -0,0 +1,89 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from quant_web.core.be.data_feed import DataFeed
+from quant_web.core.be.portfolio import Portfolio
+from quant_web.core.be.stress import ShockScenarios, StressTester
+from quant_web.core.const import DEFAULT_STOCK_POOL
+
+
+FEED_SYMBOLS = DEFAULT_STOCK_POOL[:8]
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+
+
+def _portfolio(data_feed) -> Portfolio:
+    portfolio = Portfolio(10000000)
+    prices = data_feed.get_mark_matrix()[-1]
+    symbols = data_feed.get_available_stocks()
+    for j in range(0, len(symbols), 2):
+        portfolio.buy(symbols[j], 1000 * (j + 1), float(prices[j]))
+    return portfolio
+
+
+def test_historical_scenarios_match_manual_pnl(data_feed):
+    """测试历史情景的冲击等于收盘价的逐日涨跌幅，组合盈亏等于逐只股票市值 x 涨跌幅之和"""
+    tester = StressTester(data_feed, lookback=60)
+    scenarios = tester.historical()
+    assert len(scenarios) == 60
+    
+    close = data_feed.get_field_matrix("close")
+    np.testing.assert_allclose(scenarios.shocks, np.nan_to_num(close[-60:] / close[-61:-1] - 1.0))
+    
+    portfolio = _portfolio(data_feed)
+    report = tester.run(portfolio, scenarios)
+    symbols = data_feed.get_available_stocks()
+    prices = dict(zip(symbols, close[-1]))
+    returns = dict(zip(symbols, scenarios.shocks.T))
+    expected = sum(quantity * prices[ts_code] * returns[ts_code]
+                   for ts_code, quantity in portfolio.positions.items())
+    np.testing.assert_allclose(report.pnl, expected)
+    
+    worst = report.worst(1)[0]
+    assert worst["pnl"] == report.pnl.min()
+    assert worst["top_losses"][0][1] <= worst["top_losses"][-1][1]
+    assert report.value_at_risk(0.95) <= report.expected_shortfall(0.95)
+
+
+def test_factor_and_sector_scenarios(data_feed):
+    """测试因子联动情景的协方差接近回看窗口的协方差（前几个因子），行业冲击只作用于行业内股票"""
+    tester = StressTester(data_feed, lookback=250, n_factors=len(FEED_SYMBOLS), seed=7)
+    draws = tester.factor_moves(n=50000)
+    window = data_feed.get_return_matrix()[-250:]
+    np.testing.assert_allclose(np.cov(draws.shocks, rowvar=False), np.cov(window, rowvar=False), atol=2e-5)
+    
+    market = tester.factor_shock(sigmas=-3.0)
+    assert (market.shocks @ np.ones(len(FEED_SYMBOLS)))[0] < 0
+    
+    sectors = {ts_code: "bank" if i < 3 else "tech" for i, ts_code in enumerate(FEED_SYMBOLS[:6])}
+    shocks = tester.sector_shocks(sectors, shock=-0.1)
+    assert shocks.names == ["sector bank -10%", "sector tech -10%"]
+    assert shocks.shocks.sum(axis=1).tolist() == pytest.approx([-0.3, -0.3])
+    
+    scenarios = ShockScenarios.concat([draws, market, shocks])
+    assert len(scenarios) == 50003
+    report = tester.run(_portfolio(data_feed), scenarios)
+    assert len(report.pnl) == 50003 and report.value_at_risk() > 0
+
+
+def test_return_matrix_extends_with_realtime_bars():
+    """测试实时bar追加后缓存的收益率矩阵与整体重建的结果一致"""
+    feed = DataFeed()
+    feed.load_historical_data(FEED_SYMBOLS[:3], START_DATE, END_DATE)
+    feed.get_return_matrix()
+    last = feed.get_mark_matrix()[-1]
+    feed.update_with_realtime(datetime(2023, 7, 3), {FEED_SYMBOLS[0]: float(last[0]) * 1.05,
+                                                     FEED_SYMBOLS[1]: float(last[1]) * 0.9})
+    
+    returns = feed.get_return_matrix()
+    np.testing.assert_allclose(returns[-1], [0.05, -0.1, 0.0])
+    feed._matrix_cache.pop("returns")
+    np.testing.assert_allclose(feed.get_return_matrix(), returns)
@@ -0,0 +1,79 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import json
+from datetime import datetime
+
+import pytest
+
+from quant_web.core.be.sweep import ParameterSweep, expand_grid
+from quant_web.core.const import DEFAULT_INITIAL_CASH, DEFAULT_STOCK_POOL
+from quant_web.core.task_manager import TaskFactory, TaskPriority
+from quant_web.core.tasks import ParameterSweepTask
+
+
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+FEED_SYMBOLS = DEFAULT_STOCK_POOL[:4]
+GRID = {"short_window": [5, 10], "long_window": [30, 60]}
+
+
+def test_expand_grid_is_cartesian_product():
+    """测试参数网格按参数顺序展开为笛卡尔积"""
+    combos = expand_grid({"a": [1, 2], "b": ["x", "y", "z"], "c": 0})
+    assert len(combos) == 6
+    assert combos[0] == {"a": 1, "b": "x", "c": 0}
+    assert combos[-1] == {"a": 2, "b": "z", "c": 0}
+    assert expand_grid({}) == [{}]
+
+
+def test_sweep_ranks_results_and_streams_each_combination(data_feed):
+    """测试参数扫描按指标排序，且进程池与顺序执行结果一致"""
+    streamed = []
+    sweep = ParameterSweep("moving_average", FEED_SYMBOLS, START_DATE, END_DATE,
+                           max_workers=1, data_feed=data_feed)
+    serial = sweep.run(GRID, on_result=streamed.append)
+
+    assert len(streamed) == 4
+    assert [row["rank"] for row in serial] == [1, 2, 3, 4]
+    assert all(row["error"] is None for row in serial)
+    sharpe = [row["sharpe_ratio"] for row in serial]
+    assert sharpe == sorted(sharpe, reverse=True)
+
+    parallel = ParameterSweep("moving_average", FEED_SYMBOLS, START_DATE, END_DATE,
+                              max_workers=2, data_feed=data_feed).run(GRID)
+    assert [row["params"] for row in parallel] == [row["params"] for row in serial]
+    assert [row["final_equity"] for row in parallel] == pytest.approx([row["final_equity"] for row in serial])
+
+
+def test_sweep_rejects_oversized_grid(data_feed, monkeypatch):
+    """测试参数组合数超过上限时拒绝执行"""
+    import quant_web.core.be.sweep as sweep_module
+    monkeypatch.setattr(sweep_module, "SWEEP_MAX_COMBINATIONS", 3)
+    sweep = ParameterSweep("moving_average", FEED_SYMBOLS, START_DATE, END_DATE, data_feed=data_feed)
+    with pytest.raises(ValueError):
+        sweep.run(GRID)
+
+
+def test_sweep_rejects_unknown_rank_metric(data_feed):
+    """测试排序指标不在结果表的绩效指标中时构造即报错"""
+    with pytest.raises(ValueError):
+        ParameterSweep("moving_average", FEED_SYMBOLS, START_DATE, END_DATE, rank_by="sharpe", data_feed=data_feed)
+
+
+def test_reloaded_sweep_task_keeps_its_inputs():
+    """测试从持久化参数重建的参数扫描任务恢复全部扫描输入"""
+    task = ParameterSweepTask(task_id="SW_reload", strategy_name="moving_average", param_grid=GRID,
+                              stock_pool=FEED_SYMBOLS, start_date=START_DATE, end_date=END_DATE,
+                              initial_cash=500000.0, rank_by="total_return", max_workers=2)
+    
+    reloaded = TaskFactory.create_task("ParameterSweepTask", task_id=task.task_id, priority=TaskPriority.HIGH)
+    assert reloaded.initial_cash == DEFAULT_INITIAL_CASH
+    reloaded.load_parameters(json.loads(json.dumps(task.parameters)))
+    
+    assert (reloaded.strategy_name, reloaded.param_grid, reloaded.stock_pool) == ("moving_average", GRID, FEED_SYMBOLS)
+    assert (reloaded.start_date, reloaded.end_date) == (START_DATE, END_DATE)
+    assert (reloaded.initial_cash, reloaded.rank_by, reloaded.max_workers) == (500000.0, "total_return", 2)
@@ -0,0 +1,78 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from quant_web.core.const import DEFAULT_STOCK_POOL, SCAN_ACTIVITY_BARS, SCAN_STATS
+from quant_web.core.re.factor_model import FactorModel
+from quant_web.core.re.universe_scan import UniverseScan
+
+
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+FEED_START_DATE = datetime(2021, 9, 1)  # 回测开始前的数据用于指标预热
+FEED_SYMBOLS = DEFAULT_STOCK_POOL[:6]
+CAPITAL = 100000.0
+STRATEGIES = {
+    "moving_average": {"short_window": 5, "long_window": 20, "position_ratio": 0.5},
+    "rsi_strategy": {}
+}
+
+
+@pytest.fixture(scope="module")
+def scan(data_feed):
+    return UniverseScan(FEED_SYMBOLS, START_DATE, END_DATE, strategies=STRATEGIES, capital=CAPITAL,
+                        max_workers=1, data_feed=data_feed).run()
+
+
+def test_scan_matches_single_symbol_backtests(data_feed, make_engine, scan):
+    """测试逐股扫描的统计量与单独回测每只股票的结果一致"""
+    for name, parameters in STRATEGIES.items():
+        traded = 0
+        for j, code in enumerate(scan.symbols[:3]):
+            engine = make_engine((name, name, parameters), initial_cash=CAPITAL, feed=data_feed.subset([code]))
+            result = engine.execute_backtest(START_DATE, END_DATE, vectorized=True)
+            metrics = result['performance_metrics']
+            traded += len(result['order_history'])
+            
+            stats = {stat: scan.stats[name][stat][j] for stat in SCAN_STATS}
+            assert stats['total_return'] == pytest.approx(metrics['total_return'], abs=1e-12)
+            assert stats['volatility'] == pytest.approx(metrics['annual_volatility'], abs=1e-12)
+            assert stats['sharpe_ratio'] == pytest.approx(metrics['sharpe_ratio'], abs=1e-9)
+            assert stats['max_drawdown'] == pytest.approx(-metrics['max_drawdown'], abs=1e-12)
+            assert stats['win_rate'] == pytest.approx(metrics['win_rate'], abs=1e-12)
+        assert traded > 0
+
+
+def test_scan_is_independent_of_sharding(data_feed, scan):
+    """测试多进程分片扫描与单进程扫描结果相同"""
+    sharded = UniverseScan(FEED_SYMBOLS, START_DATE, END_DATE, strategies=STRATEGIES, capital=CAPITAL,
+                           max_workers=3, data_feed=data_feed).run()
+    
+    assert sharded.symbols == scan.symbols
+    for name in STRATEGIES:
+        for stat in SCAN_STATS:
+            np.testing.assert_array_equal(sharded.stats[name][stat], scan.stats[name][stat])
+    np.testing.assert_array_equal(sharded.volume, scan.volume)
+
+
+def test_factor_results_feed_factor_model(scan):
+    """测试扫描结果转换为因子模型的输入后可以打分"""
+    results = scan.to_factor_results()
+    assert len(results) == len(STRATEGIES)
+    entry = results[0]['stocks'][scan.symbols[0]]
+    assert set(SCAN_STATS) <= set(entry)
+    assert len(entry['volume']) == SCAN_ACTIVITY_BARS
+    assert len(entry['price_changes']) == SCAN_ACTIVITY_BARS - 1
+    
+    model = FactorModel()
+    model.update_stats(scan.symbols, results)
+    scores = [model.score(code, results) for code in scan.symbols]
+    assert len(set(scores)) > 1
+    assert scan.to_frame("rsi_strategy").shape == (len(scan.symbols), len(SCAN_STATS))
@@ -0,0 +1,52 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2023, 6, 30)
+
+
+def _run(make_engine, strategy_name, vectorized):
+    engine = make_engine((strategy_name, "parity", {}))
+    return engine.execute_backtest(START_DATE, END_DATE, vectorized=vectorized)
+
+
+@pytest.mark.parametrize("strategy_name", ["moving_average", "rsi_strategy", "momentum"])
+def test_vectorized_mode_matches_event_loop(make_engine, strategy_name):
+    """测试向量化模式与逐日事件循环的回测结果一致"""
+    event = _run(make_engine, strategy_name, vectorized=False)
+    vector = _run(make_engine, strategy_name, vectorized=True)
+
+    event_equity = np.array([day['equity'] for day in event['daily_equity']])
+    vector_equity = np.array([day['equity'] for day in vector['daily_equity']])
+    assert len(event['order_history']) > 0
+    np.testing.assert_allclose(vector_equity, event_equity, rtol=1e-12)
+
+    # 动量策略在事件循环中按集合顺序输出信号，只比较每日成交的集合
+    def fills(result):
+        return sorted((o.filled_at, o.ts_code, o.side, o.quantity, o.filled_price) for o in result['order_history'])
+    assert fills(vector) == fills(event)
+    assert vector['performance_metrics']['total_return'] == pytest.approx(
+        event['performance_metrics']['total_return'])
+
+
+def test_vectorized_mode_falls_back_for_unsupported_strategy(make_engine, monkeypatch):
+    """测试策略未实现 generate_signals 时回退到事件循环"""
+    from quant_web.core.be.strategy import Strategy
+    from quant_web.core.be.strategies import MovingAverageStrategy
+    monkeypatch.setattr(MovingAverageStrategy, "generate_signals", Strategy.generate_signals)
+
+    engine = make_engine(("moving_average", "fallback", {}))
+    strategy = engine.strategies["fallback"]
+    assert not strategy.supports_vectorized
+
+    result = engine.execute_backtest(START_DATE, END_DATE, vectorized=True)
+    assert len(result['daily_equity']) > 0
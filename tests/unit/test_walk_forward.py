@@ -0,0 +1,70 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from quant_web.core.be.indicators import IndicatorEngine
+from quant_web.core.be.panel import MarketPanel
+from quant_web.core.be.walk_forward import WalkForwardOptimizer, split_windows
+from quant_web.core.const import DEFAULT_STOCK_POOL
+
+
+START_DATE = datetime(2021, 1, 1)
+END_DATE = datetime(2022, 12, 31)
+FEED_SYMBOLS = DEFAULT_STOCK_POOL[:4]
+GRID = {"short_window": [5, 10], "long_window": [30, 60]}
+
+
+def test_split_windows_rolls_by_out_of_sample_length():
+    """测试窗口按样本外长度滚动，样本外区间首尾相接且最后一段截断"""
+    dates = pd.bdate_range("2022-01-03", periods=100)
+    folds = split_windows(dates, in_sample_bars=40, out_sample_bars=25)
+    assert len(folds) == 3
+    assert [f.in_sample_start for f in folds] == [dates[0], dates[25], dates[50]]
+    assert [f.out_sample_start for f in folds] == [dates[40], dates[65], dates[90]]
+    assert folds[-1].out_sample_end == dates[-1]
+
+    anchored = split_windows(dates, in_sample_bars=40, out_sample_bars=25, anchored=True)
+    assert all(f.in_sample_start == dates[0] for f in anchored)
+
+
+def test_panel_indicator_reuses_full_history_prefix(data_feed):
+    """测试面板指标截取数据馈送上的全历史缓存，与在截断面板上直接计算一致"""
+    panel = MarketPanel.from_data_feed(data_feed, end_date=datetime(2021, 9, 30))
+    values, previous = panel.indicator("sma", with_previous=True, window=20)
+    expected, expected_previous = IndicatorEngine.compute(panel.close, "sma", with_previous=True, window=20)
+    np.testing.assert_array_equal(values, expected)
+    np.testing.assert_array_equal(previous, expected_previous)
+    assert len(data_feed._indicator_cache) == 1
+
+
+def test_walk_forward_stitches_out_of_sample_folds(data_feed):
+    """测试walk-forward逐窗口选参并拼接样本外净值，进程池与顺序执行结果一致"""
+    def run(max_workers):
+        return WalkForwardOptimizer("moving_average", GRID, FEED_SYMBOLS, START_DATE, END_DATE,
+                                    in_sample_bars=120, out_sample_bars=60, max_workers=max_workers,
+                                    data_feed=data_feed).run()
+
+    serial = run(1)
+    folds = serial["folds"]
+    assert len(folds) == 7
+    assert all(fold["best_params"]["short_window"] in (5, 10) for fold in folds)
+    # 每个参数组合的均线只在全历史上计算一次，各窗口共享
+    cached = {dict(params)["window"] for name, _, params in data_feed._indicator_cache if name == "sma"}
+    assert {5, 10, 30, 60} <= cached
+
+    curve = serial["equity_curve"]
+    dates = [point["date"] for point in curve]
+    assert dates == sorted(set(dates))
+    assert dates[0] == folds[0]["out_sample_start"] and dates[-1] == folds[-1]["out_sample_end"]
+    assert serial["performance_metrics"]["bars"] == len(curve)
+
+    parallel = run(2)
+    assert [f["best_params"] for f in parallel["folds"]] == [f["best_params"] for f in folds]
+    np.testing.assert_allclose([p["equity"] for p in parallel["equity_curve"]], [p["equity"] for p in curve])